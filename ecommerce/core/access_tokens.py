@@ -0,0 +1,134 @@
+"""
+Refresh-ahead caching of the access tokens sites use to call other services.
+
+A token is renewed in a background thread once a fraction of its lifetime has passed, and the cached
+token is served until the new one is available, so requests do not wait for the OAuth provider. A lock
+in the django cache ensures a single process renews the token of a site at a time. Processes that find
+no usable token in the cache wait for the process holding the lock instead of requesting their own.
+"""
+from __future__ import absolute_import
+
+import datetime
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from edx_django_utils import monitoring as monitoring_utils
+from edx_django_utils.cache import TieredCache
+from edx_django_utils.cache.utils import DEFAULT_REQUEST_CACHE
+from edx_rest_api_client.client import EdxRestApiClient
+
+logger = logging.getLogger(__name__)
+
+ACCESS_TOKEN_CACHE_KEY = 'site_access_token_{site_configuration_id}'
+ACCESS_TOKEN_LOCK_CACHE_KEY = 'site_access_token_lock_{site_configuration_id}'
+LOCK_POLL_INTERVAL = 0.1  # Value is in seconds.
+
+
+def _get_credentials(site_configuration):
+    return (
+        '{root}/access_token'.format(root=site_configuration.oauth2_provider_url),
+        site_configuration.oauth_settings['BACKEND_SERVICE_EDX_OAUTH2_KEY'],
+        site_configuration.oauth_settings['BACKEND_SERVICE_EDX_OAUTH2_SECRET'],
+    )
+
+
+def _fetch_access_token(credentials):
+    """
+    Retrieves a new access token from the OAuth provider.
+
+    Returns:
+        dict: The access token, with the times at which it expires and should be refreshed.
+    """
+    access_token, expiration_datetime = EdxRestApiClient.get_oauth_access_token(*credentials, token_type='jwt')
+
+    now = time.time()
+    lifetime = (expiration_datetime - datetime.datetime.utcnow()).total_seconds()
+    return {
+        'access_token': access_token,
+        'expires_at': now + lifetime,
+        'refresh_at': now + lifetime * settings.ACCESS_TOKEN_REFRESH_FRACTION,
+    }
+
+
+def _get_timeout(entry):
+    return int(entry['expires_at'] - time.time())
+
+
+def _refresh_access_token(key, lock_key, credentials):
+    try:
+        entry = _fetch_access_token(credentials)
+        # The request cache of this thread is never read, so the token is only cached in the django cache.
+        django_cache.set(key, entry, _get_timeout(entry))
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Failed to refresh the access token cached under [%s].', key)
+    finally:
+        django_cache.delete(lock_key)
+
+
+def _wait_for_access_token(key, lock_key):
+    """
+    Waits for the process holding the lock to cache a new access token.
+
+    Returns:
+        dict: The cached access token, or None if the lock was released or expired without one.
+    """
+    deadline = time.time() + settings.ACCESS_TOKEN_REFRESH_LOCK_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = django_cache.get(key)
+        if entry is not None and entry['expires_at'] > time.time():
+            return entry
+        if django_cache.get(lock_key) is None:
+            break
+    return None
+
+
+def get_access_token(site_configuration):
+    """
+    Returns an access token for the site's service user, renewing it ahead of its expiration.
+
+    Arguments:
+        site_configuration (SiteConfiguration)
+
+    Returns:
+        str: JWT access token
+    """
+    key = ACCESS_TOKEN_CACHE_KEY.format(site_configuration_id=site_configuration.id)
+    lock_key = ACCESS_TOKEN_LOCK_CACHE_KEY.format(site_configuration_id=site_configuration.id)
+    lock_timeout = settings.ACCESS_TOKEN_REFRESH_LOCK_TIMEOUT
+
+    cached_response = TieredCache.get_cached_response(key)
+    entry = cached_response.value if cached_response.is_found else None
+    if entry is not None and entry['refresh_at'] <= time.time():
+        # The token may have been renewed since it was cached for the current request.
+        entry = django_cache.get(key) or entry
+        DEFAULT_REQUEST_CACHE.set(key, entry)
+        if entry['refresh_at'] <= time.time() and django_cache.add(lock_key, True, lock_timeout):
+            monitoring_utils.set_custom_metric('access_token_refresh', 'background')
+            thread = threading.Thread(
+                target=_refresh_access_token, args=(key, lock_key, _get_credentials(site_configuration))
+            )
+            thread.daemon = True
+            thread.start()
+
+    if entry is not None and entry['expires_at'] > time.time():
+        return entry['access_token']
+
+    credentials = _get_credentials(site_configuration)
+    if django_cache.add(lock_key, True, lock_timeout):
+        try:
+            entry = _fetch_access_token(credentials)
+            TieredCache.set_all_tiers(key, entry, _get_timeout(entry))
+        finally:
+            django_cache.delete(lock_key)
+    else:
+        entry = _wait_for_access_token(key, lock_key)
+        if entry is None:
+            entry = _fetch_access_token(credentials)
+        TieredCache.set_all_tiers(key, entry, _get_timeout(entry))
+
+    monitoring_utils.set_custom_metric('access_token_refresh', 'blocking')
+    return entry['access_token']
@@ -0,0 +1,275 @@
+"""Process-local caching in front of TieredCache, batched TieredCache lookups and single-flight cache fills."""
+from __future__ import absolute_import
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from edx_django_utils import monitoring as monitoring_utils
+from edx_django_utils.cache import TieredCache
+from edx_django_utils.cache.utils import DEFAULT_REQUEST_CACHE, CachedResponse
+
+VOUCHER_CACHE_RESOURCE = 'voucher'
+COURSE_INFO_CACHE_RESOURCE = 'course_info'
+PROGRAM_CACHE_RESOURCE = 'program'
+ENTERPRISE_LEARNER_CACHE_RESOURCE = 'enterprise_learner'
+OFFER_INDEX_CACHE_RESOURCE = 'offer_index'
+PRODUCT_CLASS_CACHE_RESOURCE = 'product_class'
+
+SINGLE_FLIGHT_LOCK_KEY = '{key}.single_flight_lock'
+SINGLE_FLIGHT_STALE_KEY = '{key}.stale'
+SINGLE_FLIGHT_POLL_INTERVAL = 0.1  # Value is in seconds.
+_MISSING = object()
+
+
+class LocalLRUCache:
+    """
+    A bounded, thread-safe, least-recently-used cache whose entries expire after a timeout.
+
+    Values are stored by reference, not pickled, so callers must treat them as read-only.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_cached_response(self, key):
+        """
+        Retrieves a CachedResponse for the provided key, counting the lookup as a hit or a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return CachedResponse(is_found=False, key=key, value=None)
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return CachedResponse(is_found=True, key=key, value=entry[1])
+
+    def set(self, key, value, timeout):
+        """
+        Caches the value for `timeout` seconds, evicting the least recently used entry when full.
+        """
+        if self.max_size < 1 or timeout <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.time() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+            }
+
+
+class ProcessTieredCache:
+    """
+    A three tiered cache: a per-resource, process-local LRU tier backed by TieredCache.
+
+    The process-local tier survives across requests, so hot values are served from worker memory
+    instead of being unpickled from the django cache on every request. Its size and timeout are
+    configured per resource in the PROCESS_CACHE_RESOURCES setting; resources that are not
+    configured skip the process-local tier.
+    """
+    _tiers = {}
+    _tiers_lock = threading.Lock()
+
+    @classmethod
+    def get_tier(cls, resource):
+        """
+        Returns the process-local tier of the given resource, or None if the resource is not configured.
+        """
+        config = settings.PROCESS_CACHE_RESOURCES.get(resource)
+        if not config:
+            return None
+
+        with cls._tiers_lock:
+            tier = cls._tiers.get(resource)
+            if tier is None or tier.max_size != config['max_size']:
+                tier = cls._tiers[resource] = LocalLRUCache(config['max_size'])
+            return tier
+
+    @classmethod
+    def get_cached_response(cls, resource, key):
+        """
+        Retrieves a CachedResponse for the provided key, filling the process-local tier on a TieredCache hit.
+
+        Args:
+            resource (str): Name of the cached resource, as used in PROCESS_CACHE_RESOURCES.
+            key (str)
+
+        Returns:
+            A CachedResponse with is_found status and value.
+        """
+        tier = cls.get_tier(resource)
+        # Honor the force_cache_miss query parameter TieredCache supports for staff users.
+        if tier is None or TieredCache._should_force_django_cache_miss():  # pylint: disable=protected-access
+            return TieredCache.get_cached_response(key)
+
+        cached_response = tier.get_cached_response(key)
+        if cached_response.is_found:
+            return cached_response
+
+        cached_response = TieredCache.get_cached_response(key)
+        if cached_response.is_found:
+            tier.set(key, cached_response.value, settings.PROCESS_CACHE_RESOURCES[resource]['timeout'])
+        return cached_response
+
+    @classmethod
+    def set_all_tiers(cls, resource, key, value, django_cache_timeout):
+        """
+        Caches the value in the process-local tier and in both TieredCache tiers.
+
+        The process-local timeout never exceeds `django_cache_timeout`.
+        """
+        TieredCache.set_all_tiers(key, value, django_cache_timeout)
+        tier = cls.get_tier(resource)
+        if tier is not None:
+            timeout = min(settings.PROCESS_CACHE_RESOURCES[resource]['timeout'], django_cache_timeout)
+            tier.set(key, value, timeout)
+
+    @classmethod
+    def delete_all_tiers(cls, resource, key):
+        TieredCache.delete_all_tiers(key)
+        tier = cls.get_tier(resource)
+        if tier is not None:
+            tier.delete(key)
+
+    @classmethod
+    def clear_resource(cls, resource):
+        """
+        Clears the process-local tier of a resource. TieredCache entries are left to expire.
+        """
+        tier = cls.get_tier(resource)
+        if tier is not None:
+            tier.clear()
+
+    @classmethod
+    def get_stats(cls):
+        """
+        Returns the hit, miss and size counters of each process-local tier, keyed by resource.
+        """
+        with cls._tiers_lock:
+            tiers = dict(cls._tiers)
+        return {resource: tier.get_stats() for resource, tier in tiers.items()}
+
+    @classmethod
+    def dangerous_clear_all_tiers(cls):
+        """
+        Clears every process-local tier, the request cache and the entire django cache.
+
+        Important: This should probably only be called for testing purposes.
+        """
+        with cls._tiers_lock:
+            cls._tiers = {}
+        TieredCache.dangerous_clear_all_tiers()
+
+
+def get_many_cached_responses(keys):
+    """
+    Retrieves CachedResponses for several keys from TieredCache, reading every key
+    that misses the request cache from the django cache with a single multi-get.
+
+    Args:
+        keys (iterable of str)
+
+    Returns:
+        dict: CachedResponses keyed by key.
+    """
+    cached_responses = {}
+    uncached_keys = []
+    for key in keys:
+        cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(key)
+        if cached_response.is_found:
+            cached_responses[key] = cached_response
+        else:
+            uncached_keys.append(key)
+
+    # Honor the force_cache_miss query parameter TieredCache supports for staff users.
+    if uncached_keys and not TieredCache._should_force_django_cache_miss():  # pylint: disable=protected-access
+        for key, value in django_cache.get_many(uncached_keys).items():
+            DEFAULT_REQUEST_CACHE.set(key, value)
+            cached_responses[key] = CachedResponse(is_found=True, key=key, value=value)
+
+    for key in uncached_keys:
+        if key not in cached_responses:
+            cached_responses[key] = CachedResponse(is_found=False, key=key, value=None)
+    return cached_responses
+
+
+def get_or_fetch_single_flight(key, fetch, timeout, resource=None):
+    """
+    Returns the cached value of the key, calling `fetch` to compute and cache it on a cache miss.
+
+    Only one caller, across all processes sharing the django cache, fetches a given key at a time. The others
+    are served the last value cached for the key, which is kept for SINGLE_FLIGHT_STALE_TIMEOUT seconds after
+    it expires, while the value is revalidated. Callers without a stale value wait for the fetch to complete,
+    and fetch the value themselves if it does not complete within SINGLE_FLIGHT_LOCK_TIMEOUT seconds.
+
+    Args:
+        key (str)
+        fetch (callable): Returns the value to cache. Exceptions are propagated and nothing is cached.
+        timeout (int): Number of seconds the value is cached for.
+        resource (str): Name of the cached resource, to also cache the value in its ProcessTieredCache tier.
+
+    Returns:
+        The cached or fetched value.
+    """
+    cached_response = ProcessTieredCache.get_cached_response(resource, key)
+    if cached_response.is_found:
+        return cached_response.value
+
+    lock_key = SINGLE_FLIGHT_LOCK_KEY.format(key=key)
+    stale_key = SINGLE_FLIGHT_STALE_KEY.format(key=key)
+    lock_timeout = settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+
+    if django_cache.add(lock_key, True, lock_timeout):
+        try:
+            value = fetch()
+            ProcessTieredCache.set_all_tiers(resource, key, value, timeout)
+            django_cache.set(stale_key, value, timeout + settings.SINGLE_FLIGHT_STALE_TIMEOUT)
+        finally:
+            django_cache.delete(lock_key)
+        return value
+
+    stale_value = django_cache.get(stale_key, _MISSING)
+    if stale_value is not _MISSING:
+        monitoring_utils.set_custom_metric('single_flight_stale_response', key)
+        return stale_value
+
+    deadline = time.time() + lock_timeout
+    while time.time() < deadline and django_cache.get(lock_key) is not None:
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+        cached_response = TieredCache.get_cached_response(key)
+        if cached_response.is_found:
+            return cached_response.value
+
+    monitoring_utils.set_custom_metric('single_flight_lock_timeout', key)
+    value = fetch()
+    ProcessTieredCache.set_all_tiers(resource, key, value, timeout)
+    return value
@@ -0,0 +1,182 @@
+"""
+Process-wide pools of keep-alive HTTP connections for the REST API clients.
+
+Every EdxRestApiClient used to create its own requests.Session, so each client, and therefore each
+request, opened new TCP and TLS connections to the LMS, Discovery and Enterprise services. The adapters
+in this module are shared by all sessions created for the same upstream host, so connections are reused
+across clients, requests and threads. Sessions are still created per client because the client sets its
+authentication on the session.
+"""
+from __future__ import absolute_import
+
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from edx_django_utils import monitoring as monitoring_utils
+from requests.adapters import HTTPAdapter
+from six.moves.urllib.parse import urlsplit
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    An HTTPAdapter that applies a default timeout and keeps statistics about the reuse of its connections.
+
+    Requests made while all connections of the pool are in use are counted as saturated. They are still
+    sent, over a connection that is discarded afterwards instead of being returned to the pool.
+    """
+
+    def __init__(self, pool_size, max_retries, backoff_factor, timeout):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.requests = 0
+        self.in_flight = 0
+        self.saturated_requests = 0
+        self._stats_lock = threading.Lock()
+        # Without retries, errors are raised as they are by requests, instead of as exhausted retries. Read
+        # errors are never retried: the request may have been processed, and exhausted retries would be raised
+        # as a ConnectionError, which the callers handle differently from a Timeout.
+        retry = Retry(
+            total=max_retries, read=False, backoff_factor=backoff_factor, raise_on_status=False
+        ) if max_retries else 0
+        super(PooledHTTPAdapter, self).__init__(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        # Sessions do not have a default timeout. EdxRestApiClient sets session.timeout, which requests ignores.
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+
+        with self._stats_lock:
+            self.requests += 1
+            self.in_flight += 1
+            saturated = self.in_flight > self.pool_size
+            if saturated:
+                self.saturated_requests += 1
+
+        if saturated:
+            host = urlsplit(request.url).netloc
+            monitoring_utils.set_custom_metric('api_client_pool_saturated', host)
+            logger.debug('All [%d] pooled connections to [%s] are in use.', self.pool_size, host)
+
+        try:
+            return super(PooledHTTPAdapter, self).send(request, **kwargs)
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+
+    def close(self):
+        # The adapter is shared by every session created for its host, so closing one of those
+        # sessions must not close the connections the others are using.
+        pass
+
+    def get_stats(self):
+        """
+        Returns the number of requests sent and connections opened through this adapter.
+        """
+        pools = self.poolmanager.pools
+        connections = 0
+        pool_requests = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                pool_requests += pool.num_requests
+
+        with self._stats_lock:
+            return {
+                'requests': self.requests,
+                'connections_opened': connections,
+                'connections_reused': max(pool_requests - connections, 0),
+                'in_flight': self.in_flight,
+                'saturated_requests': self.saturated_requests,
+                'pool_size': self.pool_size,
+            }
+
+
+class TimeoutSession(requests.Session):
+    """
+    A session whose requests time out after `request_timeout` seconds, unless they are given their own timeout.
+
+    EdxRestApiClient overrides the session's timeout attribute, which requests ignores, so the timeout is
+    kept under a different name.
+    """
+
+    def __init__(self, request_timeout):
+        super(TimeoutSession, self).__init__()
+        self.request_timeout = request_timeout
+
+    def request(self, method, url, **kwargs):  # pylint: disable=arguments-differ
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.request_timeout
+        return super(TimeoutSession, self).request(method, url, **kwargs)
+
+
+_adapters = {}
+_adapters_lock = threading.Lock()
+
+
+def _get_pool_key(url):
+    parts = urlsplit(url)
+    return '{scheme}://{netloc}/'.format(scheme=parts.scheme, netloc=parts.netloc)
+
+
+def get_pooled_adapter(url):
+    """
+    Returns the adapter shared by all API client sessions for the host of the given URL.
+    """
+    key = _get_pool_key(url)
+    adapter = _adapters.get(key)
+    if adapter is None:
+        with _adapters_lock:
+            adapter = _adapters.get(key)
+            if adapter is None:
+                pool_settings = settings.API_CLIENT_CONNECTION_POOL
+                adapter = PooledHTTPAdapter(
+                    pool_size=pool_settings['POOL_SIZE'],
+                    max_retries=pool_settings['MAX_RETRIES'],
+                    backoff_factor=pool_settings['BACKOFF_FACTOR'],
+                    timeout=pool_settings['TIMEOUT'],
+                )
+                _adapters[key] = adapter
+    return adapter
+
+
+def get_api_client_session(url, timeout=None):
+    """
+    Returns a new session whose requests to the host of the given URL use the shared connection pool.
+
+    Args:
+        url (str): URL of the API the session will be used for.
+        timeout (float): Number of seconds after which the session's requests time out. Defaults to the
+            TIMEOUT of the API_CLIENT_CONNECTION_POOL setting.
+
+    Returns:
+        requests.Session
+    """
+    session = TimeoutSession(timeout) if timeout else requests.Session()
+    session.mount(_get_pool_key(url), get_pooled_adapter(url))
+    return session
+
+
+def get_api_client_pool_stats():
+    """
+    Returns the connection pool statistics of every upstream host, keyed by the host's root URL.
+    """
+    with _adapters_lock:
+        adapters = list(_adapters.items())
+    return {key: adapter.get_stats() for key, adapter in adapters}
+
+
+def clear_api_client_pools():
+    """
+    Closes the pooled connections of every upstream host and drops their adapters.
+    """
+    with _adapters_lock:
+        adapters = list(_adapters.values())
+        _adapters.clear()
+    for adapter in adapters:
+        HTTPAdapter.close(adapter)
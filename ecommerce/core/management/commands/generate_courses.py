@@ -130,43 +130,42 @@ class Command(BaseCommand):
             else:
                 logger.info("%s has been set to %s", setting, enrollment[setting])
 
+        seats = []
         if enrollment["audit"]:
-            course.create_or_update_seat("", False, 0)
-            logger.info("Created audit seat for course %s", course.id)
+            seats.append({"certificate_type": "", "id_verification_required": False, "price": 0})
         if enrollment["honor"]:
-            course.create_or_update_seat("honor", False, 0)
-            logger.info("Created honor seat for course %s", course.id)
+            seats.append({"certificate_type": "honor", "id_verification_required": False, "price": 0})
         if enrollment["verified"]:
-            course.create_or_update_seat(
-                certificate_type="verified",
-                id_verification_required=True,
-                price=100,
-                expires=self.default_upgrade_deadline
-            )
-            logger.info("Created verified seat for course %s", course.id)
+            seats.append({
+                "certificate_type": "verified",
+                "id_verification_required": True,
+                "price": 100,
+                "expires": self.default_upgrade_deadline
+            })
         if enrollment["professional_education"]:
             id_verification_required = not enrollment["no_id_verification"]
-            course.create_or_update_seat(
-                certificate_type="professional",
-                id_verification_required=id_verification_required,
-                price=1000
-            )
-            logger.info(
-                "Created professional seat for course %s. ID verification requirement has been set to %s",
-                course.id,
-                id_verification_required
-            )
+            seats.append({
+                "certificate_type": "professional",
+                "id_verification_required": id_verification_required,
+                "price": 1000
+            })
         if enrollment["credit"]:
             credit_provider = enrollment["credit_provider"]
-            course.create_or_update_seat(
-                certificate_type="credit",
-                id_verification_required=True,
-                price=2000,
-                credit_provider=credit_provider,
-                credit_hours=100
-            )
+            seats.append({
+                "certificate_type": "credit",
+                "id_verification_required": True,
+                "price": 2000,
+                "credit_provider": credit_provider,
+                "credit_hours": 100
+            })
+
+        # The seats of the course are created together, with a few queries for all of them.
+        course.create_or_update_seats(seats)
+
+        for seat in seats:
             logger.info(
-                "Created credit seat for course %s, with credit provider %s",
+                "Created %s seat for course %s. ID verification requirement has been set to %s",
+                seat["certificate_type"] or "audit",
                 course.id,
-                credit_provider
+                seat["id_verification_required"]
             )
@@ -1,5 +1,10 @@
 """
 Django management command to Sync Product, Orders and Lines to Hubspot server.
+
+Objects are streamed from the database into batches, and the batches of each object type are uploaded
+by a bounded pool of workers which retry transient failures with exponential backoff. With --incremental
+the carts changed since the previous successful sync of a site, and in the --overlap-minutes before it, are
+synced instead of those of a single day.
 """
 from __future__ import absolute_import
 
@@ -7,21 +12,25 @@ import json
 import logging
 import time
 import traceback
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from decimal import Decimal as D
 
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import Q
+from django.db.models import Prefetch, Q
+from django.utils import timezone
 from edx_rest_api_client.client import EdxRestApiClient
 from oscar.core.loading import get_class, get_model
-from six.moves import range
+from requests.exceptions import ConnectionError as ReqConnectionError
+from requests.exceptions import Timeout
 from slumber.exceptions import HttpClientError, HttpServerError
 
 from ecommerce.extensions.fulfillment.status import ORDER
 
 Basket = get_model('basket', 'Basket')
 CartLine = get_model('basket', 'Line')
+HubspotSyncWatermark = get_model('core', 'HubspotSyncWatermark')
 Order = get_model('order', 'Order')
 OrderLine = get_model('order', 'Line')
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
@@ -32,6 +41,10 @@ logger = logging.getLogger(__name__)
 
 
 DEFAULT_INITIAL_DAYS = 1
+DEFAULT_OVERLAP_MINUTES = 10
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_RETRIES = 3
+RETRY_BACKOFF = 1  # Value is in seconds, doubled after each retry.
 HUBSPOT_API_BASE_URL = 'https://api.hubapi.com'
 HUBSPOT_ECOMMERCE_SETTINGS = {
     'enabled': True,
@@ -174,11 +187,17 @@ PRODUCT = "PRODUCT"
 LINE_ITEM = "LINE_ITEM"
 DEAL = "DEAL"
 BATCH_SIZE = 200
+UPSERT_ERRORS = (HttpClientError, HttpServerError, ReqConnectionError, Timeout)
 
 
 class Command(BaseCommand):
     help = 'Sync Product, Orders and Lines to Hubspot server.'
     initial_sync_days = None
+    incremental = False
+    overlap = timedelta(minutes=DEFAULT_OVERLAP_MINUTES)
+    workers = DEFAULT_WORKERS
+    max_retries = DEFAULT_MAX_RETRIES
+    sync_until = None
 
     def _get_hubspot_enable_sites(self):
         """
@@ -266,7 +285,8 @@ class Command(BaseCommand):
     def _get_carts_extra_properties(self, cart):
         total_price = D(0.0)
         description = ''
-        lines = cart.all_lines()
+        # The lines are prefetched by _iter_carts.
+        lines = cart.lines.all()
         for line in lines:
             total_price += self._get_cart_line_prices(line, 'price_incl_tax')
             description += self._get_cart_line_information(line)
@@ -287,27 +307,41 @@ class Command(BaseCommand):
             'Quantity': line.quantity
         })
 
+    def _iter_carts(self, carts):
+        """
+        Yields the given carts with their lines and orders, loading BATCH_SIZE carts at a time.
+        """
+        carts = carts.select_related('owner').prefetch_related(
+            Prefetch('lines', queryset=CartLine.objects.select_related('product__course').order_by('id')),
+            Prefetch('order_set', queryset=Order.objects.select_related('user')),
+        ).order_by('id')
+        last_id = 0
+        while True:
+            chunk = list(carts.filter(id__gt=last_id)[:BATCH_SIZE])
+            if not chunk:
+                return
+            for cart in chunk:
+                yield cart
+            last_id = chunk[-1].id
+
     def _get_hubspot_contact_structure(self, users):
         """
-        Returns list of dicts, each dict represents hubspot CONTACT.
+        Yields dicts, each dict represents hubspot CONTACT.
         """
-        hubspot_contacts = []
         for user in users:
-            hubspot_contacts.append({
+            yield {
                 'integratorObjectId': str(user.id),
                 'action': 'UPSERT',
                 'changeOccurredTimestamp': self._get_timestamp(),
                 'propertyNameToValues': {
                     'email': user.email
                 }
-            })
-        return hubspot_contacts
+            }
 
     def _get_hubspot_deal_structure(self, carts, partner):
         """
-        Returns list of dicts, each dict represents hubspot DEAL.
+        Yields dicts, each dict represents hubspot DEAL.
         """
-        hubspot_deals = []
         for cart in carts:
             deal = {
                 'integratorObjectId': str(cart.id),
@@ -317,7 +351,7 @@ class Command(BaseCommand):
             }
             total_price, description = self._get_carts_extra_properties(cart)
             if cart.status == Basket.SUBMITTED:
-                order = Order.objects.filter(basket=cart).first()
+                order = cart.order_set.all()[0]
                 deal['propertyNameToValues'] = {
                     'deal_name': order.number,
                     'total_incl_tax': float(order.total_incl_tax),
@@ -334,44 +368,40 @@ class Command(BaseCommand):
                     'user_id': str(cart.owner.id) if cart.owner else ''
                 }
             deal['propertyNameToValues']['description'] = description
-            hubspot_deals.append(deal)
-        return hubspot_deals
+            yield deal
 
     def _get_hubspot_line_item_structure(self, lines):
         """
-        Returns list of dicts, each dict represents hubspot LINE_ITEM.
+        Yields dicts, each dict represents hubspot LINE_ITEM.
         """
-        hubspot_line_items = []
         for line in lines:
             line_price_incl_tax = self._get_cart_line_prices(line, 'price_incl_tax')
             line_price_excl_tax = self._get_cart_line_prices(line, 'price_excl_tax')
-            hubspot_line_items.append({
+            yield {
                 'integratorObjectId': str(line.id),
                 'action': 'UPSERT',
                 'changeOccurredTimestamp': self._get_timestamp(),
                 'propertyNameToValues': {
-                    'order_id': str(line.basket.id),
+                    'order_id': str(line.basket_id),
                     'price_currency': str(line.price_currency),
                     'tax': float(line_price_incl_tax - line_price_excl_tax),
-                    'product_id': str(line.product.id),
+                    'product_id': str(line.product_id),
                     'price_incl_tax': float(line_price_incl_tax),
                     'price_excl_tax': float(line_price_excl_tax),
                     'quantity': line.quantity
                 }
-            })
-        return hubspot_line_items
+            }
 
     def _get_hubspot_product_structure(self, products):
         """
-        Returns list of dicts, each dict represents hubspot PRODUCT.
+        Yields dicts, each dict represents hubspot PRODUCT.
         """
-        hubspot_products = []
         for product in products:
             if product.description:
                 description = product.description
             else:
                 description = product.course.id if product.course else ''
-            hubspot_products.append({
+            yield {
                 'integratorObjectId': str(product.id),
                 'action': 'UPSERT',
                 'changeOccurredTimestamp': self._get_timestamp(),
@@ -379,50 +409,115 @@ class Command(BaseCommand):
                     'title': str(product.title),
                     'description': description
                 }
-            })
-        return hubspot_products
+            }
 
-    def _upsert_hubspot_objects(self, object_type, objects, site_configuration):
+    def _iter_batches(self, objects):
         """
-        Calls the sync message endpoint on given objects (PRODUCT, DEAL
-        and LINE_ITEM) and each request can has 200 (BATCH_SIZE) objects.
+        Groups the given objects into lists of at most BATCH_SIZE objects.
         """
-        try:
-            total = len(objects)
-            for start in range(0, total, BATCH_SIZE):
-                batch = objects[start:start + BATCH_SIZE]
-                self.stdout.write(
-                    'Syncing {object_type}s batch from {start} to {end} of total: {total} for site {site}'.format(
-                        object_type=object_type,
-                        start=start,
-                        end=start + BATCH_SIZE,
-                        total=total,
-                        site=site_configuration.site.domain
-                    )
-                )
-                self._hubspot_endpoint(
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _is_retryable(self, ex):
+        """
+        Returns True if the request may succeed when retried, i.e. unless HubSpot rejected it.
+        """
+        if isinstance(ex, HttpClientError):
+            response = getattr(ex, 'response', None)
+            return response is not None and response.status_code == 429
+        return True
+
+    def _put_sync_messages(self, object_type, batch, site_configuration):
+        """
+        Calls the sync message endpoint on a batch, retrying transient failures with exponential backoff.
+        """
+        attempt = 0
+        while True:
+            try:
+                return self._hubspot_endpoint(
                     object_type,
                     'extensions/ecomm/v1/sync-messages/',
                     'PUT',
                     body=batch,
                     hapikey=site_configuration.hubspot_secret_key
                 )
+            except UPSERT_ERRORS as ex:
+                if attempt >= self.max_retries or not self._is_retryable(ex):
+                    raise
+                time.sleep(RETRY_BACKOFF * 2 ** attempt)
+                attempt += 1
+
+    def _collect_upserts(self, object_type, pending, site_configuration, return_when):
+        """
+        Waits for the pending batches (futures mapped to the index of their first object) and reports them.
+
+        Returns:
+            bool: True if all the completed batches were synced.
+        """
+        done, __ = wait(pending, return_when=return_when)
+        success = True
+        for future in done:
+            start = pending.pop(future)
+            try:
+                future.result()
+            except UPSERT_ERRORS as ex:
+                self.stderr.write(
+                    'An error occurred while upserting {object_type} for site {site}: {message}'.format(
+                        object_type=object_type, site=site_configuration.site.domain, message=ex
+                    )
+                )
+                success = False
+            else:
                 self.stdout.write(
-                    'Successfully synced {object_type}s batch from {start} to {end} of total: '
-                    '{total} for site {site}'.format(
+                    'Successfully synced {object_type}s batch from {start} to {end} for site {site}'.format(
                         object_type=object_type,
                         start=start,
                         end=start + BATCH_SIZE,
-                        total=total,
                         site=site_configuration.site.domain
                     )
                 )
-        except (HttpClientError, HttpServerError) as ex:
-            self.stderr.write(
-                'An error occurred while upserting {object_type} for site {site}: {message}'.format(
-                    object_type=object_type, site=site_configuration.site.domain, message=ex
+        return success
+
+    def _upsert_hubspot_objects(self, object_type, objects, site_configuration):
+        """
+        Calls the sync message endpoint on given objects (PRODUCT, DEAL
+        and LINE_ITEM) and each request can has 200 (BATCH_SIZE) objects.
+
+        The batches are built as the objects are consumed and uploaded by at most `workers` concurrent
+        requests, so that no more than `workers` batches are held at once. No further batches are
+        uploaded once one of them fails.
+
+        Returns:
+            bool: True if all the objects were synced.
+        """
+        success = True
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for index, batch in enumerate(self._iter_batches(objects)):
+                start = index * BATCH_SIZE
+                self.stdout.write(
+                    'Syncing {object_type}s batch from {start} to {end} for site {site}'.format(
+                        object_type=object_type,
+                        start=start,
+                        end=start + BATCH_SIZE,
+                        site=site_configuration.site.domain
+                    )
                 )
-            )
+                future = executor.submit(self._put_sync_messages, object_type, batch, site_configuration)
+                pending[future] = start
+                if len(pending) >= self.workers:
+                    success = self._collect_upserts(object_type, pending, site_configuration, FIRST_COMPLETED)
+                    if not success:
+                        break
+            if pending:
+                success = self._collect_upserts(object_type, pending, site_configuration, ALL_COMPLETED) and success
+        return success
 
     def _call_sync_errors_messages_endpoint(self, site_configuration):
         """
@@ -451,12 +546,43 @@ class Command(BaseCommand):
                 )
             )
 
+    def _get_synced_until(self, site_configuration):
+        """
+        Returns the time up to which the carts of the site have been synced, or None before the first incremental sync.
+        """
+        watermark = HubspotSyncWatermark.objects.filter(site_configuration=site_configuration).first()
+        return watermark.synced_until if watermark else None
+
+    def _set_synced_until(self, site_configuration, synced_until):
+        HubspotSyncWatermark.objects.update_or_create(
+            site_configuration=site_configuration, defaults={'synced_until': synced_until}
+        )
+        self.stdout.write(
+            'Carts of site {site} are synced until {synced_until}'.format(
+                site=site_configuration.site.domain, synced_until=synced_until
+            )
+        )
+
     def _get_unsynced_carts(self, site_configuration):
-        carts = Basket.objects.filter(site=site_configuration.site, lines__isnull=False)
+        carts = Basket.objects.filter(site=site_configuration.site, lines__isnull=False).distinct()
         start_date = datetime.now().date() - timedelta(self.initial_sync_days)
-        unsynced_carts = carts.filter(
-            Q(date_created__date=start_date) | Q(date_submitted__date=start_date)
-        )
+        if self.incremental:
+            synced_until = self._get_synced_until(site_configuration)
+            if synced_until:
+                # Carts created or submitted shortly before the previous sync started may have been committed after
+                # it queried them. Their upserts are idempotent, so the carts of the overlap are synced again.
+                since, lookup = synced_until - self.overlap, 'gte'
+            else:
+                since, lookup = timezone.make_aware(datetime.combine(start_date, datetime.min.time())), 'gte'
+            unsynced_carts = carts.filter(
+                Q(**{'date_created__' + lookup: since, 'date_created__lte': self.sync_until}) |
+                Q(**{'date_submitted__' + lookup: since, 'date_submitted__lte': self.sync_until})
+            )
+            start_date = since
+        else:
+            unsynced_carts = carts.filter(
+                Q(date_created__date=start_date) | Q(date_submitted__date=start_date)
+            )
         self.stdout.write(
             'Pulled unsynced carts for site {site} from {start_date} and total count is total: {count}'.format(
                 site=site_configuration.site.domain, start_date=start_date, count=unsynced_carts.count()
@@ -466,38 +592,43 @@ class Command(BaseCommand):
 
     def _sync_data(self, site_configuration):
         """
-        Create lists of Order, OrderLine and Product objects and
+        Stream Order, OrderLine and Product objects and
         call upsert(PUT) sync-messages endpoint for each objects.
+
+        Returns:
+            bool: True if all the objects were synced.
         """
         unsynced_carts = self._get_unsynced_carts(site_configuration)
-        if unsynced_carts:
-            # we need to exclude the CartLines without product
-            # because product is required in hubspot for LINE_ITEM.
-            unsynced_cart_lines = CartLine.objects.filter(basket__in=unsynced_carts).exclude(product=None)
-            unsynced_products = Product.objects.filter(basket_lines__in=unsynced_cart_lines)
-            unsynced_users = User.objects.filter(baskets__in=unsynced_carts)
-            self._upsert_hubspot_objects(
-                CONTACT,
-                self._get_hubspot_contact_structure(unsynced_users),
-                site_configuration
-            )
-            self._upsert_hubspot_objects(
-                PRODUCT,
-                self._get_hubspot_product_structure(unsynced_products),
-                site_configuration
-            )
-            self._upsert_hubspot_objects(
-                DEAL,
-                self._get_hubspot_deal_structure(unsynced_carts, site_configuration.partner),
-                site_configuration
-            )
-            self._upsert_hubspot_objects(
-                LINE_ITEM,
-                self._get_hubspot_line_item_structure(unsynced_cart_lines),
-                site_configuration
-            )
-        else:
+        if not unsynced_carts.exists():
             self.stdout.write('No data found to sync for site {site}'.format(site=site_configuration.site.domain))
+            return True
+
+        # we need to exclude the CartLines without product
+        # because product is required in hubspot for LINE_ITEM.
+        unsynced_cart_lines = CartLine.objects.filter(basket__in=unsynced_carts).exclude(product=None)
+        unsynced_products = Product.objects.filter(basket_lines__in=unsynced_cart_lines).select_related('course')
+        unsynced_users = User.objects.filter(baskets__in=unsynced_carts).only('id', 'email')
+        success = self._upsert_hubspot_objects(
+            CONTACT,
+            self._get_hubspot_contact_structure(unsynced_users.distinct().iterator()),
+            site_configuration
+        )
+        success = self._upsert_hubspot_objects(
+            PRODUCT,
+            self._get_hubspot_product_structure(unsynced_products.distinct().iterator()),
+            site_configuration
+        ) and success
+        success = self._upsert_hubspot_objects(
+            DEAL,
+            self._get_hubspot_deal_structure(self._iter_carts(unsynced_carts), site_configuration.partner),
+            site_configuration
+        ) and success
+        success = self._upsert_hubspot_objects(
+            LINE_ITEM,
+            self._get_hubspot_line_item_structure(unsynced_cart_lines.iterator()),
+            site_configuration
+        ) and success
+        return success
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -507,12 +638,45 @@ class Command(BaseCommand):
             type=int,
             help='Number of days before today to start initial sync',
         )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            dest='incremental',
+            help='Sync the carts changed since the last successful incremental sync of each site. '
+                 'The first incremental sync starts from --initial-sync-days.',
+        )
+        parser.add_argument(
+            '--overlap-minutes',
+            default=DEFAULT_OVERLAP_MINUTES,
+            dest='overlap_minutes',
+            type=int,
+            help='Number of minutes before the last successful incremental sync from which carts are synced again',
+        )
+        parser.add_argument(
+            '--workers',
+            default=DEFAULT_WORKERS,
+            dest='workers',
+            type=int,
+            help='Maximum number of batches uploaded concurrently',
+        )
+        parser.add_argument(
+            '--max-retries',
+            default=DEFAULT_MAX_RETRIES,
+            dest='max_retries',
+            type=int,
+            help='Number of times a batch is retried after a server or connection error',
+        )
 
     def handle(self, *args, **options):
         """
         Main command handler.
         """
         self.initial_sync_days = options['initial_sync_days']
+        self.incremental = options['incremental']
+        self.overlap = timedelta(minutes=options['overlap_minutes'])
+        self.workers = max(options['workers'], 1)
+        self.max_retries = options['max_retries']
+        self.sync_until = timezone.now()
         try:
             site_configurations = self._get_hubspot_enable_sites()
             if not site_configurations:
@@ -522,7 +686,8 @@ class Command(BaseCommand):
             for site_configuration in site_configurations:
                 if self._install_hubspot_ecommerce_bridge(site_configuration):
                     if self._define_hubspot_ecommerce_settings(site_configuration):
-                        self._sync_data(site_configuration)
+                        if self._sync_data(site_configuration) and self.incremental:
+                            self._set_synced_until(site_configuration, self.sync_until)
                         self._call_sync_errors_messages_endpoint(site_configuration)
         except Exception as ex:
             traceback.print_exc()
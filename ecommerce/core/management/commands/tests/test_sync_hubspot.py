@@ -3,15 +3,21 @@ Test the sync_hubspot management command
 """
 from __future__ import absolute_import
 
+import json
+import re
+import threading
 from datetime import datetime, timedelta
 
 from django.core.management import call_command
 from django.core.management.base import CommandError
+from django.utils import timezone
 from django.utils.six import StringIO
 from factory.django import get_model
 from mock import patch
+from six.moves import BaseHTTPServer, socketserver
 from slumber.exceptions import HttpClientError
 
+from ecommerce.core.management.commands.sync_hubspot import DEAL
 from ecommerce.core.management.commands.sync_hubspot import Command as sync_command
 from ecommerce.extensions.test.factories import create_basket, create_order
 from ecommerce.tests.factories import SiteConfigurationFactory, UserFactory
@@ -19,6 +25,7 @@ from ecommerce.tests.testcases import TestCase
 
 SiteConfiguration = get_model('core', 'SiteConfiguration')
 Basket = get_model('basket', 'Basket')
+HubspotSyncWatermark = get_model('core', 'HubspotSyncWatermark')
 
 DEFAULT_INITIAL_DAYS = 1
 
@@ -82,18 +89,28 @@ class TestSyncHubspotCommand(TestCase):
             {'objectType': 'PRODUCT', 'integratorObjectId': '4321', 'details': 'dummy-details-product'},
         ]}
 
-    def _get_command_output(self, is_stderr=False):
+    def _get_command_output(self, *args, **kwargs):
         """
         Runs the command and returns the stdout or stderr output of command.
         """
         out = StringIO()
         initial_sync_days_param = '--initial-sync-day=' + str(DEFAULT_INITIAL_DAYS)
-        if is_stderr:
-            call_command('sync_hubspot', initial_sync_days_param, stderr=out)
+        if kwargs.get('is_stderr'):
+            call_command('sync_hubspot', initial_sync_days_param, *args, stderr=out)
         else:
-            call_command('sync_hubspot', initial_sync_days_param, stdout=out)
+            call_command('sync_hubspot', initial_sync_days_param, *args, stdout=out)
         return out.getvalue()
 
+    def _get_synced_deal_ids(self, mocked_hubspot):
+        """
+        Returns the ids of the carts upserted through the mocked _hubspot_endpoint.
+        """
+        return sorted(
+            int(deal['integratorObjectId'])
+            for call in mocked_hubspot.call_args_list if call[0][0] == DEAL
+            for deal in call[1]['body']
+        )
+
     @patch.object(sync_command, '_hubspot_endpoint')
     def test_with_no_hubspot_secret_keys(self, mocked_hubspot):
         """
@@ -116,7 +133,7 @@ class TestSyncHubspotCommand(TestCase):
         2. Define settings
         3. Sync-error
         """
-        with patch.object(sync_command, '_get_unsynced_carts', return_value=None):
+        with patch.object(sync_command, '_get_unsynced_carts', return_value=Basket.objects.none()):
             output = self._get_command_output()
             self.assertIn(
                 'No data found to sync for site {site}'.format(site=self.hubspot_site_configuration.site.domain),
@@ -219,3 +236,129 @@ class TestSyncHubspotCommand(TestCase):
             with self.assertRaises(CommandError):
                 output = self._get_command_output(is_stderr=True)
                 self.assertIn('Command failed with ', output)
+
+    @patch.object(sync_command, '_hubspot_endpoint')
+    def test_incremental_sync(self, mocked_hubspot):
+        """
+        Verify an incremental sync only upserts the carts changed since the previous one.
+        """
+        site_configuration = self.hubspot_site_configuration
+        cart_ids = sorted(Basket.objects.filter(site=site_configuration.site).values_list('id', flat=True))
+
+        self._get_command_output('--incremental', '--overlap-minutes=0')
+        self.assertEqual(self._get_synced_deal_ids(mocked_hubspot), cart_ids)
+        synced_until = HubspotSyncWatermark.objects.get(site_configuration=site_configuration).synced_until
+
+        mocked_hubspot.reset_mock()
+        output = self._get_command_output('--incremental', '--overlap-minutes=0')
+        self.assertIn('No data found to sync for site {site}'.format(site=site_configuration.site.domain), output)
+        self.assertEqual(self._get_synced_deal_ids(mocked_hubspot), [])
+
+        cart = Basket.objects.get(id=cart_ids[0])
+        cart.date_submitted = timezone.now()
+        cart.save()
+        self._get_command_output('--incremental', '--overlap-minutes=0')
+        self.assertEqual(self._get_synced_deal_ids(mocked_hubspot), [cart.id])
+        self.assertGreater(
+            HubspotSyncWatermark.objects.get(site_configuration=site_configuration).synced_until, synced_until
+        )
+
+    @patch.object(sync_command, '_hubspot_endpoint')
+    def test_incremental_sync_late_commit(self, mocked_hubspot):
+        """
+        Verify a cart created shortly before the previous incremental sync, but committed after it queried the
+        carts, is synced by the next incremental sync.
+        """
+        site_configuration = self.hubspot_site_configuration
+        self._get_command_output('--incremental', '--overlap-minutes=0')
+        synced_until = HubspotSyncWatermark.objects.get(site_configuration=site_configuration).synced_until
+
+        late_cart = create_basket(site=site_configuration.site)
+        late_cart.date_created = synced_until - timedelta(minutes=1)
+        late_cart.save()
+        old_cart = create_basket(site=site_configuration.site)
+        old_cart.date_created = synced_until - timedelta(minutes=3)
+        old_cart.save()
+        mocked_hubspot.reset_mock()
+        self._get_command_output('--incremental', '--overlap-minutes=2')
+        self.assertEqual(self._get_synced_deal_ids(mocked_hubspot), [late_cart.id])
+
+    @patch.object(sync_command, '_hubspot_endpoint')
+    def test_incremental_sync_failure(self, mocked_hubspot):
+        """
+        Verify the watermark of a site is not advanced if some objects failed to sync.
+        """
+        mocked_hubspot.side_effect = HttpClientError
+        with patch.object(sync_command, '_install_hubspot_ecommerce_bridge', return_value=True), \
+                patch.object(sync_command, '_define_hubspot_ecommerce_settings', return_value=True):
+            self._get_command_output('--incremental', is_stderr=True)
+        self.assertFalse(HubspotSyncWatermark.objects.exists())
+
+    def test_upsert_batches_with_retries(self):
+        """
+        Verify every batch is uploaded concurrently to a stub HubSpot server, retrying the batches which fail.
+        """
+        for _ in range(3):
+            self._create_basket(self.hubspot_site_configuration.site)
+        cart_ids = sorted(
+            Basket.objects.filter(site=self.hubspot_site_configuration.site).values_list('id', flat=True)
+        )
+        sync_messages_path = re.compile(r'/extensions/ecomm/v1/sync-messages/(\w+)/')
+        failed = set()
+        synced = {}
+        lock = threading.Lock()
+
+        class HubspotStubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+            """ Fails the first upload of each batch with a server error. """
+
+            def _respond(self, status, body=b'{}'):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self._respond(200)
+
+            def do_GET(self):
+                self._respond(200, b'{"results": []}')
+
+            def do_PUT(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+                match = sync_messages_path.match(self.path)
+                if match:
+                    object_type = match.group(1)
+                    batch = tuple(sorted(obj['integratorObjectId'] for obj in body))
+                    with lock:
+                        if (object_type, batch) not in failed:
+                            failed.add((object_type, batch))
+                            self._respond(500)
+                            return
+                        synced.setdefault(object_type, []).extend(int(object_id) for object_id in batch)
+                self._respond(200)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), HubspotStubHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        base_url = 'http://127.0.0.1:{port}'.format(port=server.server_address[1])
+        with patch('ecommerce.core.management.commands.sync_hubspot.HUBSPOT_API_BASE_URL', base_url), \
+                patch('ecommerce.core.management.commands.sync_hubspot.BATCH_SIZE', 2), \
+                patch('ecommerce.core.management.commands.sync_hubspot.RETRY_BACKOFF', 0):
+            output = self._get_command_output('--workers=2')
+
+        self.assertEqual(sorted(synced[DEAL]), cart_ids)
+        self.assertEqual(len(failed), sum(len(range(0, len(ids), 2)) for ids in synced.values()))
+        self.assertIn('Successfully synced DEALs batch from 2 to 4', output)
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """ HTTP server handling each request in a new thread. """
+    daemon_threads = True
@@ -4,8 +4,13 @@ Tests for Django management command to verify ecommerce transactions.
 from __future__ import absolute_import
 
 import datetime
+import json
+import os
+import shutil
+import tempfile
 
 import ddt
+import mock
 import pytz
 import six
 from django.core.management import call_command
@@ -15,7 +20,11 @@ from oscar.test.factories import OrderFactory, OrderLineFactory, ProductFactory
 
 from ecommerce.core.constants import SEAT_PRODUCT_CLASS_NAME
 from ecommerce.core.management.commands.tests.factories import PaymentEventFactory
-from ecommerce.core.management.commands.verify_transactions import DEFAULT_END_DELTA_TIME, DEFAULT_START_DELTA_TIME
+from ecommerce.core.management.commands.verify_transactions import (
+    DEFAULT_END_DELTA_TIME,
+    DEFAULT_START_DELTA_TIME,
+    Command
+)
 from ecommerce.tests.testcases import TestCase
 
 PaymentEventType = get_model('order', 'PaymentEventType')
@@ -253,3 +262,80 @@ class VerifyTransactionsTest(TestCase):
         self.assertIn(str(refund.id), exception)
         self.assertIn('"amount": 90.0', exception)
         self.assertIn('"amount": 100.0', exception)
+
+    def create_order_without_payment(self):
+        order = OrderFactory(total_incl_tax=90, date_placed=self.timestamp)
+        OrderLineFactory(order=order, product=self.product, partner_sku='test_sku')
+        # The factory does not save the placement date.
+        order.save()
+        return order
+
+    def test_chunks(self):
+        """ Verify orders are all verified when they span several chunks. """
+        orders = [self.order] + [self.create_order_without_payment() for __ in range(4)]
+        PaymentEventFactory(order=orders[1], amount=80, event_type_id=self.payevent.id, date_created=self.timestamp)
+
+        with self.assertRaises(CommandError) as cm:
+            call_command('verify_transactions', '--chunk-size=2')
+        errors = json.loads(six.text_type(cm.exception).split(': ', 1)[1])
+
+        self.assertEqual(
+            sorted(error['order']['order_id'] for error in errors['orders_no_payment']['errors']),
+            sorted(order.id for order in orders if order != orders[1])
+        )
+        self.assertEqual(
+            [error['order']['order_id'] for error in errors['orders_mismatched_totals']['errors']], [orders[1].id]
+        )
+
+    def test_child_product_order(self):
+        """ Verify orders for child products are checked against the product class of their parent. """
+        parent = ProductFactory(
+            product_class=self.seat_product_class, structure='parent', categories=None, stockrecords=None
+        )
+        self.product.product_class = None
+        self.product.structure = 'child'
+        self.product.parent = parent
+        self.product.save()
+
+        with self.assertRaises(CommandError) as cm:
+            call_command('verify_transactions')
+        self.assertIn("The following orders are without payments", six.text_type(cm.exception))
+
+    def test_checkpoint(self):
+        """ Verify an interrupted run is resumed from its checkpoint file. """
+        orders = [self.order] + [self.create_order_without_payment() for __ in range(2)]
+        checkpoint_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, checkpoint_dir)
+        checkpoint_file = os.path.join(checkpoint_dir, 'checkpoint.json')
+
+        validate_orders = Command.validate_orders
+        validated_orders = []
+
+        def interrupt_after_first_chunk(command, chunk):
+            if validated_orders:
+                raise KeyboardInterrupt
+            validated_orders.extend(chunk)
+            validate_orders(command, chunk)
+
+        with mock.patch.object(Command, 'validate_orders', autospec=True, side_effect=interrupt_after_first_chunk):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('verify_transactions', '--chunk-size=2', '--checkpoint-file', checkpoint_file)
+
+        with open(checkpoint_file) as f:
+            checkpoint = json.load(f)
+        self.assertEqual(checkpoint['last_order_id'], validated_orders[-1].id)
+        self.assertEqual(len(checkpoint['errors']['orders_no_payment']['errors']), 2)
+
+        with mock.patch.object(Command, 'validate_orders', autospec=True, side_effect=validate_orders) as mock_validate:
+            with self.assertRaises(CommandError) as cm:
+                call_command('verify_transactions', '--chunk-size=2', '--checkpoint-file', checkpoint_file)
+
+        # Only the order left unverified by the interrupted run is verified again.
+        self.assertEqual(mock_validate.call_count, 1)
+        self.assertEqual(len(mock_validate.call_args[0][1]), 1)
+        errors = json.loads(six.text_type(cm.exception).split(': ', 1)[1])
+        self.assertEqual(
+            sorted(error['order']['order_id'] for error in errors['orders_no_payment']['errors']),
+            sorted(order.id for order in orders)
+        )
+        self.assertFalse(os.path.exists(checkpoint_file))
@@ -25,6 +25,11 @@ Example output:
     'totals_mismatch': "Order totals mismatch with payments received.
     [('Order: 72 Amount: 100.00', 'Payment: 67 Amount: 10000.00'),
     ('Order: 71 Amount: 100.00', 'Payment: 65 Amount: 10.00')]"}
+
+Orders are verified in chunks, ordered by placement date, with the payment and
+refund totals of each chunk computed by grouped queries. When a checkpoint file
+is given, the progress and errors are saved to it after every chunk, so that an
+interrupted run resumes from the last verified order of the same time window.
 """
 
 from __future__ import absolute_import
@@ -32,16 +37,19 @@ from __future__ import absolute_import
 import datetime
 import json
 import logging
+import os
 
+import dateutil.parser
 import pytz
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import Sum
+from django.db.models import Count, Max, Q, Sum
 from oscar.core.loading import get_class, get_model
 
 from ecommerce.core.constants import COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME, SEAT_PRODUCT_CLASS_NAME
 from ecommerce.core.utils import use_read_replica_if_available
 
 logger = logging.getLogger(__name__)
+Line = get_model('order', 'Line')
 Order = get_model('order', 'Order')
 PaymentEvent = get_model('order', 'PaymentEvent')
 PaymentEventType = get_model('order', 'PaymentEventType')
@@ -49,6 +57,7 @@ PaymentEventTypeName = get_class('order.constants', 'PaymentEventTypeName')
 
 DEFAULT_START_DELTA_TIME = 240
 DEFAULT_END_DELTA_TIME = 60
+DEFAULT_CHUNK_SIZE = 1000
 VALID_PRODUCT_CLASS_NAMES = [SEAT_PRODUCT_CLASS_NAME, COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME]
 
 
@@ -88,6 +97,20 @@ class Command(BaseCommand):
             action='store_true',
             help='Mismatched orders to go to Support'
         )
+        parser.add_argument(
+            '--chunk-size',
+            action='store',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Number of orders to verify at a time.'
+        )
+        parser.add_argument(
+            '--checkpoint-file',
+            action='store',
+            default=None,
+            help='File in which progress is saved after each chunk of orders. If the file exists, the run it '
+                 'belongs to is resumed. The file is deleted once all orders are verified.'
+        )
 
     def handle(self, *args, **options):
         logger.info("Verify transactions with options: %r", options)
@@ -100,26 +123,95 @@ class Command(BaseCommand):
         start_delta = options['start_delta']
         end_delta = options['end_delta']
         threshold = max(options['threshold'], 0)
-
-        start = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=start_delta)
-        end = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=end_delta)
+        chunk_size = max(options['chunk_size'], 1)
+        checkpoint_file = options['checkpoint_file']
+
+        checkpoint = self.load_checkpoint(checkpoint_file)
+        if checkpoint:
+            start = dateutil.parser.parse(checkpoint['start'])
+            end = dateutil.parser.parse(checkpoint['end'])
+            self.ERRORS_DICT = checkpoint['errors']
+            logger.info("Resuming from checkpoint [%s] after order [%d]", checkpoint_file, checkpoint['last_order_id'])
+        else:
+            start = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=start_delta)
+            end = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=end_delta)
         logger.info("Start time: %s  --  End time: %s", start, end)
 
         orders = use_read_replica_if_available(
-            Order.objects.all()
-            .filter(date_placed__gte=start, date_placed__lt=end)
-            .prefetch_related('payment_events__event_type')
+            Order.objects.filter(date_placed__gte=start, date_placed__lt=end)
         )
         logger.info("Number of orders to verify: %s", orders.count())
         if orders.count() == 0:
             logger.info("No orders, DONE")
+            self.delete_checkpoint(checkpoint_file)
             return
 
+        validate_orders = self.validate_orders_for_support if support else self.validate_orders
+        for chunk in self.iter_order_chunks(orders, chunk_size, checkpoint):
+            validate_orders(chunk)
+            self.save_checkpoint(checkpoint_file, start, end, chunk[-1])
+        self.delete_checkpoint(checkpoint_file)
+
         if support:
             self.handle_support(orders)
         else:
             self.handle_alert(orders, threshold)
 
+    def iter_order_chunks(self, orders, chunk_size, checkpoint=None):
+        """
+        Yields lists of orders, most recently placed first, paginating on the placement date and ID of the
+        last order of the previous chunk rather than an offset.
+        """
+        orders = orders.only('id', 'number', 'total_incl_tax', 'guest_email', 'date_placed').order_by(
+            '-date_placed', '-id'
+        )
+        if checkpoint:
+            last_date_placed = dateutil.parser.parse(checkpoint['last_order_date_placed'])
+            last_id = checkpoint['last_order_id']
+        else:
+            last_date_placed = last_id = None
+
+        while True:
+            chunk = orders
+            if last_id is not None:
+                chunk = chunk.filter(
+                    Q(date_placed__lt=last_date_placed) | Q(date_placed=last_date_placed, id__lt=last_id)
+                )
+            chunk = list(chunk[:chunk_size])
+            if not chunk:
+                return
+
+            yield chunk
+            last_date_placed, last_id = chunk[-1].date_placed, chunk[-1].id
+
+    def load_checkpoint(self, checkpoint_file):
+        if not (checkpoint_file and os.path.exists(checkpoint_file)):
+            return None
+
+        with open(checkpoint_file) as f:
+            return json.load(f)
+
+    def save_checkpoint(self, checkpoint_file, start, end, last_order):
+        if not checkpoint_file:
+            return
+
+        checkpoint = {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'last_order_date_placed': last_order.date_placed.isoformat(),
+            'last_order_id': last_order.id,
+            'errors': self.ERRORS_DICT,
+        }
+        # Write the whole checkpoint before replacing the previous one, so an interruption cannot corrupt it.
+        temporary_file = '{}.tmp'.format(checkpoint_file)
+        with open(temporary_file, 'w') as f:
+            json.dump(checkpoint, f)
+        os.rename(temporary_file, checkpoint_file)
+
+    def delete_checkpoint(self, checkpoint_file):
+        if checkpoint_file and os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
+
     def process_errors(self, orders):
         # FIXME: it is possible for an order to have more than one error, so this really should
         # count "unique orders with errors", not number of errors
@@ -132,9 +224,6 @@ class Command(BaseCommand):
         return error_count, exit_errors, error_rate
 
     def handle_alert(self, orders, threshold):
-        for order in orders:
-            self.validate_order(order)
-
         error_count, exit_errors, error_rate = self.process_errors(orders)
 
         if threshold == 0 or threshold >= 1:
@@ -149,14 +238,115 @@ class Command(BaseCommand):
             logger.warning("Errors in transactions within threshold (%r): %s", threshold, exit_errors)
 
     def handle_support(self, orders):
+        error_count, exit_errors, error_rate = self.process_errors(orders)
+        if error_count and error_rate > 0:
+            raise CommandError("Errors in transactions: {errors}".format(errors=exit_errors))
+
+    def get_payment_totals(self, orders):
+        """
+        Returns the number, sum and latest ID of the payment and refund events of each order.
+
+        Returns:
+            dict: Mapping of (order ID, event type ID) pairs to dicts with `count`, `total` and `last_id` keys.
+        """
+        totals = use_read_replica_if_available(
+            PaymentEvent.objects.filter(
+                order__in=[order.id for order in orders],
+                event_type__in=[self.PAID_EVENT_TYPE, self.REFUNDED_EVENT_TYPE]
+            ).values('order_id', 'event_type_id').annotate(
+                count=Count('id'), total=Sum('amount'), last_id=Max('id')
+            ).order_by()
+        )
+        return {(item['order_id'], item['event_type_id']): item for item in totals}
+
+    def get_payment_events(self, order_event_types):
+        """
+        Returns the payment events of the given types for the given orders.
+
+        Arguments:
+            order_event_types (set): (order ID, event type ID) pairs.
+
+        Returns:
+            dict: Mapping of (order ID, event type ID) pairs to lists of PaymentEvents.
+        """
+        events = {}
+        if not order_event_types:
+            return events
+
+        payment_events = use_read_replica_if_available(
+            PaymentEvent.objects.filter(
+                order__in={order_id for order_id, __ in order_event_types},
+                event_type__in={event_type_id for __, event_type_id in order_event_types}
+            ).select_related('event_type')
+        )
+        for payment_event in payment_events:
+            events.setdefault((payment_event.order_id, payment_event.event_type_id), []).append(payment_event)
+        return events
+
+    def validate_orders(self, orders):
+        payment_totals = self.get_payment_totals(orders)
+        paid_totals = {order.id: payment_totals.get((order.id, self.PAID_EVENT_TYPE.id)) for order in orders}
+        orders_requiring_payment = self.get_orders_requiring_payment(
+            [order for order in orders if paid_totals[order.id] is None and order.total_incl_tax > 0]
+        )
+
+        # Errors are collected first, so the payment events they report are fetched in a single query.
+        errors = []
+        for order in orders:
+            paid = paid_totals[order.id]
+            refunded = payment_totals.get((order.id, self.REFUNDED_EVENT_TYPE.id))
+
+            # If a coupon is used to purchase a product for the full price, there will be no PaymentEvent
+            # so we must also verify that order had a price > 0.
+            if paid is None:
+                if order.id in orders_requiring_payment:
+                    errors.append(
+                        ("orders_no_payment", "The following orders are without payments", order, None)
+                    )
+
+            # We do not support multi-payment today, so flag this for review.
+            elif paid['count'] > 1:
+                errors.append((
+                    "orders_multi_payment",
+                    "The following orders had multiple payments",
+                    order,
+                    self.PAID_EVENT_TYPE.id
+                ))
+
+            # If the payment total and the order total do not match, flag for review.
+            elif paid['total'] != order.total_incl_tax:
+                # FIXME: validate_orders should be changed to log _all_ errors related to an order
+                errors.append((
+                    "orders_mismatched_totals",
+                    "The following order totals mismatch payments received",
+                    order,
+                    self.PAID_EVENT_TYPE.id
+                ))
+
+            payment_total = paid['total'] if paid else 0
+            if refunded is not None and refunded['total'] > payment_total:
+                errors.append((
+                    "orders_refund_exceeded",
+                    "The following orders had excessive refunds",
+                    order,
+                    self.REFUNDED_EVENT_TYPE.id
+                ))
+
+        payment_events = self.get_payment_events(
+            {(order.id, event_type_id) for __, __, order, event_type_id in errors if event_type_id}
+        )
+        for tag, msg, order, event_type_id in errors:
+            self.add_error(tag, msg, order, payment_events.get((order.id, event_type_id)))
+
+    def validate_orders_for_support(self, orders):
+        payment_totals = self.get_payment_totals(orders)
         for order in orders:
-            all_payment_events = order.payment_events
-            payments = all_payment_events.filter(event_type=self.PAID_EVENT_TYPE)
+            paid = payment_totals.get((order.id, self.PAID_EVENT_TYPE.id))
 
             # If the payment total and the order total do not match, flag for review.
-            if payments.count() == 1 and payments[0].amount != order.total_incl_tax:
-                mismatch_total = float(payments[0].amount - order.total_incl_tax)
-                # FIXME: validate_order should be changed to log _all_ errors related to an order
+            if paid and paid['count'] == 1 and paid['total'] != order.total_incl_tax:
+                mismatch_total = float(paid['total'] - order.total_incl_tax)
+                # FIXME: validate_orders should be changed to log _all_ errors related to an order
                 # If payment amount > order amount, a refund is required from Support
                 if mismatch_total > 0:
                     error_dict = {
@@ -164,8 +354,8 @@ class Command(BaseCommand):
                         "order_id": order.id,
                         "order_amount": float(order.total_incl_tax),
                         # Assuming just one payment since we do not support multi-payment
-                        "payment_id": payments[0].id,
-                        "payment_amount": float(payments[0].amount),
+                        "payment_id": paid['last_id'],
+                        "payment_amount": float(paid['total']),
                         "user_email": order.guest_email,
                         "refund_amount": mismatch_total
                     }
@@ -175,54 +365,6 @@ class Command(BaseCommand):
                         error_dict=error_dict,
                     )
 
-        error_count, exit_errors, error_rate = self.process_errors(orders)
-        if error_count and error_rate > 0:
-            raise CommandError("Errors in transactions: {errors}".format(errors=exit_errors))
-
-    def validate_order(self, order):
-        all_payment_events = order.payment_events
-        refunds = all_payment_events.filter(event_type=self.REFUNDED_EVENT_TYPE)
-        payments = all_payment_events.filter(event_type=self.PAID_EVENT_TYPE)
-
-        # If a coupon is used to purchase a product for the full price, there will be no PaymentEvent
-        # so we must also verify that order had a price > 0.
-        if payments.count() == 0:
-            if self.order_requires_payment(order) and order.total_incl_tax > 0:
-                self.add_error(
-                    "orders_no_payment",
-                    "The following orders are without payments",
-                    order
-                )
-
-        # We do not support multi-payment today, so flag this for review.
-        elif payments.count() > 1:
-            self.add_error(
-                "orders_multi_payment",
-                "The following orders had multiple payments",
-                order,
-                payments
-            )
-
-        # If the payment total and the order total do not match, flag for review.
-        elif payments.aggregate(total=Sum('amount')).get('total') != order.total_incl_tax:
-            # FIXME: validate_order should be changed to log _all_ errors related to an order
-            self.add_error(
-                "orders_mismatched_totals",
-                "The following order totals mismatch payments received",
-                order,
-                payments
-            )
-
-        refund_total = refunds.aggregate(total=Sum('amount')).get('total')
-        payment_total = payments.aggregate(total=Sum('amount')).get('total')
-        if refund_total is not None and refund_total > payment_total:
-            self.add_error(
-                "orders_refund_exceeded",
-                "The following orders had excessive refunds",
-                order,
-                refunds
-            )
-
     def add_error(self, tag, msg, order=None, payments=None, error_dict=None):
         if tag not in self.ERRORS_DICT:
             self.ERRORS_DICT[tag] = {"message": msg, "errors": []}
@@ -250,12 +392,19 @@ class Command(BaseCommand):
             ]
         return d
 
-    def order_requires_payment(self, order):
+    def get_orders_requiring_payment(self, orders):
+        """
+        Returns the IDs of the orders with lines for which immediate payment is expected.
+        """
         # We only expect immediate payments for Seats and Entitlements.
-        # Filter out orders that were flagged as being without payment for other product types
-        # FIXME: there are better ways to do this
-        for line in order.lines.all():
-            name = line.product.get_product_class().name
-            if name in VALID_PRODUCT_CLASS_NAMES:
-                return True
-        return False
+        # Filter out orders that were flagged as being without payment for other product types.
+        # Child products inherit the product class of their parent.
+        if not orders:
+            return set()
+
+        return set(use_read_replica_if_available(
+            Line.objects.filter(order__in=[order.id for order in orders]).filter(
+                Q(product__product_class__name__in=VALID_PRODUCT_CLASS_NAMES) |
+                Q(product__parent__product_class__name__in=VALID_PRODUCT_CLASS_NAMES)
+            ).values_list('order_id', flat=True).distinct()
+        ))
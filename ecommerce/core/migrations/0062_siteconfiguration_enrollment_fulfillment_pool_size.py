@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 04:10
+from __future__ import unicode_literals
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0061_merge_20200408_0611'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='siteconfiguration',
+            name='enrollment_fulfillment_pool_size',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Maximum number of concurrent requests made to the LMS enrollment API when fulfilling an order. A value of 1 fulfills order lines one at a time.', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Enrollment Fulfillment Pool Size'),
+        ),
+    ]
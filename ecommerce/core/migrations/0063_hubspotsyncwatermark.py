@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 05:48
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0062_siteconfiguration_enrollment_fulfillment_pool_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HubspotSyncWatermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('synced_until', models.DateTimeField(help_text='Carts created or submitted after this time are synced by the next incremental sync.', verbose_name='Synced Until')),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('site_configuration', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='hubspot_sync_watermark', to='core.SiteConfiguration')),
+            ],
+        ),
+    ]
@@ -1,6 +1,5 @@
 from __future__ import absolute_import
 
-import datetime
 import hashlib
 import logging
 
@@ -12,6 +11,7 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.contrib.sites.models import Site
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils.functional import cached_property
 from django.utils.timezone import now
@@ -27,8 +27,10 @@ from simple_history.models import HistoricalRecords
 from six.moves.urllib.parse import urljoin, urlsplit
 from slumber.exceptions import HttpNotFoundError, SlumberBaseException
 
+from ecommerce.core.access_tokens import get_access_token
 from ecommerce.core.constants import ALL_ACCESS_CONTEXT, ALLOW_MISSING_LMS_USER_ID
 from ecommerce.core.exceptions import MissingLmsUserIdException
+from ecommerce.core.http_pools import get_api_client_session
 from ecommerce.core.utils import log_message_and_raise_validation_error
 from ecommerce.extensions.payment.exceptions import ProcessorNotFoundError
 from ecommerce.extensions.payment.helpers import get_processor_class, get_processor_class_by_name
@@ -214,6 +216,13 @@ class SiteConfiguration(models.Model):
         null=True,
         blank=True
     )
+    enrollment_fulfillment_pool_size = models.PositiveSmallIntegerField(
+        verbose_name=_('Enrollment Fulfillment Pool Size'),
+        help_text=_('Maximum number of concurrent requests made to the LMS enrollment API when fulfilling an order. '
+                    'A value of 1 fulfills order lines one at a time.'),
+        default=1,
+        validators=[MinValueValidator(1)],
+    )
 
     @property
     def payment_processors_set(self):
@@ -391,28 +400,31 @@ class SiteConfiguration(models.Model):
         """ Returns an access token for this site's service user.
 
         The access token is retrieved using the current site's OAuth credentials and the client credentials grant.
-        The token is cached for the lifetime of the token, as specified by the OAuth provider's response. The token
+        The token is cached for the lifetime of the token, as specified by the OAuth provider's response, and is
+        renewed in the background once ACCESS_TOKEN_REFRESH_FRACTION of that lifetime has passed. The token
         type is JWT.
 
         Returns:
             str: JWT access token
         """
-        key = 'siteconfiguration_access_token_{}'.format(self.id)
-        access_token_cached_response = TieredCache.get_cached_response(key)
-        if access_token_cached_response.is_found:
-            return access_token_cached_response.value
-
-        url = '{root}/access_token'.format(root=self.oauth2_provider_url)
-        access_token, expiration_datetime = EdxRestApiClient.get_oauth_access_token(
-            url,
-            self.oauth_settings['BACKEND_SERVICE_EDX_OAUTH2_KEY'],  # pylint: disable=unsubscriptable-object
-            self.oauth_settings['BACKEND_SERVICE_EDX_OAUTH2_SECRET'],  # pylint: disable=unsubscriptable-object
-            token_type='jwt'
-        )
+        return get_access_token(self)
+
+    def build_api_client(self, url, request_timeout=None, **kwargs):
+        """
+        Returns an API client, authenticated as this site's service user, that uses the connection pool
+        shared by all clients of the API's host.
 
-        expires = (expiration_datetime - datetime.datetime.utcnow()).seconds
-        TieredCache.set_all_tiers(key, access_token, expires)
-        return access_token
+        Arguments:
+            url (str): Root URL of the API.
+            request_timeout (float): Number of seconds after which the client's requests time out. Defaults
+                to the timeout of the connection pool.
+            **kwargs: Additional arguments passed to the client.
+
+        Returns:
+            EdxRestApiClient
+        """
+        session = get_api_client_session(url, timeout=request_timeout)
+        return EdxRestApiClient(url, jwt=self.access_token, session=session, **kwargs)
 
     @cached_property
     def discovery_api_client(self):
@@ -423,12 +435,14 @@ class SiteConfiguration(models.Model):
             EdxRestApiClient: The client to access the Discovery service.
         """
 
-        return EdxRestApiClient(self.discovery_api_url, jwt=self.access_token)
+        return self.build_api_client(self.discovery_api_url)
 
     @cached_property
     def embargo_api_client(self):
         """ Returns the URL for the embargo API """
-        return EdxRestApiClient(self.build_lms_url('/api/embargo/v1'), jwt=self.access_token)
+        return self.build_api_client(
+            self.build_lms_url('/api/embargo/v1'), request_timeout=settings.EMBARGO_API_TIMEOUT
+        )
 
     @cached_property
     def enterprise_api_client(self):
@@ -442,11 +456,11 @@ class SiteConfiguration(models.Model):
             EdxRestApiClient: The client to access the Enterprise service.
 
         """
-        return EdxRestApiClient(self.enterprise_api_url, jwt=self.access_token)
+        return self.build_api_client(self.enterprise_api_url)
 
     @cached_property
     def consent_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/consent/api/v1/'), jwt=self.access_token, append_slash=False)
+        return self.build_api_client(self.build_lms_url('/consent/api/v1/'), append_slash=False)
 
     @cached_property
     def user_api_client(self):
@@ -456,23 +470,23 @@ class SiteConfiguration(models.Model):
         Returns:
             EdxRestApiClient: The client to access the LMS user API service.
         """
-        return EdxRestApiClient(self.build_lms_url('/api/user/v1/'), jwt=self.access_token)
+        return self.build_api_client(self.build_lms_url('/api/user/v1/'))
 
     @cached_property
     def commerce_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/api/commerce/v1/'), jwt=self.access_token)
+        return self.build_api_client(self.build_lms_url('/api/commerce/v1/'))
 
     @cached_property
     def credit_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/api/credit/v1/'), jwt=self.access_token)
+        return self.build_api_client(self.build_lms_url('/api/credit/v1/'))
 
     @cached_property
     def enrollment_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/api/enrollment/v1/'), jwt=self.access_token, append_slash=False)
+        return self.build_api_client(self.build_lms_url('/api/enrollment/v1/'), append_slash=False)
 
     @cached_property
     def entitlement_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/api/entitlements/v1/'), jwt=self.access_token)
+        return self.build_api_client(self.build_lms_url('/api/entitlements/v1/'))
 
 
 class User(AbstractUser):
@@ -622,10 +636,10 @@ class User(AbstractUser):
             connection with the LMS account API endpoint.
         """
         try:
-            api = EdxRestApiClient(
-                request.site.siteconfiguration.build_lms_url('/api/user/v1'),
-                append_slash=False,
-                jwt=request.site.siteconfiguration.access_token
+            site_configuration = request.site.siteconfiguration
+            api = site_configuration.build_api_client(
+                site_configuration.build_lms_url('/api/user/v1'),
+                append_slash=False
             )
             response = api.accounts(self.username).get()
             return response
@@ -752,6 +766,24 @@ class BusinessClient(models.Model):
         super(BusinessClient, self).save(*args, **kwargs)
 
 
+class HubspotSyncWatermark(models.Model):
+    """ The time up to which the carts of a site have been synced to HubSpot. """
+
+    site_configuration = models.OneToOneField(
+        SiteConfiguration,
+        related_name='hubspot_sync_watermark',
+        on_delete=models.CASCADE,
+    )
+    synced_until = models.DateTimeField(
+        verbose_name=_('Synced Until'),
+        help_text=_('Carts created or submitted after this time are synced by the next incremental sync.'),
+    )
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '{site}: {synced_until}'.format(site=self.site_configuration.site.domain, synced_until=self.synced_until)
+
+
 class EcommerceFeatureRole(UserRole):
     """
     User role definitions specific to Ecommerce.
@@ -0,0 +1,120 @@
+from __future__ import absolute_import
+
+import threading
+import time
+
+import httpretty
+import mock
+from django.core.cache import cache as django_cache
+from django.test import override_settings
+from edx_django_utils.cache import TieredCache
+from edx_rest_api_client.client import EdxRestApiClient
+from requests.exceptions import ConnectionError as ReqConnectionError
+
+from ecommerce.core.access_tokens import ACCESS_TOKEN_CACHE_KEY, ACCESS_TOKEN_LOCK_CACHE_KEY, get_access_token
+from ecommerce.tests.testcases import TestCase
+
+
+@override_settings(ACCESS_TOKEN_REFRESH_FRACTION=0.5, ACCESS_TOKEN_REFRESH_LOCK_TIMEOUT=1)
+class AccessTokenTests(TestCase):
+    def setUp(self):
+        super(AccessTokenTests, self).setUp()
+        self.site_configuration = self.site.siteconfiguration
+        self.key = ACCESS_TOKEN_CACHE_KEY.format(site_configuration_id=self.site_configuration.id)
+        self.lock_key = ACCESS_TOKEN_LOCK_CACHE_KEY.format(site_configuration_id=self.site_configuration.id)
+
+    def get_access_token_and_wait_for_refresh(self):
+        """ Calls get_access_token and waits for the threads it starts to finish. """
+        threads = []
+        thread_class = threading.Thread
+
+        def create_thread(*args, **kwargs):
+            thread = thread_class(*args, **kwargs)
+            threads.append(thread)
+            return thread
+
+        with mock.patch('ecommerce.core.access_tokens.threading.Thread', side_effect=create_thread):
+            access_token = get_access_token(self.site_configuration)
+            for thread in threads:
+                thread.join()
+        return access_token
+
+    def cache_access_token(self, access_token, expires_in, refresh_in):
+        now = time.time()
+        django_cache.set(self.key, {
+            'access_token': access_token,
+            'expires_at': now + expires_in,
+            'refresh_at': now + refresh_in,
+        }, expires_in)
+
+    @httpretty.activate
+    def test_refresh_time(self):
+        """ Verify new tokens are cached with the time after which they are refreshed. """
+        token = self.mock_access_token_response(expires_in=3600)
+
+        now = time.time()
+        self.assertEqual(get_access_token(self.site_configuration), token)
+
+        entry = django_cache.get(self.key)
+        self.assertAlmostEqual(entry['expires_at'], now + 3600, delta=5)
+        self.assertAlmostEqual(entry['refresh_at'], now + 1800, delta=5)
+        self.assertIsNone(django_cache.get(self.lock_key))
+
+    @httpretty.activate
+    def test_refresh_in_background(self):
+        """ Verify the cached token is served, and renewed, once it is due for a refresh. """
+        self.cache_access_token('old-token', expires_in=60, refresh_in=-1)
+        token = self.mock_access_token_response()
+
+        with mock.patch('ecommerce.core.access_tokens.monitoring_utils.set_custom_metric') as mock_metric:
+            self.assertEqual(self.get_access_token_and_wait_for_refresh(), 'old-token')
+
+        mock_metric.assert_called_once_with('access_token_refresh', 'background')
+        self.assertEqual(django_cache.get(self.key)['access_token'], token)
+        self.assertIsNone(django_cache.get(self.lock_key))
+
+        TieredCache.dangerous_clear_all_tiers()
+        self.assertEqual(get_access_token(self.site_configuration), token)
+
+    @httpretty.activate
+    def test_refresh_in_progress(self):
+        """ Verify the cached token is served without a new refresh while another one holds the lock. """
+        self.cache_access_token('old-token', expires_in=60, refresh_in=-1)
+        django_cache.add(self.lock_key, True)
+
+        with mock.patch('ecommerce.core.access_tokens.threading.Thread') as mock_thread:
+            self.assertEqual(get_access_token(self.site_configuration), 'old-token')
+
+        self.assertFalse(mock_thread.called)
+        self.assertFalse(httpretty.has_request())
+
+    def test_refresh_failure(self):
+        """ Verify a failed background refresh keeps the cached token and releases the lock. """
+        self.cache_access_token('old-token', expires_in=60, refresh_in=-1)
+
+        with mock.patch.object(EdxRestApiClient, 'get_oauth_access_token', side_effect=ReqConnectionError):
+            self.assertEqual(self.get_access_token_and_wait_for_refresh(), 'old-token')
+
+        self.assertEqual(django_cache.get(self.key)['access_token'], 'old-token')
+        self.assertIsNone(django_cache.get(self.lock_key))
+
+    @httpretty.activate
+    def test_wait_for_concurrent_fetch(self):
+        """ Verify a process without a token waits for the process holding the lock to fetch one. """
+        django_cache.add(self.lock_key, True)
+
+        def fetch_elsewhere(_seconds):
+            self.cache_access_token('other-token', expires_in=60, refresh_in=30)
+
+        with mock.patch('ecommerce.core.access_tokens.time.sleep', side_effect=fetch_elsewhere):
+            self.assertEqual(get_access_token(self.site_configuration), 'other-token')
+        self.assertFalse(httpretty.has_request())
+
+    @httpretty.activate
+    def test_fetch_after_abandoned_lock(self):
+        """ Verify the token is fetched if the process holding the lock releases it without caching one. """
+        django_cache.add(self.lock_key, True)
+        token = self.mock_access_token_response()
+
+        with mock.patch('ecommerce.core.access_tokens.time.sleep', side_effect=lambda _: django_cache.clear()):
+            self.assertEqual(get_access_token(self.site_configuration), token)
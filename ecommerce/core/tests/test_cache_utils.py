@@ -0,0 +1,177 @@
+from __future__ import absolute_import
+
+import mock
+from django.core.cache import cache as django_cache
+from django.test import override_settings
+from edx_django_utils.cache import TieredCache
+
+from ecommerce.core.cache_utils import (
+    SINGLE_FLIGHT_LOCK_KEY,
+    SINGLE_FLIGHT_STALE_KEY,
+    LocalLRUCache,
+    ProcessTieredCache,
+    get_many_cached_responses,
+    get_or_fetch_single_flight
+)
+from ecommerce.tests.testcases import TestCase
+
+RESOURCE = 'test-resource'
+PROCESS_CACHE_RESOURCES = {RESOURCE: {'max_size': 2, 'timeout': 60}}
+
+
+class LocalLRUCacheTests(TestCase):
+    def test_get_and_set(self):
+        """ Verify values are returned until they expire and lookups are counted. """
+        cache = LocalLRUCache(max_size=2)
+        self.assertFalse(cache.get_cached_response('a').is_found)
+
+        with mock.patch('ecommerce.core.cache_utils.time.time', return_value=100):
+            cache.set('a', 'value', 10)
+            cached_response = cache.get_cached_response('a')
+        self.assertTrue(cached_response.is_found)
+        self.assertEqual(cached_response.value, 'value')
+
+        with mock.patch('ecommerce.core.cache_utils.time.time', return_value=110):
+            self.assertFalse(cache.get_cached_response('a').is_found)
+
+        self.assertEqual(cache.get_stats(), {'hits': 1, 'misses': 2, 'size': 0, 'max_size': 2})
+
+    def test_evicts_least_recently_used(self):
+        """ Verify the least recently used entry is evicted once the cache is full. """
+        cache = LocalLRUCache(max_size=2)
+        cache.set('a', 1, 60)
+        cache.set('b', 2, 60)
+        cache.get_cached_response('a')
+        cache.set('c', 3, 60)
+
+        self.assertTrue(cache.get_cached_response('a').is_found)
+        self.assertFalse(cache.get_cached_response('b').is_found)
+        self.assertTrue(cache.get_cached_response('c').is_found)
+
+    def test_delete_and_clear(self):
+        cache = LocalLRUCache(max_size=2)
+        cache.set('a', 1, 60)
+        cache.set('b', 2, 60)
+
+        cache.delete('a')
+        self.assertFalse(cache.get_cached_response('a').is_found)
+        cache.clear()
+        self.assertFalse(cache.get_cached_response('b').is_found)
+
+
+@override_settings(PROCESS_CACHE_RESOURCES=PROCESS_CACHE_RESOURCES)
+class ProcessTieredCacheTests(TestCase):
+    def test_set_all_tiers(self):
+        """ Verify values are stored in the process-local tier and in TieredCache. """
+        ProcessTieredCache.set_all_tiers(RESOURCE, 'key', 'value', 300)
+
+        self.assertEqual(TieredCache.get_cached_response('key').value, 'value')
+        self.assertEqual(ProcessTieredCache.get_tier(RESOURCE).get_cached_response('key').value, 'value')
+
+    def test_get_cached_response_fills_process_tier(self):
+        """ Verify a TieredCache hit is served from the process-local tier afterwards. """
+        TieredCache.set_all_tiers('key', 'value', 300)
+
+        self.assertEqual(ProcessTieredCache.get_cached_response(RESOURCE, 'key').value, 'value')
+        TieredCache.dangerous_clear_all_tiers()
+        self.assertEqual(ProcessTieredCache.get_cached_response(RESOURCE, 'key').value, 'value')
+        self.assertEqual(ProcessTieredCache.get_stats()[RESOURCE]['hits'], 1)
+
+    def test_process_tier_timeout_is_bounded(self):
+        """ Verify process-local entries never outlive the django cache timeout. """
+        with mock.patch('ecommerce.core.cache_utils.time.time', return_value=100):
+            ProcessTieredCache.set_all_tiers(RESOURCE, 'key', 'value', 5)
+        TieredCache.dangerous_clear_all_tiers()
+
+        with mock.patch('ecommerce.core.cache_utils.time.time', return_value=106):
+            self.assertFalse(ProcessTieredCache.get_cached_response(RESOURCE, 'key').is_found)
+
+    def test_delete_all_tiers(self):
+        ProcessTieredCache.set_all_tiers(RESOURCE, 'key', 'value', 300)
+        ProcessTieredCache.delete_all_tiers(RESOURCE, 'key')
+
+        self.assertFalse(ProcessTieredCache.get_cached_response(RESOURCE, 'key').is_found)
+
+    def test_clear_resource(self):
+        """ Verify clearing a resource only clears its process-local tier. """
+        ProcessTieredCache.set_all_tiers(RESOURCE, 'key', 'value', 300)
+        ProcessTieredCache.clear_resource(RESOURCE)
+
+        self.assertFalse(ProcessTieredCache.get_tier(RESOURCE).get_cached_response('key').is_found)
+        self.assertTrue(TieredCache.get_cached_response('key').is_found)
+
+    def test_unconfigured_resource(self):
+        """ Verify resources without configuration only use TieredCache. """
+        ProcessTieredCache.set_all_tiers('other-resource', 'key', 'value', 300)
+
+        self.assertIsNone(ProcessTieredCache.get_tier('other-resource'))
+        self.assertEqual(ProcessTieredCache.get_cached_response('other-resource', 'key').value, 'value')
+        self.assertNotIn('other-resource', ProcessTieredCache.get_stats())
+
+
+class GetManyCachedResponsesTests(TestCase):
+    def test_get_many_cached_responses(self):
+        """ Verify request cache hits, django cache hits and misses are all reported. """
+        TieredCache.set_all_tiers('request', 1, 300)
+        django_cache.set('django', 2, 300)
+
+        with self.assertNumQueries(0):
+            cached_responses = get_many_cached_responses(['request', 'django', 'missing'])
+
+        self.assertEqual(cached_responses['request'].value, 1)
+        self.assertEqual(cached_responses['django'].value, 2)
+        self.assertFalse(cached_responses['missing'].is_found)
+        self.assertTrue(TieredCache.get_cached_response('django').is_found)
+
+
+@override_settings(SINGLE_FLIGHT_LOCK_TIMEOUT=1, SINGLE_FLIGHT_STALE_TIMEOUT=60)
+class GetOrFetchSingleFlightTests(TestCase):
+    def setUp(self):
+        super(GetOrFetchSingleFlightTests, self).setUp()
+        self.fetch = mock.Mock(return_value='value')
+
+    def lock(self, key):
+        django_cache.add(SINGLE_FLIGHT_LOCK_KEY.format(key=key), True)
+
+    def test_fetch_and_cache(self):
+        """ Verify the value is fetched once, cached, and the lock is released. """
+        self.assertEqual(get_or_fetch_single_flight('key', self.fetch, 300), 'value')
+        self.assertEqual(get_or_fetch_single_flight('key', self.fetch, 300), 'value')
+
+        self.assertEqual(self.fetch.call_count, 1)
+        self.assertEqual(TieredCache.get_cached_response('key').value, 'value')
+        self.assertEqual(django_cache.get(SINGLE_FLIGHT_STALE_KEY.format(key='key')), 'value')
+        self.assertIsNone(django_cache.get(SINGLE_FLIGHT_LOCK_KEY.format(key='key')))
+
+    def test_fetch_failure_releases_lock(self):
+        """ Verify nothing is cached, and the lock is released, when the fetch fails. """
+        self.fetch.side_effect = ValueError
+        with self.assertRaises(ValueError):
+            get_or_fetch_single_flight('key', self.fetch, 300)
+
+        self.assertFalse(TieredCache.get_cached_response('key').is_found)
+        self.assertIsNone(django_cache.get(SINGLE_FLIGHT_LOCK_KEY.format(key='key')))
+
+    def test_serve_stale_during_fetch(self):
+        """ Verify the expired value is served while another caller fetches the key. """
+        django_cache.set(SINGLE_FLIGHT_STALE_KEY.format(key='key'), 'stale', 60)
+        self.lock('key')
+
+        self.assertEqual(get_or_fetch_single_flight('key', self.fetch, 300), 'stale')
+        self.assertFalse(self.fetch.called)
+
+    def test_wait_for_fetch(self):
+        """ Verify callers without a stale value wait for the fetch in progress. """
+        self.lock('key')
+
+        with mock.patch('ecommerce.core.cache_utils.time.sleep', side_effect=lambda _: django_cache.set('key', 'new')):
+            self.assertEqual(get_or_fetch_single_flight('key', self.fetch, 300), 'new')
+        self.assertFalse(self.fetch.called)
+
+    def test_fetch_after_abandoned_lock(self):
+        """ Verify the value is fetched if the lock is released without caching a value. """
+        self.lock('key')
+
+        with mock.patch('ecommerce.core.cache_utils.time.sleep', side_effect=lambda _: django_cache.clear()):
+            self.assertEqual(get_or_fetch_single_flight('key', self.fetch, 300), 'value')
+        self.assertEqual(self.fetch.call_count, 1)
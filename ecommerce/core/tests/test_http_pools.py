@@ -0,0 +1,136 @@
+from __future__ import absolute_import
+
+import socket
+
+import httpretty
+import mock
+import requests
+from django.test import override_settings
+from requests import Request
+from requests.adapters import HTTPAdapter
+
+from ecommerce.core.http_pools import (
+    PooledHTTPAdapter,
+    clear_api_client_pools,
+    get_api_client_pool_stats,
+    get_api_client_session,
+    get_pooled_adapter
+)
+from ecommerce.tests.testcases import TestCase
+
+API_CLIENT_CONNECTION_POOL = {'POOL_SIZE': 2, 'MAX_RETRIES': 0, 'BACKOFF_FACTOR': 0, 'TIMEOUT': 3}
+
+
+@override_settings(API_CLIENT_CONNECTION_POOL=API_CLIENT_CONNECTION_POOL)
+class HTTPPoolTests(TestCase):
+    def test_adapters_are_shared_per_host(self):
+        """ Verify sessions for the same host share an adapter, and sessions for other hosts do not. """
+        adapter = get_api_client_session('https://lms.example.com/api/user/v1/').get_adapter(
+            'https://lms.example.com/api/enrollment/v1/'
+        )
+
+        self.assertIsInstance(adapter, PooledHTTPAdapter)
+        self.assertEqual(adapter.pool_size, 2)
+        self.assertIs(adapter, get_pooled_adapter('https://lms.example.com/api/commerce/v1/'))
+        self.assertIsNot(adapter, get_pooled_adapter('https://discovery.example.com/api/v1/'))
+        self.assertIsNot(adapter, get_pooled_adapter('http://lms.example.com/api/user/v1/'))
+
+    def test_closing_a_session_keeps_the_pool(self):
+        """ Verify closing one session does not close the connections shared with other sessions. """
+        url = 'https://lms.example.com/api/user/v1/'
+        adapter = get_pooled_adapter(url)
+        with mock.patch.object(adapter.poolmanager, 'clear') as mock_clear:
+            get_api_client_session(url).close()
+            self.assertFalse(mock_clear.called)
+
+            clear_api_client_pools()
+            self.assertTrue(mock_clear.called)
+
+    @httpretty.activate
+    def test_stats(self):
+        """ Verify requests and connection reuse are reported per host. """
+        url = 'http://lms.example.com/api/user/v1/'
+        httpretty.register_uri(httpretty.GET, url, body='{}', content_type='application/json')
+
+        get_api_client_session(url).get(url)
+        get_api_client_session(url).get(url)
+
+        self.assertEqual(get_api_client_pool_stats(), {
+            'http://lms.example.com/': {
+                'requests': 2,
+                'connections_opened': 1,
+                'connections_reused': 1,
+                'in_flight': 0,
+                'saturated_requests': 0,
+                'pool_size': 2,
+            }
+        })
+
+    def test_default_timeout(self):
+        """ Verify the configured timeout applies to requests sent without one. """
+        url = 'https://lms.example.com/api/user/v1/'
+        adapter = get_pooled_adapter(url)
+        with mock.patch.object(HTTPAdapter, 'send') as mock_send:
+            adapter.send(Request('GET', url).prepare())
+            self.assertEqual(mock_send.call_args[1]['timeout'], 3)
+
+            adapter.send(Request('GET', url).prepare(), timeout=1)
+            self.assertEqual(mock_send.call_args[1]['timeout'], 1)
+
+    def test_session_timeout(self):
+        """ Verify the timeout of a session applies to its requests sent without one. """
+        url = 'https://lms.example.com/api/user/v1/'
+        session = get_api_client_session(url, timeout=0.5)
+        session.timeout = 5
+        with mock.patch.object(requests.Session, 'request') as mock_request:
+            session.get(url)
+            self.assertEqual(mock_request.call_args[1]['timeout'], 0.5)
+
+            session.get(url, timeout=1)
+            self.assertEqual(mock_request.call_args[1]['timeout'], 1)
+
+    def test_saturation(self):
+        """ Verify requests sent while all connections are in use are counted and reported. """
+        url = 'https://lms.example.com/api/user/v1/'
+        adapter = get_pooled_adapter(url)
+        adapter.in_flight = adapter.pool_size
+
+        with mock.patch.object(HTTPAdapter, 'send'):
+            with mock.patch('ecommerce.core.http_pools.monitoring_utils.set_custom_metric') as mock_metric:
+                adapter.send(Request('GET', url).prepare())
+
+        mock_metric.assert_called_once_with('api_client_pool_saturated', 'lms.example.com')
+        stats = adapter.get_stats()
+        self.assertEqual(stats['saturated_requests'], 1)
+        self.assertEqual(stats['in_flight'], adapter.pool_size)
+
+    @httpretty.activate
+    def test_site_configuration_clients(self):
+        """ Verify the site's API clients use the shared connection pools. """
+        self.mock_access_token_response()
+        site_configuration = self.site.siteconfiguration
+
+        for client, url in (
+                (site_configuration.discovery_api_client, site_configuration.discovery_api_url),
+                (site_configuration.user_api_client, site_configuration.build_lms_url('/api/user/v1/')),
+        ):
+            session = client._store['session']  # pylint: disable=protected-access
+            self.assertIs(session.get_adapter(url), get_pooled_adapter(url))
+
+    def test_read_timeout_not_retried(self):
+        """ Verify read timeouts are raised as timeouts, rather than retried and raised as connection errors. """
+        # The listening socket accepts connections, but never responds.
+        server = socket.socket()
+        self.addCleanup(server.close)
+        server.bind(('127.0.0.1', 0))
+        server.listen(5)
+        url = 'http://127.0.0.1:{port}/api/user/v1/'.format(port=server.getsockname()[1])
+
+        pool_settings = dict(API_CLIENT_CONNECTION_POOL, MAX_RETRIES=2, TIMEOUT=0.1)
+        with override_settings(API_CLIENT_CONNECTION_POOL=pool_settings):
+            clear_api_client_pools()
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                get_api_client_session(url).get(url)
+
+        self.assertEqual(get_pooled_adapter(url).get_stats()['connections_opened'], 1)
+        clear_api_client_pools()
@@ -0,0 +1,63 @@
+from __future__ import absolute_import
+
+import mock
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from ecommerce.core.utils import on_commit_once
+
+
+class OnCommitOnceTests(TransactionTestCase):
+    """ Tests for on_commit_once. """
+
+    def setUp(self):
+        super(OnCommitOnceTests, self).setUp()
+        self.func = mock.Mock()
+
+    def test_called_once_per_transaction(self):
+        """ Verify the function is called once the transaction commits, with the items of every deferral. """
+        with transaction.atomic():
+            on_commit_once(self.func, [1])
+            with transaction.atomic():
+                on_commit_once(self.func, [2, 1])
+            self.assertFalse(self.func.called)
+
+        self.func.assert_called_once_with({1, 2})
+
+        with transaction.atomic():
+            on_commit_once(self.func, [3])
+        self.assertEqual(self.func.call_args, mock.call({3}))
+
+    def test_called_outside_of_transaction(self):
+        """ Verify the function is called immediately outside of a transaction. """
+        on_commit_once(self.func, [1])
+        self.func.assert_called_once_with({1})
+
+    def test_rolled_back(self):
+        """ Verify the items deferred in a rolled back transaction or savepoint are discarded. """
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                on_commit_once(self.func, [1])
+                raise ValueError
+        self.assertFalse(self.func.called)
+
+        with transaction.atomic():
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    on_commit_once(self.func, [2])
+                    raise ValueError
+            on_commit_once(self.func, [3])
+        self.func.assert_called_once_with({3})
+
+    def test_savepoint_rolled_back_after_registration(self):
+        """
+        Verify the items deferred in a rolled back savepoint are passed to the function, if it was deferred to
+        before the savepoint.
+        """
+        with transaction.atomic():
+            on_commit_once(self.func, [1])
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    on_commit_once(self.func, [2])
+                    raise ValueError
+        self.func.assert_called_once_with({1, 2})
@@ -1,16 +1,23 @@
 from __future__ import absolute_import, unicode_literals
 
+import functools
 import hashlib
 import logging
+import threading
 
 import six  # pylint: disable=ungrouped-imports
 import waffle
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from six.moves.urllib.parse import parse_qs, urlparse
 
 logger = logging.getLogger(__name__)
 
+# The items deferred by on_commit_once, by function, and the callbacks running them. Database connections are
+# per thread, so are their transactions.
+_deferred = threading.local()
+
 
 def log_message_and_raise_validation_error(message):
     """
@@ -94,3 +101,39 @@ def use_read_replica_if_available(queryset):
     If there is a database called 'read_replica', use that database for the queryset.
     """
     return queryset.using("read_replica") if "read_replica" in settings.DATABASES else queryset
+
+
+def _run_deferred(func):
+    func(_deferred.items.pop(func, set()))
+
+
+def on_commit_once(func, items=()):
+    """
+    Calls func once the current transaction commits, with the items deferred to it during the transaction.
+
+    Signal receivers which run for every saved row defer their work with this, so that it runs once per
+    transaction, with the items of all the rows, rather than once per row, and reads committed data. Outside
+    of a transaction, func is called immediately.
+
+    The call is registered with transaction.on_commit the first time func is deferred in a transaction, and is
+    discarded, with its items, if the transaction, or the savepoint it was registered in, is rolled back. Items
+    deferred later, in a savepoint which is rolled back, are still passed to func. func must therefore tolerate
+    items whose changes were rolled back, e.g. by only refreshing or invalidating what depends on them.
+
+    Arguments:
+        func (callable): Function called with the set of deferred items.
+        items (iterable): Hashable items to pass to func.
+    """
+    if not hasattr(_deferred, 'items'):
+        _deferred.items = {}
+        _deferred.callbacks = {}
+    callback = _deferred.callbacks.setdefault(func, functools.partial(_run_deferred, func))
+
+    # The callback is registered once per transaction. Once it has run, or was discarded by a rollback, along
+    # with the items deferred until then, it is registered again.
+    connection = transaction.get_connection()
+    if any(entry[1] is callback for entry in connection.run_on_commit):
+        _deferred.items[func].update(items)
+    else:
+        _deferred.items[func] = set(items)
+        transaction.on_commit(callback)
@@ -6,10 +6,10 @@ import json
 import httpretty
 import mock
 from django.test import RequestFactory
-from edx_django_utils.cache import TieredCache
 from oscar.core.utils import slugify
 from oscar.test import factories
 
+from ecommerce.core.cache_utils import ProcessTieredCache
 from ecommerce.core.constants import COUPON_PRODUCT_CLASS_NAME
 from ecommerce.core.models import BusinessClient
 from ecommerce.extensions.api.v2.views.coupons import CouponViewSet
@@ -23,7 +23,7 @@ class DiscoveryMockMixin:
     """ Mocks for the Discovery service response. """
     def setUp(self):
         super(DiscoveryMockMixin, self).setUp()
-        TieredCache.dangerous_clear_all_tiers()
+        ProcessTieredCache.dangerous_clear_all_tiers()
 
     @staticmethod
     def build_discovery_catalogs_url(discovery_api_url, catalog_id=''):
@@ -4,9 +4,11 @@ from __future__ import absolute_import, unicode_literals
 import logging
 import os
 
+from django.conf import settings
 from django.core.management import BaseCommand, CommandError
 
 from ecommerce.courses.models import Course
+from ecommerce.courses.publishers import LMSPublisher
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +28,18 @@ class Command(BaseCommand):
                             dest='course_ids_file',
                             default=None,
                             help='Path to file to read courses from.')
+        parser.add_argument('--batch_size',
+                            action='store',
+                            dest='batch_size',
+                            type=int,
+                            default=settings.LMS_PUBLISH_BATCH_SIZE,
+                            help='Number of courses loaded and published together.')
+        parser.add_argument('--workers',
+                            action='store',
+                            dest='workers',
+                            type=int,
+                            default=settings.LMS_PUBLISH_POOL_SIZE,
+                            help='Maximum number of courses published concurrently.')
 
     def handle(self, *args, **options):
         failed = 0
@@ -34,26 +48,33 @@ class Command(BaseCommand):
             raise CommandError("Pass the correct absolute path to course ids file as --course_ids_file argument.")
 
         with open(course_ids_file, 'r') as file_handler:
-            course_ids = file_handler.readlines()
-            total_courses = len(course_ids)
-            logger.info("Publishing %d courses.", total_courses)
-            for index, course_id in enumerate(course_ids, start=1):
-                try:
-                    course_id = course_id.strip()
-                    course = Course.objects.get(id=course_id)
-                    publishing_error = course.publish_to_lms()
-                    if publishing_error:
-                        failed += 1
-                        logger.error(
-                            u"(%d/%d) Failed to publish %s: %s", index, total_courses, course_id, publishing_error
-                        )
-                    else:
-                        logger.info(u"(%d/%d) Successfully published %s.", index, total_courses, course_id)
-                except Course.DoesNotExist:
+            course_ids = [course_id.strip() for course_id in file_handler.readlines()]
+        total_courses = len(course_ids)
+        logger.info("Publishing %d courses.", total_courses)
+
+        batch_size = options['batch_size']
+        for start in range(0, total_courses, batch_size):
+            batch_course_ids = course_ids[start:start + batch_size]
+            courses = Course.objects.filter(id__in=batch_course_ids).select_related(
+                'partner__default_site__siteconfiguration'
+            )
+            publishing_errors = LMSPublisher().publish_courses(courses, max_workers=options['workers'])
+
+            for index, course_id in enumerate(batch_course_ids, start=start + 1):
+                if course_id not in publishing_errors:
                     failed += 1
                     logger.error(
                         u"(%d/%d) Failed to publish %s: Course does not exist.", index, total_courses, course_id
                     )
+                elif publishing_errors[course_id]:
+                    failed += 1
+                    logger.error(
+                        u"(%d/%d) Failed to publish %s: %s",
+                        index, total_courses, course_id, publishing_errors[course_id]
+                    )
+                else:
+                    logger.info(u"(%d/%d) Successfully published %s.", index, total_courses, course_id)
+
         if failed:
             logger.error("Completed publishing courses. %d of %d failed.", failed, total_courses)
         else:
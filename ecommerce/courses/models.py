@@ -5,20 +5,14 @@ import logging
 import six
 from django.conf import settings
 from django.db import models, transaction
-from django.db.models import Count, Q
 from django.utils.timezone import now, timedelta
 from django.utils.translation import ugettext_lazy as _
 from oscar.core.loading import get_class, get_model
 from simple_history.models import HistoricalRecords
 
-from django.core.exceptions import MultipleObjectsReturned
-
-from ecommerce.core.constants import (
-    ENROLLMENT_CODE_PRODUCT_CLASS_NAME,
-    ENROLLMENT_CODE_SEAT_TYPES,
-    SEAT_PRODUCT_CLASS_NAME
-)
+from ecommerce.core.constants import ENROLLMENT_CODE_PRODUCT_CLASS_NAME, SEAT_PRODUCT_CLASS_NAME
 from ecommerce.courses.publishers import LMSPublisher
+from ecommerce.courses.seats import bulk_create_or_update_seats
 from ecommerce.extensions.catalogue.utils import generate_sku
 
 logger = logging.getLogger(__name__)
@@ -173,135 +167,37 @@ class Course(models.Model):
         Returns:
             Product:  The seat that has been created or updated.
         """
-        certificate_type = certificate_type.lower()
-        course_id = six.text_type(self.id)
-
-        if certificate_type == self.certificate_type_for_mode('audit'):
-            # Yields a match if attribute names do not include 'certificate_type'.
-            certificate_type_query = ~Q(attributes__name='certificate_type')
-        else:
-            # Yields a match if attribute with name 'certificate_type' matches provided value.
-            certificate_type_query = Q(
-                attributes__name='certificate_type',
-                attribute_values__value_text=certificate_type
-            )
-
-        id_verification_required_query = Q(
-            attributes__name='id_verification_required',
-            attribute_values__value_boolean=id_verification_required
-        )
-
-        if credit_provider is None:
-            # Yields a match if attribute names do not include 'credit_provider'.
-            credit_provider_query = ~Q(attributes__name='credit_provider')
-        else:
-            # Yields a match if attribute with name 'credit_provider' matches provided value.
-            credit_provider_query = Q(
-                attributes__name='credit_provider',
-                attribute_values__value_text=credit_provider
-            )
-
-        seats = self.seat_products.filter(certificate_type_query)
-        try:
-            seat = seats.filter(
-                id_verification_required_query
-            ).get(
-                credit_provider_query
-            )
-
-            logger.info(
-                'Retrieved course seat child product with certificate type [%s] for [%s] from database.',
-                certificate_type,
-                course_id
-            )
-        except Product.DoesNotExist:
-            seat = Product()
-            logger.info(
-                'Course seat product with certificate type [%s] for [%s] does not exist. Instantiated a new instance.',
-                certificate_type,
-                course_id
-            )
-
-        seat.course = self
-        seat.structure = Product.CHILD
-        seat.parent = self.parent_seat_product
-        seat.is_discountable = True
-        seat.title = self.get_course_seat_name(certificate_type, id_verification_required)
-        seat.expires = expires
-
-        seat.save()
-
-        # If a ProductAttribute is saved with a value of None or the empty string, the ProductAttribute is deleted.
-        # As a consequence, Seats derived from a migrated "audit" mode do not have a certificate_type attribute.
-        seat.attr.certificate_type = certificate_type
-        seat.attr.course_key = course_id
-        seat.attr.id_verification_required = id_verification_required
-        if certificate_type in ENROLLMENT_CODE_SEAT_TYPES and create_enrollment_code:
-            self._create_or_update_enrollment_code(
-                certificate_type, id_verification_required, self.partner, price, expires
-            )
-
-        if credit_provider:
-            seat.attr.credit_provider = credit_provider
-
-        if credit_hours:
-            seat.attr.credit_hours = credit_hours
-
-        seat.attr.save()
-
-        try:
-            # If only one instance of stock record is present, add another. -mohit741
-            try:
-                stock_record = StockRecord.objects.get(product=seat, partner=self.partner)
-                partner_sku_2 = generate_sku(seat, self.partner, 'IN')
-                stock_record_2 = StockRecord(product=seat, partner=self.partner, partner_sku=partner_sku_2)
-                stock_record_2.price_excl_tax = second_stock_price if second_stock_price is not None else price*70 # TODO Do better than this. -mohit741
-                stock_record_2.price_currency = settings.INDIAN_CURRENCY if settings.INDIAN_CURRENCY is not None else 'INR'
-                stock_record_2.save()
-            except MultipleObjectsReturned as e:
-                logger.warning('%s',e)
-                stock_record = StockRecord.objects.all().filter(product=seat, partner=self.partner)[0]
-                stock_record_2 = StockRecord.objects.all().filter(product=seat, partner=self.partner)[1]
-            logger.info(
-                'Retrieved course seat product stock record with certificate type [%s] for [%s] from database.',
-                certificate_type,
-                course_id
-            )
-            '''Adding new StockRecord for this seat product so that sku is generated automatically. In future, add a form field to add price 
-                in Indian currency. -mohit741'''
-        except StockRecord.DoesNotExist:
-            partner_sku = generate_sku(seat, self.partner)
-            partner_sku_2 = generate_sku(seat, self.partner, 'IN')
-            stock_record = StockRecord(product=seat, partner=self.partner, partner_sku=partner_sku)
-            stock_record_2 = StockRecord(product=seat, partner=self.partner, partner_sku=partner_sku_2)
-            logger.info(
-                'Course seat product stock record with certificate type [%s] for [%s] does not exist. '
-                'Instantiated a new instance.',
-                certificate_type,
-                course_id
-            )
-
-        stock_record.price_excl_tax = price
-        stock_record.price_currency = settings.OSCAR_DEFAULT_CURRENCY
-        stock_record_2.price_excl_tax = second_stock_price if second_stock_price is not None else price*70 # TODO Do better than this. -mohit741
-        stock_record_2.price_currency = settings.INDIAN_CURRENCY if settings.INDIAN_CURRENCY is not None else 'INR'
-        stock_record.save()
-        stock_record_2.save()
+        return self.create_or_update_seats(
+            [{
+                'certificate_type': certificate_type,
+                'id_verification_required': id_verification_required,
+                'price': price,
+                'credit_provider': credit_provider,
+                'expires': expires,
+                'credit_hours': credit_hours,
+                'second_stock_price': second_stock_price,
+            }],
+            remove_stale_modes=remove_stale_modes,
+            create_enrollment_code=create_enrollment_code
+        )[0]
+
+    def create_or_update_seats(self, seats, remove_stale_modes=True, create_enrollment_code=False):
+        """
+        Creates or updates course seat products in bulk.
 
-        if remove_stale_modes and self.certificate_type_for_mode(certificate_type) == 'professional':
-            id_verification_required_query = Q(
-                attributes__name='id_verification_required',
-                attribute_values__value_boolean=not id_verification_required
-            )
+        Arguments:
+            seats(list of dict): The arguments of create_or_update_seat of each seat.
 
-            # Delete seats with a different verification requirement, assuming the seats
-            # have not been purchased.
-            seats.annotate(orders=Count('line')).filter(
-                id_verification_required_query,
-                orders=0
-            ).delete()
+        Optional arguments:
+            remove_stale_modes(bool): Remove stale modes.
+            create_enrollment_code(bool): Whether an enrollment code is created in addition to the seats.
 
-        return seat
+        Returns:
+            list of Product: The seats that have been created or updated, in the order of the given seats.
+        """
+        return bulk_create_or_update_seats(
+            [(self, seats)], remove_stale_modes=remove_stale_modes, create_enrollment_code=create_enrollment_code
+        )[self.id]
 
     def get_enrollment_code(self):
         """ Returns an enrollment code Product related to this course. """
@@ -2,21 +2,51 @@ from __future__ import absolute_import, unicode_literals
 
 import json
 import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import six
+from django.conf import settings
+from django.db.models import Prefetch
 from django.utils.translation import ugettext_lazy as _
 from edx_rest_api_client.exceptions import SlumberHttpBaseException
-from oscar.core.loading import get_model
+from oscar.core.loading import get_class, get_model
 
-from ecommerce.core.constants import ENROLLMENT_CODE_SEAT_TYPES
+from ecommerce.core.constants import (
+    ENROLLMENT_CODE_PRODUCT_CLASS_NAME,
+    ENROLLMENT_CODE_SEAT_TYPES,
+    SEAT_PRODUCT_CLASS_NAME
+)
 from ecommerce.courses.utils import mode_for_product
+from ecommerce.extensions.catalogue.utils import set_product_attributes
 
 logger = logging.getLogger(__name__)
 Product = get_model('catalogue', 'Product')
+ProductAttributeValue = get_model('catalogue', 'ProductAttributeValue')
+Selector = get_class('partner.strategy', 'Selector')
 StockRecord = get_model('partner', 'StockRecord')
+select_stockrecord_by_currency = get_class('partner.strategy', 'select_stockrecord_by_currency')
+
+
+def _is_retryable(exc):
+    """
+    Returns True if a request which failed with the given exception may succeed when it is sent again.
+
+    Connection errors and timeouts are not retried here, because the pooled connections of the API clients
+    already retry them.
+    """
+    return (
+        isinstance(exc, SlumberHttpBaseException) and exc.response is not None and exc.response.status_code >= 500
+    )
 
 
 class LMSPublisher:
+    def __init__(self):
+        # Seats and enrollment codes of the courses, by course ID, loaded in bulk by prefetch().
+        self.seats = {}
+        self.enrollment_codes = {}
+
     def get_seat_expiration(self, seat):
         if not seat.expires or 'professional' in getattr(seat.attr, 'certificate_type', ''):
             return None
@@ -26,15 +56,18 @@ class LMSPublisher:
     def get_course_verification_deadline(self, course):
         return course.verification_deadline.isoformat() if course.verification_deadline else None
 
-    def serialize_seat_for_commerce_api(self, seat):
-        """ Serializes a course seat product to a dict that can be further serialized to JSON. """
-        stock_record = seat.stockrecords.first()
+    def serialize_seat_for_commerce_api(self, seat, stock_record=None):
+        """ Serializes a course seat product to a dict that can be further serialized to JSON.
+
+        The seat is serialized with its stock record in the default currency, unless another one is given.
+        """
+        stock_record = stock_record or select_stockrecord_by_currency(seat, settings.OSCAR_DEFAULT_CURRENCY)
 
         bulk_sku = None
         if getattr(seat.attr, 'certificate_type', '') in ENROLLMENT_CODE_SEAT_TYPES:
-            enrollment_code = seat.course.enrollment_code_product
+            enrollment_code = self.get_enrollment_code(seat)
             if enrollment_code:
-                bulk_sku = enrollment_code.stockrecords.first().partner_sku
+                bulk_sku = select_stockrecord_by_currency(enrollment_code, settings.OSCAR_DEFAULT_CURRENCY).partner_sku
 
         return {
             'name': mode_for_product(seat),
@@ -47,24 +80,81 @@ class LMSPublisher:
 
     # Use the second stock record so that we can use this in lms to update shoppingcart. (Ecommerce-Shoppingcart integration) -mohit741
     def serialize_seat_for_commerce_api_with_extra_stock_records(self, seat, stock_record):
-        """ Serializes a course seat product to a dict that can be further serialized to JSON. """
+        """ Serializes a course seat product, with one of its additional stock records. """
+        return self.serialize_seat_for_commerce_api(seat, stock_record)
 
-        bulk_sku = None
-        if getattr(seat.attr, 'certificate_type', '') in ENROLLMENT_CODE_SEAT_TYPES:
-            enrollment_code = seat.course.enrollment_code_product
-            if enrollment_code:
-                bulk_sku = enrollment_code.stockrecords.first().partner_sku
+    def get_extra_stock_record(self, seat):
+        """ Returns the seat's stock record in the Indian currency, if it differs from its default stock record. """
+        stock_records = list(seat.stockrecords.all())
+        if len(stock_records) < 2:
+            return None
+
+        default_stock_record = select_stockrecord_by_currency(seat, settings.OSCAR_DEFAULT_CURRENCY)
+        extra_stock_record = select_stockrecord_by_currency(seat, settings.INDIAN_CURRENCY)
+        if extra_stock_record == default_stock_record:
+            return None
+        return extra_stock_record
+
+    def get_seats(self, course):
+        """ Returns the course's seats, with their stock records. """
+        if course.id not in self.seats:
+            # The seats' stock records are prefetched, so that their selection by currency does not query them again.
+            self.seats[course.id] = list(course.seat_products)
+        return self.seats[course.id]
+
+    def get_enrollment_code(self, seat):
+        """ Returns the active enrollment code of the seat's course, if any. """
+        if seat.course_id not in self.enrollment_codes:
+            self.enrollment_codes[seat.course_id] = seat.course.enrollment_code_product
+        return self.enrollment_codes[seat.course_id]
+
+    def prefetch(self, courses):
+        """
+        Loads the seats of the courses, with their attributes and stock records, and their enrollment codes,
+        with a few queries for all the courses.
+
+        Arguments:
+            courses (list of Course)
+        """
+        course_ids = [course.id for course in courses]
+        self.seats.update((course_id, []) for course_id in course_ids)
+        seats = Product.objects.filter(
+            parent__course_id__in=course_ids,
+            parent__structure=Product.PARENT,
+            parent__product_class__name=SEAT_PRODUCT_CLASS_NAME,
+        ).select_related('parent__product_class').prefetch_related(
+            'stockrecords',
+            Prefetch('attribute_values', queryset=ProductAttributeValue.objects.select_related('attribute')),
+        )
+        for seat in seats:
+            set_product_attributes(seat, seat.attribute_values.all())
+            self.seats[seat.parent.course_id].append(seat)
+
+        self.enrollment_codes.update((course_id, None) for course_id in course_ids)
+        enrollment_codes = Product.objects.filter(
+            course_id__in=course_ids, product_class__name=ENROLLMENT_CODE_PRODUCT_CLASS_NAME
+        ).select_related('product_class').prefetch_related('stockrecords')
+        strategy = Selector().strategy()
+        for enrollment_code in enrollment_codes:
+            if strategy.fetch_for_product(enrollment_code).availability.is_available_to_buy:
+                self.enrollment_codes[enrollment_code.course_id] = enrollment_code
+
+    def get_course_data(self, course):
+        """ Returns the commerce data of the course, which is published to LMS. """
+        seats = self.get_seats(course)
+        modes = [self.serialize_seat_for_commerce_api(seat) for seat in seats]
+        for seat in seats:
+            extra_stock_record = self.get_extra_stock_record(seat)
+            if extra_stock_record:
+                modes.append(self.serialize_seat_for_commerce_api_with_extra_stock_records(seat, extra_stock_record))
 
         return {
-            'name': mode_for_product(seat),
-            'currency': stock_record.price_currency,
-            'price': int(stock_record.price_excl_tax),
-            'sku': stock_record.partner_sku,
-            'bulk_sku': bulk_sku,
-            'expires': self.get_seat_expiration(seat),
+            'id': course.id,
+            'name': course.name,
+            'verification_deadline': self.get_course_verification_deadline(course),
+            'modes': modes,
         }
 
-
     def publish(self, course):
         """ Publish course commerce data to LMS.
 
@@ -77,27 +167,83 @@ class LMSPublisher:
         Returns:
             None, if publish operation succeeded; otherwise, error message.
         """
-        site = course.partner.default_site
-        course_id = course.id
-        error_message = _('Failed to publish commerce data for {course_id} to LMS.').format(course_id=course_id)
+        return self._send(course.partner.default_site, self.get_course_data(course))
+
+    def publish_courses(self, courses, max_workers=None):
+        """ Publish the commerce data of many courses to LMS.
+
+        The courses' seats and enrollment codes are loaded with a few queries for all of them, then their
+        data is sent to LMS by a bounded pool of threads. Requests which fail because of a server error are
+        retried.
+
+        Arguments:
+            courses (list of Course): Courses to be published.
+            max_workers (int): Maximum number of courses published concurrently. Defaults to the
+                LMS_PUBLISH_POOL_SIZE setting.
+
+        Returns:
+            OrderedDict: None, if the course was published; otherwise, the error message, by course ID.
+        """
+        courses = list(courses)
+        if not courses:
+            return OrderedDict()
 
-        name = course.name
-        verification_deadline = self.get_course_verification_deadline(course)
-        modes = [self.serialize_seat_for_commerce_api(seat) for seat in course.seat_products]
-        for seat in course.seat_products:
-            stockrecords = seat.stockrecords.all()
-            if len(stockrecords) > 1:
-                modes.append(self.serialize_seat_for_commerce_api_with_extra_stock_records(seat,stockrecords[1]))
+        self.prefetch(courses)
+        sites = {}
+        errors = OrderedDict()
+        publications = []
+        for course in courses:
+            try:
+                # Courses of the same site share its API clients, which are built before the threads use them.
+                site = sites.setdefault(course.partner.default_site_id, course.partner.default_site)
+                site.siteconfiguration.commerce_api_client  # pylint: disable=pointless-statement
+                site.siteconfiguration.credit_api_client  # pylint: disable=pointless-statement
+                publications.append((site, self.get_course_data(course)))
+                errors[course.id] = None
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Failed to serialize commerce data for [%s].', course.id)
+                errors[course.id] = _('Failed to publish commerce data for {course_id} to LMS.').format(
+                    course_id=course.id
+                )
+
+        if publications:
+            pool_size = min(len(publications), max_workers or settings.LMS_PUBLISH_POOL_SIZE)
+            with ThreadPoolExecutor(max_workers=pool_size) as executor:
+                results = executor.map(lambda publication: self._send(*publication), publications)
+                for (__, data), error in zip(publications, results):
+                    errors[data['id']] = error
+        return errors
+
+    def _put(self, resource, data, course_id):
+        """ PUTs the course's data to the API resource, retrying the requests which failed with a server error. """
+        max_retries = settings.LMS_PUBLISH_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            try:
+                return resource.put(data=data)
+            except Exception as exc:  # pylint: disable=broad-except
+                if attempt == max_retries or not _is_retryable(exc):
+                    raise
+                logger.warning('Retrying to publish [%s] to LMS after [%s].', course_id, exc)
+                time.sleep(settings.LMS_PUBLISH_RETRY_BACKOFF * 2 ** attempt)
+
+    def _send(self, site, data):
+        """ Sends the commerce data of a course to LMS.
 
-        has_credit = 'credit' in [mode['name'] for mode in modes]
+        Returns:
+            None, if publish operation succeeded; otherwise, error message.
+        """
+        course_id = data['id']
+        error_message = _('Failed to publish commerce data for {course_id} to LMS.').format(course_id=course_id)
+
+        has_credit = 'credit' in [mode['name'] for mode in data['modes']]
         if has_credit:
             try:
-                data = {
+                credit_data = {
                     'course_key': course_id,
                     'enabled': True
                 }
                 credit_api_client = site.siteconfiguration.credit_api_client
-                credit_api_client.courses(course_id).put(data)
+                self._put(credit_api_client.courses(course_id), credit_data, course_id)
                 logger.info('Successfully published CreditCourse for [%s] to LMS.', course_id)
             except SlumberHttpBaseException as e:
                 # Note that %r is used to log the repr() of the response content, which may sometimes
@@ -115,15 +261,8 @@ class LMSPublisher:
                 return error_message
 
         try:
-            data = {
-                'id': course_id,
-                'name': name,
-                'verification_deadline': verification_deadline,
-                'modes': modes,
-            }
-
             commerce_api_client = site.siteconfiguration.commerce_api_client
-            commerce_api_client.courses(course_id).put(data=data)
+            self._put(commerce_api_client.courses(course_id), data, course_id)
             logger.info('Successfully published commerce data for [%s].', course_id)
             return None
         except SlumberHttpBaseException as e:  # pylint: disable=bare-except
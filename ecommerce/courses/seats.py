@@ -0,0 +1,309 @@
+"""
+Bulk creation and update of course seat products.
+
+Creating or updating seats one at a time runs several queries to find each seat, and saves the seat, each of its
+attributes and each of its stock records separately. When thousands of course runs are published or migrated, the
+seats of a whole batch of courses are instead resolved with a few queries, compared to the requested seats, and only
+the differences are written: attribute values and stock records are bulk created, and the rows which did not change
+are not written at all.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import logging
+from collections import defaultdict
+
+import six
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from oscar.core.loading import get_model
+
+from ecommerce.core.constants import ENROLLMENT_CODE_SEAT_TYPES, SEAT_PRODUCT_CLASS_NAME
+from ecommerce.extensions.catalogue.utils import generate_sku, set_product_attributes
+
+logger = logging.getLogger(__name__)
+Product = get_model('catalogue', 'Product')
+ProductAttribute = get_model('catalogue', 'ProductAttribute')
+ProductAttributeValue = get_model('catalogue', 'ProductAttributeValue')
+StockRecord = get_model('partner', 'StockRecord')
+
+
+def _seat_spec(certificate_type, id_verification_required, price, credit_provider=None, expires=None,
+               credit_hours=None, second_stock_price=None):
+    """ Returns the requested state of a seat, with the arguments of Course.create_or_update_seat. """
+    return {
+        'certificate_type': certificate_type.lower(),
+        'id_verification_required': id_verification_required,
+        'price': price,
+        'credit_provider': credit_provider,
+        'expires': expires,
+        'credit_hours': credit_hours,
+        'second_stock_price': second_stock_price,
+    }
+
+
+def _seat_key(certificate_type, id_verification_required, credit_provider):
+    """ Returns the key which identifies a seat of a course. Seats without a certificate type are audit seats. """
+    return certificate_type or '', bool(id_verification_required), credit_provider or None
+
+
+def _get_attribute_values(seat, spec):
+    """ Returns the requested values of the seat's attributes, by attribute code. """
+    values = {
+        # An empty certificate type deletes the attribute, so that audit seats have no certificate type.
+        'certificate_type': spec['certificate_type'],
+        'course_key': six.text_type(seat.course_id),
+        'id_verification_required': spec['id_verification_required'],
+    }
+    if spec['credit_provider']:
+        values['credit_provider'] = spec['credit_provider']
+    if spec['credit_hours']:
+        values['credit_hours'] = spec['credit_hours']
+    return values
+
+
+def _get_stock_record_prices(spec):
+    """ Returns the requested (currency, SKU country, price) of the seat's default and Indian stock records. """
+    price = spec['price']
+    second_stock_price = spec['second_stock_price']
+    return [
+        (settings.OSCAR_DEFAULT_CURRENCY, None, price),
+        # TODO Do better than this. -mohit741
+        (settings.INDIAN_CURRENCY, 'IN', second_stock_price if second_stock_price is not None else price * 70),
+    ]
+
+
+def _update_attribute_values(seat, spec, values, attributes):
+    """
+    Updates or deletes the seat's attribute values which differ from the requested ones.
+
+    Returns:
+        list of ProductAttributeValue: The unsaved attribute values which are missing.
+    """
+    set_product_attributes(seat, values.values())
+
+    new_values = []
+    for code, value in six.iteritems(_get_attribute_values(seat, spec)):
+        setattr(seat.attr, code, value)
+        value_obj = values.get(code)
+        if value is None or value == '':
+            if value_obj:
+                value_obj.delete()
+        elif value_obj is None:
+            value_obj = ProductAttributeValue(product=seat, attribute=attributes[code])
+            value_obj.value = value
+            new_values.append(value_obj)
+        elif value_obj.value != value:
+            value_obj.value = value
+            value_obj.save()
+    return new_values
+
+
+def _update_stock_records(seat, partner, spec, stock_records):
+    """
+    Updates the seat's stock records whose currency or price differ from the requested ones.
+
+    Returns:
+        list of StockRecord: The unsaved stock records which are missing.
+    """
+    prices = _get_stock_record_prices(spec)
+    currencies = [currency for currency, __, __ in prices]
+    matched = {}
+    for stock_record in stock_records:
+        if stock_record.price_currency in currencies:
+            matched.setdefault(stock_record.price_currency, stock_record)
+    # Stock records in other currencies, e.g. created before the Indian currency ones, are reused.
+    unmatched = [stock_record for stock_record in stock_records if stock_record not in matched.values()]
+
+    new_stock_records = []
+    for currency, country, price in prices:
+        stock_record = matched.get(currency) or (unmatched.pop(0) if unmatched else None)
+        if stock_record is None:
+            new_stock_records.append(StockRecord(
+                product=seat,
+                partner=partner,
+                partner_sku=generate_sku(seat, partner, country),
+                price_currency=currency,
+                price_excl_tax=price
+            ))
+        elif stock_record.price_currency != currency or stock_record.price_excl_tax != price:
+            stock_record.price_currency = currency
+            stock_record.price_excl_tax = price
+            stock_record.save()
+    return new_stock_records
+
+
+def _bulk_create_with_history(model, objs, get_key, **filters):
+    """
+    Bulk creates the objects, and their history records.
+
+    Only PostgreSQL returns the primary keys of bulk created rows, so on other databases the created rows are read
+    back, with the given filters, and identified by their (unique) key, before their history is recorded.
+    """
+    if not objs:
+        return
+
+    created = model.objects.bulk_create(objs)
+    if created[0].pk is None:
+        keys = {get_key(obj) for obj in objs}
+        created = [obj for obj in model.objects.filter(**filters) if get_key(obj) in keys]
+    model.history.bulk_history_create(created)
+
+
+def bulk_create_or_update_seats(course_seats, remove_stale_modes=True, create_enrollment_code=False):
+    """
+    Creates or updates the seats of a batch of courses, in one transaction.
+
+    The existing seats of all the courses, with their attribute values and stock records, are loaded with a
+    constant number of queries. New seats are inserted one at a time, so that their primary keys are known on every
+    database; their attribute values and stock records, and those missing from existing seats, are bulk created.
+    Seats, attribute values and stock records which differ from the requested state are updated, and those which
+    do not are left untouched.
+
+    Arguments:
+        course_seats (list): (Course, list of dict) pairs of the courses and their requested seats. Each seat is a
+            dict of the arguments of Course.create_or_update_seat.
+
+    Optional arguments:
+        remove_stale_modes (bool): Delete the unpurchased professional seats with a different ID verification
+            requirement than the requested ones.
+        create_enrollment_code (bool): Whether an enrollment code is created in addition to the seats.
+
+    Returns:
+        dict: The created or updated seats of each course ID, in the order they were requested.
+    """
+    course_seats = [(course, [_seat_spec(**seat) for seat in seats]) for course, seats in course_seats]
+    courses = [course for course, __ in course_seats]
+
+    with transaction.atomic():
+        parents = {
+            parent.course_id: parent
+            for parent in Product.objects.filter(
+                course__in=courses, product_class__name=SEAT_PRODUCT_CLASS_NAME, structure=Product.PARENT
+            ).select_related('product_class')
+        }
+        for course in courses:
+            if course.id not in parents:
+                parents[course.id] = course.parent_seat_product
+
+        existing_seats = list(Product.objects.filter(parent__in=parents.values()).order_by('id'))
+        attribute_values = defaultdict(dict)
+        for value in ProductAttributeValue.objects.filter(product__in=existing_seats).select_related('attribute'):
+            attribute_values[value.product_id][value.attribute.code] = value
+        stock_records = defaultdict(list)
+        for stock_record in StockRecord.objects.filter(product__in=existing_seats).order_by('id'):
+            stock_records[stock_record.product_id].append(stock_record)
+        attributes = {
+            attribute.code: attribute
+            for attribute in ProductAttribute.objects.filter(product_class__name=SEAT_PRODUCT_CLASS_NAME)
+        }
+
+        seats_by_key = {}
+        existing_seat_keys = []
+        for seat in existing_seats:
+            values = attribute_values[seat.id]
+            key = _seat_key(*(
+                values[code].value if code in values else None
+                for code in ('certificate_type', 'id_verification_required', 'credit_provider')
+            ))
+            seats_by_key.setdefault((seat.course_id, key), seat)
+            existing_seat_keys.append((seat, key))
+
+        seats = {}
+        new_values = []
+        new_stock_records = []
+        for course, specs in course_seats:
+            course_id = six.text_type(course.id)
+            parent = parents[course.id]
+            seats[course.id] = []
+            for spec in specs:
+                key = _seat_key(spec['certificate_type'], spec['id_verification_required'], spec['credit_provider'])
+                seat = seats_by_key.get((course.id, key))
+                created = seat is None
+                if created:
+                    seat = Product(course=course, structure=Product.CHILD, parent=parent, is_discountable=True)
+                    logger.info(
+                        'Course seat product with certificate type [%s] for [%s] does not exist. '
+                        'Instantiated a new instance.',
+                        spec['certificate_type'],
+                        course_id
+                    )
+                    seats_by_key[(course.id, key)] = seat
+
+                fields = {
+                    'course_id': course.id,
+                    'structure': Product.CHILD,
+                    'parent_id': parent.id,
+                    'is_discountable': True,
+                    'title': course.get_course_seat_name(spec['certificate_type'], spec['id_verification_required']),
+                    'expires': spec['expires'],
+                }
+                if created or any(getattr(seat, field) != value for field, value in six.iteritems(fields)):
+                    for field, value in six.iteritems(fields):
+                        setattr(seat, field, value)
+                    # The attribute values are written in bulk below, so the product must not load or save them.
+                    seat.attr.initialised = True
+                    seat.save()
+                seat.parent = parent
+
+                new_values.extend(_update_attribute_values(seat, spec, attribute_values[seat.id], attributes))
+                seat_stock_records = [
+                    stock_record for stock_record in stock_records[seat.id]
+                    if stock_record.partner_id == course.partner_id
+                ]
+                new_stock_records.extend(_update_stock_records(seat, course.partner, spec, seat_stock_records))
+
+                if not created:
+                    logger.info(
+                        'Retrieved course seat child product with certificate type [%s] for [%s] from database.',
+                        spec['certificate_type'],
+                        course_id
+                    )
+
+                if spec['certificate_type'] in ENROLLMENT_CODE_SEAT_TYPES and create_enrollment_code:
+                    course._create_or_update_enrollment_code(  # pylint: disable=protected-access
+                        spec['certificate_type'],
+                        spec['id_verification_required'],
+                        course.partner,
+                        spec['price'],
+                        spec['expires']
+                    )
+                seats[course.id].append(seat)
+
+        # Stale seats are deleted before the stock records are created, as their SKUs may be reused.
+        if remove_stale_modes:
+            _delete_stale_professional_seats(course_seats, seats, existing_seat_keys)
+
+        _bulk_create_with_history(
+            ProductAttributeValue, new_values, lambda value: (value.product_id, value.attribute_id),
+            product__in={value.product_id for value in new_values}
+        )
+        _bulk_create_with_history(
+            StockRecord, new_stock_records, lambda stock_record: (stock_record.partner_id, stock_record.partner_sku),
+            partner_sku__in={stock_record.partner_sku for stock_record in new_stock_records}
+        )
+
+    return seats
+
+
+def _delete_stale_professional_seats(course_seats, seats, existing_seat_keys):
+    """
+    Deletes the unpurchased professional seats of the courses whose ID verification requirement differs from the
+    requested professional seats.
+    """
+    stale_seat_ids = []
+    for course, specs in course_seats:
+        requested_seat_ids = {seat.id for seat in seats[course.id]}
+        for spec in specs:
+            if course.certificate_type_for_mode(spec['certificate_type']) != 'professional':
+                continue
+            stale_seat_ids.extend(
+                seat.id for seat, (certificate_type, id_verification_required, __) in existing_seat_keys
+                if seat.course_id == course.id and seat.id not in requested_seat_ids and
+                certificate_type == spec['certificate_type'] and
+                id_verification_required != bool(spec['id_verification_required'])
+            )
+
+    if stale_seat_ids:
+        # Delete seats with a different verification requirement, assuming the seats have not been purchased.
+        Product.objects.filter(id__in=stale_seat_ids).annotate(orders=Count('line')).filter(orders=0).delete()
@@ -12,7 +12,7 @@ import mock
 from django.core.management import CommandError, call_command
 from testfixtures import LogCapture
 
-from ecommerce.courses.models import Course
+from ecommerce.courses.publishers import LMSPublisher
 from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
 from ecommerce.tests.testcases import TransactionTestCase
@@ -103,14 +103,27 @@ class PublishCoursesToLMSTests(DiscoveryTestMixin, TransactionTestCase):
                 "All 2 courses successfully published."
             )
         )
-        with mock.patch.object(Course, 'publish_to_lms', autospec=True) as mock_publish:
-            mock_publish.return_value = None
+        with mock.patch.object(LMSPublisher, 'publish_courses') as mock_publish:
+            mock_publish.return_value = {self.course.id: None, second_course.id: None}
             with LogCapture(LOGGER_NAME) as lc:
                 call_command('publish_to_lms', course_ids_file=self.tmp_file_path)
                 lc.check(*expected)
-        # Check that the mocked function was called twice.
+        # Check that the courses were published together.
+        self.assertEqual(mock_publish.call_count, 1)
+        self.assertEqual(set(mock_publish.call_args[0][0]), {self.course, second_course})
+
+    def test_course_publish_in_batches(self):
+        """ Verify the courses are published in batches of the given size. """
+        second_course = CourseFactory(partner=self.partner)
+        self.create_course_ids_file(self.tmp_file_path, [self.course.id, second_course.id])
+
+        with mock.patch.object(LMSPublisher, 'publish_courses') as mock_publish:
+            mock_publish.side_effect = [{self.course.id: None}, {second_course.id: None}]
+            call_command('publish_to_lms', course_ids_file=self.tmp_file_path, batch_size=1, workers=2)
+
         self.assertListEqual(
-            mock_publish.call_args_list, [mock.call(self.course), mock.call(second_course)]
+            [(list(args[0]), kwargs) for args, kwargs in mock_publish.call_args_list],
+            [([self.course], {'max_workers': 2}), ([second_course], {'max_workers': 2})]
         )
 
     def test_course_publish_failed(self):
@@ -134,12 +147,12 @@ class PublishCoursesToLMSTests(DiscoveryTestMixin, TransactionTestCase):
                 "Completed publishing courses. 1 of 1 failed."
             )
         )
-        with mock.patch.object(Course, 'publish_to_lms') as mock_publish:
-            mock_publish.return_value = error_msg
+        with mock.patch.object(LMSPublisher, 'publish_courses') as mock_publish:
+            mock_publish.return_value = {self.course.id: error_msg}
             with LogCapture(LOGGER_NAME) as lc:
                 call_command('publish_to_lms', course_ids_file=self.tmp_file_path)
                 lc.check(*expected)
-            mock_publish.assert_called_once_with()
+            self.assertEqual(mock_publish.call_count, 1)
 
     def test_unicode_file_name(self):
         """ Verify the unicode files name are read correctly."""
@@ -162,11 +175,11 @@ class PublishCoursesToLMSTests(DiscoveryTestMixin, TransactionTestCase):
                 "All 1 courses successfully published."
             )
         )
-        with mock.patch.object(Course, 'publish_to_lms') as mock_publish:
-            mock_publish.return_value = None
+        with mock.patch.object(LMSPublisher, 'publish_courses') as mock_publish:
+            mock_publish.return_value = {self.course.id: None}
             with LogCapture(LOGGER_NAME) as lc:
                 call_command('publish_to_lms', course_ids_file=unicode_file)
                 lc.check(*expected)
 
-        mock_publish.assert_called_once_with()
+        self.assertEqual(mock_publish.call_count, 1)
         os.remove(unicode_file)
@@ -6,6 +6,8 @@ import json
 import ddt
 import httpretty
 import mock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from oscar.core.loading import get_model
 from requests import Timeout
@@ -233,3 +235,93 @@ class LMSPublisherTests(DiscoveryTestMixin, TestCase):
         actual = self.attempt_credit_publication(500)
         expected = 'Failed to publish commerce data for {} to LMS.'.format(self.course.id)
         self.assertEqual(actual, expected)
+
+
+class LMSPublisherPublishCoursesTests(DiscoveryTestMixin, TestCase):
+    def setUp(self):
+        super(LMSPublisherPublishCoursesTests, self).setUp()
+
+        httpretty.enable()
+        self.mock_access_token_response()
+
+        self.courses = CourseFactory.create_batch(2, partner=self.partner)
+        for course in self.courses:
+            course.create_or_update_seat('verified', True, 50, create_enrollment_code=True)
+        self.publisher = LMSPublisher()
+
+    def tearDown(self):
+        super(LMSPublisherPublishCoursesTests, self).tearDown()
+        httpretty.disable()
+        httpretty.reset()
+
+    def mock_commerce_api(self, course, responses):
+        url = self.site_configuration.build_lms_url('/api/commerce/v1/courses/{}/'.format(course.id))
+        httpretty.register_uri(httpretty.PUT, url, responses=[
+            httpretty.Response(body=json.dumps({}), status=status, content_type=JSON) for status in responses
+        ])
+
+    def get_commerce_api_requests(self, course):
+        path = '/api/commerce/v1/courses/{}/'.format(course.id)
+        return [request for request in httpretty.httpretty.latest_requests if request.path == path]
+
+    def test_publish_courses(self):
+        """ Verify the courses are published with the same data as when they are published one at a time. """
+        for course in self.courses:
+            self.mock_commerce_api(course, [200])
+
+        errors = self.publisher.publish_courses(self.courses)
+
+        self.assertEqual(list(errors.items()), [(course.id, None) for course in self.courses])
+        for course in self.courses:
+            actual = json.loads(self.get_commerce_api_requests(course)[0].body.decode('utf-8'))
+            self.assertEqual(actual, LMSPublisher().get_course_data(course))
+            self.assertIsNotNone(actual['modes'][0]['bulk_sku'])
+
+    def test_publish_courses_queries(self):
+        """ Verify the courses are loaded with a number of queries which does not depend on their number. """
+        for course in self.courses:
+            self.mock_commerce_api(course, [200, 200])
+
+        with CaptureQueriesContext(connection) as single_course_queries:
+            LMSPublisher().publish_courses(self.courses[:1])
+        with self.assertNumQueries(len(single_course_queries)):
+            LMSPublisher().publish_courses(self.courses)
+
+    def test_publish_courses_retry(self):
+        """ Verify publications which fail with a server error are retried, and those which are invalid are not. """
+        self.mock_commerce_api(self.courses[0], [503, 200])
+        self.mock_commerce_api(self.courses[1], [400, 200])
+
+        errors = self.publisher.publish_courses(self.courses)
+
+        self.assertIsNone(errors[self.courses[0].id])
+        self.assertEqual(len(self.get_commerce_api_requests(self.courses[0])), 2)
+        self.assertEqual(
+            errors[self.courses[1].id],
+            'Failed to publish commerce data for {course_id} to LMS.'.format(course_id=self.courses[1].id)
+        )
+        self.assertEqual(len(self.get_commerce_api_requests(self.courses[1])), 1)
+
+    def test_connection_errors_not_retried(self):
+        """ Verify timeouts are left to the retries of the pooled connections, instead of being retried again. """
+        resource = mock.Mock()
+        resource.put.side_effect = Timeout
+
+        with self.assertRaises(Timeout):
+            self.publisher._put(resource, {}, self.courses[0].id)  # pylint: disable=protected-access
+        self.assertEqual(resource.put.call_count, 1)
+
+    def test_publish_courses_serialization_failure(self):
+        """ Verify a course which cannot be serialized is reported, and the other courses are still published. """
+        self.mock_commerce_api(self.courses[1], [200])
+
+        with mock.patch.object(
+                LMSPublisher, 'get_course_data', side_effect=[Exception, {'id': self.courses[1].id, 'modes': []}]
+        ):
+            errors = self.publisher.publish_courses(self.courses)
+
+        self.assertEqual(
+            errors[self.courses[0].id],
+            'Failed to publish commerce data for {course_id} to LMS.'.format(course_id=self.courses[0].id)
+        )
+        self.assertIsNone(errors[self.courses[1].id])
@@ -0,0 +1,100 @@
+from __future__ import absolute_import
+
+from decimal import Decimal
+
+from django.conf import settings
+from oscar.core.loading import get_model
+
+from ecommerce.courses.seats import bulk_create_or_update_seats
+from ecommerce.courses.tests.factories import CourseFactory
+from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
+from ecommerce.tests.testcases import TestCase
+
+Product = get_model('catalogue', 'Product')
+ProductAttributeValue = get_model('catalogue', 'ProductAttributeValue')
+StockRecord = get_model('partner', 'StockRecord')
+
+
+class BulkCreateOrUpdateSeatsTests(DiscoveryTestMixin, TestCase):
+    def setUp(self):
+        super(BulkCreateOrUpdateSeatsTests, self).setUp()
+        self.courses = CourseFactory.create_batch(2, partner=self.partner)
+
+    def get_course_seats(self, price=10, **kwargs):
+        seat = dict({'certificate_type': 'verified', 'id_verification_required': True, 'price': price}, **kwargs)
+        return [(course, [seat]) for course in self.courses]
+
+    def assert_seat_valid(self, seat, course, price, inr_price):
+        """ Verify the seat, its attributes and its stock records in both currencies. """
+        seat = Product.objects.get(id=seat.id)
+        self.assertEqual(seat.parent, course.parent_seat_product)
+        self.assertEqual(seat.attr.certificate_type, 'verified')
+        self.assertEqual(seat.attr.course_key, course.id)
+        self.assertTrue(seat.attr.id_verification_required)
+        self.assertEqual(
+            {(stock_record.price_currency, stock_record.price_excl_tax) for stock_record in seat.stockrecords.all()},
+            {(settings.OSCAR_DEFAULT_CURRENCY, price), (settings.INDIAN_CURRENCY, inr_price)}
+        )
+        self.assertEqual(ProductAttributeValue.history.filter(product=seat).count(), 3)
+        self.assertEqual(StockRecord.history.filter(product=seat).count(), 2)
+
+    def test_create_seats(self):
+        """ Verify the seats of a batch of courses are created, with their attributes and stock records. """
+        seats = bulk_create_or_update_seats(self.get_course_seats(second_stock_price=700))
+
+        for course in self.courses:
+            self.assertEqual(len(seats[course.id]), 1)
+            self.assert_seat_valid(seats[course.id][0], course, 10, 700)
+
+    def test_update_seats(self):
+        """ Verify only the stock records whose price changed are updated. """
+        seats = bulk_create_or_update_seats(self.get_course_seats())
+        updated_seats = bulk_create_or_update_seats(self.get_course_seats(second_stock_price=Decimal('800.00')))
+
+        for course in self.courses:
+            self.assertEqual(updated_seats[course.id], seats[course.id])
+            stock_records = {
+                stock_record.price_currency: stock_record
+                for stock_record in StockRecord.objects.filter(product=seats[course.id][0])
+            }
+            self.assertEqual(stock_records[settings.INDIAN_CURRENCY].price_excl_tax, 800)
+            self.assertEqual(stock_records[settings.INDIAN_CURRENCY].history.count(), 2)
+            self.assertEqual(stock_records[settings.OSCAR_DEFAULT_CURRENCY].history.count(), 1)
+
+    def test_unchanged_seats_not_written(self):
+        """ Verify seats which did not change are resolved with a constant number of queries, and not written. """
+        bulk_create_or_update_seats(self.get_course_seats())
+
+        # The parent seats, seats, attribute values, stock records and seat attributes are each read once, in a
+        # savepoint.
+        with self.assertNumQueries(7):
+            bulk_create_or_update_seats(self.get_course_seats())
+
+    def test_reuse_stock_record_in_other_currency(self):
+        """ Verify a seat's stock record in another currency is reused for its default currency. """
+        seat = bulk_create_or_update_seats(self.get_course_seats())[self.courses[0].id][0]
+        stock_record = StockRecord.objects.get(product=seat, price_currency=settings.OSCAR_DEFAULT_CURRENCY)
+        stock_record.price_currency = 'GBP'
+        stock_record.save()
+
+        bulk_create_or_update_seats(self.get_course_seats(price=20))
+
+        stock_record.refresh_from_db()
+        self.assertEqual(stock_record.price_currency, settings.OSCAR_DEFAULT_CURRENCY)
+        self.assertEqual(stock_record.price_excl_tax, 20)
+        self.assertEqual(StockRecord.objects.filter(product=seat).count(), 2)
+
+    def test_stale_professional_seats_removed(self):
+        """ Verify unpurchased professional seats with a different ID verification requirement are deleted. """
+        course_seats = [
+            (course, [{'certificate_type': 'professional', 'id_verification_required': False, 'price': 5}])
+            for course in self.courses
+        ]
+        stale_seats = bulk_create_or_update_seats(course_seats)
+        for __, seats in course_seats:
+            seats[0]['id_verification_required'] = True
+        seats = bulk_create_or_update_seats(course_seats)
+
+        for course in self.courses:
+            self.assertFalse(Product.objects.filter(id=stale_seats[course.id][0].id).exists())
+            self.assertEqual(list(course.seat_products), seats[course.id])
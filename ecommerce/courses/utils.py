@@ -7,6 +7,7 @@ from django.utils.translation import ugettext_lazy as _
 from edx_django_utils.cache import TieredCache
 from opaque_keys.edx.keys import CourseKey
 
+from ecommerce.core.cache_utils import COURSE_INFO_CACHE_RESOURCE, get_or_fetch_single_flight
 from ecommerce.core.utils import deprecated_traverse_pagination
 
 
@@ -37,17 +38,15 @@ def get_course_info_from_catalog(site, product):
 
     cache_key = u'courses_api_detail_{}{}'.format(key, partner_short_code)
     cache_key = hashlib.md5(cache_key.encode('utf-8')).hexdigest()
-    course_cached_response = TieredCache.get_cached_response(cache_key)
-    if course_cached_response.is_found:
-        return course_cached_response.value
 
-    if product.is_course_entitlement_product:
-        course = api.courses(key).get()
-    else:
-        course = api.course_runs(key).get(partner=partner_short_code)
+    def fetch_course():
+        if product.is_course_entitlement_product:
+            return api.courses(key).get()
+        return api.course_runs(key).get(partner=partner_short_code)
 
-    TieredCache.set_all_tiers(cache_key, course, settings.COURSES_API_CACHE_TIMEOUT)
-    return course
+    return get_or_fetch_single_flight(
+        cache_key, fetch_course, settings.COURSES_API_CACHE_TIMEOUT, resource=COURSE_INFO_CACHE_RESOURCE
+    )
 
 
 def get_course_catalogs(site, resource_id=None):
@@ -6,9 +6,13 @@ from __future__ import absolute_import
 import logging
 
 from django.conf import settings
-from edx_django_utils.cache import TieredCache
 from six.moves.urllib.parse import urlencode
 
+from ecommerce.core.cache_utils import (
+    ENTERPRISE_LEARNER_CACHE_RESOURCE,
+    ProcessTieredCache,
+    get_or_fetch_single_flight
+)
 from ecommerce.core.utils import get_cache_key
 
 logger = logging.getLogger(__name__)
@@ -96,7 +100,7 @@ def fetch_enterprise_learner_data(site, user):
         username=user.username
     )
 
-    cached_response = TieredCache.get_cached_response(cache_key)
+    cached_response = ProcessTieredCache.get_cached_response(ENTERPRISE_LEARNER_CACHE_RESOURCE, cache_key)
     if cached_response.is_found:
         return cached_response.value
 
@@ -105,7 +109,9 @@ def fetch_enterprise_learner_data(site, user):
     querystring = {'username': user.username}
     response = endpoint().get(**querystring)
 
-    TieredCache.set_all_tiers(cache_key, response, settings.ENTERPRISE_API_CACHE_TIMEOUT)
+    ProcessTieredCache.set_all_tiers(
+        ENTERPRISE_LEARNER_CACHE_RESOURCE, cache_key, response, settings.ENTERPRISE_API_CACHE_TIMEOUT
+    )
     return response
 
 
@@ -129,13 +135,9 @@ def catalog_contains_course_runs(site, course_run_ids, enterprise_customer_uuid,
         query_params=urlencode(query_params, True)
     )
 
-    contains_content_cached_response = TieredCache.get_cached_response(cache_key)
-    if contains_content_cached_response.is_found:
-        return contains_content_cached_response.value
-
-    api = site.siteconfiguration.enterprise_api_client
-    endpoint = getattr(api, api_resource_name)(api_resource_id)
-    contains_content = endpoint.contains_content_items.get(**query_params)['contains_content_items']
-    TieredCache.set_all_tiers(cache_key, contains_content, settings.ENTERPRISE_API_CACHE_TIMEOUT)
+    def fetch_contains_content():
+        api = site.siteconfiguration.enterprise_api_client
+        endpoint = getattr(api, api_resource_name)(api_resource_id)
+        return endpoint.contains_content_items.get(**query_params)['contains_content_items']
 
-    return contains_content
+    return get_or_fetch_single_flight(cache_key, fetch_contains_content, settings.ENTERPRISE_API_CACHE_TIMEOUT)
@@ -25,6 +25,7 @@ from six.moves.urllib.parse import urlencode
 from slumber.exceptions import SlumberHttpBaseException
 
 from ecommerce.core.constants import SYSTEM_ENTERPRISE_LEARNER_ROLE
+from ecommerce.core.http_pools import get_api_client_session
 from ecommerce.core.url_utils import absolute_url, get_lms_dashboard_url
 from ecommerce.enterprise.api import fetch_enterprise_learner_data
 from ecommerce.enterprise.exceptions import EnterpriseDoesNotExist
@@ -51,9 +52,11 @@ def get_enterprise_api_client(site):
     """
     Constructs a REST client for to communicate with the Open edX Enterprise Service
     """
+    url = site.siteconfiguration.enterprise_api_url
     return EdxRestApiClient(
-        site.siteconfiguration.enterprise_api_url,
-        jwt=site.siteconfiguration.access_token
+        url,
+        jwt=site.siteconfiguration.access_token,
+        session=get_api_client_session(url)
     )
 
 
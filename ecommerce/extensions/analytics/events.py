@@ -0,0 +1,156 @@
+"""
+Buffered delivery of Segment events.
+
+Tracked events are put in a bounded in-process queue, and a background thread hands them to the Segment client of
+their site in batches, so the requests tracking events do not build and validate the Segment messages themselves.
+Events tracked while the queue is full are dropped rather than slowing the request down. The numbers of events
+which overflowed the queue, and of queued events the Segment client did not accept, are counted.
+"""
+from __future__ import absolute_import
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from edx_django_utils import monitoring as monitoring_utils
+from six.moves import queue  # pylint: disable=import-error
+
+logger = logging.getLogger(__name__)
+
+_event_queue = None
+_event_queue_lock = threading.Lock()
+
+
+class SegmentEventQueue(object):
+    """
+    Bounded queue of Segment events, flushed in batches by a background worker thread.
+
+    Attributes:
+        overflow_count (int): Number of events which were not queued because the queue was full.
+        dropped_count (int): Number of queued events which the Segment client failed to accept.
+        sent_count (int): Number of queued events accepted by the Segment client.
+    """
+
+    def __init__(self, maxsize, batch_size, flush_interval):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_count = 0
+        self.dropped_count = 0
+        self.sent_count = 0
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def put(self, segment_client, user_tracking_id, event, properties, context):
+        """
+        Queues an event, without blocking. The event keeps the time at which it was queued.
+
+        Arguments:
+            segment_client (analytics.Client): Segment client of the event's site.
+            user_tracking_id (str): ID of the user to which the event is associated.
+            event (str): Event name.
+            properties (dict): Event properties.
+            context (dict): Event context.
+
+        Returns:
+            bool: Whether the event was queued.
+        """
+        self._start_worker()
+        try:
+            self._queue.put_nowait((segment_client, user_tracking_id, event, properties, context, timezone.now()))
+        except queue.Full:
+            with self._lock:
+                self.overflow_count += 1
+            monitoring_utils.set_custom_metric('segment_event_queue_overflow_count', self.overflow_count)
+            logger.warning('Segment event [%s] was dropped because the event queue is full.', event)
+            return False
+        return True
+
+    def flush(self):
+        """ Sends the queued events from the calling thread, e.g. before the process exits. """
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self.send(batch)
+
+    def send(self, batch):
+        """ Hands a batch of queued events to their Segment clients. """
+        sent = dropped = 0
+        for segment_client, user_tracking_id, event, properties, context, timestamp in batch:
+            try:
+                success, __ = segment_client.track(
+                    user_tracking_id, event, properties, context=context, timestamp=timestamp
+                )
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Failed to send Segment event [%s].', event)
+                success = False
+            if success:
+                sent += 1
+            else:
+                dropped += 1
+
+        with self._lock:
+            self.sent_count += sent
+            self.dropped_count += dropped
+        if dropped:
+            logger.warning('[%d] of [%d] Segment events were dropped by the Segment client.', dropped, len(batch))
+
+    def _get_batch(self):
+        """
+        Waits for an event, then collects the events queued within the flush interval, up to the batch size.
+
+        Returns:
+            list: The queued events.
+        """
+        batch = [self._queue.get()]
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            self.send(self._get_batch())
+
+    def _start_worker(self):
+        # The worker is restarted in processes forked after it was started, where the thread no longer runs.
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run)
+                self._worker.daemon = True
+                self._worker.start()
+
+
+def get_event_queue():
+    """
+    Returns the process-wide Segment event queue. The queued events are flushed when the process exits.
+
+    Returns:
+        SegmentEventQueue
+    """
+    global _event_queue  # pylint: disable=global-statement
+    if _event_queue is None:
+        with _event_queue_lock:
+            if _event_queue is None:
+                event_queue = SegmentEventQueue(
+                    settings.SEGMENT_EVENT_QUEUE_SIZE,
+                    settings.SEGMENT_EVENT_BATCH_SIZE,
+                    settings.SEGMENT_EVENT_FLUSH_INTERVAL
+                )
+                atexit.register(event_queue.flush)
+                _event_queue = event_queue
+    return _event_queue
@@ -0,0 +1,80 @@
+from __future__ import absolute_import
+
+import threading
+
+import mock
+from django.test import TestCase
+
+from ecommerce.extensions.analytics.events import SegmentEventQueue
+
+
+class SegmentEventQueueTests(TestCase):
+    """ Tests for the Segment event queue. """
+
+    def setUp(self):
+        super(SegmentEventQueueTests, self).setUp()
+        self.segment_client = mock.Mock()
+        self.segment_client.track.return_value = True, {}
+
+    def create_queue(self, maxsize=10, batch_size=2, flush_interval=5):
+        event_queue = SegmentEventQueue(maxsize, batch_size, flush_interval)
+        # Events stay queued until they are sent by the test.
+        patcher = mock.patch.object(event_queue, '_start_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return event_queue
+
+    def put_event(self, event_queue, event='foo'):
+        return event_queue.put(self.segment_client, 'user-id', event, {'bar': 'baz'}, {'ip': None})
+
+    def test_batches(self):
+        """ Verify the queued events are collected in batches of at most the batch size, and sent in order. """
+        event_queue = self.create_queue()
+        for event in ('first', 'second', 'third'):
+            self.assertTrue(self.put_event(event_queue, event))
+
+        event_queue.send(event_queue._get_batch())  # pylint: disable=protected-access
+        self.assertEqual([call[0][1] for call in self.segment_client.track.call_args_list], ['first', 'second'])
+
+        event_queue.flush()
+        self.assertEqual(self.segment_client.track.call_count, 3)
+        self.assertEqual(self.segment_client.track.call_args[0][1], 'third')
+        self.assertEqual(event_queue.sent_count, 3)
+
+    def test_overflow(self):
+        """ Verify events tracked while the queue is full are dropped and counted, without blocking. """
+        event_queue = self.create_queue(maxsize=1)
+
+        self.assertTrue(self.put_event(event_queue))
+        self.assertFalse(self.put_event(event_queue))
+        self.assertEqual(event_queue.overflow_count, 1)
+
+        event_queue.flush()
+        self.assertEqual(self.segment_client.track.call_count, 1)
+
+    def test_dropped(self):
+        """ Verify events the Segment client fails to accept are counted, without stopping the batch. """
+        self.segment_client.track.side_effect = [Exception, (False, {}), (True, {})]
+        event_queue = self.create_queue()
+        for __ in range(3):
+            self.put_event(event_queue)
+
+        event_queue.flush()
+
+        self.assertEqual(self.segment_client.track.call_count, 3)
+        self.assertEqual(event_queue.dropped_count, 2)
+        self.assertEqual(event_queue.sent_count, 1)
+
+    def test_worker(self):
+        """ Verify the background worker sends the queued events, with the time at which they were queued. """
+        sent = threading.Event()
+        self.segment_client.track.side_effect = lambda *args, **kwargs: sent.set() or (True, {})
+        event_queue = SegmentEventQueue(10, 10, 0)
+
+        self.put_event(event_queue)
+
+        self.assertTrue(sent.wait(5))
+        self.segment_client.track.assert_called_once_with(
+            'user-id', 'foo', {'bar': 'baz'}, context={'ip': None}, timestamp=mock.ANY
+        )
+        self.assertIsNotNone(self.segment_client.track.call_args[1]['timestamp'].tzinfo)
@@ -6,6 +6,7 @@ import ddt
 import mock
 from analytics import Client
 from django.contrib.auth.models import AnonymousUser
+from django.test import override_settings
 from django.test.client import RequestFactory
 
 from ecommerce.core.models import User  # pylint: disable=unused-import
@@ -13,6 +14,7 @@ from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.analytics.utils import (
     ECOM_TRACKING_ID_FMT,
     get_google_analytics_client_id,
+    get_segment_context,
     parse_tracking_context,
     prepare_analytics_data,
     track_segment_event,
@@ -120,6 +122,39 @@ class UtilsTest(DiscoveryTestMixin, BasketMixin, TransactionTestCase):
             track_segment_event(self.site, user, event, properties)
             mock_track.assert_called_once_with(user_tracking_id, event, properties, context=context)
 
+    @override_settings(SEGMENT_EVENT_QUEUE_ENABLED=True)
+    def test_track_segment_event_queued(self):
+        """ The function should queue the event for the site's Segment client if the event queue is enabled. """
+        self.site_configuration.segment_key = 'fake-key'
+        self.site_configuration.save()
+        user, event, properties = self._get_generic_segment_event_parameters()
+        user_tracking_id, context = get_segment_context(self.site, user)
+
+        with mock.patch('ecommerce.extensions.analytics.utils.get_event_queue') as mock_get_event_queue:
+            with mock.patch.object(Client, 'track') as mock_track:
+                track_segment_event(self.site, user, event, properties)
+                self.assertFalse(mock_track.called)
+
+        mock_get_event_queue.return_value.put.assert_called_once_with(
+            self.site_configuration.segment_client, user_tracking_id, event, properties, context
+        )
+
+    def test_get_segment_context_cached_per_request(self):
+        """ The Segment context of a user should be computed once per request, and on every call otherwise. """
+        user = self.create_user()
+
+        with mock.patch('ecommerce.extensions.analytics.utils.parse_tracking_context') as mock_parse:
+            mock_parse.return_value = 'fake-id', None, None
+            with mock.patch('crum.get_current_request', return_value=None):
+                get_segment_context(self.site, user)
+                get_segment_context(self.site, user)
+            self.assertEqual(mock_parse.call_count, 2)
+
+            with mock.patch('crum.get_current_request', return_value=RequestFactory().get('/')):
+                get_segment_context(self.site, user)
+                self.assertEqual(get_segment_context(self.site, user)[0], 'fake-id')
+            self.assertEqual(mock_parse.call_count, 3)
+
     def test_translate_basket_line_for_segment(self):
         """ The method should return a dict formatted for Segment. """
         basket = create_basket(empty=True)
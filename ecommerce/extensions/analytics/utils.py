@@ -4,14 +4,19 @@ import json
 import logging
 from functools import wraps
 
+import crum
+from django.conf import settings
 from django.db import transaction
+from edx_django_utils.cache.utils import DEFAULT_REQUEST_CACHE
 from six.moves.urllib.parse import urlunsplit  # pylint: disable=import-error
 
 from ecommerce.courses.utils import mode_for_product
+from ecommerce.extensions.analytics.events import get_event_queue
 
 logger = logging.getLogger(__name__)
 
 ECOM_TRACKING_ID_FMT = 'ecommerce-{}'
+SEGMENT_CONTEXT_CACHE_KEY = 'segment_context_{site_id}_{user_id}'
 
 
 def parse_tracking_context(user, usage=None):
@@ -151,7 +156,40 @@ def track_segment_event(site, user, event, properties):
         logger.debug(msg)
         return False, msg
 
-    user_tracking_id, ga_client_id, lms_ip = parse_tracking_context(user, usage=event)
+    user_tracking_id, context = get_segment_context(site, user, usage=event)
+    segment_client = site_configuration.segment_client
+    if settings.SEGMENT_EVENT_QUEUE_ENABLED:
+        event_queue = get_event_queue()
+        # The Segment client adds its library to the context of each event, so every event gets its own copy.
+        return transaction.on_commit(
+            lambda: event_queue.put(segment_client, user_tracking_id, event, properties, dict(context)))
+
+    return transaction.on_commit(
+        lambda: segment_client.track(user_tracking_id, event, properties, context=dict(context)))
+
+
+def get_segment_context(site, user, usage=None):
+    """ Returns the tracking ID and the Segment context of a user's events on a site.
+
+    They are computed once per request, so the events tracked by a request share them.
+
+    Args:
+        site (Site): Site on which the events are tracked.
+        user (User): User to which the events are associated.
+        usage (str): Optional. A description of how the tracking ID will be used.
+
+    Returns:
+        (user_tracking_id, context): Tuple of the user's tracking ID and the Segment context.
+    """
+    cache_key = SEGMENT_CONTEXT_CACHE_KEY.format(site_id=site.id, user_id=user.id)
+    # Outside of requests the request cache is not cleared, so the context of other events may be outdated.
+    in_request = crum.get_current_request() is not None and user.id is not None
+    if in_request:
+        cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(cache_key)
+        if cached_response.is_found:
+            return cached_response.value
+
+    user_tracking_id, ga_client_id, lms_ip = parse_tracking_context(user, usage=usage)
     # construct a URL, so that hostname can be sent to GA.
     # For now, send a dummy value for path.  Segment parses the URL and sends
     # the host and path separately. When needed, the path can be fetched by adding:
@@ -172,9 +210,9 @@ def track_segment_event(site, user, event, properties):
             'url': page,
         }
     }
-    return transaction.on_commit(
-        lambda: site.siteconfiguration.segment_client.track(user_tracking_id, event, properties,
-                                                            context=context))
+    if in_request:
+        DEFAULT_REQUEST_CACHE.set(cache_key, (user_tracking_id, context))
+    return user_tracking_id, context
 
 
 def translate_basket_line_for_segment(line):
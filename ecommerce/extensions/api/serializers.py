@@ -13,7 +13,7 @@ from dateutil.parser import parse
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import Count, Q, Sum
+from django.db.models import Q
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from oscar.core.loading import get_class, get_model
@@ -29,7 +29,6 @@ from ecommerce.core.constants import (
     SEAT_PRODUCT_CLASS_NAME
 )
 from ecommerce.core.url_utils import get_ecommerce_url
-from ecommerce.coupons.utils import is_coupon_available
 from ecommerce.courses.models import Course
 from ecommerce.entitlements.utils import create_or_update_course_entitlement
 from ecommerce.extensions.offer.constants import (
@@ -46,6 +45,7 @@ from ecommerce.extensions.offer.utils import (
     send_assigned_offer_reminder_email,
     send_revoked_offer_email
 )
+from ecommerce.extensions.voucher.utils import get_coupon_usage_summary
 from ecommerce.invoice.models import Invoice
 
 logger = logging.getLogger(__name__)
@@ -56,6 +56,7 @@ Benefit = get_model('offer', 'Benefit')
 BillingAddress = get_model('order', 'BillingAddress')
 Catalog = get_model('catalogue', 'Catalog')
 Category = get_model('catalogue', 'Category')
+CouponUsageSummary = get_model('voucher', 'CouponUsageSummary')
 Line = get_model('order', 'Line')
 OfferAssignment = get_model('offer', 'OfferAssignment')
 OfferAssignmentEmailTemplates = get_model('offer', 'OfferAssignmentEmailTemplates')
@@ -66,6 +67,7 @@ ProductAttributeValue = get_model('catalogue', 'ProductAttributeValue')
 ProductCategory = get_model('catalogue', 'ProductCategory')
 Refund = get_model('refund', 'Refund')
 Selector = get_class('partner.strategy', 'Selector')
+select_stockrecord_by_currency = get_class('partner.strategy', 'select_stockrecord_by_currency')
 StockRecord = get_model('partner', 'StockRecord')
 Voucher = get_model('voucher', 'Voucher')
 VoucherApplication = get_model('voucher', 'VoucherApplication')
@@ -505,7 +507,8 @@ class SeatProductHelper:
             raise serializers.ValidationError(_(u"Products must have a price."))
 
     @staticmethod
-    def save(course, product, create_enrollment_code): #TODO
+    def get_seat(product):
+        """ Returns the arguments of Course.create_or_update_seat for the product data. """
         attrs = _flatten(product['attribute_values'])
 
         # Extract arguments required for Seat creation, deserializing as necessary.
@@ -523,20 +526,27 @@ class SeatProductHelper:
         credit_hours = attrs.get('credit_hours')
         credit_hours = int(credit_hours) if credit_hours else None
 
-        seat = course.create_or_update_seat(
-            certificate_type,
-            id_verification_required,
-            price,
-            expires=expires,
-            credit_provider=credit_provider,
-            credit_hours=credit_hours,
-            create_enrollment_code=create_enrollment_code,
-            second_stock_price=inr_price
+        return {
+            'certificate_type': certificate_type,
+            'id_verification_required': id_verification_required,
+            'price': price,
+            'expires': expires,
+            'credit_provider': credit_provider,
+            'credit_hours': credit_hours,
+            'second_stock_price': inr_price,
+        }
+
+    @staticmethod
+    def save_all(course, products, create_enrollment_code):
+        """ Creates or updates the seats of all the products of the course at once. """
+        seats = course.create_or_update_seats(
+            [SeatProductHelper.get_seat(product) for product in products],
+            create_enrollment_code=create_enrollment_code
         )
 
         # As a convenience to our caller, provide the SKU in the returned product serialization.
-        # We only create one stockrecord per product, so this first() business is safe.
-        product['partner_sku'] = seat.stockrecords.first().partner_sku
+        for product, seat in zip(products, seats):
+            product['partner_sku'] = select_stockrecord_by_currency(seat, settings.OSCAR_DEFAULT_CURRENCY).partner_sku
 
 
 class AtomicPublicationSerializer(serializers.Serializer):  # pylint: disable=abstract-method
@@ -617,13 +627,17 @@ class AtomicPublicationSerializer(serializers.Serializer):  # pylint: disable=ab
                 course.verification_deadline = course_verification_deadline
                 course.save()
 
+                seat_products = []
                 for product in products:
                     product_class = product.get('product_class')
 
                     if product_class == COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME:
                         EntitlementProductHelper.save(partner, course, course_uuid, product)
                     elif product_class == SEAT_PRODUCT_CLASS_NAME:
-                        SeatProductHelper.save(course, product, create_or_activate_enrollment_code)
+                        seat_products.append(product)
+
+                # The seats are created or updated together, with a few queries for all of them.
+                SeatProductHelper.save_all(course, seat_products, create_or_activate_enrollment_code)
 
                 if course.get_enrollment_code():
                     course.toggle_enrollment_code_status(is_active=create_or_activate_enrollment_code)
@@ -734,25 +748,35 @@ class CodeUsageSerializer(serializers.Serializer):  # pylint: disable=abstract-m
         return obj.get('user_email')
 
     def get_redemptions(self, obj):
-        voucher = Voucher.objects.get(code=self.get_code(obj))
-        offer = voucher.best_offer
-        redemption_count = voucher.num_orders
+        if obj.get('has_enterprise_offer'):
+            # The voucher and its enterprise offer values are annotated onto the rows by the coupon codes view.
+            usage = obj['usage']
+            max_global_applications = obj['max_global_applications']
+            redemption_count = obj['num_orders']
+        else:
+            voucher = Voucher.objects.get(code=self.get_code(obj))
+            usage = voucher.usage
+            max_global_applications = voucher.best_offer.max_global_applications
+            redemption_count = voucher.num_orders
 
-        if voucher.usage == Voucher.SINGLE_USE:
+        if usage == Voucher.SINGLE_USE:
             max_coupon_usage = 1
-        elif offer.max_global_applications is None:
+        elif max_global_applications is None:
             max_coupon_usage = OFFER_MAX_USES_DEFAULT
         else:
-            max_coupon_usage = offer.max_global_applications
+            max_coupon_usage = max_global_applications
 
         return {
             'used': redemption_count,
             'total': max_coupon_usage,
         }
 
-    def num_assignments(self, code, user_email=None):
+    def num_assignments(self, obj, user_email=None):
+        if 'num_assignments' in obj:
+            return obj['num_assignments']
+
         offer_assignments = OfferAssignment.objects.filter(
-            code=code,
+            code=self.get_code(obj),
             status__in=[OFFER_ASSIGNED, OFFER_ASSIGNMENT_EMAIL_PENDING, OFFER_ASSIGNMENT_EMAIL_BOUNCED],
         )
         if user_email:
@@ -760,6 +784,15 @@ class CodeUsageSerializer(serializers.Serializer):  # pylint: disable=abstract-m
 
         return offer_assignments.count()
 
+    def num_applications(self, obj):
+        if 'num_applications' in obj:
+            return obj['num_applications']
+
+        return VoucherApplication.objects.filter(
+            voucher__code=self.get_code(obj),
+            user__email=self.get_assigned_to(obj)
+        ).count()
+
 
 class NotAssignedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disable=abstract-method
 
@@ -768,7 +801,7 @@ class NotAssignedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disable=ab
 
     def get_redemptions(self, obj):
         redemptions = super(NotAssignedCodeUsageSerializer, self).get_redemptions(obj)
-        return dict(redemptions, num_assignments=self.num_assignments(code=self.get_code(obj)))
+        return dict(redemptions, num_assignments=self.num_assignments(obj))
 
 
 class NotRedeemedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disable=abstract-method
@@ -778,7 +811,7 @@ class NotRedeemedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disable=ab
         if usage_type in (Voucher.SINGLE_USE, Voucher.MULTI_USE_PER_CUSTOMER):
             return super(NotRedeemedCodeUsageSerializer, self).get_redemptions(obj)
 
-        num_assignments = self.num_assignments(code=self.get_code(obj), user_email=self.get_assigned_to(obj))
+        num_assignments = self.num_assignments(obj, user_email=self.get_assigned_to(obj))
         return {'used': 0, 'total': num_assignments}
 
 
@@ -792,11 +825,8 @@ class PartialRedeemedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disabl
         if usage_type == Voucher.MULTI_USE_PER_CUSTOMER:
             return super(PartialRedeemedCodeUsageSerializer, self).get_redemptions(obj)
 
-        num_assignments = self.num_assignments(code=self.get_code(obj), user_email=self.get_assigned_to(obj))
-        num_applications = VoucherApplication.objects.filter(
-            voucher__code=self.get_code(obj),
-            user__email=self.get_assigned_to(obj)
-        ).count()
+        num_assignments = self.num_assignments(obj, user_email=self.get_assigned_to(obj))
+        num_applications = self.num_applications(obj)
         return {'used': num_applications, 'total': num_assignments + num_applications}
 
 
@@ -809,10 +839,7 @@ class RedeemedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disable=abstr
         return obj.get('user__email')
 
     def get_redemptions(self, obj):
-        num_applications = VoucherApplication.objects.filter(
-            voucher__code=self.get_code(obj),
-            user__email=self.get_assigned_to(obj)
-        ).count()
+        num_applications = self.num_applications(obj)
         return {'used': num_applications, 'total': num_applications}
 
 
@@ -905,30 +932,6 @@ class EnterpriseCouponOverviewListSerializer(serializers.ModelSerializer):
     """
     Serializer for Enterprise Coupons list overview.
     """
-    def _get_num_unassigned(self, vouchers):
-        """
-        Return number of available assignments.
-        """
-        all_slots_available = 0
-        enterprise_offer = vouchers.first().enterprise_offer
-
-        assignments = OfferAssignment.objects.filter(code__in=vouchers.values_list('code', flat=True)).exclude(
-            status__in=[OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]
-        ).values('code').annotate(num_assignments=Count('code')).order_by('code')
-
-        vouchers_num_assignments = {item['code']: item['num_assignments'] for item in assignments}
-
-        for voucher in vouchers:
-            num_assignments = vouchers_num_assignments.get(voucher.code, 0)
-            voucher_slots_available = voucher.calculate_available_slots(
-                enterprise_offer.max_global_applications,
-                num_assignments
-            )
-            if voucher_slots_available > 0:
-                all_slots_available += voucher_slots_available
-
-        return all_slots_available
-
     def _get_errors(self, coupon):
         """
         Returns a list of OfferAssignment errors associated with coupon.
@@ -940,39 +943,21 @@ class EnterpriseCouponOverviewListSerializer(serializers.ModelSerializer):
         )
         return OfferAssignmentSerializer(offer_assignments_with_error, many=True).data
 
-    # Max number of codes available (Maximum Coupon Usage).
-    def _get_max_uses(self, voucher, voucher_usage, voucher_count):
-        offer = voucher.best_offer
-
-        max_uses_per_code = None
-        if voucher_usage == Voucher.SINGLE_USE:
-            max_uses_per_code = 1
-        elif offer.max_global_applications:
-            max_uses_per_code = offer.max_global_applications
-        else:
-            max_uses_per_code = OFFER_MAX_USES_DEFAULT
-
-        return max_uses_per_code * voucher_count
-
     def to_representation(self, coupon):  # pylint: disable=arguments-differ
         representation = super(EnterpriseCouponOverviewListSerializer, self).to_representation(coupon)
 
-        vouchers = coupon.attr.coupon_vouchers.vouchers.all()
-        voucher = vouchers.first()
-        usage = voucher.usage
-        count = vouchers.count()
-        num_orders = vouchers.aggregate(Sum('num_orders'))
-
+        summary = get_coupon_usage_summary(coupon)
         data = {
-            'start_date': voucher.start_datetime,
-            'end_date': voucher.end_datetime,
-            'num_uses': num_orders['num_orders__sum'],
-            'usage_limitation': usage,
-            'num_codes': count,
-            'max_uses': self._get_max_uses(voucher, usage, count),
-            'num_unassigned': self._get_num_unassigned(vouchers),
-            'errors': self._get_errors(coupon),
-            'available': is_coupon_available(coupon),
+            'start_date': summary.start_date,
+            'end_date': summary.end_date,
+            'num_uses': summary.num_uses,
+            'usage_limitation': summary.usage_limitation,
+            'num_codes': summary.num_codes,
+            'max_uses': summary.max_uses,
+            'num_unassigned': summary.num_unassigned,
+            # Only coupons with bounced assignment emails need their assignments looked up.
+            'errors': self._get_errors(coupon) if summary.num_errors else [],
+            'available': summary.is_available,
         }
 
         return dict(representation, **data)
@@ -1245,6 +1230,13 @@ class CheckoutSerializer(serializers.Serializer):  # pylint: disable=abstract-me
         return obj['payment_form_data']
 
 
+class SDNPrescreenSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """ Billing details of a user, checked against the SDN list ahead of their payment. """
+    name = serializers.CharField()
+    city = serializers.CharField()
+    country = serializers.CharField()
+
+
 class InvoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Invoice
@@ -1290,21 +1282,22 @@ class CouponCodeAssignmentSerializer(serializers.Serializer):  # pylint: disable
         offer_assignments = []
         emails_already_sent = set()
 
-        for code in available_assignments:
-            offer = available_assignments[code]['offer']
-            email = next(email_iterator) if voucher_usage_type == Voucher.MULTI_USE_PER_CUSTOMER else None
-            for _ in range(available_assignments[code]['num_slots']):
-                new_offer_assignment = OfferAssignment.objects.create(
-                    offer=offer,
-                    code=code,
-                    user_email=email or next(email_iterator),
-                )
-                offer_assignments.append(new_offer_assignment)
-                # Start async email task. For MULTI_USE_PER_CUSTOMER, a single email is sent
-                email_code_pair = frozenset((new_offer_assignment.user_email, new_offer_assignment.code))
-                if email_code_pair not in emails_already_sent:
-                    self._trigger_email_sending_task(greeting, closing, new_offer_assignment, voucher_usage_type)
-                    emails_already_sent.add(email_code_pair)
+        with CouponUsageSummary.objects.track_usage(available_assignments):
+            for code in available_assignments:
+                offer = available_assignments[code]['offer']
+                email = next(email_iterator) if voucher_usage_type == Voucher.MULTI_USE_PER_CUSTOMER else None
+                for _ in range(available_assignments[code]['num_slots']):
+                    new_offer_assignment = OfferAssignment.objects.create(
+                        offer=offer,
+                        code=code,
+                        user_email=email or next(email_iterator),
+                    )
+                    offer_assignments.append(new_offer_assignment)
+                    # Start async email task. For MULTI_USE_PER_CUSTOMER, a single email is sent
+                    email_code_pair = frozenset((new_offer_assignment.user_email, new_offer_assignment.code))
+                    if email_code_pair not in emails_already_sent:
+                        self._trigger_email_sending_task(greeting, closing, new_offer_assignment, voucher_usage_type)
+                        emails_already_sent.add(email_code_pair)
 
         validated_data['offer_assignments'] = offer_assignments
         return validated_data
@@ -1528,9 +1521,10 @@ class CouponCodeRevokeSerializer(CouponCodeMixin, serializers.Serializer):  # py
         detail = 'success'
 
         try:
-            for offer_assignment in offer_assignments:
-                offer_assignment.status = OFFER_ASSIGNMENT_REVOKED
-                offer_assignment.save()
+            with CouponUsageSummary.objects.track_usage([code]):
+                for offer_assignment in offer_assignments:
+                    offer_assignment.status = OFFER_ASSIGNMENT_REVOKED
+                    offer_assignment.save()
 
             send_revoked_offer_email(
                 greeting=greeting,
@@ -15,3 +15,8 @@ class ServiceUserThrottle(UserRateThrottle):
         if request.user.username in service_users:
             return True
         return super(ServiceUserThrottle, self).allow_request(request, view)
+
+
+class SDNPrescreenThrottle(UserRateThrottle):
+    """Limits the rate at which a user can start SDN checks in the background."""
+    scope = 'sdn_prescreen'
@@ -11,7 +11,9 @@ import httpretty
 import mock
 import six  # pylint: disable=ungrouped-imports
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from edx_rest_framework_extensions.auth.jwt.cookies import jwt_cookie_name
 from oscar.core.loading import get_model
@@ -22,12 +24,18 @@ from six.moves import range
 from waffle.testutils import override_switch
 
 from ecommerce.core.constants import ALLOW_MISSING_LMS_USER_ID
+from ecommerce.core.tests import toggle_switch
 from ecommerce.courses.models import Course
 from ecommerce.extensions.api import exceptions as api_exceptions
 from ecommerce.extensions.api.tests.test_authentication import AccessTokenMixin
 from ecommerce.extensions.api.v2.tests.views import JSON_CONTENT_TYPE, OrderDetailViewTestMixin
-from ecommerce.extensions.api.v2.views.baskets import BasketCalculateView, BasketCreateView
-from ecommerce.extensions.basket.constants import EMAIL_OPT_IN_ATTRIBUTE
+from ecommerce.extensions.api.v2.views.baskets import BasketCalculateBatchView, BasketCalculateView, BasketCreateView
+from ecommerce.extensions.basket.constants import (
+    DISABLE_IN_MEMORY_BASKET_CALCULATION_SWITCH_NAME,
+    EMAIL_OPT_IN_ATTRIBUTE
+)
+from ecommerce.extensions.offer.applicator import Applicator
+from ecommerce.extensions.partner.strategy import Selector
 from ecommerce.extensions.payment import exceptions as payment_exceptions
 from ecommerce.extensions.payment.models import PaymentProcessorResponse
 from ecommerce.extensions.payment.processors.cybersource import Cybersource
@@ -704,6 +712,28 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data, expected)
 
+    @httpretty.activate
+    def test_basket_calculate_strategy_selection(self):
+        """
+        Verify the strategy of a basket is selected once per request, from the user's stored country, without
+        calls to the LMS, however many products the basket has.
+        """
+        self.user.country = 'IN'
+        self.user.save()
+
+        # The strategies are still selected, and the number of selections counted.
+        select_strategy = Selector._select_strategy  # pylint: disable=protected-access
+        with mock.patch.object(User, 'account_details') as mock_account_details:
+            with mock.patch.object(
+                    Selector, '_select_strategy', autospec=True, side_effect=select_strategy
+            ) as mock_select_strategy:
+                response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_select_strategy.call_count, 1)
+        self.assertFalse(mock_account_details.called)
+        self.assertEqual(httpretty.httpretty.latest_requests, [])
+
     @httpretty.activate
     def test_basket_calculate_does_not_call_tracking_events(self):
         """
@@ -716,7 +746,7 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
             self.assertEqual(response.status_code, 200)
             mock_track.assert_not_called()
 
-    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket_atomic')
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
     def test_basket_calculate_anonymous_caching(self, mock_calculate_basket):
         """Verify a request made with the is_anonymous parameter is cached"""
         url_with_one_sku = self._generate_sku_url(self.products[0:1], username=None)
@@ -776,25 +806,25 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         self.assertFalse(mock_calculate_basket.called, msg='The cache should be hit.')
         self.assertEqual(response.data, expected)
 
-    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket_atomic')
-    def test_basket_calculate_no_query_parameters(self, mock_calculate_basket_atomic):
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
+    def test_basket_calculate_no_query_parameters(self, mock_calculate_basket):
         """Verify a request made without query parameters uses the request user"""
         expected = {'Test Succeeded': True}
-        mock_calculate_basket_atomic.return_value = expected
+        mock_calculate_basket.return_value = expected
 
         url_with_one_sku_no_anon = self._generate_sku_url(self.products[0:1], add_query_params=False)
 
         # Call BasketCalculate to test that we do not hit the cache
         response = self.client.get(url_with_one_sku_no_anon)
         self.assertEqual(response.status_code, 200)
-        self.assertTrue(mock_calculate_basket_atomic.called, msg='The cache should be missed.')
+        self.assertTrue(mock_calculate_basket.called, msg='The cache should be missed.')
         self.assertEqual(response.data, expected)
-        mock_calculate_basket_atomic.reset_mock()
+        mock_calculate_basket.reset_mock()
 
         # Call BasketCalculate again to test that we do not hit the cache
         response = self.client.get(url_with_one_sku_no_anon)
         self.assertEqual(response.status_code, 200)
-        self.assertTrue(mock_calculate_basket_atomic.called, msg='The cache should be missed.')
+        self.assertTrue(mock_calculate_basket.called, msg='The cache should be missed.')
         self.assertEqual(response.data, expected)
 
     @httpretty.activate
@@ -813,7 +843,7 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         self.assertTrue(mock_logger.called)
 
     @httpretty.activate
-    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket_atomic')
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
     def test_conflicting_user_anonymous_params(self, mock_calculate_basket):
         """
         Verify that when the request contains both a username and an is_anonymous parameter, a Bad Request response
@@ -829,22 +859,22 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         self.assertFalse(mock_calculate_basket.called)
 
     @httpretty.activate
-    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket_atomic')
-    def test_basket_calculate_with_anonymous_caching_disabled(self, mock_calculate_basket_atomic):
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
+    def test_basket_calculate_with_anonymous_caching_disabled(self, mock_calculate_basket):
         """Verify a request made by a staff user is not cached"""
         expected = {'Test Succeeded': True}
-        mock_calculate_basket_atomic.return_value = {'Test Succeeded': True}
+        mock_calculate_basket.return_value = {'Test Succeeded': True}
 
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 200)
-        self.assertTrue(mock_calculate_basket_atomic.called)
+        self.assertTrue(mock_calculate_basket.called)
         self.assertEqual(response.data, expected)
 
-        mock_calculate_basket_atomic.reset_mock()
+        mock_calculate_basket.reset_mock()
 
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 200)
-        self.assertTrue(mock_calculate_basket_atomic.called, msg='The cache should be missed.')
+        self.assertTrue(mock_calculate_basket.called, msg='The cache should be missed.')
         self.assertEqual(response.data, expected)
 
     @httpretty.activate
@@ -904,6 +934,7 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         self.assertEqual(response.status_code, 403)
 
     @mock.patch('ecommerce.extensions.basket.models.Basket.add_product', mock.Mock(side_effect=Exception))
+    @mock.patch('ecommerce.extensions.basket.models.InMemoryBasket.add_product', mock.Mock(side_effect=Exception))
     @mock.patch('ecommerce.extensions.api.v2.views.baskets.logger.exception')
     def test_exception_log(self, mock_logger):
         """A log entry is filed when an exception happens."""
@@ -913,6 +944,22 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
             self.client.get(self.url + '&code={code}'.format(code=voucher.code))
             self.assertTrue(mock_logger.called)
 
+    def get_basket_writes(self, url):
+        """ Requests the given basket calculation, and returns the queries writing baskets to the database. """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries if query['sql'].startswith('INSERT INTO "basket_')]
+
+    def test_basket_calculate_without_writes(self):
+        """
+        Verify basket totals are calculated without writing a basket to the database. No basket, line or voucher
+        rows are inserted, so the calculation avoids the INSERT and rollback round trips of a temporary basket.
+        """
+        voucher, _ = prepare_voucher(_range=self.range, benefit_type=Benefit.FIXED, benefit_value=5)
+        self.assertEqual(self.get_basket_writes(self.url + '&code={code}'.format(code=voucher.code)), [])
+        self.assertFalse(Basket.objects.exists())
+
     def _create_program_with_courses_and_offer(self):
         offer = ProgramOfferFactory(
             site=self.site,
@@ -1007,3 +1054,158 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         self.client.logout()
         self.client.login(username=user.username, password=self.password)
         return user
+
+
+class BasketCalculateViewAtomicTests(BasketCalculateViewTests):
+    """
+    Runs the basket calculation tests with temporary baskets saved in a transaction which is rolled back.
+
+    Baskets calculated in memory must have the same totals.
+    """
+
+    def setUp(self):
+        super(BasketCalculateViewAtomicTests, self).setUp()
+        toggle_switch(DISABLE_IN_MEMORY_BASKET_CALCULATION_SWITCH_NAME, True)
+
+    def test_basket_calculate_without_writes(self):
+        """ Verify the temporary basket is written to the database, and rolled back. """
+        voucher, _ = prepare_voucher(_range=self.range, benefit_type=Benefit.FIXED, benefit_value=5)
+        self.assertNotEqual(self.get_basket_writes(self.url + '&code={code}'.format(code=voucher.code)), [])
+        self.assertFalse(Basket.objects.exists())
+
+
+@ddt.ddt
+class BasketCalculateBatchViewTests(ThrottlingMixin, TestCase):
+    def setUp(self):
+        super(BasketCalculateBatchViewTests, self).setUp()
+        self.products = ProductFactory.create_batch(3, stockrecords__partner=self.partner, categories=[])
+        self.path = reverse('api:v2:baskets:calculate_batch')
+        self.range = factories.RangeFactory(includes_all_products=True)
+        self.user = self.create_user(is_staff=True)
+        self.client.login(username=self.user.username, password=self.password)
+        self.product_groups = [self.products, self.products[:1], self.products[1:]]
+
+    def _generate_url(self, product_groups, username=None):
+        sku_groups = [
+            ','.join(product.stockrecords.first().partner_sku for product in products) for products in product_groups
+        ]
+        params = {'sku_group': sku_groups}
+        if username:
+            params['username'] = username
+        else:
+            params['is_anonymous'] = 'true'
+        return '{root}?{qs}'.format(root=self.path, qs=six.moves.urllib.parse.urlencode(params, True))
+
+    def _get_calculated_totals(self, products, code=None):
+        """ Returns the totals BasketCalculateView calculates for the products. """
+        params = {
+            'sku': [product.stockrecords.first().partner_sku for product in products],
+            'username': self.user.username,
+        }
+        if code:
+            params['code'] = code
+        url = '{root}?{qs}'.format(
+            root=reverse('api:v2:baskets:calculate'), qs=six.moves.urllib.parse.urlencode(params, True)
+        )
+        return self.client.get(url).data
+
+    def _get_skus(self, products):
+        return sorted(product.stockrecords.first().partner_sku for product in products)
+
+    def assert_results(self, response, code=None):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'results': [
+                dict(skus=self._get_skus(products), **self._get_calculated_totals(products, code=code))
+                for products in self.product_groups
+            ]
+        })
+
+    @ddt.data('', '?sku_group=', '?sku_group=,', '?sku_group=foo')
+    def test_invalid_sku_groups(self, query):
+        """ Verify bad response when sku groups are missing, empty or invalid. """
+        response = self.client.get(self.path + query)
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(BASKET_CALCULATE_BATCH_MAX_GROUPS=2)
+    def test_too_many_sku_groups(self):
+        """ Verify bad response when more sku groups than allowed are sent. """
+        response = self.client.get(self._generate_url(self.product_groups))
+        self.assertEqual(response.status_code, 400)
+
+    def test_no_authentication(self):
+        """ Verify that un-authenticated users are rejected """
+        self.client.logout()
+        response = self.client.get(self._generate_url(self.product_groups))
+        self.assertEqual(response.status_code, 401)
+
+    def test_unauthorized_username(self):
+        """ Verify non-staff users cannot calculate the baskets of other users. """
+        user = self.create_user()
+        self.client.login(username=user.username, password=self.password)
+        response = self.client.get(self._generate_url(self.product_groups, username=self.user.username))
+        self.assertEqual(response.status_code, 403)
+
+    @httpretty.activate
+    def test_site_offer(self):
+        """ Verify each group is priced as BasketCalculateView prices it, with offers loaded once. """
+        benefit = factories.BenefitFactory(type=Benefit.PERCENTAGE, range=self.range, value=10)
+        condition = factories.ConditionFactory(value=3, range=self.range, type=Condition.COVERAGE)
+        factories.ConditionalOfferFactory(benefit=benefit, condition=condition, offer_type=ConditionalOffer.SITE)
+
+        with mock.patch.object(Applicator, 'get_offers', side_effect=Applicator.get_offers, autospec=True) as mock_get:
+            response = self.client.get(self._generate_url(self.product_groups, username=self.user.username))
+        self.assertEqual(mock_get.call_count, 1)
+
+        self.assert_results(response)
+        self.assertEqual(response.data['results'][0]['total_incl_tax'], Decimal('27.00'))
+
+    def test_voucher(self):
+        """ Verify the voucher is applied to every group. """
+        voucher, _ = prepare_voucher(_range=self.range, benefit_type=Benefit.FIXED, benefit_value=5)
+        url = self._generate_url(self.product_groups, username=self.user.username)
+
+        response = self.client.get(url + '&code={code}'.format(code=voucher.code))
+
+        self.assert_results(response, code=voucher.code)
+        self.assertFalse(Basket.objects.exists())
+
+    def test_atomic_calculation(self):
+        """ Verify the groups are priced with temporary baskets saved in a transaction when the switch is on. """
+        toggle_switch(DISABLE_IN_MEMORY_BASKET_CALCULATION_SWITCH_NAME, True)
+        voucher, _ = prepare_voucher(_range=self.range, benefit_type=Benefit.FIXED, benefit_value=5)
+        url = self._generate_url(self.product_groups, username=self.user.username)
+
+        response = self.client.get(url + '&code={code}'.format(code=voucher.code))
+
+        self.assert_results(response, code=voucher.code)
+
+    def test_anonymous_caching(self):
+        """ Verify anonymous totals are read from, and written to, the cache of BasketCalculateView. """
+        cached_totals = {'Test Succeeded': True}
+        anonymous_url = '{root}?{qs}&is_anonymous=true'.format(
+            root=reverse('api:v2:baskets:calculate'),
+            qs=six.moves.urllib.parse.urlencode({'sku': self._get_skus(self.products[:1])}, True)
+        )
+        with mock.patch.object(BasketCalculateView, '_calculate_temporary_basket', return_value=cached_totals):
+            self.client.get(anonymous_url)
+
+        calculated_totals = {'Calculated': True}
+        with mock.patch.object(
+                BasketCalculateBatchView, '_calculate_temporary_baskets', return_value=[calculated_totals]
+        ) as mock_calculate:
+            response = self.client.get(self._generate_url(self.product_groups[1:]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_calculate.call_args[0][2], [self.product_groups[2]])
+        self.assertEqual(response.data['results'], [
+            dict(skus=self._get_skus(self.product_groups[1]), **cached_totals),
+            dict(skus=self._get_skus(self.product_groups[2]), **calculated_totals),
+        ])
+
+        with mock.patch.object(BasketCalculateBatchView, '_calculate_temporary_baskets') as mock_calculate:
+            response = self.client.get(self._generate_url(self.product_groups[1:]))
+        self.assertFalse(mock_calculate.called)
+        self.assertEqual(
+            response.data['results'][1], dict(skus=self._get_skus(self.product_groups[2]), **calculated_totals)
+        )
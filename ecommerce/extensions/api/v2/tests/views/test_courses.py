@@ -6,6 +6,7 @@ import jwt
 import mock
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.test import override_settings
 from django.urls import reverse
 from oscar.core.loading import get_class, get_model
 
@@ -207,3 +208,69 @@ class CourseViewSetTests(ProductSerializerMixin, DiscoveryTestMixin, TestCase):
             mock_publish.return_value = True
             response = self.client.post(path)
             self.assert_publish_response(response, 200, 'Course [{course_id}] was successfully published to LMS.')
+
+    def test_bulk_publish(self):
+        """ Verify the view publishes the courses to LMS together, and reports the result of each course. """
+        second_course = CourseFactory(partner=self.partner)
+        missing_course_id = 'course-v1:Missing+Course+Run'
+        course_ids = [self.course.id, second_course.id, missing_course_id]
+        path = reverse('api:v2:course-bulk-publish-list')
+
+        toggle_switch('publish_course_modes_to_lms', True)
+
+        with mock.patch.object(LMSPublisher, 'publish_courses') as mock_publish:
+            mock_publish.return_value = {self.course.id: None, second_course.id: 'Failed!'}
+            response = self.client.post(path, json.dumps({'course_ids': course_ids}), JSON_CONTENT_TYPE)
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(set(mock_publish.call_args[0][0]), {self.course, second_course})
+        self.assertEqual(response.json(), {'results': [
+            {'course_id': self.course.id, 'published': True, 'error': None},
+            {'course_id': second_course.id, 'published': False, 'error': 'Failed!'},
+            {
+                'course_id': missing_course_id,
+                'published': False,
+                'error': 'Course [{}] does not exist.'.format(missing_course_id),
+            },
+        ]})
+
+        with mock.patch.object(LMSPublisher, 'publish_courses') as mock_publish:
+            mock_publish.return_value = {self.course.id: None}
+            response = self.client.post(path, json.dumps({'course_ids': [self.course.id]}), JSON_CONTENT_TYPE)
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_publish_invalid_request(self):
+        """ Verify the view returns a 400 if no list of course IDs is given. """
+        path = reverse('api:v2:course-bulk-publish-list')
+        for data in ({}, {'course_ids': self.course.id}):
+            response = self.client.post(path, json.dumps(data), JSON_CONTENT_TYPE)
+            self.assertEqual(response.status_code, 400)
+
+    @override_settings(LMS_BULK_PUBLISH_MAX_COURSES=1)
+    def test_bulk_publish_too_many_courses(self):
+        """ Verify the view returns a 400, without publishing, if more courses are given than it publishes at once. """
+        second_course = CourseFactory(partner=self.partner)
+
+        with mock.patch.object(LMSPublisher, 'publish_courses') as mock_publish:
+            response = self.client.post(
+                reverse('api:v2:course-bulk-publish-list'),
+                json.dumps({'course_ids': [self.course.id, second_course.id]}),
+                JSON_CONTENT_TYPE
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(mock_publish.called)
+
+    def test_bulk_publish_switch_inactive(self):
+        """ Verify the view returns a 500, without publishing, if the switch is inactive. """
+        toggle_switch('publish_course_modes_to_lms', False)
+
+        with mock.patch.object(LMSPublisher, 'publish_courses') as mock_publish:
+            response = self.client.post(
+                reverse('api:v2:course-bulk-publish-list'),
+                json.dumps({'course_ids': [self.course.id]}),
+                JSON_CONTENT_TYPE
+            )
+
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(mock_publish.called)
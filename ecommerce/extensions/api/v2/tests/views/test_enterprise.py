@@ -13,7 +13,9 @@ import mock
 import rules
 import six  # pylint: disable=ungrouped-imports
 from django.conf import settings
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.http import urlencode
 from django.utils.timezone import now
@@ -55,6 +57,7 @@ from ecommerce.tests.testcases import TestCase
 
 Basket = get_model('basket', 'Basket')
 Benefit = get_model('offer', 'Benefit')
+CouponUsageSummary = get_model('voucher', 'CouponUsageSummary')
 OfferAssignment = get_model('offer', 'OfferAssignment')
 OfferAssignmentEmailTemplates = get_model('offer', 'OfferAssignmentEmailTemplates')
 Product = get_model('catalogue', 'Product')
@@ -759,6 +762,46 @@ class EnterpriseCouponViewSetRbacTests(
             ).json()
             self.assert_code_detail_response(response['results'], expected_response, codes)
 
+    def get_code_detail_query_count(self, voucher_type, quantity, code_filter):
+        """
+        Creates a coupon with assigned and redeemed codes, and returns the number of queries needed to list its codes.
+        """
+        coupon_post_data = dict(self.data, voucher_type=voucher_type, quantity=quantity, max_uses=quantity)
+        coupon_id = self.get_response('POST', ENTERPRISE_COUPONS_LINK, coupon_post_data).json()['coupon_id']
+        vouchers = Product.objects.get(id=coupon_id).attr.coupon_vouchers.vouchers.all()
+        codes = [voucher.code for voucher in vouchers]
+
+        for index, code in enumerate(codes[:-1]):
+            email = 'user{}-{}@example.com'.format(coupon_id, index)
+            self.assign_user_to_code(coupon_id, [email], [code])
+            if index % 2:
+                self.use_voucher(Voucher.objects.get(code=code), self.create_user(email=email))
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.get_response(
+                'GET',
+                '/api/v2/enterprise/coupons/{}/codes/?code_filter={}'.format(coupon_id, code_filter)
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    @ddt.data(
+        *[
+            (voucher_type, code_filter)
+            for voucher_type in (Voucher.MULTI_USE, Voucher.MULTI_USE_PER_CUSTOMER)
+            for code_filter in (VOUCHER_NOT_ASSIGNED, VOUCHER_NOT_REDEEMED, VOUCHER_PARTIAL_REDEEMED, VOUCHER_REDEEMED)
+        ]
+    )
+    @ddt.unpack
+    def test_coupon_codes_detail_query_count(self, voucher_type, code_filter):
+        """
+        Verify the number of queries made to list the codes of a coupon does not grow with its number of codes.
+        """
+        self.assertEqual(
+            self.get_code_detail_query_count(voucher_type, 3, code_filter),
+            self.get_code_detail_query_count(voucher_type, 7, code_filter)
+        )
+
     def test_coupon_codes_detail_with_invalid_coupon_id(self):
         """
         Verify that `/api/v2/enterprise/coupons/{coupon_id}/codes/` endpoint returns 400 on invalid coupon id
@@ -1403,6 +1446,36 @@ class EnterpriseCouponViewSetRbacTests(
         for actual_result in overview_response['results']:
             self.assertIn(actual_result, expected_results)
 
+    def test_get_enterprise_coupon_overview_query_count(self):
+        """
+        Verify the number of queries made for a page of the coupon overview does not grow with its number of coupons.
+        """
+        enterprise_id = '85b08dde-0877-4474-a4e9-8408fe47ce88'
+        EcommerceFeatureRoleAssignment.objects.all().delete()
+        EcommerceFeatureRoleAssignment.objects.get_or_create(
+            role=self.role,
+            user=self.user,
+            enterprise_id=enterprise_id
+        )
+        overview_url = reverse(
+            'api:v2:enterprise-coupons-(?P<enterprise-id>.+)/overview-list',
+            kwargs={'enterprise_id': enterprise_id}
+        )
+
+        query_counts = []
+        for coupon_titles in (['coupon-1'], ['coupon-2', 'coupon-3', 'coupon-4']):
+            for coupon_title in coupon_titles:
+                data = dict(self.data, title=coupon_title, enterprise_customer={'name': 'LOTRx', 'id': enterprise_id})
+                self.get_response('POST', ENTERPRISE_COUPONS_LINK, data)
+
+            # The first request builds the usage summaries of the new coupons.
+            self.get_response_json('GET', overview_url)
+            with CaptureQueriesContext(connection) as context:
+                self.get_response_json('GET', overview_url)
+            query_counts.append(len(context.captured_queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
     def test_get_enterprise_coupon_overview_data_with_active_filter(self):
         """
         Test if we get correct enterprise coupon overview data with some inactive coupons.
@@ -1669,6 +1742,13 @@ class EnterpriseCouponViewSetRbacTests(
         coupon = coupon_response.json()
         coupon_id = coupon['coupon_id']
         vouchers = Product.objects.get(id=coupon_id).attr.coupon_vouchers.vouchers.all()
+        overview_url = reverse(
+            'api:v2:enterprise-coupons-(?P<enterprise-id>.+)/overview-list',
+            kwargs={'enterprise_id': enterprise_id}
+        )
+
+        # Build the usage summary of the coupon, which must then be kept up to date as its codes are used.
+        self.get_response_json('GET', overview_url)
 
         # code assignments.
         self.assign_coupon_codes(coupon_id, vouchers, code_assignments)
@@ -1678,19 +1758,14 @@ class EnterpriseCouponViewSetRbacTests(
             assignment = OfferAssignment.objects.filter(code=vouchers[0].code).first()
             if assignment:
                 assignment.status = OFFER_ASSIGNMENT_EMAIL_BOUNCED
-                assignment.save()
+                with CouponUsageSummary.objects.track_usage([assignment.code]):
+                    assignment.save()
 
         for i, voucher in enumerate(vouchers):
             for _ in range(0, code_redemptions[i]):
                 self.use_voucher(voucher, self.create_user())
 
-        coupon_overview_response = self.get_response_json(
-            'GET',
-            reverse(
-                'api:v2:enterprise-coupons-(?P<enterprise-id>.+)/overview-list',
-                kwargs={'enterprise_id': enterprise_id}
-            )
-        )
+        coupon_overview_response = self.get_response_json('GET', overview_url)
 
         # Verify that we get correct results.
         for field, value in six.iteritems(expected_response):
@@ -9,6 +9,7 @@ from requests.exceptions import HTTPError, Timeout
 from rest_framework import status
 
 from ecommerce.core.models import User
+from ecommerce.extensions.api.throttles import SDNPrescreenThrottle
 from ecommerce.extensions.api.v2.tests.views import JSON_CONTENT_TYPE
 from ecommerce.extensions.payment.utils import SDNClient
 from ecommerce.extensions.test.factories import create_basket
@@ -69,3 +70,73 @@ class SDNCheckViewSetTests(TestCase):
             sdn_validator_mock.side_effect = side_effect
             response = self.make_request()
             self.assertEqual(response.json()['hits'], 0)
+
+    def test_sdn_check_no_match(self):
+        """Verify the user's baskets are not merged when the SDN check does not make a hit."""
+        with mock.patch.object(SDNClient, 'search', return_value={'total': 0}):
+            with mock.patch('ecommerce.extensions.payment.utils.Basket.get_basket') as get_basket_mock:
+                self.make_request()
+                self.assertFalse(get_basket_mock.called)
+
+
+@ddt.ddt
+class SDNPrescreenViewTests(TestCase):
+    PATH = reverse('api:v2:sdn:prescreen')
+
+    def setUp(self):
+        super(SDNPrescreenViewTests, self).setUp()
+        user = self.create_user()
+        self.client.login(username=user.username, password=self.password)
+        self.site.siteconfiguration.enable_sdn_check = True
+        self.site.siteconfiguration.save()
+
+    def make_request(self, data=None):
+        """Make a POST request to the endpoint."""
+        return self.client.post(
+            self.PATH,
+            data=json.dumps(data or {'name': 'Tester', 'city': 'Testlandia', 'country': 'TE'}),
+            content_type=JSON_CONTENT_TYPE
+        )
+
+    def test_authentication_required(self):
+        """Verify only authenticated users can access endpoint."""
+        self.client.logout()
+        self.assertEqual(self.make_request().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_prescreen(self):
+        """Verify the endpoint starts an SDN check of the billing details."""
+        with mock.patch.object(SDNClient, 'prescreen') as prescreen_mock:
+            response = self.make_request()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        prescreen_mock.assert_called_once_with('Tester', 'Testlandia', 'TE')
+
+    @ddt.data(
+        {'city': 'Testlandia', 'country': 'TE'},
+        {'name': 'Tester', 'country': 'TE'},
+        {'name': 'Tester', 'city': 'Testlandia', 'country': ''},
+    )
+    def test_invalid_billing_details(self, data):
+        """Verify the endpoint returns a 400, without starting an SDN check, if billing details are missing."""
+        with mock.patch.object(SDNClient, 'prescreen') as prescreen_mock:
+            response = self.make_request(data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(prescreen_mock.called)
+
+    def test_throttling(self):
+        """Verify the rate at which a user can start SDN checks is throttled."""
+        with mock.patch.object(SDNClient, 'prescreen') as prescreen_mock:
+            for __ in range(SDNPrescreenThrottle().num_requests):
+                self.assertEqual(self.make_request().status_code, status.HTTP_202_ACCEPTED)
+
+            response = self.make_request()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(prescreen_mock.call_count, SDNPrescreenThrottle().num_requests)
+
+    def test_sdn_check_disabled(self):
+        """Verify nothing is checked when the SDN check is disabled for the site."""
+        self.site.siteconfiguration.enable_sdn_check = False
+        self.site.siteconfiguration.save()
+        with mock.patch.object(SDNClient, 'prescreen') as prescreen_mock:
+            response = self.make_request()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(prescreen_mock.called)
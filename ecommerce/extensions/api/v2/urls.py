@@ -46,6 +46,7 @@ BASKET_URLS = [
         name='retrieve_order'
     ),
     url(r'^calculate/$', basket_views.BasketCalculateView.as_view(), name='calculate'),
+    url(r'^calculate/batch/$', basket_views.BasketCalculateBatchView.as_view(), name='calculate_batch'),
 ]
 
 PAYMENT_URLS = [
@@ -84,7 +85,8 @@ PROVIDER_URLS = [
 ]
 
 SDN_URLS = [
-    url(r'^search/$', sdn_views.SDNCheckViewSet.as_view(), name='search')
+    url(r'^search/$', sdn_views.SDNCheckViewSet.as_view(), name='search'),
+    url(r'^prescreen/$', sdn_views.SDNPrescreenView.as_view(), name='prescreen'),
 ]
 
 ENTERPRISE_URLS = [
@@ -18,6 +18,7 @@ from ecommerce.extensions.offer.constants import (
     OFFER_ASSIGNMENT_EMAIL_PENDING
 )
 from ecommerce.extensions.offer.models import OfferAssignment, OfferAssignmentEmailAttempt
+from ecommerce.extensions.voucher.models import CouponUsageSummary
 
 logger = logging.getLogger(__name__)
 
@@ -125,7 +126,7 @@ class AssignmentEmailBounce(APIView):
         """Update the OfferAssignment model"""
         offer = OfferAssignmentEmailAttempt.objects.get(send_id=send_id)
         assigned_offer = OfferAssignment.objects.get(id=offer.offer_assignment.id)
-        with transaction.atomic():
+        with CouponUsageSummary.objects.track_usage([assigned_offer.code]):
             OfferAssignment.objects.select_for_update().filter(
                 user_email=assigned_offer.user_email,
                 code=assigned_offer.code,
@@ -5,6 +5,7 @@ import logging
 import warnings
 
 import six
+import waffle
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
@@ -20,15 +21,18 @@ from rest_framework.permissions import DjangoModelPermissions, IsAuthenticated
 from rest_framework.response import Response
 
 from ecommerce.core.exceptions import MissingLmsUserIdException
-from ecommerce.core.utils import get_cache_key
 from ecommerce.extensions.analytics.utils import audit_log
 from ecommerce.extensions.api import data as data_api
 from ecommerce.extensions.api import exceptions as api_exceptions
 from ecommerce.extensions.api.permissions import IsStaffOrOwner
 from ecommerce.extensions.api.serializers import BasketSerializer, OrderSerializer
 from ecommerce.extensions.api.throttles import ServiceUserThrottle
-from ecommerce.extensions.basket.constants import TEMPORARY_BASKET_CACHE_KEY
-from ecommerce.extensions.basket.utils import attribute_cookie_data
+from ecommerce.extensions.basket.anonymous_prices import get_anonymous_price_cache_key
+from ecommerce.extensions.basket.constants import (
+    DISABLE_IN_MEMORY_BASKET_CALCULATION_SWITCH_NAME,
+    TEMPORARY_BASKET_CACHE_KEY
+)
+from ecommerce.extensions.basket.utils import attribute_cookie_data, calculate_basket_totals
 from ecommerce.extensions.checkout.mixins import EdxOrderPlacementMixin
 from ecommerce.extensions.partner.shortcuts import get_partner_for_site
 from ecommerce.extensions.payment import exceptions as payment_exceptions
@@ -41,6 +45,7 @@ Order = get_model('order', 'Order')
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
 Product = get_model('catalogue', 'Product')
 Selector = get_class('partner.strategy', 'Selector')
+StockRecord = get_model('partner', 'StockRecord')
 User = get_user_model()
 Voucher = get_model('voucher', 'Voucher')
 
@@ -414,48 +419,40 @@ class BasketCalculateView(generics.GenericAPIView):
             raise
         return response
 
-    def get(self, request):
-        """ Calculate basket totals given a list of sku's
-
-        Create a temporary basket add the sku's and apply an optional voucher code.
-        Then calculate the total price less discounts. If a voucher code is not
-        provided apply a voucher in the Enterprise entitlements available
-        to the user.
-
-        Query Params:
-            sku (string): A list of sku(s) to calculate
-            code (string): Optional voucher code to apply to the basket.
-            username (string): Optional username of a user for which to calculate the basket.
-
-        Returns:
-            JSON: {
-                    'total_incl_tax_excl_discounts': basket.total_incl_tax_excl_discounts,
-                    'total_incl_tax': basket.total_incl_tax,
-                    'currency': basket.currency
-                }
+    def _calculate_temporary_basket(self, user, request, products, voucher, skus, code):
+        if waffle.switch_is_active(DISABLE_IN_MEMORY_BASKET_CALCULATION_SWITCH_NAME):
+            return self._calculate_temporary_basket_atomic(user, request, products, voucher, skus, code)
+        return self._calculate_temporary_basket_in_memory(user, request, products, voucher, skus, code)
 
-         Side effects:
-            If the basket owner does not have an LMS user id, tries to find it. If found, adds the id to the user and
-            saves the user. If the id cannot be found, writes custom metrics to record this fact.
-       """
-        DEFAULT_REQUEST_CACHE.set(TEMPORARY_BASKET_CACHE_KEY, True)
+    def _calculate_temporary_basket_in_memory(self, user, request, products, voucher, skus, code):
+        """
+        Calculates the totals of a basket of the given products with an in-memory basket.
 
-        partner = get_partner_for_site(request)
-        skus = request.GET.getlist('sku')
-        if not skus:
-            return HttpResponseBadRequest(_('No SKUs provided.'))
-        skus.sort()
+        The results are those of _calculate_temporary_basket_atomic, without writing to the database.
+        """
+        try:
+            return calculate_basket_totals(request, user, [products], voucher)[0]
+        except:  # pylint: disable=bare-except
+            logger.exception(
+                'Failed to calculate basket discount for SKUs [%s] and voucher [%s].',
+                skus, code
+            )
+            raise
 
-        code = request.GET.get('code', None)
+    def _get_voucher(self, code):
         try:
-            voucher = Voucher.objects.get(code=code) if code else None
+            return Voucher.objects.get(code=code) if code else None
         except Voucher.DoesNotExist:
-            voucher = None
+            return None
 
-        products = Product.objects.filter(stockrecords__partner=partner, stockrecords__partner_sku__in=skus)
-        if not products:
-            return HttpResponseBadRequest(_('Products with SKU(s) [{skus}] do not exist.').format(skus=', '.join(skus)))
+    def _get_basket_owner(self, request):
+        """
+        Determines the user for whom baskets are calculated from the username and is_anonymous query params.
 
+        Returns:
+            tuple: The basket owner, or None if anonymous baskets are calculated, and the response to return
+                instead if the query params are invalid.
+        """
         basket_owner = request.user
 
         requested_username = request.GET.get('username', default='')
@@ -465,7 +462,7 @@ class BasketCalculateView(generics.GenericAPIView):
 
         # validate query parameters
         if requested_username and is_anonymous:
-            return HttpResponseBadRequest(_('Provide username or is_anonymous query param, but not both'))
+            return None, HttpResponseBadRequest(_('Provide username or is_anonymous query param, but not both'))
         if not requested_username and not is_anonymous:
             logger.warning("Request to Basket Calculate must supply either username or is_anonymous query"
                            " param. Requesting user=%s. Future versions of this API will treat this "
@@ -485,7 +482,7 @@ class BasketCalculateView(generics.GenericAPIView):
                     # never purchased before.
                     use_default_basket = True
             else:
-                return HttpResponseForbidden('Unauthorized user credentials')
+                return None, HttpResponseForbidden('Unauthorized user credentials')
 
         if basket_owner.username == self.MARKETING_USER and not use_default_basket:
             # For legacy requests that predate is_anonymous parameter, we will calculate
@@ -495,35 +492,78 @@ class BasketCalculateView(generics.GenericAPIView):
             use_default_basket = True
 
         if use_default_basket:
-            basket_owner = None
+            return None, None
 
         # If we have a basket owner, ensure they have an LMS user id
         try:
-            if basket_owner:
-                called_from = u'calculation of basket total'
-                basket_owner.add_lms_user_id('ecommerce_missing_lms_user_id_calculate_basket_total', called_from)
+            called_from = u'calculation of basket total'
+            basket_owner.add_lms_user_id('ecommerce_missing_lms_user_id_calculate_basket_total', called_from)
         except MissingLmsUserIdException:
-            return self._report_bad_request(
+            return None, self._report_bad_request(
                 api_exceptions.LMS_USER_ID_NOT_FOUND_DEVELOPER_MESSAGE.format(user_id=basket_owner.id),
                 api_exceptions.LMS_USER_ID_NOT_FOUND_USER_MESSAGE
             )
+        return basket_owner, None
+
+    def _get_anonymous_cache_key(self, request, skus):
+        # For an anonymous user we can directly get the cached price, because
+        # there can't be any enrollments or entitlements.
+        return get_anonymous_price_cache_key(request.site, skus)
+
+    def get(self, request):
+        """ Calculate basket totals given a list of sku's
+
+        Create a temporary basket add the sku's and apply an optional voucher code.
+        Then calculate the total price less discounts. If a voucher code is not
+        provided apply a voucher in the Enterprise entitlements available
+        to the user.
+
+        Query Params:
+            sku (string): A list of sku(s) to calculate
+            code (string): Optional voucher code to apply to the basket.
+            username (string): Optional username of a user for which to calculate the basket.
+
+        Returns:
+            JSON: {
+                    'total_incl_tax_excl_discounts': basket.total_incl_tax_excl_discounts,
+                    'total_incl_tax': basket.total_incl_tax,
+                    'currency': basket.currency
+                }
+
+         Side effects:
+            If the basket owner does not have an LMS user id, tries to find it. If found, adds the id to the user and
+            saves the user. If the id cannot be found, writes custom metrics to record this fact.
+       """
+        DEFAULT_REQUEST_CACHE.set(TEMPORARY_BASKET_CACHE_KEY, True)
+
+        partner = get_partner_for_site(request)
+        skus = request.GET.getlist('sku')
+        if not skus:
+            return HttpResponseBadRequest(_('No SKUs provided.'))
+        skus.sort()
+
+        code = request.GET.get('code', None)
+        voucher = self._get_voucher(code)
+
+        products = Product.objects.filter(stockrecords__partner=partner, stockrecords__partner_sku__in=skus)
+        if not products:
+            return HttpResponseBadRequest(_('Products with SKU(s) [{skus}] do not exist.').format(skus=', '.join(skus)))
+
+        basket_owner, error_response = self._get_basket_owner(request)
+        if error_response is not None:
+            return error_response
+        use_default_basket = basket_owner is None
 
         cache_key = None
         if use_default_basket:
-            # For an anonymous user we can directly get the cached price, because
-            # there can't be any enrollments or entitlements.
-            cache_key = get_cache_key(
-                site_comain=request.site,
-                resource_name='calculate',
-                skus=skus
-            )
+            cache_key = self._get_anonymous_cache_key(request, skus)
             cached_response = TieredCache.get_cached_response(cache_key)
             logger.info('bundle debugging 1: Cache key [%s] site [%s] skus [%s] response [%s]',
                         str(cache_key), str(request.site), str(skus), str(cached_response))
             if cached_response.is_found:
                 return Response(cached_response.value)
 
-        response = self._calculate_temporary_basket_atomic(basket_owner, request, products, voucher, skus, code)
+        response = self._calculate_temporary_basket(basket_owner, request, products, voucher, skus, code)
         logger.info('bundle debugging 2: Cache key [%s] response [%s] skus [%s] timeout [%s]',
                     str(cache_key), str(response), str(skus), str(settings.ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT))
         if response and use_default_basket:
@@ -532,3 +572,127 @@ class BasketCalculateView(generics.GenericAPIView):
             TieredCache.set_all_tiers(cache_key, response, settings.ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT)
 
         return Response(response)
+
+
+class BasketCalculateBatchView(BasketCalculateView):
+    def _calculate_temporary_baskets(self, user, request, product_groups, voucher, sku_groups, code):
+        """
+        Calculates the totals of a basket of the products of each group.
+        """
+        if waffle.switch_is_active(DISABLE_IN_MEMORY_BASKET_CALCULATION_SWITCH_NAME):
+            return [
+                self._calculate_temporary_basket_atomic(user, request, products, voucher, skus, code)
+                for products, skus in zip(product_groups, sku_groups)
+            ]
+
+        try:
+            return calculate_basket_totals(request, user, product_groups, voucher)
+        except:  # pylint: disable=bare-except
+            logger.exception(
+                'Failed to calculate basket discounts for SKU groups [%s] and voucher [%s].',
+                sku_groups, code
+            )
+            raise
+
+    def get(self, request):
+        """ Calculate the totals of several baskets given groups of sku's
+
+        Does what BasketCalculateView does for each group of sku's in one request, e.g. to price
+        every course card of a catalog page. Anonymous basket totals are read from, and written to,
+        the same cache entries as BasketCalculateView's.
+
+        Query Params:
+            sku_group (string): A comma-separated list of the sku(s) of a basket. Repeated for each basket.
+            code (string): Optional voucher code to apply to the baskets.
+            username (string): Optional username of a user for which to calculate the baskets.
+            is_anonymous (string): Optional, 'true' to calculate the baskets of an anonymous user.
+
+        Returns:
+            JSON: {
+                    'results': [
+                        {
+                            'skus': the sorted sku's of the group,
+                            'total_incl_tax_excl_discounts': basket.total_incl_tax_excl_discounts,
+                            'total_incl_tax': basket.total_incl_tax,
+                            'currency': basket.currency
+                        },
+                        ...
+                    ]
+                }
+        """
+        DEFAULT_REQUEST_CACHE.set(TEMPORARY_BASKET_CACHE_KEY, True)
+
+        partner = get_partner_for_site(request)
+        sku_groups = [
+            sorted(sku for sku in sku_group.split(',') if sku) for sku_group in request.GET.getlist('sku_group')
+        ]
+        if not sku_groups or not all(sku_groups):
+            return HttpResponseBadRequest(_('No SKUs provided.'))
+        if len(sku_groups) > settings.BASKET_CALCULATE_BATCH_MAX_GROUPS:
+            return HttpResponseBadRequest(
+                _('No more than {count} SKU groups can be provided.').format(
+                    count=settings.BASKET_CALCULATE_BATCH_MAX_GROUPS
+                )
+            )
+
+        code = request.GET.get('code', None)
+        voucher = self._get_voucher(code)
+
+        stockrecords = StockRecord.objects.filter(
+            partner=partner,
+            partner_sku__in={sku for skus in sku_groups for sku in skus}
+        ).select_related('product').prefetch_related('product__stockrecords')
+        products_by_sku = {stockrecord.partner_sku: stockrecord.product for stockrecord in stockrecords}
+        product_groups = []
+        for skus in sku_groups:
+            products = []
+            for sku in skus:
+                product = products_by_sku.get(sku)
+                if product is not None and product.id not in {added.id for added in products}:
+                    products.append(product)
+            if not products:
+                return HttpResponseBadRequest(
+                    _('Products with SKU(s) [{skus}] do not exist.').format(skus=', '.join(skus))
+                )
+            product_groups.append(products)
+
+        basket_owner, error_response = self._get_basket_owner(request)
+        if error_response is not None:
+            return error_response
+        use_default_basket = basket_owner is None
+
+        responses = [None] * len(sku_groups)
+        cache_keys = [
+            self._get_anonymous_cache_key(request, skus) if use_default_basket else None for skus in sku_groups
+        ]
+        uncached_positions = []
+        for position, cache_key in enumerate(cache_keys):
+            if cache_key:
+                cached_response = TieredCache.get_cached_response(cache_key)
+                if cached_response.is_found:
+                    responses[position] = cached_response.value
+                    continue
+            uncached_positions.append(position)
+
+        if uncached_positions:
+            calculated_responses = self._calculate_temporary_baskets(
+                basket_owner,
+                request,
+                [product_groups[position] for position in uncached_positions],
+                voucher,
+                [sku_groups[position] for position in uncached_positions],
+                code
+            )
+            for position, response in zip(uncached_positions, calculated_responses):
+                responses[position] = response
+                if response and use_default_basket:
+                    TieredCache.set_all_tiers(
+                        cache_keys[position], response, settings.ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT
+                    )
+
+        results = []
+        for skus, response in zip(sku_groups, responses):
+            result = {'skus': skus}
+            result.update(response or {})
+            results.append(result)
+        return Response({'results': results})
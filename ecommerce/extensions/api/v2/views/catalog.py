@@ -82,7 +82,7 @@ class CatalogViewSet(NestedViewSetMixin, ReadOnlyModelViewSet):
                     course_id__in=course_ids,
                     attributes__name='certificate_type',
                     attribute_values__value_text__in=seat_types
-                ),
+                ).prefetch_related('stockrecords'),
                 many=True,
                 context={'request': request}
             ).data
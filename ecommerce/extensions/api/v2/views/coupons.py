@@ -32,6 +32,7 @@ from ecommerce.extensions.payment.processors.invoice import InvoicePayment
 from ecommerce.extensions.voucher.models import CouponVouchers
 from ecommerce.extensions.voucher.utils import (
     get_or_create_enterprise_offer,
+    reset_coupon_usage_summaries,
     update_voucher_offer,
     update_voucher_with_enterprise_offer
 )
@@ -352,6 +353,7 @@ class CouponViewSet(EdxOrderPlacementMixin, viewsets.ModelViewSet):
             self.update_offer_data(request.data, vouchers, self.request.site)
             self.update_coupon_product_data(request.data, coupon)
             self.update_invoice_data(request.data, coupon)
+            reset_coupon_usage_summaries(coupon_ids=[coupon.id])
             serializer = self.get_serializer(coupon)
             return Response(serializer.data)
         except ValidationError as error:
@@ -2,15 +2,17 @@
 from __future__ import absolute_import
 
 import waffle
+from django.conf import settings
 from django.db.models import Prefetch
 from oscar.core.loading import get_model
 from rest_framework import status
-from rest_framework.decorators import detail_route
+from rest_framework.decorators import detail_route, list_route
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
 from ecommerce.core.constants import COURSE_ID_REGEX
 from ecommerce.courses.models import Course
+from ecommerce.courses.publishers import LMSPublisher
 from ecommerce.extensions.api import serializers
 from ecommerce.extensions.api.v2.views import NonDestroyableModelViewSet
 
@@ -97,3 +99,53 @@ class CourseViewSet(NonDestroyableModelViewSet):
 
         return Response({'status': msg.format(course_id=course.id)},
                         status=status.HTTP_200_OK if published else status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @list_route(methods=['post'])
+    def bulk_publish(self, request):
+        """
+        Publish many courses to LMS.
+        ---
+        parameters:
+            - name: course_ids
+              description: IDs of the courses to publish.
+              required: true
+              type: array
+              paramType: body
+        """
+        course_ids = request.data.get('course_ids')
+        if not course_ids or not isinstance(course_ids, list):
+            return Response({'status': 'A list of course_ids is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(course_ids) > settings.LMS_BULK_PUBLISH_MAX_COURSES:
+            return Response(
+                {'status': 'No more than {count} courses can be published at once.'.format(
+                    count=settings.LMS_BULK_PUBLISH_MAX_COURSES
+                )},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not waffle.switch_is_active('publish_course_modes_to_lms'):
+            return Response(
+                {'status': 'Courses were not published to LMS because the switch [publish_course_modes_to_lms] '
+                           'is disabled.'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        courses = Course.objects.filter(
+            id__in=course_ids, partner=request.site.siteconfiguration.partner
+        ).select_related('partner__default_site__siteconfiguration')
+        publishing_errors = LMSPublisher().publish_courses(courses)
+
+        results = []
+        for course_id in course_ids:
+            if course_id not in publishing_errors:
+                error = 'Course [{course_id}] does not exist.'.format(course_id=course_id)
+            else:
+                error = publishing_errors[course_id]
+            results.append({'course_id': course_id, 'published': error is None, 'error': error})
+
+        published = all(result['published'] for result in results)
+        return Response(
+            {'results': results},
+            status=status.HTTP_200_OK if published else status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
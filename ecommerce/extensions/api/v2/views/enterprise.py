@@ -5,7 +5,21 @@ import logging
 import six
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
-from django.db.models import Q
+from django.db.models import (
+    BooleanField,
+    Case,
+    Count,
+    Exists,
+    F,
+    IntegerField,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When
+)
+from django.db.models.functions import Coalesce
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
@@ -57,6 +71,9 @@ from ecommerce.extensions.offer.constants import (
     OFFER_ASSIGNED,
     OFFER_ASSIGNMENT_EMAIL_BOUNCED,
     OFFER_ASSIGNMENT_EMAIL_PENDING,
+    OFFER_ASSIGNMENT_REVOKED,
+    OFFER_MAX_USES_DEFAULT,
+    OFFER_REDEEMED,
     VOUCHER_NOT_ASSIGNED,
     VOUCHER_NOT_REDEEMED,
     VOUCHER_PARTIAL_REDEEMED,
@@ -70,6 +87,7 @@ from ecommerce.extensions.voucher.utils import (
 )
 
 logger = logging.getLogger(__name__)
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
 Order = get_model('order', 'Order')
 Line = get_model('basket', 'Line')
 OfferAssignment = get_model('offer', 'OfferAssignment')
@@ -83,6 +101,48 @@ User = get_user_model()
 DEPRECATED_COUPON_CATEGORIES = ['Bulk Enrollment']
 
 
+def _count_subquery(queryset, group_by):
+    """
+    Returns an expression counting the rows of a queryset filtered on the outer query, 0 when there are none.
+    """
+    counts = queryset.order_by().values(group_by).annotate(count=Count('id')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _enterprise_offers(**voucher_filter):
+    return ConditionalOffer.objects.filter(condition__enterprise_customer_uuid__isnull=False, **voucher_filter)
+
+
+def _code_assignments(**assignment_filter):
+    return OfferAssignment.objects.filter(
+        code=OuterRef('code'),
+        status__in=[OFFER_ASSIGNED, OFFER_ASSIGNMENT_EMAIL_PENDING, OFFER_ASSIGNMENT_EMAIL_BOUNCED],
+        **assignment_filter
+    )
+
+
+def _code_applications():
+    return VoucherApplication.objects.filter(voucher__code=OuterRef('code'), user__email=OuterRef('user_email'))
+
+
+def _annotate_assignment_redemptions(assignments):
+    """
+    Annotates the voucher and enterprise offer values the code usage serializers need onto OfferAssignments.
+    """
+    code_vouchers = Voucher.objects.filter(code=OuterRef('code'))
+    return assignments.annotate(
+        usage=Subquery(code_vouchers.values('usage')[:1]),
+        num_orders=Subquery(code_vouchers.values('num_orders')[:1], output_field=IntegerField()),
+        has_enterprise_offer=Value(True, output_field=BooleanField()),
+        max_global_applications=Subquery(
+            _enterprise_offers(vouchers__code=OuterRef('code')).values('max_global_applications')[:1],
+            output_field=IntegerField()
+        ),
+        num_assignments=_count_subquery(_code_assignments(user_email=OuterRef('user_email')), 'code'),
+        num_applications=_count_subquery(_code_applications(), 'voucher__code'),
+    )
+
+
 class EnterpriseCustomerViewSet(generics.GenericAPIView):
 
     permission_classes = (IsAuthenticated, IsAdminUser,)
@@ -377,39 +437,57 @@ class EnterpriseCouponViewSet(CouponViewSet):
         """
         Returns a queryset containing Vouchers with slots that have not been assigned.
         Unique Vouchers will be included in the final queryset for all types.
-        """
-        vouchers_with_slots = []
-        for voucher in vouchers:
-            slots_available = voucher.slots_available_for_assignment
-            if slots_available == 0:
-                continue
 
-            vouchers_with_slots.append(voucher.id)
+        The available slots are computed in the database, following Voucher.slots_available_for_assignment.
+        """
+        enterprise_offers = _enterprise_offers(vouchers=OuterRef('pk'))
+        single_assignment_usages = [Voucher.SINGLE_USE, Voucher.MULTI_USE_PER_CUSTOMER]
+        queryset = vouchers.annotate(
+            has_enterprise_offer=Exists(enterprise_offers),
+            max_global_applications=Subquery(
+                enterprise_offers.values('max_global_applications')[:1], output_field=IntegerField()
+            ),
+            max_uses=Case(
+                When(max_global_applications__gt=0, then=F('max_global_applications')),
+                default=Value(OFFER_MAX_USES_DEFAULT),
+                output_field=IntegerField()
+            ),
+            num_slots_taken=_count_subquery(
+                OfferAssignment.objects.filter(
+                    code=OuterRef('code'),
+                    offer__vouchers=OuterRef('pk'),
+                    offer__condition__enterprise_customer_uuid__isnull=False,
+                ).exclude(status__in=[OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]),
+                'code'
+            ),
+            num_assignments=_count_subquery(_code_assignments(), 'code'),
+        ).filter(
+            Q(has_enterprise_offer=False) |
+            Q(usage__in=single_assignment_usages, num_orders=0, num_slots_taken=0) |
+            (~Q(usage__in=single_assignment_usages) & ~Q(max_uses=F('num_orders') + F('num_slots_taken')))
+        )
 
-        return Voucher.objects.filter(id__in=vouchers_with_slots).values('code').order_by('code')
+        return queryset.values(
+            'code', 'usage', 'num_orders', 'has_enterprise_offer', 'max_global_applications', 'num_assignments'
+        ).order_by('code')
 
     def _get_not_redeemed_usages(self, vouchers):
         """
         Returns a queryset containing unique code and user_email pairs from OfferAssignments.
         Only code and user_email pairs that have no corresponding VoucherApplication are returned.
         """
-        unredeemed_assignments = []
-        for voucher in vouchers:
-            users_having_usages = VoucherApplication.objects.filter(
-                voucher=voucher).values_list('user__email', flat=True)
-
-            assignments = voucher.enterprise_offer.offerassignment_set.filter(
-                code=voucher.code,
-                status__in=[OFFER_ASSIGNED, OFFER_ASSIGNMENT_EMAIL_BOUNCED, OFFER_ASSIGNMENT_EMAIL_PENDING]
-            ).exclude(user_email__in=users_having_usages)
-
-            if assignments.count() == 0:
-                continue
-
-            unredeemed_assignments.extend(assignments.values_list('id', flat=True))
-
-        return OfferAssignment.objects.filter(
-            id__in=unredeemed_assignments).values('code', 'user_email').order_by('user_email').distinct()
+        # The assignments are narrowed down to the coupon's codes before the subqueries are evaluated for them.
+        assignments = OfferAssignment.objects.filter(code__in=vouchers.values('code')).annotate(
+            is_coupon_assignment=Exists(vouchers.filter(code=OuterRef('code'), offers=OuterRef('offer'))),
+            is_redeemed=Exists(_code_applications()),
+        ).filter(
+            is_coupon_assignment=True,
+            is_redeemed=False,
+            offer__condition__enterprise_customer_uuid__isnull=False,
+            status__in=[OFFER_ASSIGNED, OFFER_ASSIGNMENT_EMAIL_BOUNCED, OFFER_ASSIGNMENT_EMAIL_PENDING],
+        ).values('code', 'user_email')
+
+        return _annotate_assignment_redemptions(assignments).order_by('user_email').distinct()
 
     def _get_partial_redeemed_usages(self, vouchers):
         """
@@ -420,45 +498,41 @@ class EnterpriseCouponViewSet(CouponViewSet):
         if vouchers.first().usage == Voucher.SINGLE_USE:
             return OfferAssignment.objects.none()
 
-        parially_redeemed_assignments = []
-        for voucher in vouchers:
-            users_having_usages = VoucherApplication.objects.filter(
-                voucher=voucher).values_list('user__email', flat=True)
-
-            assignments = voucher.enterprise_offer.offerassignment_set.filter(
-                code=voucher.code,
-                status__in=[OFFER_ASSIGNED, OFFER_ASSIGNMENT_EMAIL_PENDING],
-                user_email__in=users_having_usages
-            )
-
-            if assignments.count() == 0:
-                continue
-
-            parially_redeemed_assignments.append(assignments.first().id)
+        assignments = OfferAssignment.objects.filter(code__in=vouchers.values('code')).annotate(
+            is_coupon_assignment=Exists(vouchers.filter(code=OuterRef('code'), offers=OuterRef('offer'))),
+            is_redeemed=Exists(_code_applications()),
+        ).filter(
+            is_coupon_assignment=True,
+            is_redeemed=True,
+            offer__condition__enterprise_customer_uuid__isnull=False,
+            status__in=[OFFER_ASSIGNED, OFFER_ASSIGNMENT_EMAIL_PENDING],
+        )
+        # Only the first partially redeemed assignment of each code is listed.
+        first_assignment_ids = assignments.order_by().values('code').annotate(first_id=Min('id')).values('first_id')
 
-        return OfferAssignment.objects.filter(
-            id__in=parially_redeemed_assignments).values('code', 'user_email').order_by('user_email')
+        return _annotate_assignment_redemptions(
+            OfferAssignment.objects.filter(id__in=first_assignment_ids).values('code', 'user_email')
+        ).order_by('user_email')
 
     def _get_redeemed_usages(self, vouchers):
         """
         Returns a queryset containing unique voucher.code and user.email pairs from VoucherApplications.
         Only code and email pairs that have no corresponding active OfferAssignments are returned.
         """
-        voucher_applications = VoucherApplication.objects.filter(voucher__in=vouchers)
-        redeemed_voucher_application_ids = []
-        for voucher_application in voucher_applications:
-            unredeemed_voucher_assignments = OfferAssignment.objects.filter(
-                code=voucher_application.voucher.code,
-                user_email=voucher_application.user.email,
+        return VoucherApplication.objects.filter(voucher__in=vouchers).annotate(
+            has_active_assignment=Exists(OfferAssignment.objects.filter(
+                code=OuterRef('voucher__code'),
+                user_email=OuterRef('user__email'),
                 status__in=[OFFER_ASSIGNED, OFFER_ASSIGNMENT_EMAIL_PENDING]
-            )
-
-            if unredeemed_voucher_assignments.count() == 0:
-                redeemed_voucher_application_ids.append(voucher_application.id)
-
-        return VoucherApplication.objects.filter(
-            id__in=redeemed_voucher_application_ids
-        ).values('voucher__code', 'user__email').distinct().order_by('user__email')
+            )),
+        ).filter(has_active_assignment=False).values('voucher__code', 'user__email').annotate(
+            num_applications=_count_subquery(
+                VoucherApplication.objects.filter(
+                    voucher__code=OuterRef('voucher__code'), user__email=OuterRef('user__email')
+                ),
+                'voucher__code'
+            ),
+        ).distinct().order_by('user__email')
 
     @list_route(url_path=r'(?P<enterprise_id>.+)/search', permission_classes=[IsAuthenticated])
     @permission_required('enterprise.can_view_coupon', fn=lambda request, enterprise_id: enterprise_id)
@@ -625,7 +699,7 @@ class EnterpriseCouponViewSet(CouponViewSet):
             serializer = self.get_serializer(coupon)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
-        page = self.paginate_queryset(enterprise_coupons)
+        page = self.paginate_queryset(enterprise_coupons.select_related('usage_summary'))
         serializer = self.get_serializer(page, many=True)
         return self.get_paginated_response(serializer.data)
 
@@ -40,7 +40,7 @@ class ProductViewSet(NestedViewSetMixin, NonDestroyableModelViewSet):
         return super(ProductViewSet, self).get_queryset().filter(
             Q(stockrecords__partner=partner) |
             Q(course__partner=partner)
-        )
+        ).prefetch_related('stockrecords')
 
     def invalid_product_response(self, http_method):
         """
@@ -4,11 +4,14 @@ from __future__ import absolute_import
 import logging
 
 from oscar.core.loading import get_model
+from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from ecommerce.extensions.payment.utils import checkSDN
+from ecommerce.extensions.api.serializers import SDNPrescreenSerializer
+from ecommerce.extensions.api.throttles import SDNPrescreenThrottle
+from ecommerce.extensions.payment.utils import checkSDN, prescreenSDN
 
 logger = logging.getLogger(__name__)
 
@@ -40,3 +43,23 @@ class SDNCheckViewSet(APIView):
                 basket_id,
             )
         return Response({'hits': hit_count})
+
+
+class SDNPrescreenView(APIView):
+    """Starts an SDN check of a user's billing details in the background."""
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (SDNPrescreenThrottle,)
+
+    def post(self, request):
+        """
+        POST handler for the view. The billing details are checked, and the results cached, while the user
+        completes the payment form, so that the check made when the payment is submitted does not wait for
+        the SDN API.
+        """
+        serializer = SDNPrescreenSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        prescreenSDN(request, data['name'], data['city'], data['country'])
+        return Response(status=status.HTTP_202_ACCEPTED)
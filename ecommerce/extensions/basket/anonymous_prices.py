@@ -0,0 +1,216 @@
+"""
+Cache of the basket totals calculated for anonymous users.
+
+The totals of anonymous baskets do not depend on the user, so the basket calculate endpoints cache them by site
+and SKUs. The warm_anonymous_prices management command computes the entries of every active seat and entitlement
+ahead of time, and refreshes them before they expire, so that traffic to popular courses does not all pay for
+their calculation at once when an entry expires.
+
+The cache keys include a generation, which is replaced when a site offer changes, so that every cached total,
+including those of baskets of several products, is invalidated at once. When stock records change, the cached
+totals of their SKUs are recalculated, once the transaction changing them commits.
+"""
+from __future__ import absolute_import
+
+import logging
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+import crum
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache as django_cache
+from django.db.models import Q
+from django.http import HttpRequest
+from django.utils import timezone
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE, TieredCache
+from oscar.core.loading import get_model
+from threadlocals.threadlocals import get_current_request, set_thread_variable
+
+from ecommerce.core.constants import COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME, SEAT_PRODUCT_CLASS_NAME
+from ecommerce.core.utils import get_cache_key
+from ecommerce.extensions.basket.utils import calculate_basket_totals
+
+logger = logging.getLogger(__name__)
+SiteConfiguration = get_model('core', 'SiteConfiguration')
+StockRecord = get_model('partner', 'StockRecord')
+
+ANONYMOUS_PRICES_GENERATION_CACHE_KEY = 'basket.anonymous_prices_generation'
+WARMED_PRODUCT_CLASS_NAMES = (SEAT_PRODUCT_CLASS_NAME, COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME)
+
+
+def get_anonymous_prices_generation():
+    """
+    Returns the generation of the cached anonymous basket totals.
+    """
+    cached_response = TieredCache.get_cached_response(ANONYMOUS_PRICES_GENERATION_CACHE_KEY)
+    if cached_response.is_found:
+        return cached_response.value
+
+    # A generation that was evicted from the cache is replaced by a new one, which invalidates the entries
+    # cached under the evicted generation.
+    django_cache.add(ANONYMOUS_PRICES_GENERATION_CACHE_KEY, uuid.uuid4().hex, None)
+    generation = django_cache.get(ANONYMOUS_PRICES_GENERATION_CACHE_KEY)
+    DEFAULT_REQUEST_CACHE.set(ANONYMOUS_PRICES_GENERATION_CACHE_KEY, generation)
+    return generation
+
+
+def invalidate_anonymous_prices():
+    """
+    Invalidates all the cached anonymous basket totals, by replacing their generation.
+    """
+    TieredCache.set_all_tiers(ANONYMOUS_PRICES_GENERATION_CACHE_KEY, uuid.uuid4().hex, None)
+    logger.info('Invalidated the cached anonymous basket totals.')
+
+
+def get_anonymous_price_cache_key(site, skus):
+    """
+    Returns the key of the cached totals of an anonymous basket.
+
+    Arguments:
+        site (Site): The site of the basket.
+        skus (list of str): The SKUs of the products in the basket.
+    """
+    return get_cache_key(
+        site_comain=site,
+        resource_name='calculate',
+        skus=sorted(skus),
+        generation=get_anonymous_prices_generation()
+    )
+
+
+def get_warmable_skus(site):
+    """
+    Returns the SKUs of the active seats and entitlements of the site's partner, whose anonymous totals are
+    computed ahead of time.
+    """
+    return list(StockRecord.objects.filter(
+        Q(product__product_class__name__in=WARMED_PRODUCT_CLASS_NAMES) |
+        Q(product__parent__product_class__name__in=WARMED_PRODUCT_CLASS_NAMES),
+        Q(product__expires__isnull=True) | Q(product__expires__gt=timezone.now()),
+        partner=site.siteconfiguration.partner,
+    ).order_by('partner_sku').values_list('partner_sku', flat=True))
+
+
+@contextmanager
+def _anonymous_request(site):
+    """
+    Installs a request of an anonymous user to the site as the current request.
+
+    Offers and ranges read the site, and the dynamic discount offers the query params, of the current request.
+    """
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = '/'
+    request.META = {'HTTP_HOST': site.domain, 'SERVER_NAME': site.domain}
+    request.COOKIES = {}
+    request.site = site
+    request.user = AnonymousUser()
+
+    previous_request = get_current_request()
+    previous_crum_request = crum.get_current_request()
+    set_thread_variable('request', request)
+    crum.set_current_request(request)
+    try:
+        yield request
+    finally:
+        set_thread_variable('request', previous_request)
+        crum.set_current_request(previous_crum_request)
+
+
+def _cache_anonymous_prices(request, stock_records):
+    product_groups = [[stock_record.product] for stock_record in stock_records]
+    for stock_record, totals in zip(stock_records, calculate_basket_totals(request, None, product_groups)):
+        TieredCache.set_all_tiers(
+            get_anonymous_price_cache_key(request.site, [stock_record.partner_sku]),
+            totals,
+            settings.ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT
+        )
+
+
+def warm_anonymous_prices(site, skus, batch_size=100):
+    """
+    Calculates, and caches, the anonymous totals of a basket of each of the given SKUs.
+
+    The offers are loaded once for every batch of SKUs. If the calculation of a batch fails, its SKUs are
+    calculated one at a time, so that a single failing product does not prevent the others from being cached.
+
+    Arguments:
+        site (Site): The site whose anonymous totals are cached.
+        skus (list of str): SKUs of the site's partner.
+        batch_size (int): The number of SKUs calculated together.
+
+    Returns:
+        int: The number of SKUs whose totals were cached.
+    """
+    num_cached = 0
+    with _anonymous_request(site) as request:
+        for start in range(0, len(skus), batch_size):
+            stock_records = list(StockRecord.objects.filter(
+                partner=site.siteconfiguration.partner,
+                partner_sku__in=skus[start:start + batch_size]
+            ).select_related('product').prefetch_related('product__stockrecords'))
+
+            try:
+                _cache_anonymous_prices(request, stock_records)
+                num_cached += len(stock_records)
+                continue
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Failed to calculate the anonymous totals of a batch of SKUs of site [%s].', site)
+
+            for stock_record in stock_records:
+                try:
+                    _cache_anonymous_prices(request, [stock_record])
+                    num_cached += 1
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception(
+                        'Failed to calculate the anonymous totals of SKU [%s] of site [%s].',
+                        stock_record.partner_sku, site
+                    )
+    return num_cached
+
+
+def _get_site_configurations(partner_ids):
+    return SiteConfiguration.objects.filter(partner_id__in=partner_ids).select_related('site')
+
+
+def refresh_anonymous_prices(stock_record_ids):
+    """
+    Recalculates the cached anonymous totals of the stock records' SKUs, on every site of their partners.
+
+    The SKUs of a site are recalculated together. Totals which are not cached are left to be calculated on
+    demand, or by the next warming.
+
+    Arguments:
+        stock_record_ids (iterable of int): IDs of the changed stock records.
+    """
+    skus_by_partner = defaultdict(set)
+    stock_records = StockRecord.objects.filter(id__in=stock_record_ids).values_list('partner_id', 'partner_sku')
+    for partner_id, sku in stock_records:
+        skus_by_partner[partner_id].add(sku)
+
+    for site_configuration in _get_site_configurations(skus_by_partner):
+        site = site_configuration.site
+        skus = [
+            sku for sku in sorted(skus_by_partner[site_configuration.partner_id])
+            if TieredCache.get_cached_response(get_anonymous_price_cache_key(site, [sku])).is_found
+        ]
+        if skus:
+            warm_anonymous_prices(site, skus)
+
+
+def delete_anonymous_prices(partner_skus):
+    """
+    Deletes the cached anonymous totals of the SKUs, on every site of their partners.
+
+    Arguments:
+        partner_skus (iterable): (partner ID, SKU) pairs of the deleted stock records.
+    """
+    skus_by_partner = defaultdict(set)
+    for partner_id, sku in partner_skus:
+        skus_by_partner[partner_id].add(sku)
+
+    for site_configuration in _get_site_configurations(skus_by_partner):
+        for sku in skus_by_partner[site_configuration.partner_id]:
+            TieredCache.delete_all_tiers(get_anonymous_price_cache_key(site_configuration.site, [sku]))
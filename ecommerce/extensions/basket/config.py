@@ -5,3 +5,10 @@ from oscar.apps.basket import config
 
 class BasketConfig(config.BasketConfig):
     name = 'ecommerce.extensions.basket'
+
+    def ready(self):
+        super(BasketConfig, self).ready()
+
+        # Register signal handlers
+        # noinspection PyUnresolvedReferences
+        import ecommerce.extensions.basket.signals  # pylint: disable=unused-import, import-outside-toplevel
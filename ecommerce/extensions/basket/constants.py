@@ -1,3 +1,6 @@
 TEMPORARY_BASKET_CACHE_KEY = "ecommerce.is_calculate_temporary_basket"
 EMAIL_OPT_IN_ATTRIBUTE = "email_opt_in"
 PURCHASER_BEHALF_ATTRIBUTE = "purchased_for_organization"
+
+# Switch that calculates basket totals with a temporary basket saved in a rolled back transaction, instead of in memory.
+DISABLE_IN_MEMORY_BASKET_CALCULATION_SWITCH_NAME = 'disable_in_memory_basket_calculation'
@@ -13,3 +13,11 @@ class RedirectException(Exception):
 
 class VoucherException(Exception):
     """ Voucher Exception. """
+
+
+class InMemoryBasketSaveError(TypeError):
+    """ Raised when an in-memory basket, which only exists to calculate totals, is saved. """
+
+
+class InMemoryBasketQueryError(TypeError):
+    """ Raised when an in-memory basket's lines or vouchers are queried in a way that needs the database. """
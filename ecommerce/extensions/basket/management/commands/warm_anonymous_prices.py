@@ -0,0 +1,55 @@
+"""
+Management command that computes the anonymous basket totals of all active seats and entitlements ahead of time.
+
+It should be scheduled to run more often than ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT, so that the cached totals
+are refreshed before they expire.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import logging
+
+from django.contrib.sites.models import Site
+from django.core.management import BaseCommand
+
+from ecommerce.extensions.basket.anonymous_prices import get_warmable_skus, warm_anonymous_prices
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Caches the anonymous basket totals of every active seat and entitlement SKU of each site.
+
+    Example:
+
+        ./manage.py warm_anonymous_prices --site-domain example.com
+    """
+
+    help = 'Cache the anonymous basket totals of every active seat and entitlement SKU of each site.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--site-domain',
+            action='append',
+            dest='site_domains',
+            default=[],
+            help='Domain of a site whose totals are cached. Repeat for several sites. Defaults to all sites.'
+        )
+        parser.add_argument(
+            '-b', '--batch-size',
+            action='store',
+            dest='batch_size',
+            default=100,
+            type=int,
+            help='Number of SKUs whose totals are calculated with the same offers.'
+        )
+
+    def handle(self, *args, **options):
+        sites = Site.objects.filter(siteconfiguration__isnull=False).select_related('siteconfiguration__partner')
+        if options['site_domains']:
+            sites = sites.filter(domain__in=options['site_domains'])
+
+        for site in sites.order_by('id'):
+            skus = get_warmable_skus(site)
+            num_cached = warm_anonymous_prices(site, skus, batch_size=options['batch_size'])
+            logger.info('Cached the anonymous totals of [%d] of [%d] SKUs of site [%s].', num_cached, len(skus), site)
@@ -3,7 +3,9 @@ from __future__ import absolute_import
 import logging
 
 from django.db import models
+from django.db.models.query import QuerySet
 from django.utils.encoding import python_2_unicode_compatible
+from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
 from oscar.apps.basket.abstract_models import AbstractBasket
@@ -11,6 +13,7 @@ from oscar.core.loading import get_class
 
 from ecommerce.extensions.analytics.utils import track_segment_event, translate_basket_line_for_segment
 from ecommerce.extensions.basket.constants import TEMPORARY_BASKET_CACHE_KEY
+from ecommerce.extensions.basket.exceptions import InMemoryBasketQueryError, InMemoryBasketSaveError
 
 logger = logging.getLogger(__name__)
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
@@ -73,6 +76,21 @@ class Basket(AbstractBasket):
         # Call flush after we fetch all_lines() which is cleared during flush()
         super(Basket, self).flush()  # pylint: disable=bad-super-call
 
+    def all_lines(self):
+        """
+        Return a cached set of basket lines, with the stock records of their products prefetched, so that
+        the strategy selects the stock record of each line without a query.
+        """
+        if self.id is None:
+            return self.lines.none()
+        if self._lines is None:
+            self._lines = (
+                self.lines
+                .select_related('product', 'stockrecord')
+                .prefetch_related('attributes', 'product__images', 'product__stockrecords')
+                .order_by(self._meta.pk.name))
+        return self._lines
+
     def add_product(self, product, quantity=1, options=None):
         """
         Add the indicated product to basket.
@@ -106,6 +124,137 @@ class Basket(AbstractBasket):
             num_lines=self.num_lines)
 
 
+class InMemoryQuerySet(list):
+    """
+    The related objects of an in-memory basket, with the read-only queryset methods that work on them.
+
+    Other queryset methods, e.g. filter() or get(), would need the database and raise InMemoryBasketQueryError.
+    """
+
+    def all(self):
+        return self
+
+    def count(self):  # pylint: disable=arguments-differ
+        return len(self)
+
+    def exists(self):
+        return bool(self)
+
+    def first(self):
+        return self[0] if self else None
+
+    def __getattr__(self, name):
+        if not name.startswith('_') and hasattr(QuerySet, name):
+            raise InMemoryBasketQueryError(
+                'In-memory baskets only hold their related objects in memory, and do not support {}().'.format(name)
+            )
+        raise AttributeError(name)
+
+
+class InMemoryManager(models.Manager):
+    """
+    Stands in for a related manager of an in-memory basket.
+
+    Querysets are served from the related objects held in memory, so reading them does not hit the database.
+    """
+
+    def __init__(self, model):
+        super(InMemoryManager, self).__init__()
+        self.model = model
+        self._objects = []
+
+    def get_queryset(self):
+        return InMemoryQuerySet(self._objects)
+
+    def add(self, *objs):
+        self._objects.extend(obj for obj in objs if obj not in self._objects)
+
+
+class InMemoryBasket(Basket):
+    """
+    A basket whose lines and vouchers are only held in memory.
+
+    It is used to price products, e.g. when calculating basket totals for the marketing site, without writing
+    to the database. The offers are applied as they are to a saved basket. In-memory baskets cannot be saved.
+    """
+
+    class Meta:
+        proxy = True
+
+    @cached_property
+    def lines(self):
+        return InMemoryManager(self._meta.get_field('lines').related_model)
+
+    @cached_property
+    def vouchers(self):
+        return InMemoryManager(self._meta.get_field('vouchers').related_model)
+
+    def save(self, *args, **kwargs):  # pylint: disable=arguments-differ
+        raise InMemoryBasketSaveError('In-memory baskets are only used to calculate totals, and cannot be saved.')
+
+    def all_lines(self):
+        if self._lines is None:
+            self._lines = self.lines.all()
+        return self._lines
+
+    @property
+    def is_empty(self):
+        return self.num_lines == 0
+
+    @property
+    def contains_a_voucher(self):
+        return self.vouchers.exists()
+
+    def add_product(self, product, quantity=1, options=None):
+        """
+        Add the indicated product to the basket, like AbstractBasket.add_product does, but in memory.
+
+        Returns (line, created).
+        """
+        if options:
+            raise ValueError('Product options are not supported by in-memory baskets.')
+
+        price_currency = self.currency
+        stock_info = self.get_stock_info(product, [])
+
+        if not stock_info.price.exists:
+            raise ValueError('Strategy hasn\'t found a price for product {}'.format(product))
+
+        if price_currency and stock_info.price.currency != price_currency:
+            raise ValueError(
+                'Basket lines must all have the same currency. Proposed line has currency {}, '
+                'while basket has currency {}'.format(stock_info.price.currency, price_currency)
+            )
+
+        if stock_info.stockrecord is None:
+            raise ValueError(
+                'Basket lines must all have stock records. Strategy hasn\'t found any stock record '
+                'for product {}'.format(product)
+            )
+
+        line_reference = self._create_line_reference(product, stock_info.stockrecord, [])
+        line = next((line for line in self.all_lines() if line.line_reference == line_reference), None)
+        created = line is None
+        if created:
+            line = self.lines.model(
+                basket=self,
+                line_reference=line_reference,
+                product=product,
+                stockrecord=stock_info.stockrecord,
+                quantity=quantity,
+                price_excl_tax=stock_info.price.excl_tax,
+                price_currency=stock_info.price.currency,
+            )
+            if stock_info.price.is_tax_known:
+                line.price_incl_tax = stock_info.price.incl_tax
+            self.lines.add(line)
+        else:
+            line.quantity = max(0, line.quantity + quantity)
+        self.reset_offer_applications()
+
+        return line, created
+
+
 class BasketAttributeType(models.Model):
     """
     Used to keep attribute types for BasketAttribute
@@ -0,0 +1,109 @@
+from __future__ import absolute_import
+
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from oscar.core.loading import get_model
+
+from ecommerce.core.utils import on_commit_once
+from ecommerce.extensions.basket.anonymous_prices import (
+    delete_anonymous_prices,
+    invalidate_anonymous_prices,
+    refresh_anonymous_prices
+)
+from ecommerce.extensions.offer.utils import is_offer_usage_update
+
+Benefit = get_model('offer', 'Benefit')
+Catalog = get_model('catalogue', 'Catalog')
+Condition = get_model('offer', 'Condition')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+Range = get_model('offer', 'Range')
+RangeProduct = get_model('offer', 'RangeProduct')
+StockRecord = get_model('partner', 'StockRecord')
+
+
+def _has_site_offers(**offer_filters):
+    return ConditionalOffer.objects.filter(offer_type=ConditionalOffer.SITE, **offer_filters).exists()
+
+
+def _has_site_offers_for_ranges(ranges):
+    return ConditionalOffer.objects.filter(offer_type=ConditionalOffer.SITE).filter(
+        Q(condition__range__in=ranges) | Q(benefit__range__in=ranges)
+    ).exists()
+
+
+@receiver(post_save, sender=StockRecord, dispatch_uid='basket.refresh_anonymous_prices_on_stock_record_save')
+def refresh_anonymous_prices_on_stock_record_save(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Recalculate the cached anonymous totals of a stock record's SKU once its changes are committed. The stock
+    records saved in a transaction are recalculated together.
+    """
+    on_commit_once(refresh_anonymous_prices, [instance.id])
+
+
+@receiver(post_delete, sender=StockRecord, dispatch_uid='basket.delete_anonymous_prices_on_stock_record_delete')
+def delete_anonymous_prices_on_stock_record_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the cached anonymous totals of a deleted stock record's SKU.
+    """
+    on_commit_once(delete_anonymous_prices, [(instance.partner_id, instance.partner_sku)])
+
+
+@receiver(post_save, sender=ConditionalOffer, dispatch_uid='basket.invalidate_anonymous_prices_on_offer_save')
+@receiver(post_delete, sender=ConditionalOffer, dispatch_uid='basket.invalidate_anonymous_prices_on_offer_delete')
+@receiver(post_save, sender=Condition, dispatch_uid='basket.invalidate_anonymous_prices_on_condition_save')
+@receiver(post_delete, sender=Condition, dispatch_uid='basket.invalidate_anonymous_prices_on_condition_delete')
+@receiver(post_save, sender=Benefit, dispatch_uid='basket.invalidate_anonymous_prices_on_benefit_save')
+@receiver(post_delete, sender=Benefit, dispatch_uid='basket.invalidate_anonymous_prices_on_benefit_delete')
+@receiver(post_save, sender=Range, dispatch_uid='basket.invalidate_anonymous_prices_on_range_save')
+@receiver(post_delete, sender=Range, dispatch_uid='basket.invalidate_anonymous_prices_on_range_delete')
+@receiver(post_save, sender=RangeProduct, dispatch_uid='basket.invalidate_anonymous_prices_on_range_product_save')
+@receiver(post_delete, sender=RangeProduct, dispatch_uid='basket.invalidate_anonymous_prices_on_range_product_delete')
+@receiver(m2m_changed, sender=Range.classes.through,
+          dispatch_uid='basket.invalidate_anonymous_prices_on_range_classes_change')
+@receiver(m2m_changed, sender=Range.included_categories.through,
+          dispatch_uid='basket.invalidate_anonymous_prices_on_range_categories_change')
+@receiver(m2m_changed, sender=Range.excluded_products.through,
+          dispatch_uid='basket.invalidate_anonymous_prices_on_range_excluded_products_change')
+@receiver(m2m_changed, sender=Catalog.stock_records.through,
+          dispatch_uid='basket.invalidate_anonymous_prices_on_catalog_stock_records_change')
+def invalidate_anonymous_prices_on_offer_change(sender, instance, **kwargs):
+    """
+    Invalidate the cached anonymous totals, once the changes are committed, when a site offer, or the
+    condition, benefit or range of a site offer, changes.
+
+    Voucher offers do not apply to anonymous baskets, so their changes, e.g. when coupons are created,
+    keep the cached totals. So do orders recording their use of a site offer.
+    """
+    if not kwargs.get('action', 'post_').startswith('post_'):
+        return
+
+    if sender is ConditionalOffer:
+        is_site_offer_change = (
+            instance.offer_type == ConditionalOffer.SITE and not is_offer_usage_update(kwargs.get('update_fields'))
+        )
+    elif sender is Condition:
+        is_site_offer_change = _has_site_offers(condition=instance)
+    elif sender is Benefit:
+        is_site_offer_change = _has_site_offers(benefit=instance)
+    elif sender is RangeProduct:
+        is_site_offer_change = _has_site_offers_for_ranges([instance.range_id])
+    elif sender is Range:
+        is_site_offer_change = _has_site_offers_for_ranges([instance.id])
+    else:
+        # The relation changed from the side of the related objects when reverse is set. The IDs
+        # of the related objects are unknown when all of them are removed.
+        ids = kwargs['pk_set'] if kwargs['reverse'] else [instance.id]
+        if ids is None:
+            is_site_offer_change = True
+        elif sender is Catalog.stock_records.through:
+            is_site_offer_change = _has_site_offers_for_ranges(Range.objects.filter(catalog_id__in=ids))
+        else:
+            is_site_offer_change = _has_site_offers_for_ranges(ids)
+
+    if is_site_offer_change:
+        on_commit_once(_invalidate_anonymous_prices)
+
+
+def _invalidate_anonymous_prices(__):
+    invalidate_anonymous_prices()
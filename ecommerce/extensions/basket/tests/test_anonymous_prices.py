@@ -0,0 +1,172 @@
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+from decimal import Decimal
+
+import mock
+from django.urls import reverse
+from django.utils import timezone
+from edx_django_utils.cache import TieredCache
+from oscar.core.loading import get_model
+from oscar.test import factories
+
+from ecommerce.core.constants import COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME, SEAT_PRODUCT_CLASS_NAME
+from ecommerce.extensions.api.v2.views.baskets import BasketCalculateView
+from ecommerce.extensions.basket import anonymous_prices
+from ecommerce.extensions.basket.anonymous_prices import (
+    get_anonymous_price_cache_key,
+    get_anonymous_prices_generation,
+    get_warmable_skus,
+    warm_anonymous_prices
+)
+from ecommerce.tests.factories import ProductFactory
+from ecommerce.tests.testcases import TestCase
+
+Benefit = get_model('offer', 'Benefit')
+Condition = get_model('offer', 'Condition')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+ProductClass = get_model('catalogue', 'ProductClass')
+
+
+class AnonymousPricesTests(TestCase):
+    def setUp(self):
+        super(AnonymousPricesTests, self).setUp()
+        # The cached totals are updated once changes are committed, which test transactions never are.
+        patcher = mock.patch('ecommerce.core.utils.transaction.on_commit', side_effect=lambda func: func())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.seat_class = ProductClass.objects.get(name=SEAT_PRODUCT_CLASS_NAME)
+        self.seats = ProductFactory.create_batch(2, product_class=self.seat_class, stockrecords__partner=self.partner)
+        self.skus = [seat.stockrecords.first().partner_sku for seat in self.seats]
+
+    def get_cached_totals(self, sku):
+        cached_response = TieredCache.get_cached_response(get_anonymous_price_cache_key(self.site, [sku]))
+        return cached_response.value if cached_response.is_found else None
+
+    def get_expected_totals(self, product):
+        price = product.stockrecords.first().price_excl_tax
+        return {'total_incl_tax_excl_discounts': price, 'total_incl_tax': price, 'currency': 'GBP'}
+
+    def create_site_offer(self):
+        offer_range = factories.RangeFactory(includes_all_products=True)
+        return factories.ConditionalOfferFactory(
+            offer_type=ConditionalOffer.SITE,
+            benefit=factories.BenefitFactory(type=Benefit.PERCENTAGE, range=offer_range, value=10),
+            condition=factories.ConditionFactory(type=Condition.COUNT, range=offer_range, value=1),
+        )
+
+    def test_get_warmable_skus(self):
+        """ Verify the SKUs of the active seats and entitlements of the site's partner are warmed. """
+        entitlement = ProductFactory(
+            product_class=ProductClass.objects.get(name=COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME),
+            stockrecords__partner=self.partner
+        )
+        ProductFactory(
+            product_class=self.seat_class,
+            stockrecords__partner=self.partner,
+            expires=timezone.now() - datetime.timedelta(days=1)
+        )
+        ProductFactory(stockrecords__partner=self.partner)
+        ProductFactory(product_class=self.seat_class, stockrecords__partner=factories.PartnerFactory())
+
+        self.assertEqual(
+            get_warmable_skus(self.site),
+            sorted(self.skus + [entitlement.stockrecords.first().partner_sku])
+        )
+
+    def test_warm_anonymous_prices(self):
+        """ Verify the totals are cached where the basket calculate endpoint reads them. """
+        self.create_site_offer()
+
+        self.assertEqual(warm_anonymous_prices(self.site, self.skus), 2)
+
+        user = self.create_user()
+        self.client.login(username=user.username, password=self.password)
+        for seat in self.seats:
+            sku = seat.stockrecords.first().partner_sku
+            with mock.patch.object(BasketCalculateView, '_calculate_temporary_basket') as mock_calculate:
+                response = self.client.get(
+                    reverse('api:v2:baskets:calculate'), {'sku': sku, 'is_anonymous': 'true'}
+                )
+            self.assertFalse(mock_calculate.called)
+            self.assertEqual(response.data, self.get_cached_totals(sku))
+            self.assertLess(response.data['total_incl_tax'], response.data['total_incl_tax_excl_discounts'])
+
+    def test_warm_anonymous_prices_failure(self):
+        """ Verify the SKUs of a batch which fails are calculated one at a time. """
+        calculate_basket_totals = anonymous_prices.calculate_basket_totals
+
+        def calculate_single_basket_totals(request, user, product_groups):
+            if len(product_groups) > 1 or product_groups[0][0] == self.seats[0]:
+                raise ValueError
+            return calculate_basket_totals(request, user, product_groups)
+
+        with mock.patch.object(
+                anonymous_prices, 'calculate_basket_totals', side_effect=calculate_single_basket_totals
+        ):
+            self.assertEqual(warm_anonymous_prices(self.site, self.skus), 1)
+
+        self.assertIsNone(self.get_cached_totals(self.seats[0].stockrecords.first().partner_sku))
+        self.assertEqual(
+            self.get_cached_totals(self.seats[1].stockrecords.first().partner_sku),
+            self.get_expected_totals(self.seats[1])
+        )
+
+    def test_invalidate_on_site_offer_change(self):
+        """ Verify the cached totals are invalidated when site offers change, but not voucher offers. """
+        generation = get_anonymous_prices_generation()
+
+        factories.ConditionalOfferFactory(offer_type=ConditionalOffer.VOUCHER)
+        self.assertEqual(get_anonymous_prices_generation(), generation)
+
+        offer = self.create_site_offer()
+        self.assertNotEqual(get_anonymous_prices_generation(), generation)
+
+        generation = get_anonymous_prices_generation()
+        offer.condition.range.add_product(ProductFactory())
+        self.assertNotEqual(get_anonymous_prices_generation(), generation)
+
+    def test_invalidate_on_excluded_product_change(self):
+        """ Verify the cached totals are invalidated when products are excluded from the range of a site offer. """
+        offer_range = self.create_site_offer().condition.range
+        generation = get_anonymous_prices_generation()
+
+        offer_range.excluded_products.add(self.seats[0])
+        self.assertNotEqual(get_anonymous_prices_generation(), generation)
+
+        generation = get_anonymous_prices_generation()
+        self.seats[1].excludes.add(offer_range)
+        self.assertNotEqual(get_anonymous_prices_generation(), generation)
+
+    def test_offer_usage_keeps_cached_totals(self):
+        """ Verify orders recording their use of a site offer do not invalidate the cached totals. """
+        offer = self.create_site_offer()
+        generation = get_anonymous_prices_generation()
+
+        offer.record_usage({'freq': 1, 'discount': Decimal('1.00')})
+
+        self.assertEqual(get_anonymous_prices_generation(), generation)
+
+    def test_refresh_on_stock_record_change(self):
+        """ Verify the cached totals of a SKU are recalculated when its stock record changes. """
+        warm_anonymous_prices(self.site, self.skus[:1])
+        stock_records = [seat.stockrecords.first() for seat in self.seats]
+        for stock_record in stock_records:
+            stock_record.price_excl_tax += 1
+            stock_record.save()
+
+        self.assertEqual(self.get_cached_totals(self.skus[0]), self.get_expected_totals(self.seats[0]))
+        self.assertIsNone(self.get_cached_totals(self.skus[1]))
+
+        stock_records[0].delete()
+        self.assertIsNone(self.get_cached_totals(self.skus[0]))
+
+    def test_refresh_batched(self):
+        """ Verify the cached totals of the SKUs of several stock records are recalculated together, per site. """
+        warm_anonymous_prices(self.site, self.skus)
+        stock_record_ids = [seat.stockrecords.first().id for seat in self.seats]
+
+        with mock.patch.object(anonymous_prices, 'warm_anonymous_prices') as mock_warm:
+            anonymous_prices.refresh_anonymous_prices(stock_record_ids)
+
+        mock_warm.assert_called_once_with(self.site, sorted(self.skus))
@@ -3,15 +3,20 @@ from __future__ import absolute_import, unicode_literals
 from django.contrib.sites.models import Site
 from django.core.management import CommandError, call_command
 from django.utils.six import StringIO
+from edx_django_utils.cache import TieredCache
 from oscar.core.loading import get_model
 from oscar.test import factories
 from six.moves import range
 
+from ecommerce.core.constants import SEAT_PRODUCT_CLASS_NAME
+from ecommerce.extensions.basket.anonymous_prices import get_anonymous_price_cache_key
 from ecommerce.extensions.test.factories import create_order
 from ecommerce.invoice.models import Invoice
+from ecommerce.tests.factories import ProductFactory, SiteConfigurationFactory
 from ecommerce.tests.testcases import TestCase
 
 Basket = get_model('basket', 'Basket')
+ProductClass = get_model('catalogue', 'ProductClass')
 
 
 class DeleteOrderedBasketsCommandTests(TestCase):
@@ -134,3 +139,36 @@ class AddSiteToBasketsBasketsCommandTests(TestCase):
         """ Verify an error is raised if no site ID is specified. """
         with self.assertRaisesMessage(CommandError, 'A valid Site ID must be specified!'):
             call_command(self.command, commit=False)
+
+
+class WarmAnonymousPricesCommandTests(TestCase):
+    command = 'warm_anonymous_prices'
+
+    def setUp(self):
+        super(WarmAnonymousPricesCommandTests, self).setUp()
+        self.other_site_configuration = SiteConfigurationFactory()
+        self.stock_records = [
+            ProductFactory(
+                product_class=ProductClass.objects.get(name=SEAT_PRODUCT_CLASS_NAME),
+                stockrecords__partner=site_configuration.partner
+            ).stockrecords.first()
+            for site_configuration in (self.site_configuration, self.other_site_configuration)
+        ]
+
+    def assert_cached(self, site, stock_record, is_cached=True):
+        cache_key = get_anonymous_price_cache_key(site, [stock_record.partner_sku])
+        self.assertEqual(TieredCache.get_cached_response(cache_key).is_found, is_cached)
+
+    def test_warm_all_sites(self):
+        """ Verify the totals of the SKUs of every site are cached. """
+        call_command(self.command)
+
+        self.assert_cached(self.site, self.stock_records[0])
+        self.assert_cached(self.other_site_configuration.site, self.stock_records[1])
+
+    def test_warm_site(self):
+        """ Verify only the totals of the SKUs of the given sites are cached. """
+        call_command(self.command, site_domains=[self.site.domain])
+
+        self.assert_cached(self.site, self.stock_records[0])
+        self.assert_cached(self.other_site_configuration.site, self.stock_records[1], is_cached=False)
@@ -7,18 +7,23 @@ import six
 from analytics import Client
 from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
 from oscar.core.loading import get_class, get_model
+from oscar.test import factories
 
 from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.analytics.utils import parse_tracking_context, translate_basket_line_for_segment
 from ecommerce.extensions.api.v2.tests.views.mixins import CatalogMixin
 from ecommerce.extensions.basket.constants import TEMPORARY_BASKET_CACHE_KEY
+from ecommerce.extensions.basket.exceptions import InMemoryBasketQueryError, InMemoryBasketSaveError
 from ecommerce.extensions.basket.models import Basket
 from ecommerce.extensions.basket.tests.mixins import BasketMixin
 from ecommerce.extensions.test.factories import create_basket
-from ecommerce.tests.factories import SiteConfigurationFactory, UserFactory
-from ecommerce.tests.testcases import TransactionTestCase
+from ecommerce.tests.factories import ProductFactory, SiteConfigurationFactory, UserFactory
+from ecommerce.tests.testcases import TestCase, TransactionTestCase
 
 Basket = get_model('basket', 'Basket')
+Default = get_class('partner.strategy', 'Default')
+InMemoryBasket = get_model('basket', 'InMemoryBasket')
+Line = get_model('basket', 'Line')
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
 
 
@@ -200,3 +205,63 @@ class BasketTests(CatalogMixin, BasketMixin, TransactionTestCase):
         seat = course.create_or_update_seat('verified', True, 100)
         basket.add_product(seat)
         return basket
+
+
+class InMemoryBasketTests(TestCase):
+    def setUp(self):
+        super(InMemoryBasketTests, self).setUp()
+        self.basket = InMemoryBasket(owner=self.create_user(), site=self.site)
+        self.basket.strategy = Default()
+
+    def test_add_product(self):
+        """ Verify products are added to lines held in memory. """
+        products = ProductFactory.create_batch(2, stockrecords__partner=self.partner)
+        self.assertTrue(self.basket.is_empty)
+
+        for product in products + products[:1]:
+            self.basket.add_product(product)
+
+        self.assertFalse(self.basket.is_empty)
+        self.assertEqual([line.product for line in self.basket.all_lines()], products)
+        self.assertEqual([line.quantity for line in self.basket.lines.all()], [2, 1])
+        self.assertEqual(self.basket.lines.first().basket, self.basket)
+        self.assertEqual(
+            self.basket.total_excl_tax,
+            sum(product.stockrecords.first().price_excl_tax * quantity for product, quantity in zip(products, (2, 1)))
+        )
+        self.assertFalse(Basket.objects.exists())
+        self.assertFalse(Line.objects.exists())
+
+    def test_vouchers(self):
+        """ Verify vouchers are held in memory. """
+        voucher = factories.VoucherFactory()
+        self.assertFalse(self.basket.contains_a_voucher)
+
+        self.basket.vouchers.add(voucher)
+        self.basket.vouchers.add(voucher)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self.basket.contains_a_voucher)
+            self.assertEqual(list(self.basket.vouchers.all()), [voucher])
+            self.assertEqual(self.basket.vouchers.first(), voucher)
+        self.assertFalse(voucher.basket_set.exists())
+
+    def test_chained_queries(self):
+        """ Verify queries that would need the database raise instead of returning wrong results. """
+        product = ProductFactory(stockrecords__partner=self.partner)
+        self.basket.add_product(product)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.basket.lines.all().count(), 1)
+            self.assertTrue(self.basket.lines.all().exists())
+            with self.assertRaises(InMemoryBasketQueryError):
+                self.basket.lines.filter(product=product)
+            with self.assertRaises(InMemoryBasketQueryError):
+                self.basket.lines.all().filter(product=product).count()
+            with self.assertRaises(InMemoryBasketQueryError):
+                self.basket.vouchers.exclude(code='ABC')
+
+    def test_save(self):
+        """ Verify in-memory baskets cannot be saved. """
+        with self.assertRaises(InMemoryBasketSaveError):
+            self.basket.save()
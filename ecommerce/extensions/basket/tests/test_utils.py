@@ -375,7 +375,7 @@ class BasketUtilsTests(DiscoveryTestMixin, BasketMixin, TestCase):
         course = CourseFactory(partner=self.partner)
         course.create_or_update_seat('verified', False, 10, create_enrollment_code=True)
         enrollment_code = Product.objects.get(product_class__name=ENROLLMENT_CODE_PRODUCT_CLASS_NAME)
-        with mock.patch.object(UserAlreadyPlacedOrder, 'user_already_placed_order', return_value=True):
+        with mock.patch.object(UserAlreadyPlacedOrder, 'get_purchased_product_ids', return_value={enrollment_code.id}):
             basket = prepare_basket(self.request, [enrollment_code])
             self.assertIsNotNone(basket)
 
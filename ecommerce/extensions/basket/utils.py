@@ -29,11 +29,13 @@ Basket = get_model('basket', 'Basket')
 BasketAttribute = get_model('basket', 'BasketAttribute')
 BasketAttributeType = get_model('basket', 'BasketAttributeType')
 BUNDLE = 'bundle_identifier'
+InMemoryBasket = get_model('basket', 'InMemoryBasket')
 ORGANIZATION_ATTRIBUTE_TYPE = 'organization'
 ENTERPRISE_CATALOG_ATTRIBUTE_TYPE = 'enterprise_catalog_uuid'
 StockRecord = get_model('partner', 'StockRecord')
 OrderLine = get_model('order', 'Line')
 Refund = get_model('refund', 'Refund')
+Selector = get_class('partner.strategy', 'Selector')
 Voucher = get_model('voucher', 'Voucher')
 
 logger = logging.getLogger(__name__)
@@ -118,10 +120,13 @@ def prepare_basket(request, products, voucher=None):
             return basket
 
     is_multi_product_basket = len(products) > 1
+    purchased_product_ids = UserAlreadyPlacedOrder.get_purchased_product_ids(
+        user=request.user,
+        products=[product for product in products if not product.is_enrollment_code_product],
+        site=request.site
+    )
     for product in products:
-        if product.is_enrollment_code_product or \
-                not UserAlreadyPlacedOrder.user_already_placed_order(user=request.user,
-                                                                     product=product, site=request.site):
+        if product.is_enrollment_code_product or product.id not in purchased_product_ids:
             basket.add_product(product, 1)
             # Call signal handler to notify listeners that something has been added to the basket
             basket_addition.send(sender=basket_addition, product=product, user=request.user, request=request,
@@ -457,6 +462,53 @@ def apply_offers_on_basket(request, basket):
         Applicator().apply(basket, request.user, request)
 
 
+def calculate_basket_totals(request, user, product_groups, voucher=None):
+    """
+    Calculates the totals of a basket of each group of products, with in-memory baskets which are never saved.
+
+    The strategy and the offers are loaded once and shared by all the baskets.
+
+    Args:
+        request (Request): The request the totals are calculated for. The bundle query param, if any, is
+            used to select the program offers.
+        user (User): The owner of the baskets, or None for anonymous baskets.
+        product_groups (list of list of Product): The products of each basket.
+        voucher (Voucher): Optional voucher to apply to every basket.
+
+    Returns:
+        list of dict: The totals of each basket, in the order of the product groups.
+    """
+    strategy = Selector().strategy(user=user, request=request)
+    baskets = []
+    for products in product_groups:
+        basket = InMemoryBasket(owner=user, site=request.site)
+        basket.strategy = strategy
+        for product in products:
+            basket.add_product(product, 1)
+        if voucher:
+            basket.vouchers.add(voucher)
+        baskets.append(basket)
+
+    # The offers that could apply to any of the baskets are those of a basket holding all their lines.
+    shared_basket = InMemoryBasket(owner=user, site=request.site)
+    shared_basket.lines.add(*[line for basket in baskets for line in basket.all_lines()])
+    if voucher:
+        shared_basket.vouchers.add(voucher)
+
+    applicator = Applicator()
+    offers = applicator.get_offers(shared_basket, user=user, request=request, bundle_id=request.GET.get('bundle'))
+
+    totals = []
+    for basket in baskets:
+        applicator.apply_shared_offers(basket, offers)
+        totals.append({
+            'total_incl_tax_excl_discounts': basket.total_incl_tax_excl_discounts,
+            'total_incl_tax': basket.total_incl_tax,
+            'currency': basket.currency
+        })
+    return totals
+
+
 @newrelic.agent.function_trace()
 def apply_voucher_on_basket_and_check_discount(voucher, request, basket):
     """
@@ -194,11 +194,10 @@ class BasketLogicMixin(object):
             'show_voucher_form': bool(lines),
             'is_enrollment_code_purchase': False
         }
-        # Check if user's country is India to update line sku -mohit741
-        isIndian = False
-        if request and request.user is not None and not request.user.is_anonymous :
-            profile = request.user.account_details(request)
-            isIndian = profile['country'] == 'IN'
+        # Use the sku of the stock record the user's strategy selects, e.g. the INR one for Indian users -mohit741
+        # The strategy is selected from the user's stored country, so this makes no LMS call.
+        user = request.user if request else None
+        strategy = Selector().strategy(request=request, user=user)
         lines_data = []
         for line in lines:
             product = line.product
@@ -224,9 +223,8 @@ class BasketLogicMixin(object):
 
             context_updates['order_details_msg'] = self._get_order_details_message(product)
             context_updates['switch_link_text'], context_updates['partner_sku'] = get_basket_switch_data(product)
-            stocks = product.stockrecords.all()
             line_data.update({
-                'sku': stocks[0].partner_sku if not isIndian and len(stocks) is 1 else stocks[1].partner_sku,
+                'sku': strategy.select_stockrecord(product).partner_sku,
                 'benefit_value': self._get_benefit_value(line),
                 'enrollment_code': product.is_enrollment_code_product,
                 'line': line,
@@ -122,15 +122,16 @@ class MigratedCourse:
 
     def _get_products(self, modes):
         """ Creates/updates course seat products. """
+        seats = []
         for mode in modes:
-            certificate_type = Course.certificate_type_for_mode(mode['slug'])
-            id_verification_required = Course.is_mode_verified(mode['slug'])
-            price = mode['min_price']
             expires = mode.get('expiration_datetime')
-            expires = parse(expires) if expires else None
-            self.course.create_or_update_seat(
-                certificate_type, id_verification_required, price, expires=expires, remove_stale_modes=False
-            )
+            seats.append({
+                'certificate_type': Course.certificate_type_for_mode(mode['slug']),
+                'id_verification_required': Course.is_mode_verified(mode['slug']),
+                'price': mode['min_price'],
+                'expires': parse(expires) if expires else None,
+            })
+        self.course.create_or_update_seats(seats, remove_stale_modes=False)
 
 
 class Command(BaseCommand):
@@ -8,7 +8,9 @@ from django.conf import settings
 from django.db.utils import IntegrityError
 from oscar.core.loading import get_model
 
+from ecommerce.core.cache_utils import PRODUCT_CLASS_CACHE_RESOURCE, ProcessTieredCache
 from ecommerce.core.constants import COUPON_PRODUCT_CLASS_NAME
+from ecommerce.core.utils import get_cache_key
 from ecommerce.extensions.payment.models import EnterpriseContractMetadata
 from ecommerce.extensions.voucher.models import CouponVouchers
 from ecommerce.extensions.voucher.utils import create_vouchers
@@ -118,6 +120,43 @@ def create_coupon_product(
     return coupon_product
 
 
+def get_product_class(name):
+    """
+    Returns the product class with the given name, from a process-wide cache.
+
+    Arguments:
+        name (str): Name of the product class.
+
+    Raises:
+        ProductClass.DoesNotExist: When no product class has the given name.
+    """
+    cache_key = get_cache_key(resource=PRODUCT_CLASS_CACHE_RESOURCE, name=name)
+    cached_response = ProcessTieredCache.get_cached_response(PRODUCT_CLASS_CACHE_RESOURCE, cache_key)
+    if cached_response.is_found:
+        return cached_response.value
+
+    product_class = ProductClass.objects.get(name=name)
+    ProcessTieredCache.set_all_tiers(
+        PRODUCT_CLASS_CACHE_RESOURCE, cache_key, product_class, settings.PRODUCT_CLASS_CACHE_TIMEOUT
+    )
+    return product_class
+
+
+def set_product_attributes(product, attribute_values):
+    """
+    Sets the product's attributes from attribute values which were already read, e.g. prefetched, so that
+    reading the attributes does not query them again.
+
+    Arguments:
+        product (Product)
+        attribute_values (iterable of ProductAttributeValue): All the attribute values of the product, with
+            their attributes.
+    """
+    for value in attribute_values:
+        setattr(product.attr, value.attribute.code, value.value)
+    product.attr.initialised = True
+
+
 def create_coupon_product_and_stockrecord(title, category, partner, price):
     product_class = ProductClass.objects.get(name=COUPON_PRODUCT_CLASS_NAME)
     coupon_product = Product.objects.create(title=title, product_class=product_class)
@@ -30,6 +30,7 @@ logger = logging.getLogger(__name__)
 Basket = get_model('basket', 'Basket')
 BasketAttribute = get_model('basket', 'BasketAttribute')
 BasketAttributeType = get_model('basket', 'BasketAttributeType')
+CouponUsageSummary = get_model('voucher', 'CouponUsageSummary')
 NoShippingRequired = get_class('shipping.methods', 'NoShippingRequired')
 OfferAssignment = get_model('offer', 'OfferAssignment')
 Order = get_model('order', 'Order')
@@ -355,7 +356,8 @@ class EdxOrderPlacementMixin(six.with_metaclass(abc.ABCMeta, OrderPlacementMixin
                 order=order
             ).order_by('-date_created').first()
             assignment.status = OFFER_REDEEMED
-            assignment.save()
+            with CouponUsageSummary.objects.track_usage([voucher.code]):
+                assignment.save()
 
     def create_assignments_for_multi_use_per_customer(self, order):
         """
@@ -381,4 +383,5 @@ class EdxOrderPlacementMixin(six.with_metaclass(abc.ABCMeta, OrderPlacementMixin
                     OfferAssignment(offer=offer, code=voucher.code, user_email=user_email, status=OFFER_ASSIGNED)
                     for __ in range(offer_assignments_available)
                 ]
-                OfferAssignment.objects.bulk_create(assignments)
+                with CouponUsageSummary.objects.track_usage([voucher.code]):
+                    OfferAssignment.objects.bulk_create(assignments)
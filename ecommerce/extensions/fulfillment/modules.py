@@ -9,6 +9,7 @@ import abc
 import datetime
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 
 import requests
@@ -16,7 +17,6 @@ import six
 import waffle
 from django.conf import settings
 from django.urls import reverse
-from edx_rest_api_client.client import EdxRestApiClient
 from oscar.core.loading import get_model
 from requests.exceptions import ConnectionError as ReqConnectionError  # pylint: disable=ungrouped-imports
 from requests.exceptions import Timeout
@@ -29,6 +29,7 @@ from ecommerce.core.constants import (
     HUBSPOT_FORMS_INTEGRATION_ENABLE,
     ISO_8601_FORMAT
 )
+from ecommerce.core.http_pools import get_api_client_session
 from ecommerce.core.url_utils import get_lms_enrollment_api_url, get_lms_entitlement_api_url
 from ecommerce.courses.models import Course
 from ecommerce.courses.utils import mode_for_product
@@ -192,9 +193,7 @@ class EnrollmentFulfillmentModule(BaseFulfillmentModule):
             messages if the LMS user id cannot be found.
     """
 
-    def _post_to_enrollment_api(self, data, user, usage):
-        enrollment_api_url = get_lms_enrollment_api_url()
-        timeout = settings.ENROLLMENT_FULFILLMENT_TIMEOUT
+    def _get_enrollment_api_headers(self, user, usage):
         headers = {
             'Content-Type': 'application/json',
             'X-Edx-Api-Key': settings.EDX_API_KEY
@@ -208,8 +207,47 @@ class EnrollmentFulfillmentModule(BaseFulfillmentModule):
         if ip:
             headers['X-Forwarded-For'] = ip
 
+        return headers
+
+    def _post_to_enrollment_api(self, data, user, usage):
+        enrollment_api_url = get_lms_enrollment_api_url()
+        timeout = settings.ENROLLMENT_FULFILLMENT_TIMEOUT
+        headers = self._get_enrollment_api_headers(user, usage)
+
         return requests.post(enrollment_api_url, data=json.dumps(data), headers=headers, timeout=timeout)
 
+    def _post_enrollments_concurrently(self, enrollments, user, usage, pool_size):
+        """ POST the data of several enrollments to the enrollment API with a bounded thread pool.
+
+        All requests use the connection pool shared by the LMS API clients. The URL and headers are
+        resolved up front since the worker threads have neither the current request nor database access.
+        A network error or time out is returned in place of the response of the request that failed.
+
+        Arguments:
+            enrollments (list of dict): Enrollments with the POST data under 'data'.
+            user (User): The user being enrolled.
+            usage (string): A description of why data is being posted to the enrollment API.
+            pool_size (int): Maximum number of requests in flight.
+
+        Returns:
+            list: The responses, in the same order as `enrollments`.
+        """
+        enrollment_api_url = get_lms_enrollment_api_url()
+        timeout = settings.ENROLLMENT_FULFILLMENT_TIMEOUT
+        headers = self._get_enrollment_api_headers(user, usage)
+
+        with get_api_client_session(enrollment_api_url) as session:
+            def post(enrollment):
+                try:
+                    return session.post(
+                        enrollment_api_url, data=json.dumps(enrollment['data']), headers=headers, timeout=timeout
+                    )
+                except (ReqConnectionError, Timeout) as exc:
+                    return exc
+
+            with ThreadPoolExecutor(max_workers=pool_size) as executor:
+                return list(executor.map(post, enrollments))
+
     def _add_enterprise_data_to_enrollment_api_post(self, data, order):
         """ Augment enrollment api POST data with enterprise specific data.
 
@@ -341,6 +379,55 @@ class EnrollmentFulfillmentModule(BaseFulfillmentModule):
         line.effective_contract_discounted_price = enterprise_customer_cost
         line.save()
 
+    def _handle_enrollment_api_response(self, order, enrollment, response):
+        """ Set the status of an enrollment's line from the enrollment API response.
+
+        Arguments:
+            order (Order): The order being fulfilled.
+            enrollment (dict): The line, mode, course_key and provider of the enrollment.
+            response (Response or RequestException): The enrollment API response, or the network
+                error or time out that occurred instead.
+        """
+        line = enrollment['line']
+        if isinstance(response, ReqConnectionError):
+            logger.error(
+                "Unable to fulfill line [%d] of order [%s] due to a network problem", line.id, order.number
+            )
+            order.notes.create(message='Fulfillment of order failed due to a network problem.', note_type='Error')
+            line.set_status(LINE.FULFILLMENT_NETWORK_ERROR)
+        elif isinstance(response, Timeout):
+            logger.error(
+                "Unable to fulfill line [%d] of order [%s] due to a request time out", line.id, order.number
+            )
+            order.notes.create(message='Fulfillment of order failed due to a request time out.', note_type='Error')
+            line.set_status(LINE.FULFILLMENT_TIMEOUT_ERROR)
+        elif response.status_code == status.HTTP_200_OK:
+            line.set_status(LINE.COMPLETE)
+
+            audit_log(
+                'line_fulfilled',
+                order_line_id=line.id,
+                order_number=order.number,
+                product_class=line.product.get_product_class().name,
+                course_id=enrollment['course_key'],
+                mode=enrollment['mode'],
+                user_id=order.user.id,
+                credit_provider=enrollment['provider'],
+            )
+        else:
+            try:
+                data = response.json()
+                reason = data.get('message')
+            except Exception:  # pylint: disable=broad-except
+                reason = '(No detail provided.)'
+
+            logger.error(
+                "Fulfillment of line [%d] on order [%s] failed with status code [%d]: %s",
+                line.id, order.number, response.status_code, reason
+            )
+            order.notes.create(message=reason, note_type='Error')
+            line.set_status(LINE.FULFILLMENT_SERVER_ERROR)
+
     def fulfill_product(self, order, lines, email_opt_in=False):
         """ Fulfills the purchase of a 'seat' by enrolling the associated student.
 
@@ -372,6 +459,7 @@ class EnrollmentFulfillmentModule(BaseFulfillmentModule):
 
             return order, lines
 
+        enrollments = []
         for line in lines:
             try:
                 mode = mode_for_product(line.product)
@@ -414,52 +502,35 @@ class EnrollmentFulfillmentModule(BaseFulfillmentModule):
                         'value': provider
                     }
                 )
+            enrollment = {'line': line, 'mode': mode, 'course_key': course_key, 'provider': provider, 'data': data}
             try:
                 self._add_enterprise_data_to_enrollment_api_post(data, order)
                 self._update_orderline_with_enterprise_discount_metadata(order, line)
+            except (ReqConnectionError, Timeout) as exc:
+                self._handle_enrollment_api_response(order, enrollment, exc)
+                continue
+            enrollments.append(enrollment)
 
-                # Post to the Enrollment API. The LMS will take care of posting a new EnterpriseCourseEnrollment to
-                # the Enterprise service if the user+course has a corresponding EnterpriseCustomerUser.
-                response = self._post_to_enrollment_api(data, user=order.user, usage='fulfill enrollment')
-
-                if response.status_code == status.HTTP_200_OK:
-                    line.set_status(LINE.COMPLETE)
-
-                    audit_log(
-                        'line_fulfilled',
-                        order_line_id=line.id,
-                        order_number=order.number,
-                        product_class=line.product.get_product_class().name,
-                        course_id=course_key,
-                        mode=mode,
-                        user_id=order.user.id,
-                        credit_provider=provider,
-                    )
-                else:
-                    try:
-                        data = response.json()
-                        reason = data.get('message')
-                    except Exception:  # pylint: disable=broad-except
-                        reason = '(No detail provided.)'
-
-                    logger.error(
-                        "Fulfillment of line [%d] on order [%s] failed with status code [%d]: %s",
-                        line.id, order.number, response.status_code, reason
+        pool_size = order.site.siteconfiguration.enrollment_fulfillment_pool_size if order.site else 1
+        if pool_size > 1 and len(enrollments) > 1:
+            # Database access stays on this thread; only the enrollment API requests are sent concurrently.
+            responses = self._post_enrollments_concurrently(
+                enrollments, order.user, 'fulfill enrollment', min(pool_size, len(enrollments))
+            )
+            for enrollment, response in zip(enrollments, responses):
+                self._handle_enrollment_api_response(order, enrollment, response)
+        else:
+            for enrollment in enrollments:
+                try:
+                    # Post to the Enrollment API. The LMS will take care of posting a new EnterpriseCourseEnrollment
+                    # to the Enterprise service if the user+course has a corresponding EnterpriseCustomerUser.
+                    response = self._post_to_enrollment_api(
+                        enrollment['data'], user=order.user, usage='fulfill enrollment'
                     )
-                    order.notes.create(message=reason, note_type='Error')
-                    line.set_status(LINE.FULFILLMENT_SERVER_ERROR)
-            except ReqConnectionError:
-                logger.error(
-                    "Unable to fulfill line [%d] of order [%s] due to a network problem", line.id, order.number
-                )
-                order.notes.create(message='Fulfillment of order failed due to a network problem.', note_type='Error')
-                line.set_status(LINE.FULFILLMENT_NETWORK_ERROR)
-            except Timeout:
-                logger.error(
-                    "Unable to fulfill line [%d] of order [%s] due to a request time out", line.id, order.number
-                )
-                order.notes.create(message='Fulfillment of order failed due to a request time out.', note_type='Error')
-                line.set_status(LINE.FULFILLMENT_TIMEOUT_ERROR)
+                except (ReqConnectionError, Timeout) as exc:
+                    response = exc
+                self._handle_enrollment_api_response(order, enrollment, response)
+
         logger.info("Finished fulfilling 'Seat' product types for order [%s]", order.number)
         return order, lines
 
@@ -881,9 +952,8 @@ class CourseEntitlementFulfillmentModule(BaseFulfillmentModule):
             try:
                 entitlement_option = Option.objects.get(code='course_entitlement')
 
-                entitlement_api_client = EdxRestApiClient(
-                    get_lms_entitlement_api_url(),
-                    jwt=order.site.siteconfiguration.access_token
+                entitlement_api_client = order.site.siteconfiguration.build_api_client(
+                    get_lms_entitlement_api_url()
                 )
 
                 # POST to the Entitlement API.
@@ -924,9 +994,8 @@ class CourseEntitlementFulfillmentModule(BaseFulfillmentModule):
             entitlement_option = Option.objects.get(code='course_entitlement')
             course_entitlement_uuid = line.attributes.get(option=entitlement_option).value
 
-            entitlement_api_client = EdxRestApiClient(
-                get_lms_entitlement_api_url(),
-                jwt=line.order.site.siteconfiguration.access_token
+            entitlement_api_client = line.order.site.siteconfiguration.build_api_client(
+                get_lms_entitlement_api_url()
             )
 
             # DELETE to the Entitlement API.
@@ -9,6 +9,7 @@ from decimal import Decimal
 import ddt
 import httpretty
 import mock
+import requests
 from django.conf import settings
 from django.test import override_settings
 from oscar.core.loading import get_class, get_model
@@ -338,6 +339,54 @@ class EnrollmentFulfillmentModuleTests(ProgramTestMixin, DiscoveryTestMixin, Ful
         EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
         self.assertEqual(LINE.FULFILLMENT_SERVER_ERROR, self.order.lines.all()[0].status)
 
+    def test_enrollment_module_fulfill_concurrently(self):
+        """Test that the lines of an order are fulfilled concurrently when the site allows it."""
+        self.site_configuration.enrollment_fulfillment_pool_size = 3
+        self.site_configuration.save()
+        basket = factories.BasketFactory(owner=self.user, site=self.site)
+        for course_id in ('edX/DemoX/Course_1', 'edX/DemoX/Course_2', 'edX/DemoX/Failing_Course'):
+            course = CourseFactory(id=course_id, partner=self.partner)
+            basket.add_product(course.create_or_update_seat(self.certificate_type, False, 100), 1)
+        order = create_order(number=3, basket=basket, user=self.user)
+
+        def post(_url, data, **_kwargs):
+            # The response depends only on the course of the request, whichever thread sends it, and in any order.
+            response = requests.Response()
+            if json.loads(data)['course_details']['course_id'] == 'edX/DemoX/Failing_Course':
+                response.status_code, content = 500, b'{"message": "Oops!"}'
+            else:
+                response.status_code, content = 200, b'{}'
+            response._content = content  # pylint: disable=protected-access
+            return response
+
+        with mock.patch('requests.Session.post', side_effect=post) as post_mock:
+            __, lines = EnrollmentFulfillmentModule().fulfill_product(order, list(order.lines.all()))
+
+        self.assertEqual(post_mock.call_count, 3)
+        self.assertEqual(
+            {line.product.attr.course_key: line.status for line in lines},
+            {
+                'edX/DemoX/Course_1': LINE.COMPLETE,
+                'edX/DemoX/Course_2': LINE.COMPLETE,
+                'edX/DemoX/Failing_Course': LINE.FULFILLMENT_SERVER_ERROR,
+            }
+        )
+        self.assertEqual([note.message for note in order.notes.all()], ['Oops!'])
+
+    @mock.patch('requests.Session.post', mock.Mock(side_effect=Timeout))
+    def test_enrollment_module_fulfill_concurrently_request_timeout(self):
+        """Test that lines receive a timeout error status if a concurrent fulfillment request times out."""
+        self.site_configuration.enrollment_fulfillment_pool_size = 2
+        self.site_configuration.save()
+        basket = factories.BasketFactory(owner=self.user, site=self.site)
+        basket.add_product(self.seat, 1)
+        course = CourseFactory(id='edX/DemoX/Course_1', partner=self.partner)
+        basket.add_product(course.create_or_update_seat(self.certificate_type, False, 100), 1)
+        order = create_order(number=3, basket=basket, user=self.user)
+
+        __, lines = EnrollmentFulfillmentModule().fulfill_product(order, list(order.lines.all()))
+        self.assertEqual([line.status for line in lines], [LINE.FULFILLMENT_TIMEOUT_ERROR] * 2)
+
     @httpretty.activate
     def test_revoke_product(self):
         """ The method should call the Enrollment API to un-enroll the student, and return True. """
@@ -0,0 +1,149 @@
+"""
+Index of the site offers that could apply to a product.
+
+Site offers are conditioned on a range of products. Evaluating every site offer against every basket
+gets slower as offers accumulate, and evaluating dynamic ranges may call the Discovery or Enterprise
+services. The index maps product and product class IDs to the site offers whose condition range can
+contain them, so the applicator only evaluates offers that could match the basket's lines. Offers whose
+range membership cannot be resolved from the database are always candidates.
+"""
+from __future__ import absolute_import
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.timezone import now
+from oscar.core.loading import get_model
+
+from ecommerce.core.cache_utils import OFFER_INDEX_CACHE_RESOURCE, ProcessTieredCache
+
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+Range = get_model('offer', 'Range')
+RangeProduct = get_model('offer', 'RangeProduct')
+StockRecord = get_model('partner', 'StockRecord')
+
+OFFER_INDEX_CACHE_KEY = 'offer.applicability_index'
+
+
+def _is_indexable(offer):
+    """
+    Returns True if the offer's condition is only satisfied by basket lines whose products
+    are included in the condition range through products, product classes or a catalog.
+    """
+    condition = offer.condition
+    condition_range = condition.range
+    if condition.proxy_class or condition_range is None:
+        return False
+
+    benefit_range = offer.benefit.range
+    if benefit_range and benefit_range.catalog_query:
+        # ConditionalOffer.is_condition_satisfied checks the benefit range against the Discovery Service.
+        return False
+
+    return not any([
+        condition_range.proxy_class,
+        condition_range.includes_all_products,
+        condition_range.catalog_query,
+        condition_range.course_catalog,
+        condition_range.enterprise_customer,
+    ])
+
+
+def build_offer_applicability_index():
+    """
+    Builds the applicability index of open site offers that have not expired.
+
+    Returns:
+        dict: The IDs of offers that are always candidates under 'all', and the IDs of offers
+            keyed by the product IDs and product class IDs their condition range includes.
+    """
+    offers = ConditionalOffer.objects.filter(
+        Q(end_datetime__gte=now()) | Q(end_datetime=None),
+        offer_type=ConditionalOffer.SITE,
+        status=ConditionalOffer.OPEN,
+        condition__program_uuid__isnull=True,
+        condition__enterprise_customer_uuid__isnull=True,
+    ).select_related('condition__range', 'benefit__range')
+
+    index = {'all': set(), 'products': defaultdict(set), 'classes': defaultdict(set)}
+    offer_ids_by_range = defaultdict(set)
+    catalog_ids_by_range = {}
+    for offer in offers:
+        if _is_indexable(offer):
+            condition_range = offer.condition.range
+            offer_ids_by_range[condition_range.id].add(offer.id)
+            if condition_range.catalog_id:
+                catalog_ids_by_range[condition_range.id] = condition_range.catalog_id
+        else:
+            index['all'].add(offer.id)
+
+    range_ids = list(offer_ids_by_range)
+    # Oscar also includes products in the categories of a range, which are not indexed.
+    for range_id in Range.included_categories.through.objects.filter(
+            range_id__in=range_ids).values_list('range_id', flat=True).distinct():
+        index['all'].update(offer_ids_by_range.pop(range_id))
+
+    for range_id, product_id in RangeProduct.objects.filter(
+            range_id__in=range_ids).values_list('range_id', 'product_id'):
+        index['products'][product_id].update(offer_ids_by_range.get(range_id, ()))
+
+    for range_id, product_class_id in Range.classes.through.objects.filter(
+            range_id__in=range_ids).values_list('range_id', 'productclass_id'):
+        index['classes'][product_class_id].update(offer_ids_by_range.get(range_id, ()))
+
+    if catalog_ids_by_range:
+        range_ids_by_catalog = defaultdict(set)
+        for range_id, catalog_id in catalog_ids_by_range.items():
+            range_ids_by_catalog[catalog_id].add(range_id)
+
+        for catalog_id, product_id in StockRecord.objects.filter(
+                catalogs__in=list(range_ids_by_catalog)).values_list('catalogs', 'product_id'):
+            for range_id in range_ids_by_catalog[catalog_id]:
+                index['products'][product_id].update(offer_ids_by_range.get(range_id, ()))
+
+    index['products'] = dict(index['products'])
+    index['classes'] = dict(index['classes'])
+    return index
+
+
+def get_offer_applicability_index():
+    """
+    Returns the cached applicability index, building it on a cache miss.
+    """
+    cached_response = ProcessTieredCache.get_cached_response(OFFER_INDEX_CACHE_RESOURCE, OFFER_INDEX_CACHE_KEY)
+    if cached_response.is_found:
+        return cached_response.value
+
+    index = build_offer_applicability_index()
+    ProcessTieredCache.set_all_tiers(
+        OFFER_INDEX_CACHE_RESOURCE, OFFER_INDEX_CACHE_KEY, index, settings.OFFER_INDEX_CACHE_TIMEOUT
+    )
+    return index
+
+
+def invalidate_offer_applicability_index():
+    """
+    Drops the applicability index from every cache tier so that it is rebuilt on next use.
+    """
+    ProcessTieredCache.delete_all_tiers(OFFER_INDEX_CACHE_RESOURCE, OFFER_INDEX_CACHE_KEY)
+
+
+def get_candidate_offer_ids(products):
+    """
+    Returns the IDs of the site offers that could apply to a basket containing the given products.
+
+    Args:
+        products (iterable of Product)
+
+    Returns:
+        set: Offer IDs.
+    """
+    index = get_offer_applicability_index()
+    offer_ids = set(index['all'])
+    for product in products:
+        # Ranges that include a parent product also include its children.
+        for product_id in (product.id, product.parent_id):
+            offer_ids.update(index['products'].get(product_id, ()))
+        offer_ids.update(index['classes'].get(product.get_product_class().id, ()))
+    return offer_ids
@@ -7,6 +7,7 @@ from oscar.apps.offer.applicator import Applicator as OscarApplicator
 from oscar.core.loading import get_model
 
 from ecommerce.enterprise.utils import get_enterprise_id_for_user
+from ecommerce.extensions.offer.applicability import get_candidate_offer_ids
 
 logger = logging.getLogger(__name__)
 BUNDLE = 'bundle_identifier'
@@ -48,14 +49,14 @@ class Applicator(OscarApplicator):
         basket. As an example, if the basket has a bundle ID or an enterprise customer
         UUID, gets only the site offers associated with that specific bundle or enterprise
         customer, rather than all site offers. Otherwise, gets the site offers not associated
-        with a bundle.
+        with a bundle whose condition could match the basket's lines.
 
         Returns:
             list of Offer: A sorted list of all the offers that apply to the basket.
         """
         program_offers = self._get_program_offers(basket, bundle_id)
         enterprise_offers = self._get_enterprise_offers(basket.site, user)
-        site_offers = [] if program_offers or enterprise_offers else self.get_site_offers()
+        site_offers = [] if program_offers or enterprise_offers else self.get_site_offers(basket)
 
         basket_offers = self.get_basket_offers(basket, user)
 
@@ -72,12 +73,39 @@ class Applicator(OscarApplicator):
             )
         )
 
-    def get_site_offers(self):
+    def apply_shared_offers(self, basket, offers):
+        """
+        Apply offers loaded once for several baskets to one of them.
+
+        The offers are those get_offers returns for a basket containing the products of all the baskets,
+        e.g. when pricing several groups of products in one request. Site offers that could never apply
+        to the given basket are skipped, as get_offers would have done for the basket alone.
+
+        Args:
+            basket (Basket): The basket to apply the offers to.
+            offers (list of Offer): The offers returned by get_offers, in priority order.
+        """
+        ConditionalOffer = get_model('offer', 'ConditionalOffer')
+        candidate_offer_ids = get_candidate_offer_ids([line.product for line in basket.all_lines()])
+        self.apply_offers(basket, [
+            offer for offer in offers
+            if offer.id in candidate_offer_ids or not (
+                offer.offer_type == ConditionalOffer.SITE and
+                offer.condition.program_uuid is None and
+                offer.condition.enterprise_customer_uuid is None
+            )
+        ])
+
+    def get_site_offers(self, basket=None):  # pylint: disable=arguments-differ
         """
         Return other site offers that are available to baskets without bundle ids or
         enterprise customer UUIDs.
 
         Excludes: Bundle and Enterprise offers.
+
+        Args:
+            basket (Basket): (Optional) If given, only the offers the offer applicability index
+                lists as candidates for the basket's products are returned.
         """
         ConditionalOffer = get_model('offer', 'ConditionalOffer')
         qs = ConditionalOffer.active.filter(
@@ -85,8 +113,33 @@ class Applicator(OscarApplicator):
             condition__program_uuid__isnull=True,
             condition__enterprise_customer_uuid__isnull=True,
         )
+        if basket is not None:
+            products = [line.product for line in basket.all_lines()]
+            qs = qs.filter(id__in=get_candidate_offer_ids(products))
         return qs.select_related('condition', 'benefit')
 
+    def get_basket_offers(self, basket, user):
+        """
+        Return basket-linked offers such as those associated with a voucher code.
+
+        Unlike Oscar's implementation, the vouchers of in-memory baskets, which are never saved, are considered.
+        """
+        if basket.id is not None:
+            return super(Applicator, self).get_basket_offers(basket, user)
+
+        offers = []
+        if not user or not basket.contains_a_voucher:
+            return offers
+
+        for voucher in basket.vouchers.all():
+            available_to_user, __ = voucher.is_available_to_user(user=user)
+            if voucher.is_active() and available_to_user:
+                basket_offers = voucher.offers.all()
+                for offer in basket_offers:
+                    offer.set_voucher(voucher)
+                offers = list(chain(offers, basket_offers))
+        return offers
+
     def _get_enterprise_offers(self, site, user):
         """
         Return enterprise offers filtered by the user's enterprise, if it exists.
@@ -116,11 +169,15 @@ class Applicator(OscarApplicator):
         BasketAttributeType = get_model('basket', 'BasketAttributeType')
         ConditionalOffer = get_model('offer', 'ConditionalOffer')
 
-        bundle_attributes = BasketAttribute.objects.filter(
-            basket=basket,
-            attribute_type=BasketAttributeType.objects.get(name=BUNDLE)
-        )
-        program_uuid = bundle_id if bundle_attributes.count() == 0 else bundle_attributes.first().value_text
+        program_uuid = bundle_id
+        if basket.id is not None:
+            # Unsaved baskets, such as in-memory ones, have no attributes.
+            bundle_attributes = BasketAttribute.objects.filter(
+                basket=basket,
+                attribute_type=BasketAttributeType.objects.get(name=BUNDLE)
+            )
+            if bundle_attributes.count() != 0:
+                program_uuid = bundle_attributes.first().value_text
         if program_uuid:
             offers = ConditionalOffer.active.filter(
                 offer_type=ConditionalOffer.SITE, condition__program_uuid=program_uuid
@@ -9,6 +9,9 @@ OFFER_ASSIGNMENT_REVOKED = 'REVOKED'
 
 OFFER_MAX_USES_DEFAULT = 10000
 
+# Fields of a ConditionalOffer which record its usage by orders, rather than what it applies to.
+OFFER_USAGE_FIELDS = ('num_applications', 'num_orders', 'total_discount')
+
 # Coupon code filters
 VOUCHER_NOT_ASSIGNED = 'unassigned'
 VOUCHER_NOT_REDEEMED = 'unredeemed'
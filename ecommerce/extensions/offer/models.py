@@ -23,13 +23,15 @@ from simple_history.models import HistoricalRecords
 from slumber.exceptions import SlumberBaseException
 from threadlocals.threadlocals import get_current_request
 
+from ecommerce.core.cache_utils import get_many_cached_responses
 from ecommerce.core.utils import get_cache_key, log_message_and_raise_validation_error
 from ecommerce.extensions.offer.constants import (
     OFFER_ASSIGNED,
     OFFER_ASSIGNMENT_EMAIL_BOUNCED,
     OFFER_ASSIGNMENT_EMAIL_PENDING,
     OFFER_ASSIGNMENT_REVOKED,
-    OFFER_REDEEMED
+    OFFER_REDEEMED,
+    OFFER_USAGE_FIELDS
 )
 
 OFFER_PRIORITY_ENTERPRISE = 10
@@ -181,6 +183,24 @@ class ConditionalOffer(AbstractConditionalOffer):
         self.clean()
         super(ConditionalOffer, self).save(*args, **kwargs)  # pylint: disable=bad-super-call
 
+    def record_usage(self, discount):
+        """
+        Records the use of the offer by an order.
+
+        Only the usage counters, and the status when the offer is consumed, are saved, so that the receivers of
+        the post_save signal can tell an order's use of the offer from a change to the offer.
+        """
+        status = self.status
+        self.num_applications += discount['freq']
+        self.total_discount += discount['discount']
+        self.num_orders += 1
+        # The status is set as save() sets it, to know whether it changes.
+        if not self.is_suspended:
+            self.status = self.CONSUMED if self.get_max_applications() == 0 else self.OPEN
+        update_fields = OFFER_USAGE_FIELDS if self.status == status else OFFER_USAGE_FIELDS + ('status',)
+        self.save(update_fields=update_fields)
+    record_usage.alters_data = True
+
     def clean(self):
         self.clean_email_domains()
         self.clean_max_global_applications()  # Our frontend uses the name max_uses instead of max_global_applications
@@ -312,6 +332,11 @@ class ConditionalOffer(AbstractConditionalOffer):
 
             return is_satisfied
 
+        condition_range = self.condition.range
+        if condition_range and condition_range.course_catalog:
+            # Look up the course catalog membership of all lines at once instead of once per line.
+            condition_range.prefetch_catalog_membership([line.product for line in basket.all_lines()])
+
         return super(ConditionalOffer, self).is_condition_satisfied(basket)  # pylint: disable=bad-super-call
 
 
@@ -404,39 +429,101 @@ class Range(AbstractRange):
         if self.course_seat_types:
             validate_credit_seat_type(self.course_seat_types)
 
-    def catalog_contains_product(self, product):
-        """
-        Retrieve the results from using the catalog contains endpoint for
-        catalog service for the catalog id contained in field "course_catalog".
-        """
-        request = get_current_request()
-        partner_code = request.site.siteconfiguration.partner.short_code
-        cache_key = get_cache_key(
-            site_domain=request.site.domain,
-            partner_code=partner_code,
+    def _get_catalog_contains_cache_key(self, site, course_id):
+        return get_cache_key(
+            site_domain=site.domain,
+            partner_code=site.siteconfiguration.partner.short_code,
             resource='catalogs.contains',
-            course_id=product.course_id,
+            course_id=course_id,
             catalog_id=self.course_catalog
         )
-        cached_response = TieredCache.get_cached_response(cache_key)
-        if cached_response.is_found:
-            return cached_response.value
+
+    def catalog_contains_products(self, products):
+        """
+        Retrieve, for several products at once, whether the catalog in field "course_catalog"
+        contains their course runs. Cached results are read with a single multi-get and all
+        cache misses are resolved with a single request to the catalog contains endpoint.
+
+        Returns:
+            dict: Whether the catalog contains each course run, keyed by course run ID.
+        """
+        request = get_current_request()
+        cache_keys = {
+            product.course_id: self._get_catalog_contains_cache_key(request.site, product.course_id)
+            for product in products
+        }
+        cached_responses = get_many_cached_responses(cache_keys.values())
+
+        contains = {}
+        uncached_course_run_ids = []
+        for course_run_id, cache_key in cache_keys.items():
+            cached_response = cached_responses[cache_key]
+            if cached_response.is_found:
+                contains[course_run_id] = cached_response.value['courses'][course_run_id]
+            else:
+                uncached_course_run_ids.append(course_run_id)
+
+        if not uncached_course_run_ids:
+            return contains
 
         discovery_api_client = request.site.siteconfiguration.discovery_api_client
         try:
             # GET: /api/v1/catalogs/{catalog_id}/contains?course_run_id={course_run_ids}
             response = discovery_api_client.catalogs(self.course_catalog).contains.get(
-                course_run_id=product.course_id
+                course_run_id=','.join(sorted(uncached_course_run_ids))
             )
-
-            TieredCache.set_all_tiers(cache_key, response, settings.COURSES_API_CACHE_TIMEOUT)
-            return response
         except (ReqConnectionError, SlumberBaseException, Timeout) as exc:
             logger.exception('[Code Redemption Failure] Unable to connect to the Discovery Service '
                              'for catalog contains endpoint. '
-                             'Product: %s, Message: %s, Range: %s', product.id, exc, self.id)
+                             'Course runs: %s, Message: %s, Range: %s', uncached_course_run_ids, exc, self.id)
             raise Exception('Unable to connect to Discovery Service for catalog contains endpoint.')
 
+        for course_run_id in uncached_course_run_ids:
+            contains[course_run_id] = response['courses'].get(course_run_id, False)
+            # Cache the response each course run would have gotten on its own.
+            TieredCache.set_all_tiers(
+                cache_keys[course_run_id],
+                {'courses': {course_run_id: contains[course_run_id]}},
+                settings.COURSES_API_CACHE_TIMEOUT
+            )
+        return contains
+
+    def catalog_contains_product(self, product):
+        """
+        Retrieve the results from using the catalog contains endpoint for
+        catalog service for the catalog id contained in field "course_catalog".
+        """
+        return {'courses': self.catalog_contains_products([product])}
+
+    def _catalog_product_ids(self):
+        """
+        Returns the IDs of the products with a stock record in the range's catalog, memoized per catalog.
+        """
+        cached_catalog_id, product_ids = getattr(self, '_cached_catalog_product_ids', (None, None))
+        if product_ids is None or cached_catalog_id != self.catalog_id:
+            product_ids = set(self.catalog.stock_records.values_list('product_id', flat=True))
+            self._cached_catalog_product_ids = (self.catalog_id, product_ids)  # pylint: disable=attribute-defined-outside-init
+        return product_ids
+
+    def invalidate_cached_ids(self):
+        super(Range, self).invalidate_cached_ids()  # pylint: disable=bad-super-call
+        self._cached_catalog_product_ids = (None, None)  # pylint: disable=attribute-defined-outside-init
+
+    def prefetch_catalog_membership(self, products):
+        """
+        Resolve catalog membership of all the given products at once, e.g. for all lines of a basket,
+        so that the subsequent contains_product calls for these products need no lookups of their own.
+        """
+        if self.course_catalog and self.course_seat_types:
+            seats = [
+                product for product in products
+                if getattr(product.attr, 'certificate_type', '').lower() in self.course_seat_types  # pylint: disable=unsupported-membership-test
+            ]
+            if seats:
+                self.catalog_contains_products(seats)
+        elif self.catalog:
+            self._catalog_product_ids()
+
     def contains_product(self, product):
         """
         Assert if the range contains the product.
@@ -452,9 +539,7 @@ class Range(AbstractRange):
                 contains_product = ((response['courses'][product.course_id]) or contains_product)
 
         elif self.catalog:
-            contains_product = (
-                product.id in self.catalog.stock_records.values_list('product', flat=True) or contains_product
-            )
+            contains_product = product.id in self._catalog_product_ids() or contains_product
 
         if not contains_product:
             logger.warning('[Code Redemption Failure] Course catalog for Range does not contain the Product. '
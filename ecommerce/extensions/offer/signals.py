@@ -0,0 +1,50 @@
+from __future__ import absolute_import
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from oscar.core.loading import get_model
+
+from ecommerce.core.utils import on_commit_once
+from ecommerce.extensions.offer.applicability import invalidate_offer_applicability_index
+from ecommerce.extensions.offer.utils import is_offer_usage_update
+
+Benefit = get_model('offer', 'Benefit')
+Catalog = get_model('catalogue', 'Catalog')
+Condition = get_model('offer', 'Condition')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+Range = get_model('offer', 'Range')
+RangeProduct = get_model('offer', 'RangeProduct')
+
+
+@receiver(post_save, sender=ConditionalOffer, dispatch_uid='offer.invalidate_index_on_offer_save')
+@receiver(post_delete, sender=ConditionalOffer, dispatch_uid='offer.invalidate_index_on_offer_delete')
+@receiver(post_save, sender=Condition, dispatch_uid='offer.invalidate_index_on_condition_save')
+@receiver(post_delete, sender=Condition, dispatch_uid='offer.invalidate_index_on_condition_delete')
+@receiver(post_save, sender=Benefit, dispatch_uid='offer.invalidate_index_on_benefit_save')
+@receiver(post_delete, sender=Benefit, dispatch_uid='offer.invalidate_index_on_benefit_delete')
+@receiver(post_save, sender=Range, dispatch_uid='offer.invalidate_index_on_range_save')
+@receiver(post_delete, sender=Range, dispatch_uid='offer.invalidate_index_on_range_delete')
+@receiver(post_save, sender=RangeProduct, dispatch_uid='offer.invalidate_index_on_range_product_save')
+@receiver(post_delete, sender=RangeProduct, dispatch_uid='offer.invalidate_index_on_range_product_delete')
+@receiver(m2m_changed, sender=Range.classes.through, dispatch_uid='offer.invalidate_index_on_range_classes_change')
+@receiver(m2m_changed, sender=Range.included_categories.through,
+          dispatch_uid='offer.invalidate_index_on_range_categories_change')
+@receiver(m2m_changed, sender=Catalog.stock_records.through,
+          dispatch_uid='offer.invalidate_index_on_catalog_stock_records_change')
+def invalidate_offer_index(sender, **kwargs):
+    """
+    Drop the offer applicability index, once the changes are committed, when the offers, conditions or ranges
+    it was built from change.
+
+    The index is dropped after the commit, so it is not rebuilt from the data as it was before the changes, and
+    is not dropped when an order records its use of an offer.
+    """
+    if not kwargs.get('action', 'post_').startswith('post_'):
+        return
+    if sender is ConditionalOffer and is_offer_usage_update(kwargs.get('update_fields')):
+        return
+    on_commit_once(_invalidate_offer_index)
+
+
+def _invalidate_offer_index(__):
+    invalidate_offer_applicability_index()
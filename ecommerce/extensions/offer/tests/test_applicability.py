@@ -0,0 +1,154 @@
+from __future__ import absolute_import
+
+from decimal import Decimal
+
+import mock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from oscar.core.loading import get_model
+from oscar.test import factories
+
+from ecommerce.extensions.catalogue.models import Catalog
+from ecommerce.extensions.offer.applicability import (
+    build_offer_applicability_index,
+    get_candidate_offer_ids,
+    get_offer_applicability_index
+)
+from ecommerce.extensions.test.factories import ConditionalOfferFactory, EnterpriseOfferFactory, ProgramOfferFactory
+from ecommerce.tests.testcases import TestCase
+
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+
+
+class OfferApplicabilityIndexTests(TestCase):
+    def setUp(self):
+        super(OfferApplicabilityIndexTests, self).setUp()
+        # The index is invalidated once changes are committed, which test transactions never are.
+        patcher = mock.patch('ecommerce.core.utils.transaction.on_commit', side_effect=lambda func: func())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.product = factories.create_product()
+        self.range = factories.RangeFactory(products=[self.product])
+        self.offer = ConditionalOfferFactory(condition__range=self.range)
+
+    def test_products_are_indexed(self):
+        """ Verify offers are candidates only for the products in their condition range. """
+        self.assertIn(self.offer.id, get_candidate_offer_ids([self.product]))
+        self.assertNotIn(self.offer.id, get_candidate_offer_ids([factories.create_product()]))
+
+    def test_child_products_are_indexed(self):
+        """ Verify offers on a parent product are candidates for its children. """
+        parent = factories.create_product(structure='parent')
+        child = factories.create_product(structure='child', parent=parent)
+        offer = ConditionalOfferFactory(condition__range=factories.RangeFactory(products=[parent]))
+
+        self.assertIn(offer.id, get_candidate_offer_ids([child]))
+
+    def test_product_classes_are_indexed(self):
+        """ Verify offers whose range includes a product class are candidates for its products. """
+        product = factories.create_product(product_class='Other class')
+        offer_range = factories.RangeFactory()
+        offer_range.classes.add(product.get_product_class())
+        offer = ConditionalOfferFactory(condition__range=offer_range)
+
+        self.assertIn(offer.id, get_candidate_offer_ids([product]))
+        self.assertNotIn(offer.id, get_candidate_offer_ids([self.product]))
+
+    def test_catalog_products_are_indexed(self):
+        """ Verify offers whose range has a catalog are candidates for the catalog's products. """
+        product = factories.create_product()
+        stock_record = factories.create_stockrecord(product)
+        catalog = Catalog.objects.create(partner=stock_record.partner)
+        offer = ConditionalOfferFactory(condition__range=factories.RangeFactory(catalog=catalog))
+        self.assertNotIn(offer.id, get_candidate_offer_ids([product]))
+
+        catalog.stock_records.add(stock_record)
+        self.assertIn(offer.id, get_candidate_offer_ids([product]))
+
+    def test_unindexable_offers_are_always_candidates(self):
+        """ Verify offers whose range membership depends on external services are candidates for all baskets. """
+        offers = [
+            ConditionalOfferFactory(condition__range=factories.RangeFactory(includes_all_products=True)),
+            ConditionalOfferFactory(condition__range=factories.RangeFactory(
+                catalog_query='*:*', course_seat_types='verified'
+            )),
+            ConditionalOfferFactory(
+                condition__range=self.range,
+                benefit__range=factories.RangeFactory(catalog_query='*:*', course_seat_types='verified'),
+            ),
+        ]
+        category_range = factories.RangeFactory()
+        category_range.included_categories.add(factories.CategoryFactory())
+        offers.append(ConditionalOfferFactory(condition__range=category_range))
+
+        candidate_offer_ids = get_candidate_offer_ids([])
+        for offer in offers:
+            self.assertIn(offer.id, candidate_offer_ids)
+        self.assertNotIn(self.offer.id, candidate_offer_ids)
+
+    def test_excluded_offers(self):
+        """ Verify the index only contains open site offers without a program or enterprise condition. """
+        excluded_offers = [
+            ProgramOfferFactory(condition__range=self.range),
+            EnterpriseOfferFactory(condition__range=self.range),
+            ConditionalOfferFactory(condition__range=self.range, offer_type=ConditionalOffer.VOUCHER),
+            ConditionalOfferFactory(condition__range=self.range, status=ConditionalOffer.SUSPENDED),
+        ]
+
+        candidate_offer_ids = get_candidate_offer_ids([self.product])
+        self.assertIn(self.offer.id, candidate_offer_ids)
+        for offer in excluded_offers:
+            self.assertNotIn(offer.id, candidate_offer_ids)
+
+    def test_index_is_cached(self):
+        """ Verify the index is only built once until it is invalidated. """
+        get_offer_applicability_index()
+        with CaptureQueriesContext(connection) as queries:
+            get_offer_applicability_index()
+        self.assertEqual(len(queries), 0)
+
+        self.range.remove_product(self.product)
+        self.assertNotIn(self.offer.id, get_candidate_offer_ids([self.product]))
+
+    def test_offer_changes_invalidate_index(self):
+        """ Verify new and removed offers are reflected by the index. """
+        get_offer_applicability_index()
+        offer = ConditionalOfferFactory(condition__range=self.range)
+        self.assertIn(offer.id, get_candidate_offer_ids([self.product]))
+
+        offer.delete()
+        self.assertNotIn(offer.id, get_candidate_offer_ids([self.product]))
+
+    def test_offer_usage_keeps_index(self):
+        """ Verify orders recording their use of an offer do not invalidate the index, but changes to it do. """
+        with mock.patch('ecommerce.extensions.offer.signals.invalidate_offer_applicability_index') as mock_invalidate:
+            self.offer.record_usage({'freq': 1, 'discount': Decimal('1.00')})
+            self.assertFalse(mock_invalidate.called)
+
+            self.offer.priority += 1
+            self.offer.save()
+            self.assertEqual(mock_invalidate.call_count, 1)
+
+        self.offer.refresh_from_db()
+        self.assertEqual((self.offer.num_applications, self.offer.num_orders), (1, 1))
+
+    def test_consumed_offer_invalidates_index(self):
+        """ Verify the index is invalidated when an order consumes an offer. """
+        self.offer.max_global_applications = 1
+        self.offer.save()
+
+        with mock.patch('ecommerce.extensions.offer.signals.invalidate_offer_applicability_index') as mock_invalidate:
+            self.offer.record_usage({'freq': 1, 'discount': Decimal('1.00')})
+            self.assertTrue(mock_invalidate.called)
+
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.status, ConditionalOffer.CONSUMED)
+
+    def test_build_query_count(self):
+        """ Verify the number of queries needed to build the index does not grow with the number of offers. """
+        with self.assertNumQueries(4):
+            build_offer_applicability_index()
+
+        ConditionalOfferFactory.create_batch(5, condition__range=factories.RangeFactory(products=[self.product]))
+        with self.assertNumQueries(4):
+            build_offer_applicability_index()
@@ -63,13 +63,27 @@ class ApplicatorTests(TestCase):
 
     def test_get_offers_without_bundle(self):
         """ Verify that all non bundle offers are returned if no bundle id is given. """
+        product = factories.create_product(price=100)
+        self.basket.add_product(product)
         offers_in_db = list(ConditionalOffer.active.filter(offer_type=ConditionalOffer.SITE))
-        site_offers = ConditionalOfferFactory.create_batch(3) + offers_in_db
+        site_offers = ConditionalOfferFactory.create_batch(
+            3, condition__range=factories.RangeFactory(products=[product])
+        ) + offers_in_db
         ProgramOfferFactory()
 
         # Verify that program offer was not returned without bundle_id
         self.assert_correct_offers(site_offers)
 
+    def test_get_offers_excludes_site_offers_for_other_products(self):
+        """ Verify that site offers whose condition range contains none of the basket's products are not returned. """
+        product = factories.create_product(price=100)
+        self.basket.add_product(product)
+        offers_in_db = list(ConditionalOffer.active.filter(offer_type=ConditionalOffer.SITE))
+        offer = ConditionalOfferFactory(condition__range=factories.RangeFactory(products=[product]))
+        ConditionalOfferFactory(condition__range=factories.RangeFactory(products=[factories.create_product()]))
+
+        self.assert_correct_offers([offer] + offers_in_db)
+
     def test_get_site_offers(self):
         """ Verify get_site_offers returns correct objects based on filter"""
         existing_offers = list(ConditionalOffer.active.filter(offer_type=ConditionalOffer.SITE))
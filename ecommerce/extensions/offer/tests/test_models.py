@@ -7,6 +7,8 @@ import ddt
 import httpretty
 import six
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from edx_django_utils.cache import TieredCache
 from mock import patch
 from oscar.core.loading import get_model
@@ -334,6 +336,44 @@ class RangeTests(CouponMixin, DiscoveryTestMixin, DiscoveryMockMixin, TestCase):
             _ = self.range.catalog_contains_product(self.product)
             self.assertEqual(mocked_set_all_tiers.call_count, 2)
 
+    def test_catalog_contains_products(self):
+        """
+        Verify that catalog_contains_products resolves all products with a single request
+        and caches the result for each course run.
+        """
+        self.mock_access_token_response()
+        course, seat = self.create_course_and_seat()
+        other_course, other_seat = self.create_course_and_seat(course_id='a/b/c')
+        course_catalog_id = 1
+        self.range.catalog_query = None
+        self.range.course_seat_types = 'verified'
+        self.range.course_catalog = course_catalog_id
+        self.range.save()
+        self.mock_catalog_contains_endpoint(
+            discovery_api_url=self.site_configuration.discovery_api_url, catalog_id=course_catalog_id,
+            course_run_ids=[course.id]
+        )
+
+        expected = {course.id: True, other_course.id: False}
+        self.assertEqual(self.range.catalog_contains_products([seat, other_seat]), expected)
+        self._assert_num_requests(2)
+
+        self.assertEqual(self.range.catalog_contains_products([seat, other_seat]), expected)
+        self.range.prefetch_catalog_membership([seat, other_seat])
+        self.assertTrue(self.range.contains_product(seat))
+        self.assertFalse(self.range.contains_product(other_seat))
+        self._assert_num_requests(2)
+
+    def test_prefetch_catalog_membership_with_catalog(self):
+        """ Verify that the product IDs of the range's catalog are only fetched once. """
+        other_product = factories.create_product()
+        self.range_with_catalog.prefetch_catalog_membership([self.product, other_product])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(self.range_with_catalog.contains_product(self.product))
+            self.assertFalse(self.range_with_catalog.contains_product(other_product))
+        self.assertFalse([query for query in queries.captured_queries if 'partner_stockrecord' in query['sql']])
+
 
 @ddt.ddt
 @httpretty.activate
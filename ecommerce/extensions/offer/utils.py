@@ -14,7 +14,7 @@ from six.moves.urllib.parse import urlencode
 
 from ecommerce.core.url_utils import absolute_redirect
 from ecommerce.extensions.checkout.utils import add_currency
-from ecommerce.extensions.offer.constants import OFFER_ASSIGNED
+from ecommerce.extensions.offer.constants import OFFER_ASSIGNED, OFFER_USAGE_FIELDS
 
 logger = logging.getLogger(__name__)
 
@@ -295,3 +295,14 @@ def update_assignments_for_multi_use_per_customer(voucher):
                 for __ in range(offer_assignments_available)
             ]
             OfferAssignment.objects.bulk_create(assignments)
+
+
+def is_offer_usage_update(update_fields):
+    """
+    Returns whether a ConditionalOffer save only recorded the offer's use by an order, see
+    ConditionalOffer.record_usage. The offer applies to the same products, with the same discount, after such a save.
+
+    Arguments:
+        update_fields (frozenset): The update_fields of the offer's post_save signal.
+    """
+    return bool(update_fields) and set(update_fields) <= set(OFFER_USAGE_FIELDS)
@@ -16,7 +16,9 @@ from oscar.test.factories import BasketFactory
 from requests import Timeout
 from testfixtures import LogCapture
 
+from ecommerce.core.models import SiteConfiguration
 from ecommerce.core.url_utils import get_lms_entitlement_api_url
+from ecommerce.entitlements.utils import create_or_update_course_entitlement
 from ecommerce.extensions.fulfillment.status import ORDER
 from ecommerce.extensions.order.utils import UserAlreadyPlacedOrder
 from ecommerce.extensions.refund.tests.factories import RefundFactory
@@ -320,11 +322,11 @@ class UserAlreadyPlacedOrderTests(RefundTestMixin, TestCase):
         self.assertEqual(UserAlreadyPlacedOrder.is_order_line_refunded(refund_line.order_line), is_refunded)
 
     @httpretty.activate
-    def test_is_entitlement_expired_cached(self):
+    def test_get_expired_entitlements_cached(self):
         """
         Test that entitlement's expired status gets cached
 
-        We expect 2 calls to set_all_tiers in the is_entitlement_expired
+        We expect 2 calls to set_all_tiers in the get_expired_entitlements
         method due to:
             - the site_configuration api setup
             - the result being cached
@@ -339,8 +341,88 @@ class UserAlreadyPlacedOrderTests(RefundTestMixin, TestCase):
         with mock.patch.object(TieredCache, 'set_all_tiers', wraps=TieredCache.set_all_tiers) as mocked_set_all_tiers:
             mocked_set_all_tiers.assert_not_called()
 
-            _ = UserAlreadyPlacedOrder.is_entitlement_expired(self.course_entitlement_uuid, site=self.site)
+            _ = UserAlreadyPlacedOrder.get_expired_entitlements([self.course_entitlement_uuid], site=self.site)
             self.assertEqual(mocked_set_all_tiers.call_count, 2)
 
-            _ = UserAlreadyPlacedOrder.is_entitlement_expired(self.course_entitlement_uuid, site=self.site)
+            _ = UserAlreadyPlacedOrder.get_expired_entitlements([self.course_entitlement_uuid], site=self.site)
             self.assertEqual(mocked_set_all_tiers.call_count, 2)
+
+
+class PurchasedProductIdsTests(TestCase):
+    """
+    Tests for UserAlreadyPlacedOrder.get_purchased_product_ids.
+
+    The orders are created without the seats of RefundTestMixin, so that the tests do not depend on several seats
+    of a course being created.
+    """
+    def setUp(self):
+        super(PurchasedProductIdsTests, self).setUp()
+        self.user = self.create_user()
+        self.product = create_order(site=self.site, user=self.user).lines.first().product
+        self.entitlement_option = Option.objects.get(name='Course Entitlement')
+        self.course_entitlement = self.create_entitlement_order('111')
+
+    def create_entitlement_order(self, entitlement_uuid):
+        """ Creates an order of a new course entitlement, with the given entitlement UUID. """
+        course_entitlement = create_or_update_course_entitlement(
+            certificate_type='verified',
+            price=100,
+            partner=self.partner,
+            UUID=entitlement_uuid,
+            title='Bar',
+        )
+        basket = BasketFactory(owner=self.user, site=self.site)
+        basket.add_product(course_entitlement)
+        order = create_order(basket=basket, user=self.user)
+        order.lines.first().attributes.create(option=self.entitlement_option, value=entitlement_uuid)
+        return course_entitlement
+
+    def mock_entitlement_api(self, entitlements):
+        """ Mocks the entitlement API client of the site to return the given entitlements, keyed by UUID. """
+        client = mock.Mock()
+        client.entitlements.side_effect = lambda entitlement_uuid: mock.Mock(
+            get=mock.Mock(return_value=entitlements[entitlement_uuid])
+        )
+        return mock.patch.object(SiteConfiguration, 'build_api_client', return_value=client)
+
+    def test_get_purchased_product_ids(self):
+        """
+        Verify the purchased products are found with a single query, and the entitlements fetched concurrently.
+        """
+        expired_entitlement = self.create_entitlement_order('222')
+        unpurchased_product = self.create_entitlement_order('333')
+        OrderLine.objects.filter(product=unpurchased_product).delete()
+        products = [self.product, self.course_entitlement, expired_entitlement, unpurchased_product]
+
+        entitlements = {'111': {'expired_at': None}, '222': {'expired_at': '2017-12-16T21:36:19.279647Z'}}
+        with self.mock_entitlement_api(entitlements) as mock_build_api_client, self.assertNumQueries(2):
+            purchased_product_ids = UserAlreadyPlacedOrder.get_purchased_product_ids(self.user, products, self.site)
+
+        self.assertEqual(purchased_product_ids, {self.product.id, self.course_entitlement.id})
+        self.assertEqual(mock_build_api_client.call_count, 1)
+        self.assertEqual(
+            sorted(call[0][0] for call in mock_build_api_client.return_value.entitlements.call_args_list),
+            ['111', '222']
+        )
+
+        # The entitlements are cached.
+        with self.mock_entitlement_api({}) as mock_build_api_client:
+            self.assertEqual(
+                UserAlreadyPlacedOrder.get_purchased_product_ids(self.user, products, self.site),
+                purchased_product_ids
+            )
+        self.assertFalse(mock_build_api_client.called)
+
+    def test_get_purchased_product_ids_refunded_entitlement(self):
+        """
+        Verify the entitlements of refunded order lines are not fetched.
+        """
+        OrderLine.objects.get(product=self.course_entitlement).refund_lines.create(
+            refund=RefundFactory(user=self.user), status='Complete', line_credit_excl_tax=0
+        )
+        with self.mock_entitlement_api({}) as mock_build_api_client:
+            self.assertEqual(
+                UserAlreadyPlacedOrder.get_purchased_product_ids(self.user, [self.course_entitlement], self.site),
+                set()
+            )
+        self.assertFalse(mock_build_api_client.called)
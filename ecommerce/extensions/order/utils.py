@@ -2,11 +2,13 @@
 from __future__ import absolute_import, unicode_literals
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import waffle
 from django.conf import settings
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from edx_django_utils.cache import TieredCache
-from edx_rest_api_client.client import EdxRestApiClient
 from edx_rest_api_client.exceptions import HttpNotFoundError
 from oscar.apps.order.utils import OrderCreator as OscarOrderCreator
 from oscar.core.loading import get_model
@@ -14,6 +16,7 @@ from requests.exceptions import ConnectionError as ReqConnectionError  # pylint:
 from requests.exceptions import ConnectTimeout
 from threadlocals.threadlocals import get_current_request
 
+from ecommerce.core.constants import COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME
 from ecommerce.core.url_utils import get_lms_entitlement_api_url
 from ecommerce.extensions.order.constants import DISABLE_REPEAT_ORDER_CHECK_SWITCH_NAME
 from ecommerce.extensions.refund.status import REFUND_LINE
@@ -21,9 +24,9 @@ from ecommerce.referrals.models import Referral
 
 logger = logging.getLogger(__name__)
 
-Option = get_model('catalogue', 'Option')
 Order = get_model('order', 'Order')
 OrderLine = get_model('order', 'Line')
+OrderLineAttribute = get_model('order', 'LineAttribute')
 RefundLine = get_model('refund', 'RefundLine')
 
 
@@ -135,34 +138,131 @@ class UserAlreadyPlacedOrder:
     """
 
     @staticmethod
-    def is_entitlement_expired(entitlement_uuid, site):
+    def _get_entitlement_cache_key(entitlement_uuid, site):
+        return 'course_entitlement_detail_{}{}'.format(entitlement_uuid, site.siteconfiguration.partner.short_code)
+
+    @staticmethod
+    def get_expired_entitlements(entitlement_uuids, site):
         """
-        Checks to see if a given entitlement is expired.
+        Checks which of the given entitlements are expired.
+
+        Cached entitlements are read from the cache, and the others are fetched concurrently from the LMS.
+        Entitlements which cannot be fetched due to a network problem are considered expired.
 
         Args:
-            entitlement_uuid: UUID
+            entitlement_uuids: iterable of UUIDs
             site: (Site)
 
         Returns:
-            bool: True if the entitlement is expired
+            set: The UUIDs of the expired entitlements
+        """
+        entitlements = {}
+        uncached_uuids = []
+        for entitlement_uuid in set(entitlement_uuids):
+            entitlement_cached_response = TieredCache.get_cached_response(
+                UserAlreadyPlacedOrder._get_entitlement_cache_key(entitlement_uuid, site)
+            )
+            if entitlement_cached_response.is_found:
+                entitlements[entitlement_uuid] = entitlement_cached_response.value
+            else:
+                uncached_uuids.append(entitlement_uuid)
+
+        expired_uuids = set()
+        if uncached_uuids:
+            try:
+                entitlement_api_client = site.siteconfiguration.build_api_client(get_lms_entitlement_api_url())
+            except (ConnectTimeout, ReqConnectionError):
+                logger.exception('Unable to get entitlements info %s due to a network problem', uncached_uuids)
+                return set(entitlement_uuids)
+
+            def fetch(entitlement_uuid):
+                logger.debug('Trying to get entitlement {%s}', entitlement_uuid)
+                try:
+                    return entitlement_api_client.entitlements(entitlement_uuid).get()
+                except (ConnectTimeout, ReqConnectionError, HttpNotFoundError):
+                    logger.exception('Unable to get entitlement info [%s] due to a network problem', entitlement_uuid)
+                    return None
+
+            if len(uncached_uuids) == 1:
+                responses = [fetch(uncached_uuids[0])]
+            else:
+                pool_size = min(len(uncached_uuids), settings.ENTITLEMENT_API_POOL_SIZE)
+                with ThreadPoolExecutor(max_workers=pool_size) as executor:
+                    responses = list(executor.map(fetch, uncached_uuids))
+
+            for entitlement_uuid, entitlement in zip(uncached_uuids, responses):
+                if entitlement is None:
+                    expired_uuids.add(entitlement_uuid)
+                    continue
+                TieredCache.set_all_tiers(
+                    UserAlreadyPlacedOrder._get_entitlement_cache_key(entitlement_uuid, site),
+                    entitlement,
+                    settings.COURSES_API_CACHE_TIMEOUT
+                )
+                entitlements[entitlement_uuid] = entitlement
+
+        for entitlement_uuid, entitlement in entitlements.items():
+            expired = entitlement.get('expired_at')
+            logger.debug('Entitlement {%s} expired = {%s}', entitlement_uuid, expired)
+            if expired:
+                expired_uuids.add(entitlement_uuid)
+        return expired_uuids
 
+    @staticmethod
+    def get_purchased_product_ids(user, products, site):
         """
-        entitlement_api_client = EdxRestApiClient(get_lms_entitlement_api_url(),
-                                                  jwt=site.siteconfiguration.access_token)
-        partner_short_code = site.siteconfiguration.partner.short_code
-        key = 'course_entitlement_detail_{}{}'.format(entitlement_uuid, partner_short_code)
-        entitlement_cached_response = TieredCache.get_cached_response(key)
-        if entitlement_cached_response.is_found:
-            entitlement = entitlement_cached_response.value
-        else:
-            logger.debug('Trying to get entitlement {%s}', entitlement_uuid)
-            entitlement = entitlement_api_client.entitlements(entitlement_uuid).get()
-            TieredCache.set_all_tiers(key, entitlement, settings.COURSES_API_CACHE_TIMEOUT)
-
-        expired = entitlement.get('expired_at')
-        logger.debug('Entitlement {%s} expired = {%s}', entitlement_uuid, expired)
-
-        return expired
+        Checks which of the given products the user has already purchased.
+
+        A product is considered purchased if an OrderLine exists for the product,
+        and it has not been refunded. Purchased course entitlements must also not be expired.
+
+        Args:
+            user: (User)
+            products: list of (Product)
+            site: (Site)
+
+        Returns:
+            set: The ids of the purchased products.
+
+        Notes:
+            If the switch with the name `ecommerce.extensions.order.constants.DISABLE_REPEAT_ORDER_SWITCH_NAME`
+            is active this check will be disabled, and this method will return an empty set.
+        """
+        if waffle.switch_is_active(DISABLE_REPEAT_ORDER_CHECK_SWITCH_NAME):
+            return set()
+
+        entitlement_uuid = OrderLineAttribute.objects.filter(
+            line=OuterRef('pk'), option__code='course_entitlement'
+        ).values('value')[:1]
+        order_lines = OrderLine.objects.filter(
+            product__in=[product.id for product in products], order__user=user
+        ).exclude(
+            refund_lines__status=REFUND_LINE.COMPLETE
+        ).annotate(
+            product_class_name=Coalesce('product__product_class__name', 'product__parent__product_class__name'),
+            entitlement_uuid=Subquery(entitlement_uuid),
+        ).values_list('product_id', 'product_class_name', 'entitlement_uuid')
+
+        purchased_product_ids = set()
+        entitlement_product_ids = {}
+        for product_id, product_class_name, line_entitlement_uuid in order_lines:
+            if product_class_name != COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME:
+                purchased_product_ids.add(product_id)
+            elif line_entitlement_uuid:
+                entitlement_product_ids.setdefault(line_entitlement_uuid, set()).add(product_id)
+
+        entitlement_product_ids = {
+            line_entitlement_uuid: product_ids - purchased_product_ids
+            for line_entitlement_uuid, product_ids in entitlement_product_ids.items()
+            if product_ids - purchased_product_ids
+        }
+        if entitlement_product_ids:
+            expired_uuids = UserAlreadyPlacedOrder.get_expired_entitlements(entitlement_product_ids, site)
+            for line_entitlement_uuid, product_ids in entitlement_product_ids.items():
+                if line_entitlement_uuid not in expired_uuids:
+                    purchased_product_ids.update(product_ids)
+
+        return purchased_product_ids
 
     @staticmethod
     def user_already_placed_order(user, product, site):
@@ -183,28 +283,7 @@ class UserAlreadyPlacedOrder:
             If the switch with the name `ecommerce.extensions.order.constants.DISABLE_REPEAT_ORDER_SWITCH_NAME`
             is active this check will be disabled, and this method will already return `False`.
         """
-        if waffle.switch_is_active(DISABLE_REPEAT_ORDER_CHECK_SWITCH_NAME):
-            return False
-
-        entitlement_option = Option.objects.get(code='course_entitlement')
-
-        orders_lines = OrderLine.objects.filter(product=product, order__user=user)
-        for order_line in orders_lines:
-            if not UserAlreadyPlacedOrder.is_order_line_refunded(order_line):
-                if not order_line.product.is_course_entitlement_product:
-                    return True
-
-                entitlement_uuid = order_line.attributes.get(option=entitlement_option).value
-                try:
-                    if not UserAlreadyPlacedOrder.is_entitlement_expired(entitlement_uuid, site):
-                        return True
-                except (ConnectTimeout, ReqConnectionError, HttpNotFoundError):
-                    logger.exception(
-                        'Unable to get entitlement info [%s] due to a network problem',
-                        entitlement_uuid
-                    )
-
-        return False
+        return product.id in UserAlreadyPlacedOrder.get_purchased_product_ids(user, [product], site)
 
     @staticmethod
     def is_order_line_refunded(order_line):
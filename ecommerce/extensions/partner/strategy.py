@@ -1,17 +1,27 @@
 from __future__ import absolute_import
 
 import logging
+import threading
 
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.db import connection
 from django.utils import timezone
 from oscar.apps.partner import availability, strategy
-from oscar.core.loading import get_model
 from oscar.apps.partner import prices
 from decimal import Decimal as D
+from requests.exceptions import ConnectionError as ReqConnectionError
+from requests.exceptions import Timeout
+from slumber.exceptions import SlumberBaseException
+
 from ecommerce.core.constants import SEAT_PRODUCT_CLASS_NAME
 from ecommerce.core.models import User
 
 logger = logging.getLogger(__name__)
 
+USER_COUNTRY_LOCK_KEY = 'partner.user_country_lock.{user_id}'
+USER_COUNTRY_LOCK_TIMEOUT = 60  # Value is in seconds.
+
 
 # TODO Remove unneccessary logging
 # Add GST for Indian customers -mohit741
@@ -32,8 +42,9 @@ class CourseSeatAvailabilityPolicyMixin(strategy.StockRequired):
 
     @property
     def seat_class(self):
-        ProductClass = get_model('catalogue', 'ProductClass')
-        return ProductClass.objects.get(name=SEAT_PRODUCT_CLASS_NAME)
+        # Imported here to avoid a circular import, the catalogue utils depend on the voucher app.
+        from ecommerce.extensions.catalogue.utils import get_product_class  # pylint: disable=import-outside-toplevel
+        return get_product_class(SEAT_PRODUCT_CLASS_NAME)
 
     def availability_policy(self, product, stockrecord):
         """ A product is unavailable for non-admin users if the current date is
@@ -48,46 +59,123 @@ class CourseSeatAvailabilityPolicyMixin(strategy.StockRequired):
         return availability.Unavailable()
 
 
-# Use the second stock record for Indian Customers -mohit741
-class UseSecondStockRecord(object):
+def select_stockrecord_by_currency(product, currency):
+    """
+    Returns the product's stock record priced in the given currency, or its first stock record if none is.
+
+    The stock records are read with a single query, or from the product's prefetched stock records.
+
+    Arguments:
+        product (Product)
+        currency (str): ISO 4217 currency code.
+
+    Returns:
+        StockRecord, or None if the product has no stock records.
+    """
+    stockrecords = list(product.stockrecords.all())
+    for stockrecord in stockrecords:
+        if stockrecord.price_currency == currency:
+            return stockrecord
+    return stockrecords[0] if stockrecords else None
+
+
+class UseCurrencyStockRecord(object):
+    """
+    Stockrecord selection mixin that uses the stock record priced in the strategy's `stockrecord_currency`.
+    """
+    stockrecord_currency = settings.OSCAR_DEFAULT_CURRENCY
+
     def select_stockrecord(self, product):
-        try:
-            return product.stockrecords.all()[1]
-        except IndexError:
-            return product.stockrecords.all()[0]
+        return select_stockrecord_by_currency(product, self.stockrecord_currency)
+
 
+# Use the INR stock record for Indian Customers -mohit741
 # Indian strategy for Indian Market -mohit741
-class IndiaStrategy(UseSecondStockRecord, CourseSeatAvailabilityPolicyMixin,
+class IndiaStrategy(UseCurrencyStockRecord, CourseSeatAvailabilityPolicyMixin,
                       IncludeGST, strategy.Structured):
-    pass
+    stockrecord_currency = settings.INDIAN_CURRENCY
 
-class DefaultStrategy(strategy.UseFirstStockRecord, CourseSeatAvailabilityPolicyMixin,
+class DefaultStrategy(UseCurrencyStockRecord, CourseSeatAvailabilityPolicyMixin,
                       strategy.NoTax, strategy.Structured):
     """ Default Strategy """
 
 
+def update_user_country(request, user):
+    """
+    Stores the country of the user's LMS account, which decides the user's strategy.
+
+    Users without a country in their account are stored with an empty country, so that their account is
+    not fetched again.
+
+    Returns:
+        str: The country, or None if the account could not be fetched.
+    """
+    try:
+        country = user.account_details(request).get('country') or ''
+    except (ReqConnectionError, SlumberBaseException, Timeout):
+        return None
+
+    User.objects.filter(pk=user.pk).update(country=country)
+    user.country = country
+    return country
+
+
+def _update_user_country_in_background(request, user):
+    try:
+        update_user_country(request, user)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Failed to update the country of user [%s].', user.username)
+    finally:
+        django_cache.delete(USER_COUNTRY_LOCK_KEY.format(user_id=user.pk))
+        connection.close()
+
+
+def prefetch_user_country(request, user):
+    """
+    Stores the country of the user's LMS account in a background thread, unless it is already being fetched.
+
+    Returns:
+        threading.Thread: The thread fetching the country, or None.
+    """
+    if not django_cache.add(USER_COUNTRY_LOCK_KEY.format(user_id=user.pk), True, USER_COUNTRY_LOCK_TIMEOUT):
+        return None
+
+    thread = threading.Thread(target=_update_user_country_in_background, args=(request, user))
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
 # Use IndiaStrategy if country is IN else use Default with no tax -mohit741
 class Selector(object):
-    def strategy(self, request=None, user=None, **kwargs):  # pylint: disable=unused-argument
-        if request is not None:
-            try:
-                if user is not None and not user.is_anonymous: # Performance improvement : Call lms api only when user.country is None, and save it. -mohit741
-                    if user.country is None or user.country == '':
-                        profile = request.user.account_details(request)
-                        _user = User.objects.get(username=user.username)
-                        _user.country = profile['country']
-                        _user.save()
-                        logger.info('----------------------------------------Called Save Profile--------------------------------------')
-                        if profile['country'] == 'IN':
-                            return IndiaStrategy()
-                    else:
-                        if user.country == 'IN':
-                            logger.info('---------------------------------Indian strategy called-------------------------------------')
-                            return IndiaStrategy()
-            except Exception:
-                raise
-        logger.info('------------------Default strategy called---------------------------')
-        return DefaultStrategy(request if hasattr(request, 'user') else None)
+    """
+    Selects the strategy of a user.
 
+    Strategies are selected once per request and user. The country of a user whose country is unknown is
+    fetched from the LMS at login, or in the background, so selecting a strategy makes no queries or API calls.
+    """
 
+    def strategy(self, request=None, user=None, **kwargs):  # pylint: disable=unused-argument
+        if request is None:
+            return DefaultStrategy()
+
+        is_authenticated = user is not None and not user.is_anonymous
+        # pylint: disable=protected-access
+        strategies = getattr(request, '_strategy_cache', None)
+        if strategies is None:
+            strategies = request._strategy_cache = {}
+
+        key = user.pk if is_authenticated else None
+        if key not in strategies:
+            strategies[key] = self._select_strategy(request, user if is_authenticated else None)
+        return strategies[key]
+
+    def _select_strategy(self, request, user):
+        if user is not None:
+            if user.country is None:
+                # The user will get the strategy of their country once it is known.
+                prefetch_user_country(request, user)
+            elif user.country == 'IN':
+                return IndiaStrategy()
 
+        return DefaultStrategy(request if hasattr(request, 'user') else None)
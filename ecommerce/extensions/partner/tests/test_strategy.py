@@ -3,15 +3,32 @@ from __future__ import absolute_import
 import datetime
 
 import ddt
+import httpretty
+import mock
 import pytz
+from django.contrib.auth.models import AnonymousUser
 from django.test import RequestFactory
 from oscar.apps.partner import availability
+from oscar.core.loading import get_model
+from oscar.test import factories
+from requests.exceptions import Timeout
 
+from ecommerce.core.models import User
 from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
-from ecommerce.extensions.partner.strategy import DefaultStrategy, Selector
+from ecommerce.extensions.partner.strategy import (
+    DefaultStrategy,
+    IndiaStrategy,
+    Selector,
+    prefetch_user_country,
+    select_stockrecord_by_currency,
+    update_user_country
+)
+from ecommerce.tests.factories import ProductFactory
 from ecommerce.tests.testcases import TestCase
 
+Product = get_model('catalogue', 'Product')
+
 
 @ddt.ddt
 class DefaultStrategyTests(DiscoveryTestMixin, TestCase):
@@ -23,7 +40,12 @@ class DefaultStrategyTests(DiscoveryTestMixin, TestCase):
 
     def test_seat_class(self):
         """ Verify the property returns the course seat Product Class. """
-        self.assertEqual(self.strategy.seat_class, self.seat_product_class)
+        seat_product_class = self.seat_product_class
+        self.assertEqual(self.strategy.seat_class, seat_product_class)
+
+        # The product class is cached for the process.
+        with self.assertNumQueries(0):
+            self.assertEqual(DefaultStrategy().seat_class, seat_product_class)
 
     def test_availability_policy_not_expired(self):
         """ If the course seat's expiration date has not passed, the seat should be available for purchase. """
@@ -68,8 +90,138 @@ class DefaultStrategyTests(DiscoveryTestMixin, TestCase):
         self.assertIsInstance(actual, available)
 
 
+class StockRecordSelectionTests(TestCase):
+    def setUp(self):
+        super(StockRecordSelectionTests, self).setUp()
+        self.product = ProductFactory(stockrecords__partner=self.partner, stockrecords__price_currency='GBP')
+        self.usd_stockrecord = factories.StockRecordFactory(
+            product=self.product, partner=self.partner, price_currency='USD'
+        )
+        self.inr_stockrecord = factories.StockRecordFactory(
+            product=self.product, partner=self.partner, price_currency='INR'
+        )
+
+    def test_select_stockrecord_by_currency(self):
+        """ Verify the stock record in the currency is selected, or the first stock record if there is none. """
+        self.assertEqual(select_stockrecord_by_currency(self.product, 'INR'), self.inr_stockrecord)
+        self.assertEqual(select_stockrecord_by_currency(self.product, 'USD'), self.usd_stockrecord)
+        self.assertEqual(
+            select_stockrecord_by_currency(self.product, 'EUR'), self.product.stockrecords.order_by('id').first()
+        )
+        self.assertIsNone(select_stockrecord_by_currency(ProductFactory(stockrecords=None), 'USD'))
+
+    def test_strategies_select_stockrecord(self):
+        """ Verify the Indian strategy selects the INR stock record, and the default one the USD stock record. """
+        self.assertEqual(IndiaStrategy().select_stockrecord(self.product), self.inr_stockrecord)
+        self.assertEqual(DefaultStrategy().select_stockrecord(self.product), self.usd_stockrecord)
+
+    def test_select_prefetched_stockrecord(self):
+        """ Verify the stock record is selected from the prefetched stock records, without a query. """
+        product = Product.objects.select_related('product_class').prefetch_related('stockrecords').get(
+            id=self.product.id
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(IndiaStrategy().select_stockrecord(product), self.inr_stockrecord)
+            self.assertEqual(DefaultStrategy().fetch_for_product(product).stockrecord, self.usd_stockrecord)
+
+
+@ddt.ddt
 class SelectorTests(TestCase):
+    def setUp(self):
+        super(SelectorTests, self).setUp()
+        self.user = self.create_user(country='US')
+        self.request.user = self.user
+
     def test_strategy(self):
         """ Verify our own DefaultStrategy is returned. """
         actual = Selector().strategy()
         self.assertIsInstance(actual, DefaultStrategy)
+
+    @ddt.data(('IN', IndiaStrategy), ('US', DefaultStrategy), ('', DefaultStrategy))
+    @ddt.unpack
+    def test_strategy_for_country(self, country, strategy_class):
+        """ Verify the strategy is selected by the user's country, without queries or API calls. """
+        self.user.country = country
+        with mock.patch('ecommerce.extensions.partner.strategy.prefetch_user_country') as mock_prefetch:
+            with self.assertNumQueries(0):
+                actual = Selector().strategy(request=self.request, user=self.user)
+        self.assertIsInstance(actual, strategy_class)
+        self.assertFalse(mock_prefetch.called)
+
+    def test_strategy_memoized(self):
+        """ Verify the strategy is selected once per request and user. """
+        strategy = Selector().strategy(request=self.request, user=self.user)
+        self.assertIs(Selector().strategy(request=self.request, user=self.user), strategy)
+
+        other_user = self.create_user(country='IN')
+        self.assertIsInstance(Selector().strategy(request=self.request, user=other_user), IndiaStrategy)
+        self.assertIsInstance(Selector().strategy(request=self.request, user=AnonymousUser()), DefaultStrategy)
+
+        request = RequestFactory().get('/')
+        request.user = self.user
+        self.assertIsNot(Selector().strategy(request=request, user=self.user), strategy)
+
+    def test_strategy_unknown_country(self):
+        """ Verify the country of a user is fetched in the background when it is unknown. """
+        self.user.country = None
+        with mock.patch('ecommerce.extensions.partner.strategy.prefetch_user_country') as mock_prefetch:
+            actual = Selector().strategy(request=self.request, user=self.user)
+        self.assertIsInstance(actual, DefaultStrategy)
+        mock_prefetch.assert_called_once_with(self.request, self.user)
+
+    @ddt.data(('IN', 'IN'), (None, ''))
+    @ddt.unpack
+    def test_update_user_country(self, account_country, country):
+        """ Verify the country of the user's LMS account is stored. """
+        with mock.patch.object(User, 'account_details', return_value={'country': account_country}):
+            self.assertEqual(update_user_country(self.request, self.user), country)
+        self.assertEqual(self.user.country, country)
+        self.assertEqual(User.objects.get(pk=self.user.pk).country, country)
+
+    def test_update_user_country_failure(self):
+        """ Verify the country is left unknown when the LMS account cannot be fetched. """
+        User.objects.filter(pk=self.user.pk).update(country=None)
+        self.user.country = None
+
+        with mock.patch.object(User, 'account_details', side_effect=Timeout):
+            self.assertIsNone(update_user_country(self.request, self.user))
+        self.assertIsNone(User.objects.get(pk=self.user.pk).country)
+
+    @httpretty.activate
+    @ddt.data('IN', 'US')
+    def test_strategy_selection_queries(self, country):
+        """
+        Verify pricing products of a request selects the strategy once, without queries, LMS calls or other HTTP
+        requests, however many products are priced.
+        """
+        self.user.country = country
+        for course_id in ('a/b/c', 'd/e/f'):
+            CourseFactory(id=course_id, partner=self.partner).create_or_update_seat('verified', True, 10)
+        # Seats take their product class from their parent.
+        products = list(Product.objects.filter(parent__isnull=False).select_related(
+            'parent__product_class'
+        ).prefetch_related('stockrecords'))
+        # The seat product class is cached for the process the first time it is used.
+        DefaultStrategy().seat_class  # pylint: disable=expression-not-assigned
+
+        # The strategies are still selected, and the number of selections counted.
+        select_strategy = Selector._select_strategy  # pylint: disable=protected-access
+        with mock.patch.object(User, 'account_details') as mock_account_details:
+            with mock.patch.object(
+                    Selector, '_select_strategy', autospec=True, side_effect=select_strategy
+            ) as mock_select_strategy:
+                with self.assertNumQueries(0):
+                    for product in products:
+                        Selector().strategy(request=self.request, user=self.user).fetch_for_product(product)
+
+        self.assertEqual(len(products), 2)
+        self.assertEqual(mock_select_strategy.call_count, 1)
+        self.assertFalse(mock_account_details.called)
+        self.assertEqual(httpretty.httpretty.latest_requests, [])
+
+    def test_prefetch_user_country(self):
+        """ Verify the country of a user is fetched by a single background thread at a time. """
+        with mock.patch('ecommerce.extensions.partner.strategy.threading.Thread') as mock_thread:
+            self.assertIsNotNone(prefetch_user_country(self.request, self.user))
+            self.assertIsNone(prefetch_user_country(self.request, self.user))
+        mock_thread.return_value.start.assert_called_once_with()
@@ -2,6 +2,7 @@
 from __future__ import absolute_import
 
 import json
+import threading
 import time
 
 import httpretty
@@ -14,8 +15,10 @@ from requests.exceptions import HTTPError, Timeout
 from six.moves.urllib.parse import urlencode
 
 from ecommerce.core.models import User
+from ecommerce.courses.tests.factories import CourseFactory
+from ecommerce.extensions.payment import utils as payment_utils
 from ecommerce.extensions.payment.models import SDNCheckFailure
-from ecommerce.extensions.payment.utils import SDNClient, clean_field_value, middle_truncate
+from ecommerce.extensions.payment.utils import SDNClient, clean_field_value, embargo_check, middle_truncate
 from ecommerce.tests.testcases import TestCase
 
 
@@ -156,6 +159,66 @@ class SDNCheckTests(TestCase):
             self.assertIn(product1, sdn_object.products.all())
             self.assertIn(product2, sdn_object.products.all())
 
+    @httpretty.activate
+    def test_sdn_check_cached(self):
+        """ Verify searches for the same individual are answered from the cache, whatever their case or spacing. """
+        sdn_response = {'total': 0}
+        self.mock_sdn_response(json.dumps(sdn_response))
+        self.assertEqual(self.sdn_validator.search(self.name, self.city, self.country), sdn_response)
+        self.assertEqual(
+            self.sdn_validator.search(' DR.  EVIL', self.city.lower(), self.country.lower()),
+            sdn_response
+        )
+        self.assertEqual(len(httpretty.httpretty.latest_requests), 1)
+
+        self.sdn_validator.search('Mini-Me', self.city, self.country)
+        self.assertEqual(len(httpretty.httpretty.latest_requests), 2)
+
+    @httpretty.activate
+    def test_sdn_check_failure_not_cached(self):
+        """ Verify failed searches are not cached. """
+        self.mock_sdn_response(json.dumps({'total': 1}), status_code=400)
+        with self.assertRaises(HTTPError):
+            self.sdn_validator.search(self.name, self.city, self.country)
+
+        sdn_response = {'total': 0}
+        self.mock_sdn_response(json.dumps(sdn_response))
+        self.assertEqual(self.sdn_validator.search(self.name, self.city, self.country), sdn_response)
+
+    @httpretty.activate
+    def test_prescreen(self):
+        """ Verify prescreening caches the results of the search in the background. """
+        sdn_response = {'total': 1}
+        self.mock_sdn_response(json.dumps(sdn_response))
+        self.sdn_validator.prescreen(self.name, self.city, self.country).result()
+        self.assertEqual(len(httpretty.httpretty.latest_requests), 1)
+
+        self.assertEqual(self.sdn_validator.search(self.name, self.city, self.country), sdn_response)
+        self.assertEqual(len(httpretty.httpretty.latest_requests), 1)
+
+    @httpretty.activate
+    def test_prescreen_failure(self):
+        """ Verify a failed prescreening is not cached. """
+        self.mock_sdn_response(json.dumps({'total': 1}), status_code=500)
+        self.sdn_validator.prescreen(self.name, self.city, self.country).result()
+
+        with self.assertRaises(HTTPError):
+            self.sdn_validator.search(self.name, self.city, self.country)
+
+    @override_settings(SDN_PRESCREEN_MAX_PENDING=1)
+    def test_prescreen_bounded(self):
+        """ Verify prescreenings are skipped while too many are pending. """
+        release = threading.Event()
+        with mock.patch.multiple(payment_utils, _sdn_prescreen_executor=None, _sdn_prescreen_slots=None):
+            with mock.patch.object(SDNClient, 'search', side_effect=lambda *args: release.wait(5)) as search_mock:
+                future = self.sdn_validator.prescreen(self.name, self.city, self.country)
+                self.assertIsNone(self.sdn_validator.prescreen(self.name, self.city, self.country))
+                release.set()
+                future.result()
+
+                self.sdn_validator.prescreen(self.name, self.city, self.country).result()
+            self.assertEqual(search_mock.call_count, 2)
+
 
 class EmbargoCheckTests(TestCase):
     """ Tests for the Embargo check function. """
@@ -189,3 +252,47 @@ class EmbargoCheckTests(TestCase):
         self.mock_embargo_response(json.dumps(embargo_response))
         response = self.site.siteconfiguration.embargo_api_client.course_access.get(**self.params)
         self.assertEqual(response, embargo_response)
+
+    def create_seat_and_user(self, ip_address='0.0.0.0'):
+        seat = CourseFactory(partner=self.partner).create_or_update_seat('verified', False, 10)
+        user = self.create_user(tracking_context={'lms_ip': ip_address})
+        return seat, user
+
+    def get_embargo_requests(self):
+        return [request for request in httpretty.httpretty.latest_requests if 'embargo' in request.path]
+
+    @httpretty.activate
+    def test_embargo_api_timeout(self):
+        """ Verify the embargo API client times out after EMBARGO_API_TIMEOUT. """
+        self.mock_access_token_response()
+        session = self.site.siteconfiguration.embargo_api_client._store['session']  # pylint: disable=protected-access
+        self.assertEqual(session.request_timeout, settings.EMBARGO_API_TIMEOUT)
+
+    @httpretty.activate
+    def test_embargo_check_cached(self):
+        """ Verify embargo decisions are cached per user, IP address and set of courses. """
+        self.mock_access_token_response()
+        self.mock_embargo_response(json.dumps({'access': False}))
+        seat, user = self.create_seat_and_user()
+
+        self.assertFalse(embargo_check(user, self.site, [seat, seat]))
+        self.assertFalse(embargo_check(user, self.site, [seat]))
+        self.assertEqual(len(self.get_embargo_requests()), 1)
+
+        user.tracking_context = {'lms_ip': '1.1.1.1'}
+        self.assertFalse(embargo_check(user, self.site, [seat]))
+        self.assertEqual(len(self.get_embargo_requests()), 2)
+
+    @httpretty.activate
+    def test_embargo_check_fail_open(self):
+        """ Verify purchases are allowed, and the decision is not cached, when the embargo API fails. """
+        self.mock_access_token_response()
+        self.mock_embargo_response('{}', status_code=500)
+        seat, user = self.create_seat_and_user()
+
+        with mock.patch('ecommerce.extensions.payment.utils.monitoring_utils.increment') as mock_increment:
+            self.assertTrue(embargo_check(user, self.site, [seat]))
+        mock_increment.assert_called_once_with('embargo_check_fail_open')
+
+        self.mock_embargo_response(json.dumps({'access': False}))
+        self.assertFalse(embargo_check(user, self.site, [seat]))
@@ -2,17 +2,23 @@ from __future__ import absolute_import
 
 import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 import six  # pylint: disable=ungrouped-imports
 from django.conf import settings
 from django.contrib.auth import logout
 from django.utils.translation import ugettext_lazy as _
+from edx_django_utils import monitoring as monitoring_utils
 from oscar.core.loading import get_model
 from requests.exceptions import HTTPError, Timeout
 from six.moves.urllib.parse import urlencode
 
+from ecommerce.core.cache_utils import get_or_fetch_single_flight
 from ecommerce.core.constants import SEAT_PRODUCT_CLASS_NAME
+from ecommerce.core.http_pools import PooledHTTPAdapter
+from ecommerce.core.utils import get_cache_key
 from ecommerce.extensions.analytics.utils import parse_tracking_context
 from ecommerce.extensions.payment.models import SDNCheckFailure
 
@@ -110,6 +116,9 @@ def clean_field_value(value):
 def embargo_check(user, site, products):
     """ Checks if the user has access to purchase products by calling the LMS embargo API.
 
+    Decisions are cached per user, IP address and set of courses for EMBARGO_CHECK_CACHE_TIMEOUT
+    seconds, and concurrent checks of the same decision make a single call to the API.
+
     Args:
         request : The current request
         products (list): A list of products to check access against
@@ -126,18 +135,30 @@ def embargo_check(user, site, products):
             courses.append(product.course.id)
 
     if courses:
+        courses = sorted(set(courses))
         params = {
             'user': user,
             'ip_address': ip,
             'course_ids': courses
         }
+        cache_key = get_cache_key(
+            site_domain=site.domain,
+            resource='embargo',
+            username=user.username,
+            ip_address=ip,
+            course_ids=courses
+        )
 
-        try:
+        def fetch_access():
             response = site.siteconfiguration.embargo_api_client.course_access.get(**params)
             return response.get('access', True)
+
+        try:
+            return get_or_fetch_single_flight(cache_key, fetch_access, settings.EMBARGO_CHECK_CACHE_TIMEOUT)
         except:  # pylint: disable=bare-except
             # We are going to allow purchase if the API is un-reachable.
-            pass
+            logger.warning('Allowing purchase of courses %s after the embargo check failed.', courses)
+            monitoring_utils.increment('embargo_check_fail_open')
 
     return True
 
@@ -149,7 +170,6 @@ def checkSDN(request, name, city, country):
     hit_count = 0
 
     site_configuration = request.site.siteconfiguration
-    basket = Basket.get_basket(request.user, site_configuration.site)
 
     if site_configuration.enable_sdn_check:
         sdn_check = SDNClient(
@@ -161,6 +181,8 @@ def checkSDN(request, name, city, country):
             response = sdn_check.search(name, city, country)
             hit_count = response['total']
             if hit_count > 0:
+                # Getting the basket may merge the user's open baskets, so it is only done when it is recorded.
+                basket = Basket.get_basket(request.user, site_configuration.site)
                 sdn_check.deactivate_user(
                     basket,
                     name,
@@ -177,12 +199,87 @@ def checkSDN(request, name, city, country):
     return hit_count
 
 
+def prescreenSDN(request, name, city, country):
+    """
+    Starts an SDN check in the background, so that the check made when the payment is submitted is answered
+    from the cache.
+    """
+    site_configuration = request.site.siteconfiguration
+    if site_configuration.enable_sdn_check:
+        SDNClient(
+            api_url=settings.SDN_CHECK_API_URL,
+            api_key=settings.SDN_CHECK_API_KEY,
+            sdn_list=site_configuration.sdn_api_list
+        ).prescreen(name, city, country)
+
+
+def _normalize_sdn_field(value):
+    return ' '.join(six.text_type(value).split())
+
+
+_sdn_adapter = None
+_sdn_adapter_lock = threading.Lock()
+
+
+def _get_sdn_adapter():
+    """
+    Returns the adapter whose keep-alive connections are shared by all SDN API requests of the process.
+    """
+    global _sdn_adapter  # pylint: disable=global-statement
+    if _sdn_adapter is None:
+        with _sdn_adapter_lock:
+            if _sdn_adapter is None:
+                # Failed checks are not retried, as they would delay the payment, which is allowed anyway.
+                _sdn_adapter = PooledHTTPAdapter(
+                    pool_size=settings.API_CLIENT_CONNECTION_POOL['POOL_SIZE'],
+                    max_retries=0,
+                    backoff_factor=0,
+                    timeout=settings.SDN_CHECK_REQUEST_TIMEOUT,
+                )
+    return _sdn_adapter
+
+
+_sdn_prescreen_executor = None
+_sdn_prescreen_slots = None
+_sdn_prescreen_lock = threading.Lock()
+
+
+def _get_sdn_prescreen_executor():
+    """
+    Returns the pool of threads making the SDN checks started in the background, which is shared by the whole
+    process, and the semaphore bounding the number of pending checks.
+    """
+    global _sdn_prescreen_executor, _sdn_prescreen_slots  # pylint: disable=global-statement
+    if _sdn_prescreen_executor is None:
+        with _sdn_prescreen_lock:
+            if _sdn_prescreen_executor is None:
+                _sdn_prescreen_slots = threading.BoundedSemaphore(settings.SDN_PRESCREEN_MAX_PENDING)
+                _sdn_prescreen_executor = ThreadPoolExecutor(max_workers=settings.SDN_PRESCREEN_POOL_SIZE)
+    return _sdn_prescreen_executor, _sdn_prescreen_slots
+
+
 class SDNClient:
     """A utility class that handles SDN related operations."""
     def __init__(self, api_url, api_key, sdn_list):
         self.api_url = api_url
         self.api_key = api_key
         self.sdn_list = sdn_list
+        self.session = requests.Session()
+        self.session.mount(api_url, _get_sdn_adapter())
+
+    def get_cache_key(self, name, city, country):
+        """
+        Returns the key of the cached results of a search, which are shared by searches that only differ by
+        the case and spacing of the individual's details.
+        """
+        return get_cache_key(
+            resource='sdn_check',
+            api_url=self.api_url,
+            sdn_list=self.sdn_list,
+            name=_normalize_sdn_field(name).lower(),
+            city=_normalize_sdn_field(city).lower(),
+            country=_normalize_sdn_field(country).upper()
+        )
 
     def search(self, name, city, country):
         """
@@ -192,6 +289,9 @@ class SDNClient:
             * SDN API returns a non-200 status code response
             * user is not found on the SDN list
 
+        Results are cached for SDN_CHECK_CACHE_TIMEOUT seconds, and concurrent searches for the same
+        individual make a single request to the SDN API. Failed searches are not cached.
+
         Args:
             name (str): Individual's full name.
             city (str): Individual's city.
@@ -199,6 +299,38 @@ class SDNClient:
         Returns:
             dict: SDN API response.
         """
+        return get_or_fetch_single_flight(
+            self.get_cache_key(name, city, country),
+            lambda: self._search(_normalize_sdn_field(name), _normalize_sdn_field(city), country),
+            settings.SDN_CHECK_CACHE_TIMEOUT
+        )
+
+    def prescreen(self, name, city, country):
+        """
+        Searches the OFAC list for an individual in a background thread, to cache the results.
+
+        The search is skipped if SDN_PRESCREEN_MAX_PENDING searches are already pending.
+
+        Returns:
+            Future: The search, or None if it was skipped.
+        """
+        executor, slots = _get_sdn_prescreen_executor()
+        if not slots.acquire(False):
+            logger.warning('SDN prescreening of [%s] was skipped because too many are pending.', name)
+            return None
+
+        return executor.submit(self._prescreen, name, city, country, slots)
+
+    def _prescreen(self, name, city, country, slots):
+        try:
+            self.search(name, city, country)
+        except requests.exceptions.RequestException:
+            # The search is made again when the payment is submitted.
+            pass
+        finally:
+            slots.release()
+
+    def _search(self, name, city, country):
         params = urlencode({
             'sources': self.sdn_list,
             'type': 'individual',
@@ -215,7 +347,7 @@ class SDNClient:
         auth_header = {'Authorization': 'Bearer {}'.format(self.api_key)}
 
         try:
-            response = requests.get(
+            response = self.session.get(
                 sdn_check_url,
                 headers=auth_header,
                 timeout=settings.SDN_CHECK_REQUEST_TIMEOUT
@@ -26,6 +26,7 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from ecommerce.core.http_pools import get_api_client_session
 from ecommerce.core.url_utils import absolute_redirect, get_lms_url
 from ecommerce.extensions.api.serializers import OrderSerializer
 from ecommerce.extensions.basket.utils import (
@@ -218,7 +219,8 @@ class CybersourceInterstitialView(CyberSourceProcessorMixin, EdxOrderPlacementMi
         if waffle.flag_is_active(self.request, DYNAMIC_DISCOUNT_FLAG) and basket.lines.count() == 1:  # pragma: no cover  pylint: disable=line-too-long
             discount_lms_url = get_lms_url('/api/discounts/')
             lms_discount_client = EdxRestApiClient(discount_lms_url,
-                                                   jwt=self.request.site.siteconfiguration.access_token)
+                                                   jwt=self.request.site.siteconfiguration.access_token,
+                                                   session=get_api_client_session(discount_lms_url))
             ck = basket.lines.first().product.course_id
             user_id = basket.owner.lms_user_id
             try:
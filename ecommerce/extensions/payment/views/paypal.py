@@ -20,6 +20,7 @@ from oscar.apps.payment.exceptions import PaymentError
 from oscar.core.loading import get_class, get_model
 from requests.exceptions import Timeout
 
+from ecommerce.core.http_pools import get_api_client_session
 from ecommerce.core.url_utils import get_lms_url
 from ecommerce.extensions.basket.utils import basket_add_organization_attribute
 from ecommerce.extensions.checkout.mixins import EdxOrderPlacementMixin
@@ -62,7 +63,8 @@ class PaypalPaymentExecutionView(EdxOrderPlacementMixin, View):
         if waffle.flag_is_active(self.request, DYNAMIC_DISCOUNT_FLAG) and basket.lines.count() == 1:
             discount_lms_url = get_lms_url('/api/discounts/')
             lms_discount_client = EdxRestApiClient(discount_lms_url,
-                                                   jwt=self.request.site.siteconfiguration.access_token)
+                                                   jwt=self.request.site.siteconfiguration.access_token,
+                                                   session=get_api_client_session(discount_lms_url))
             ck = basket.lines.first().product.course_id
             user_id = basket.owner.lms_user_id
             try:
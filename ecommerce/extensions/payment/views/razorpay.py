@@ -36,6 +36,7 @@ Country = get_model('address', 'Country')
 Basket = get_model('basket', 'Basket')
 Repository = get_class('shipping.repository', 'Repository')
 Selector = get_class('partner.strategy', 'Selector')
+select_stockrecord_by_currency = get_class('partner.strategy', 'select_stockrecord_by_currency')
 Source = get_model('payment', 'Source')
 SourceType = get_model('payment', 'SourceType')
 
@@ -120,10 +121,8 @@ class PaymentView(EdxOrderPlacementMixin, View):
         sku = 'many'
         # Check for user's country and update sku -mohit741
         if basket.num_lines==1:
-            if is_indian:
-                sku = basket.lines.first().product.stockrecords.all()[1].partner_sku
-            else:
-                sku = basket.lines.first().product.stockrecords.first().partner_sku
+            currency = settings.INDIAN_CURRENCY if is_indian else settings.OSCAR_DEFAULT_CURRENCY
+            sku = select_stockrecord_by_currency(basket.all_lines()[0].product, currency).partner_sku
         context = {
             # "basket": basket,
             "user": user.username,
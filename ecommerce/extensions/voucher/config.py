@@ -11,3 +11,7 @@ class VoucherConfig(config.VoucherConfig):
     def ready(self):  # pragma: no cover
         if settings.VOUCHER_CODE_LENGTH < 1:
             raise ImproperlyConfigured("VOUCHER_CODE_LENGTH must be a positive number.")
+
+        # Register signal handlers
+        # noinspection PyUnresolvedReferences
+        import ecommerce.extensions.voucher.signals  # pylint: disable=unused-import, import-outside-toplevel
@@ -0,0 +1,48 @@
+from __future__ import absolute_import
+
+from django.core.management import call_command
+from oscar.core.loading import get_model
+from testfixtures import LogCapture
+
+from ecommerce.coupons.tests.mixins import CouponMixin
+from ecommerce.extensions.voucher.utils import get_coupon_usage_summary
+from ecommerce.tests.testcases import TestCase
+
+CouponUsageSummary = get_model('voucher', 'CouponUsageSummary')
+LOGGER_NAME = 'ecommerce.extensions.voucher.management.commands.update_coupon_usage_summaries'
+
+
+class UpdateCouponUsageSummariesTests(CouponMixin, TestCase):
+    """Tests for update_coupon_usage_summaries management command."""
+
+    def setUp(self):
+        super(UpdateCouponUsageSummariesTests, self).setUp()
+        self.coupon = self.create_coupon(quantity=3)
+        self.summary = get_coupon_usage_summary(self.coupon)
+        # Queryset updates bypass the signals that keep summaries up to date.
+        CouponUsageSummary.objects.filter(id=self.summary.id).update(num_codes=1, num_uses=5)
+
+    def test_verify(self):
+        """ Verify outdated summaries are reported, and left unchanged, when verifying. """
+        with LogCapture(LOGGER_NAME) as logger:
+            call_command('update_coupon_usage_summaries', '--verify')
+
+        logger.check(
+            (
+                LOGGER_NAME,
+                'WARNING',
+                "Usage summary of coupon [{}] is out of date for fields ['num_codes', 'num_uses'].".format(
+                    self.coupon.id
+                )
+            ),
+            (LOGGER_NAME, 'INFO', '1 coupon usage summaries were out of date.'),
+        )
+        summary = CouponUsageSummary.objects.get(id=self.summary.id)
+        self.assertEqual((summary.num_codes, summary.num_uses), (1, 5))
+
+    def test_update(self):
+        """ Verify outdated summaries are recomputed. """
+        call_command('update_coupon_usage_summaries')
+
+        summary = CouponUsageSummary.objects.get(id=self.summary.id)
+        self.assertEqual((summary.num_codes, summary.num_uses), (3, 0))
@@ -0,0 +1,64 @@
+"""
+This command rebuilds, or verifies, the usage summaries shown in the enterprise coupon overview.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import logging
+
+import six
+from django.core.management import BaseCommand
+from django.db import transaction
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.voucher.utils import compute_coupon_usage
+
+CouponUsageSummary = get_model('voucher', 'CouponUsageSummary')
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the usage summaries of coupons and updates the ones that are out of date.
+
+    Example:
+
+        ./manage.py update_coupon_usage_summaries --verify
+    """
+
+    help = 'Recompute the usage summaries of coupons and update the ones that are out of date.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            dest='verify',
+            default=False,
+            help='Only report the summaries that are out of date, without updating them.'
+        )
+
+    def handle(self, *args, **options):
+        verify = options['verify']
+        num_outdated = 0
+
+        for summary_id in CouponUsageSummary.objects.values_list('id', flat=True).order_by('id'):
+            with transaction.atomic():
+                summary = CouponUsageSummary.objects.select_for_update().get(id=summary_id)
+                usage = compute_coupon_usage(summary.coupon_id)
+                outdated_fields = sorted(
+                    field for field, value in six.iteritems(usage) if getattr(summary, field) != value
+                )
+                if not outdated_fields:
+                    continue
+
+                num_outdated += 1
+                logger.warning(
+                    'Usage summary of coupon [%d] is out of date for fields %s.', summary.coupon_id, outdated_fields
+                )
+                if not verify:
+                    for field in outdated_fields:
+                        setattr(summary, field, usage[field])
+                    summary.save()
+
+        logger.info(
+            '%d coupon usage summaries were out of date%s.', num_outdated, '' if verify else ' and have been updated'
+        )
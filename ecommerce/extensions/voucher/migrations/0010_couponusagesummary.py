@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 05:17
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0047_coupon_sales_force_id_attribute'),
+        ('voucher', '0009_historicalvoucherapplication'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CouponUsageSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('start_date', models.DateTimeField(null=True)),
+                ('end_date', models.DateTimeField(null=True)),
+                ('usage_limitation', models.CharField(blank=True, max_length=128)),
+                ('num_codes', models.PositiveIntegerField(default=0)),
+                ('num_uses', models.PositiveIntegerField(default=0)),
+                ('max_uses', models.PositiveIntegerField(default=0)),
+                ('num_unassigned', models.PositiveIntegerField(default=0)),
+                ('num_errors', models.PositiveIntegerField(default=0)),
+                ('coupon', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='usage_summary', to='catalogue.Product')),
+            ],
+            options={
+                'ordering': ('-modified', '-created'),
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+    ]
@@ -2,18 +2,30 @@ from __future__ import absolute_import
 
 import datetime
 import logging
+from collections import Counter
+from contextlib import contextmanager
 
+import six
 from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
+from django_extensions.db.models import TimeStampedModel
 from oscar.apps.voucher.abstract_models import (  # pylint: disable=ungrouped-imports
     AbstractVoucher,
     AbstractVoucherApplication
 )
+from oscar.core.loading import get_model
 from simple_history.models import HistoricalRecords
 
 from ecommerce.core.utils import log_message_and_raise_validation_error
-from ecommerce.extensions.offer.constants import OFFER_ASSIGNMENT_REVOKED, OFFER_MAX_USES_DEFAULT, OFFER_REDEEMED
+from ecommerce.extensions.offer.constants import (
+    OFFER_ASSIGNMENT_EMAIL_BOUNCED,
+    OFFER_ASSIGNMENT_REVOKED,
+    OFFER_MAX_USES_DEFAULT,
+    OFFER_REDEEMED
+)
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +40,111 @@ class CouponVouchers(models.Model):
     vouchers = models.ManyToManyField('voucher.Voucher', blank=True, related_name='coupon_vouchers')
 
 
+def _get_codes_usage(codes, enterprise_max_uses):
+    """
+    Returns what each of the given codes contributes to the usage figures of its coupon.
+
+    Arguments:
+        codes (set): Voucher codes.
+        enterprise_max_uses (dict): Maximum uses of the enterprise offer of each code which has one.
+
+    Returns:
+        dict: num_uses, num_unassigned and num_errors Counters, by code.
+    """
+    OfferAssignment = get_model('offer', 'OfferAssignment')
+    num_assignments = Counter()
+    num_errors = Counter()
+    assignments = OfferAssignment.objects.filter(code__in=codes).values('code', 'status').annotate(
+        count=Count('id')
+    ).order_by()
+    for assignment in assignments:
+        if assignment['status'] == OFFER_ASSIGNMENT_EMAIL_BOUNCED:
+            num_errors[assignment['code']] += assignment['count']
+        if assignment['status'] not in (OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED):
+            num_assignments[assignment['code']] += assignment['count']
+
+    usage = {}
+    for voucher in Voucher.objects.filter(code__in=codes).only('code', 'usage', 'num_orders'):
+        num_unassigned = 0
+        # Assignment is only valid for Vouchers linked to an enterprise offer.
+        if voucher.code in enterprise_max_uses:
+            num_unassigned = max(voucher.calculate_available_slots(
+                enterprise_max_uses[voucher.code], num_assignments[voucher.code]
+            ), 0)
+        usage[voucher.code] = Counter(
+            num_uses=voucher.num_orders, num_unassigned=num_unassigned, num_errors=num_errors[voucher.code]
+        )
+    return usage
+
+
+class CouponUsageSummaryManager(models.Manager):
+
+    @contextmanager
+    def track_usage(self, codes):
+        """
+        Adds the changes a block makes to the usage of the given codes to the usage summaries of their coupons.
+
+        Only the given codes are inspected, before and after the block, and the differences are added to the
+        summaries with F() expressions, in the block's transaction. Coupons without a summary are skipped; theirs
+        is built from all their codes the first time it is requested.
+
+        Arguments:
+            codes (iterable): Codes the block redeems, assigns, bounces or revokes.
+        """
+        with transaction.atomic():
+            coupon_ids = dict(CouponVouchers.objects.filter(
+                vouchers__code__in=set(codes), coupon__usage_summary__isnull=False
+            ).values_list('vouchers__code', 'coupon_id'))
+            if not coupon_ids:
+                yield
+                return
+
+            enterprise_max_uses = dict(Voucher.objects.filter(
+                code__in=coupon_ids, offers__condition__enterprise_customer_uuid__isnull=False
+            ).values_list('code', 'offers__max_global_applications'))
+            usage_before = _get_codes_usage(coupon_ids, enterprise_max_uses)
+            yield
+            usage_after = _get_codes_usage(coupon_ids, enterprise_max_uses)
+
+            changes = {}
+            for code, coupon_id in six.iteritems(coupon_ids):
+                change = changes.setdefault(coupon_id, Counter())
+                change.update(usage_after[code])
+                change.subtract(usage_before[code])
+            for coupon_id, change in six.iteritems(changes):
+                deltas = {field: F(field) + value for field, value in six.iteritems(change) if value}
+                if deltas:
+                    self.filter(coupon_id=coupon_id).update(modified=timezone.now(), **deltas)
+
+
+class CouponUsageSummary(TimeStampedModel):
+    """
+    Usage figures of a coupon's codes, kept up to date as they are redeemed, assigned and revoked
+    so the enterprise coupon overview does not aggregate over every code of the coupons it lists.
+    """
+    objects = CouponUsageSummaryManager()
+
+    coupon = models.OneToOneField('catalogue.Product', related_name='usage_summary', on_delete=models.CASCADE)
+    start_date = models.DateTimeField(null=True)
+    end_date = models.DateTimeField(null=True)
+    usage_limitation = models.CharField(max_length=128, blank=True)
+    num_codes = models.PositiveIntegerField(default=0)
+    num_uses = models.PositiveIntegerField(default=0)
+    max_uses = models.PositiveIntegerField(default=0)
+    num_unassigned = models.PositiveIntegerField(default=0)
+    num_errors = models.PositiveIntegerField(default=0)
+
+    @property
+    def is_available(self):
+        """
+        Whether the coupon's codes can currently be redeemed. A coupon without codes has no dates, and is not
+        available.
+        """
+        if self.start_date is None or self.end_date is None:
+            return False
+        return self.start_date < timezone.now() < self.end_date
+
+
 class OrderLineVouchers(models.Model):
     line = models.ForeignKey('order.Line', related_name='order_line_vouchers', on_delete=models.CASCADE)
     vouchers = models.ManyToManyField('voucher.Voucher', related_name='order_line_vouchers')
@@ -87,6 +204,11 @@ class Voucher(AbstractVoucher):
                 'Failed to create Voucher. Voucher start and end datetime fields must be type datetime.'
             )
 
+    def record_usage(self, order, user):
+        with CouponUsageSummary.objects.track_usage([self.code]):
+            super(Voucher, self).record_usage(order, user)  # pylint: disable=bad-super-call
+    record_usage.alters_data = True
+
     @classmethod
     def does_exist(cls, code):
         try:
@@ -0,0 +1,61 @@
+from __future__ import absolute_import
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from oscar.core.loading import get_model
+
+from ecommerce.core.cache_utils import VOUCHER_CACHE_RESOURCE, ProcessTieredCache
+from ecommerce.extensions.offer.utils import is_offer_usage_update
+from ecommerce.extensions.voucher.utils import get_voucher_cache_key, reset_coupon_usage_summaries
+
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+CouponVouchers = get_model('voucher', 'CouponVouchers')
+Range = get_model('offer', 'Range')
+Voucher = get_model('voucher', 'Voucher')
+
+
+@receiver(post_save, sender=Voucher, dispatch_uid='voucher.invalidate_cached_voucher_on_save')
+@receiver(post_delete, sender=Voucher, dispatch_uid='voucher.invalidate_cached_voucher_on_delete')
+def invalidate_cached_voucher(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop a changed voucher from every cache tier, and clear this process' voucher tier
+    since vouchers may also have been cached under differently cased codes.
+    """
+    ProcessTieredCache.delete_all_tiers(VOUCHER_CACHE_RESOURCE, get_voucher_cache_key(instance.code))
+    ProcessTieredCache.clear_resource(VOUCHER_CACHE_RESOURCE)
+
+
+@receiver(post_save, sender=ConditionalOffer, dispatch_uid='voucher.clear_cached_vouchers_on_offer_save')
+@receiver(post_delete, sender=ConditionalOffer, dispatch_uid='voucher.clear_cached_vouchers_on_offer_delete')
+@receiver(post_save, sender=Range, dispatch_uid='voucher.clear_cached_vouchers_on_range_save')
+@receiver(post_delete, sender=Range, dispatch_uid='voucher.clear_cached_vouchers_on_range_delete')
+def clear_cached_vouchers(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Clear this process' voucher tier when the offers or ranges vouchers resolve to change.
+    """
+    ProcessTieredCache.clear_resource(VOUCHER_CACHE_RESOURCE)
+
+
+@receiver(m2m_changed, sender=CouponVouchers.vouchers.through,
+          dispatch_uid='voucher.reset_coupon_usage_on_codes_change')
+def reset_coupon_usage_on_codes_change(sender, instance, action, **kwargs):  # pylint: disable=unused-argument
+    """
+    Reset the usage summary of a coupon when codes are added to or removed from it.
+    """
+    if action.startswith('post_'):
+        if isinstance(instance, CouponVouchers):
+            reset_coupon_usage_summaries(coupon_ids=[instance.coupon_id])
+        else:
+            reset_coupon_usage_summaries(codes=[instance.code])
+
+
+@receiver(post_save, sender=ConditionalOffer, dispatch_uid='voucher.reset_coupon_usage_on_offer_save')
+def reset_coupon_usage_on_offer_save(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Reset the usage summaries of the coupons whose codes use a saved offer, whose maximum uses may have changed.
+    """
+    # The summaries do not depend on the offer's usage counters, which are saved by every order using it.
+    if not created and not is_offer_usage_update(kwargs.get('update_fields')):
+        reset_coupon_usage_summaries(
+            coupon_ids=CouponVouchers.objects.filter(vouchers__offers=instance).values_list('coupon_id', flat=True)
+        )
@@ -0,0 +1,42 @@
+from __future__ import absolute_import
+
+from edx_django_utils.cache import TieredCache
+
+from ecommerce.core.cache_utils import VOUCHER_CACHE_RESOURCE, ProcessTieredCache
+from ecommerce.extensions.test.factories import prepare_voucher
+from ecommerce.extensions.voucher.utils import get_cached_voucher, get_voucher_cache_key
+from ecommerce.tests.testcases import TestCase
+
+
+class VoucherCacheInvalidationTests(TestCase):
+    """ Tests for the receivers invalidating cached vouchers. """
+
+    def setUp(self):
+        super(VoucherCacheInvalidationTests, self).setUp()
+        self.voucher, __ = prepare_voucher(code='CACHEDCODE')
+        self.cache_key = get_voucher_cache_key(self.voucher.code)
+        get_cached_voucher(self.voucher.code)
+
+    def assert_voucher_cached(self, is_cached):
+        tier = ProcessTieredCache.get_tier(VOUCHER_CACHE_RESOURCE)
+        self.assertEqual(tier.get_cached_response(self.cache_key).is_found, is_cached)
+
+    def test_voucher_save(self):
+        """ Verify saving a voucher removes it from every cache tier. """
+        self.assert_voucher_cached(True)
+        self.voucher.name = 'Updated name'
+        self.voucher.save()
+
+        self.assert_voucher_cached(False)
+        self.assertFalse(TieredCache.get_cached_response(self.cache_key).is_found)
+        self.assertEqual(get_cached_voucher(self.voucher.code).name, 'Updated name')
+
+    def test_offer_save(self):
+        """ Verify saving an offer clears the process-local voucher tier. """
+        self.voucher.offers.first().save()
+        self.assert_voucher_cached(False)
+
+    def test_range_save(self):
+        """ Verify saving a range clears the process-local voucher tier. """
+        self.voucher.offers.first().condition.range.save()
+        self.assert_voucher_cached(False)
@@ -5,9 +5,13 @@ import uuid
 
 import ddt
 import httpretty
+import mock
+import six
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from factory.fuzzy import FuzzyText
 from oscar.templatetags.currency_filters import currency
@@ -33,11 +37,17 @@ from ecommerce.extensions.fulfillment.modules import CouponFulfillmentModule
 from ecommerce.extensions.fulfillment.status import LINE
 from ecommerce.extensions.offer.models import OFFER_PRIORITY_VOUCHER
 from ecommerce.extensions.test.factories import create_order, prepare_voucher
+from ecommerce.extensions.voucher import utils as voucher_utils
 from ecommerce.extensions.voucher.utils import (
+    compute_coupon_usage,
+    create_new_vouchers,
     create_vouchers,
     generate_coupon_report,
+    get_coupon_usage_summary,
     get_voucher_and_products_from_code,
     get_voucher_discount_info,
+    reset_coupon_usage_summaries,
+    stream_coupon_report,
     update_voucher_offer
 )
 from ecommerce.tests.factories import UserFactory
@@ -47,6 +57,7 @@ from ecommerce.tests.testcases import TestCase
 Basket = get_model('basket', 'Basket')
 Benefit = get_model('offer', 'Benefit')
 Catalog = get_model('catalogue', 'Catalog')
+CouponUsageSummary = get_model('voucher', 'CouponUsageSummary')
 CouponVouchers = get_model('voucher', 'CouponVouchers')
 Order = get_model('order', 'Order')
 Product = get_model('catalogue', 'Product')
@@ -115,12 +126,12 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
             'benefit_value': 100.00,
             'catalog': self.catalog,
             'coupon': self.coupon,
-            'end_datetime': datetime.datetime.now() + datetime.timedelta(days=1),
+            'end_datetime': timezone.now() + datetime.timedelta(days=1),
             'enterprise_customer': None,
             'enterprise_customer_catalog': None,
             'name': "Test voucher",
             'quantity': 10,
-            'start_datetime': datetime.datetime.now() - datetime.timedelta(days=1),
+            'start_datetime': timezone.now() - datetime.timedelta(days=1),
             'voucher_type': Voucher.SINGLE_USE
         }
 
@@ -243,6 +254,48 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
         self.assertEqual(voucher.start_datetime, self.data['start_datetime'])
         self.assertEqual(voucher.usage, Voucher.SINGLE_USE)
 
+    def _count_create_vouchers_queries(self, quantity):
+        self.data['quantity'] = quantity
+        with CaptureQueriesContext(connection) as context:
+            vouchers = create_vouchers(**self.data)
+        self.assertEqual(len(vouchers), quantity)
+        self.assertEqual(len(set(voucher.code for voucher in vouchers)), quantity)
+        return len(context.captured_queries)
+
+    def test_create_vouchers_query_count(self):
+        """ Verify the number of queries needed to create vouchers does not grow with their quantity. """
+        # The first call also creates the offer objects the later calls reuse.
+        self._count_create_vouchers_queries(1)
+        self.assertEqual(self._count_create_vouchers_queries(5), self._count_create_vouchers_queries(200))
+
+    @mock.patch.object(voucher_utils, 'VOUCHER_BULK_BATCH_SIZE', 10)
+    def test_create_new_vouchers_query_count(self):
+        """
+        Verify minting vouchers takes three queries per batch of codes: one to check the codes are unused, one to
+        insert the vouchers and one to read them back. A code which is already used is replaced by the
+        check of the next batch.
+        """
+        existing_code = create_new_vouchers(
+            self.data['end_datetime'], 'Existing', 1, self.data['start_datetime'], Voucher.SINGLE_USE
+        )[0].code
+        # The third code is already used, and is replaced by the 26th.
+        codes = ['CODE{}'.format(index) for index in range(2)] + [existing_code]
+        codes += ['CODE{}'.format(index) for index in range(2, 25)]
+
+        with mock.patch.object(voucher_utils, '_generate_random_code', side_effect=codes):
+            with self.assertNumQueries(3 * 3):
+                vouchers = create_new_vouchers(
+                    self.data['end_datetime'], self.data['name'], 25, self.data['start_datetime'], Voucher.SINGLE_USE
+                )
+
+        self.assertEqual(
+            sorted(voucher.code for voucher in vouchers), sorted('CODE{}'.format(index) for index in range(25))
+        )
+        self.assertEqual(
+            set(Voucher.objects.filter(code__startswith='CODE').values_list('id', flat=True)),
+            {voucher.id for voucher in vouchers}
+        )
+
     def test_create_voucher_with_long_name(self):
         self.data.update({
             'name': (
@@ -526,7 +579,7 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
         """ Verify the coupon report show correct status for inactive coupons. """
         self.data.update({
             'name': self.coupon.title,
-            'end_datetime': datetime.datetime.now() - datetime.timedelta(days=1)
+            'end_datetime': timezone.now() - datetime.timedelta(days=1)
         })
         vouchers = create_vouchers(**self.data)
         self.coupon_vouchers.first().vouchers.add(*vouchers)
@@ -697,6 +750,35 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
         self.assertIn('Redeemed For Course ID', field_names)
         self.assertIn('Redeemed For Course IDs', field_names)
 
+    def test_stream_coupon_report(self):
+        """ Verify the streamed report contains the same rows as the full report for any batch size. """
+        self.setup_coupons_for_report()
+        vouchers = self.coupon_vouchers.first().vouchers.all()
+        self.use_voucher('TESTORDER1', vouchers[1], self.user)
+        self.use_voucher('TESTORDER2', vouchers[2], UserFactory())
+
+        field_names, rows = generate_coupon_report(self.coupon_vouchers)
+        for batch_size in (1, 2, 1000):
+            streamed_field_names, streamed_rows = stream_coupon_report(self.coupon_vouchers, batch_size=batch_size)
+            self.assertEqual(streamed_field_names, field_names)
+            self.assertEqual(list(streamed_rows), rows)
+
+    def _count_report_row_queries(self, coupon):
+        __, rows = stream_coupon_report([coupon.attr.coupon_vouchers])
+        with CaptureQueriesContext(connection) as context:
+            list(rows)
+        return len(context.captured_queries)
+
+    def test_stream_coupon_report_query_count(self):
+        """ Verify the number of queries needed to read voucher rows does not grow with the number of vouchers. """
+        small_coupon = self.create_coupon(title='Small coupon', catalog=self.catalog, quantity=2)
+        large_coupon = self.create_coupon(title='Large coupon', catalog=self.catalog, quantity=8)
+        self.use_voucher('TESTORDER1', small_coupon.attr.coupon_vouchers.vouchers.first(), self.user)
+        for index, voucher in enumerate(large_coupon.attr.coupon_vouchers.vouchers.all()[:4]):
+            self.use_voucher('TESTORDER{}'.format(index + 2), voucher, self.user)
+
+        self.assertEqual(self._count_report_row_queries(small_coupon), self._count_report_row_queries(large_coupon))
+
     def test_update_voucher_offer(self):
         """Test updating a voucher."""
         self.data['email_domains'] = 'example.com'
@@ -761,3 +843,62 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
 
         self.assertIn('Program UUID', field_names)
         self.assertEqual(rows[0]['Program UUID'], program_uuid)
+
+
+@ddt.ddt
+class CouponUsageSummaryTests(CouponMixin, TestCase):
+    """ Tests for the coupon usage summaries. """
+
+    def setUp(self):
+        super(CouponUsageSummaryTests, self).setUp()
+        self.coupon = self.create_coupon(quantity=2)
+        self.summary = get_coupon_usage_summary(self.coupon)
+        self.vouchers = list(self.coupon.attr.coupon_vouchers.vouchers.all())
+
+    def assert_summary_up_to_date(self, coupon):
+        summary = CouponUsageSummary.objects.get(coupon=coupon)
+        for field, value in six.iteritems(compute_coupon_usage(coupon.id)):
+            self.assertEqual(getattr(summary, field), value, field)
+        return summary
+
+    @ddt.data(2, 20)
+    def test_redemption(self, quantity):
+        """
+        Verify a redemption adds to the summary of its coupon, without recomputing it, with a number of queries
+        which does not depend on the number of codes of the coupon.
+        """
+        coupon = self.create_coupon(quantity=quantity, title='Coupon with {} codes'.format(quantity))
+        get_coupon_usage_summary(coupon)
+        voucher = coupon.attr.coupon_vouchers.vouchers.first()
+        user = UserFactory()
+        order = create_order(user=user)
+
+        with mock.patch.object(voucher_utils, 'compute_coupon_usage') as mock_compute:
+            with self.assertNumQueries(12):
+                voucher.record_usage(order, user)
+        self.assertFalse(mock_compute.called)
+
+        self.assertEqual(self.assert_summary_up_to_date(coupon).num_uses, 1)
+
+    def test_redemption_without_summary(self):
+        """ Verify a redemption of a code whose coupon has no summary does not build one. """
+        CouponUsageSummary.objects.all().delete()
+        order = create_order(user=UserFactory())
+
+        self.vouchers[0].record_usage(order, order.user)
+
+        self.assertFalse(CouponUsageSummary.objects.exists())
+
+    def test_reset(self):
+        """ Verify the summary of an edited coupon is rebuilt the next time it is requested. """
+        reset_coupon_usage_summaries(codes=[self.vouchers[0].code])
+        self.assertFalse(CouponUsageSummary.objects.exists())
+
+        get_coupon_usage_summary(Product.objects.get(id=self.coupon.id))
+        reset_coupon_usage_summaries(coupon_ids=[self.coupon.id])
+        self.assertFalse(CouponUsageSummary.objects.exists())
+
+    def test_is_available_without_dates(self):
+        """ Verify a summary without dates, of a coupon without codes, is not available. """
+        self.assertTrue(self.summary.is_available)
+        self.assertFalse(CouponUsageSummary(coupon=self.coupon).is_available)
@@ -11,21 +11,28 @@ from decimal import Decimal, DecimalException
 import dateutil.parser
 import pytz
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Prefetch, Q, Sum
 from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
-from edx_django_utils.cache import TieredCache
 from opaque_keys.edx.keys import CourseKey
 from oscar.core.loading import get_model
 from oscar.templatetags.currency_filters import currency
 from six.moves import range
 
+from ecommerce.core.cache_utils import VOUCHER_CACHE_RESOURCE, ProcessTieredCache
 from ecommerce.core.url_utils import get_ecommerce_url
 from ecommerce.core.utils import log_message_and_raise_validation_error
 from ecommerce.enterprise.benefits import BENEFIT_MAP as ENTERPRISE_BENEFIT_MAP
 from ecommerce.enterprise.conditions import AssignableEnterpriseCustomerCondition
 from ecommerce.enterprise.utils import get_enterprise_customer
 from ecommerce.extensions.api import exceptions
-from ecommerce.extensions.offer.constants import OFFER_MAX_USES_DEFAULT
+from ecommerce.extensions.offer.constants import (
+    OFFER_ASSIGNMENT_EMAIL_BOUNCED,
+    OFFER_ASSIGNMENT_REVOKED,
+    OFFER_MAX_USES_DEFAULT,
+    OFFER_REDEEMED
+)
 from ecommerce.extensions.offer.models import OFFER_PRIORITY_VOUCHER
 from ecommerce.extensions.offer.utils import get_benefit_type, get_discount_percentage, get_discount_value
 from ecommerce.invoice.models import Invoice
@@ -39,9 +46,13 @@ Basket = get_model('basket', 'Basket')
 Benefit = get_model('offer', 'Benefit')
 Condition = get_model('offer', 'Condition')
 ConditionalOffer = get_model('offer', 'ConditionalOffer')
+CouponUsageSummary = get_model('voucher', 'CouponUsageSummary')
 CouponVouchers = get_model('voucher', 'CouponVouchers')
+Line = get_model('order', 'Line')
+OfferAssignment = get_model('offer', 'OfferAssignment')
 Order = get_model('order', 'Order')
 Product = get_model('catalogue', 'Product')
+ProductAttributeValue = get_model('catalogue', 'ProductAttributeValue')
 ProductCategory = get_model('catalogue', 'ProductCategory')
 Range = get_model('offer', 'Range')
 StockRecord = get_model('partner', 'StockRecord')
@@ -49,6 +60,9 @@ Voucher = get_model('voucher', 'Voucher')
 VoucherApplication = get_model('voucher', 'VoucherApplication')
 VoucherOffer = get_model('voucher', 'Voucher_offers')
 
+COUPON_REPORT_BATCH_SIZE = 1000
+VOUCHER_BULK_BATCH_SIZE = 500
+
 
 def _add_redemption_course_ids(new_row_to_append, header_row, redemption_course_ids):
     if any(row in [_('Catalog Query'), _('Program UUID')] for row in header_row):
@@ -196,8 +210,8 @@ def _get_info_for_coupon_report(coupon, voucher):
     return coupon_data
 
 
-def _get_voucher_info_for_coupon_report(voucher):
-    offer = voucher.best_offer
+def _get_voucher_info_for_coupon_report(voucher, offer=None):
+    offer = offer or voucher.best_offer
     status = _get_voucher_status(voucher, offer)
     path = '{path}?code={code}'.format(path=reverse('coupons:offer'), code=voucher.code)
     url = get_ecommerce_url(path)
@@ -227,39 +241,79 @@ def _get_voucher_info_for_coupon_report(voucher):
     return coupon_data
 
 
-def _get_redemption_course_ids(voucher_application):
+def _get_best_offer_from_prefetched(voucher):
     """
-    Return list of course ids where voucher is applied
-    Args:
-        voucher_application: voucher application object
+    Return the same offer as Voucher.best_offer, using the voucher's prefetched offers.
+
+    Arguments:
+        voucher (Voucher): Voucher with `offers__condition` prefetched.
 
     Returns:
-         list of course ids where voucher is applied.
+        ConditionalOffer
+    """
+    offers = list(voucher.offers.all())
+    for offer in offers:
+        if offer.condition.enterprise_customer_uuid is not None:
+            return offer
+    for offer in offers:
+        if offer.condition.range_id is not None:
+            return offer
+    return min(offers, key=lambda offer: offer.date_created)
+
+
+def _get_redemption_course_ids_by_order(order_ids):
     """
-    redemption_course_ids = []
-    for line in voucher_application.order.lines.all():
+    Return the redeemed course ids for each of the given orders, using two queries in total.
+
+    Arguments:
+        order_ids (iterable): IDs of the orders a coupon was redeemed with.
+
+    Returns:
+        dict: Order ID mapped to the list of course ids (or entitlement UUIDs) of the order lines.
+    """
+    lines = list(
+        Line.objects.filter(order_id__in=order_ids).select_related(
+            'product__product_class', 'product__parent__product_class'
+        ).order_by('pk')
+    )
+    entitlement_product_ids = [
+        line.product_id for line in lines if line.product and line.product.is_course_entitlement_product
+    ]
+    entitlement_uuids = {}
+    if entitlement_product_ids:
+        attribute_values = ProductAttributeValue.objects.filter(
+            product_id__in=entitlement_product_ids,
+            attribute__code='UUID'
+        ).select_related('attribute')
+        entitlement_uuids = {value.product_id: value.value for value in attribute_values}
+
+    redemption_course_ids = {}
+    for line in lines:
         if line.product:
-            if line.product.is_course_entitlement_product:
-                redemption_course_ids.append(line.product.attr.UUID)
+            if line.product_id in entitlement_uuids:
+                course_id = entitlement_uuids[line.product_id]
             else:
-                redemption_course_ids.append(line.product.course_id)
+                course_id = line.product.course_id
         else:
-            redemption_course_ids.append('Unknown')
+            course_id = 'Unknown'
+        redemption_course_ids.setdefault(line.order_id, []).append(course_id)
     return redemption_course_ids
 
 
-def generate_coupon_report(coupon_vouchers):
+def _get_coupon_report_header_row(coupon_voucher):
     """
-    Generate coupon report data
+    Return the first report row of a coupon, which holds the data shared by all of its vouchers.
+    """
+    coupon = coupon_voucher.coupon
+    header_row = _get_info_for_coupon_report(coupon, coupon_voucher.vouchers.first())
+    header_row[_('Client')] = Invoice.objects.get(order__lines__product=coupon).business_client.name
+    return header_row
 
-    Args:
-        coupon_vouchers (List[CouponVouchers]): List of coupon_vouchers the report should be generated for
 
-    Returns:
-        List[str]
-        List[dict]
+def _get_coupon_report_field_names(header_row):
+    """
+    Return the report columns applicable to the coupon type described by the given header row.
     """
-
     field_names = [
         _('Code'),
         _('Coupon Name'),
@@ -289,48 +343,14 @@ def generate_coupon_report(coupon_vouchers):
         _('Coupon Expiry Date'),
         _('Email Domains'),
     ]
-    rows = []
-
-    for coupon_voucher in coupon_vouchers:
-        coupon = coupon_voucher.coupon
-        client = Invoice.objects.get(order__lines__product=coupon).business_client.name
-        rows.append(_get_info_for_coupon_report(coupon, coupon_voucher.vouchers.first()))
-        rows[0][_('Client')] = client
-
-        for voucher in coupon_voucher.vouchers.all().prefetch_related('offers'):
-            row = _get_voucher_info_for_coupon_report(voucher)
-
-            for item in (_('Order Number'), _('Redeemed By Username'),):
-                row[item] = ''
-
-            rows.append(row)
-
-            if voucher.num_orders > 0:
-                voucher_applications = VoucherApplication.objects.filter(
-                    voucher=voucher).prefetch_related('user', 'order__lines')
 
-                for application in voucher_applications:
-                    redemption_course_ids = _get_redemption_course_ids(application)
-                    redemption_user_username = application.user.username
-
-                    new_row = row.copy()
-                    _add_redemption_course_ids(new_row, rows[0], redemption_course_ids)
-                    new_row.update({
-                        _('Status'): _('Redeemed'),
-                        _('Order Number'): application.order.number,
-                        _('Redeemed By Username'): redemption_user_username,
-                        _('Maximum Coupon Usage'): 1,
-                        _('Redemption Count'): 1,
-                    })
-                    rows.append(new_row)
-
-    if _('Program UUID') in rows[0]:
+    if _('Program UUID') in header_row:
         field_names.remove(_('Course ID'))
         field_names.remove(_('Organization'))
         field_names.remove(_('Catalog Query'))
         field_names.remove(_('Course Seat Types'))
         field_names.remove(_('Redeemed For Course ID'))
-    elif _('Catalog Query') in rows[0]:
+    elif _('Catalog Query') in header_row:
         field_names.remove(_('Course ID'))
         field_names.remove(_('Organization'))
         field_names.remove(_('Program UUID'))
@@ -341,7 +361,105 @@ def generate_coupon_report(coupon_vouchers):
         field_names.remove(_('Redeemed For Course IDs'))
         field_names.remove(_('Program UUID'))
 
-    return field_names, rows
+    return field_names
+
+
+def _iter_voucher_rows_for_coupon_report(coupon_voucher, header_row, batch_size):
+    """
+    Yield the report rows of every voucher of a coupon and of each of their redemptions.
+
+    Vouchers are read in keyset-paginated batches of `batch_size`; the offers, applications,
+    users, orders and order lines of a batch are fetched with a constant number of queries.
+    """
+    vouchers = Voucher.objects.filter(coupon_vouchers=coupon_voucher).prefetch_related(
+        Prefetch('offers', queryset=ConditionalOffer.objects.select_related('condition'))
+    ).order_by('id')
+
+    last_voucher_id = 0
+    while True:
+        batch = list(vouchers.filter(id__gt=last_voucher_id)[:batch_size])
+        if not batch:
+            return
+        last_voucher_id = batch[-1].id
+
+        redeemed_voucher_ids = [voucher.id for voucher in batch if voucher.num_orders > 0]
+        applications_by_voucher = {}
+        redemption_course_ids = {}
+        if redeemed_voucher_ids:
+            applications = VoucherApplication.objects.filter(
+                voucher_id__in=redeemed_voucher_ids
+            ).select_related('user', 'order').order_by('id')
+            for application in applications:
+                applications_by_voucher.setdefault(application.voucher_id, []).append(application)
+            redemption_course_ids = _get_redemption_course_ids_by_order(
+                set(application.order_id for application in applications)
+            )
+
+        for voucher in batch:
+            row = _get_voucher_info_for_coupon_report(voucher, _get_best_offer_from_prefetched(voucher))
+
+            for item in (_('Order Number'), _('Redeemed By Username'),):
+                row[item] = ''
+
+            yield row
+
+            for application in applications_by_voucher.get(voucher.id, []):
+                new_row = row.copy()
+                _add_redemption_course_ids(
+                    new_row, header_row, redemption_course_ids.get(application.order_id, ['Unknown'])
+                )
+                new_row.update({
+                    _('Status'): _('Redeemed'),
+                    _('Order Number'): application.order.number,
+                    _('Redeemed By Username'): application.user.username,
+                    _('Maximum Coupon Usage'): 1,
+                    _('Redemption Count'): 1,
+                })
+                yield new_row
+
+
+def stream_coupon_report(coupon_vouchers, batch_size=COUPON_REPORT_BATCH_SIZE):
+    """
+    Generate coupon report data lazily.
+
+    The coupon level rows are built up front, so a missing StockRecord or Invoice is raised
+    before any row is returned; voucher and redemption rows are then yielded as they are read.
+
+    Args:
+        coupon_vouchers (List[CouponVouchers]): List of coupon_vouchers the report should be generated for
+        batch_size (int): Number of vouchers read from the database per batch
+
+    Returns:
+        List[str]
+        Iterator[dict]
+    """
+    header_rows = [
+        (coupon_voucher, _get_coupon_report_header_row(coupon_voucher)) for coupon_voucher in coupon_vouchers
+    ]
+    field_names = _get_coupon_report_field_names(header_rows[0][1])
+
+    def rows():
+        for coupon_voucher, header_row in header_rows:
+            yield header_row
+            for row in _iter_voucher_rows_for_coupon_report(coupon_voucher, header_row, batch_size):
+                yield row
+
+    return field_names, rows()
+
+
+def generate_coupon_report(coupon_vouchers):
+    """
+    Generate coupon report data
+
+    Args:
+        coupon_vouchers (List[CouponVouchers]): List of coupon_vouchers the report should be generated for
+
+    Returns:
+        List[str]
+        List[dict]
+    """
+    field_names, rows = stream_coupon_report(coupon_vouchers)
+    return field_names, list(rows)
 
 
 def generate_offer_name(coupon_id, benefit_type, benefit_value, offer_number=None, is_enterprise=False):
@@ -489,6 +607,44 @@ def get_or_create_enterprise_offer(
     return offer
 
 
+def _generate_random_code(length):
+    h = hashlib.sha256()
+    h.update(uuid.uuid4().bytes)
+    return base64.b32encode(h.digest())[0:length].decode('ascii')
+
+
+def _generate_code_strings(length, quantity):
+    """
+    Create unique strings of random characters of specified length that are not used by any voucher.
+
+    Candidates are generated in blocks of at most VOUCHER_BULK_BATCH_SIZE codes and each block is
+    checked against existing vouchers with a single query; colliding candidates are replaced in
+    the next block.
+
+    Args:
+        length (int): Defines the length of randomly generated strings.
+        quantity (int): Number of strings to generate.
+
+    Raises:
+        ValueError raised if length is less than one.
+
+    Returns:
+        List[str]
+    """
+    if length < 1:
+        raise ValueError("Voucher code length must be a positive number.")
+
+    codes = set()
+    while len(codes) < quantity:
+        block_size = min(quantity - len(codes), VOUCHER_BULK_BATCH_SIZE)
+        candidates = set(_generate_random_code(length) for __ in range(block_size)) - codes
+        # Voucher.save upper-cases codes, so an exact match here is a case-insensitive match.
+        existing_codes = set(Voucher.objects.filter(code__in=candidates).values_list('code', flat=True))
+        codes.update(candidates - existing_codes)
+
+    return list(codes)
+
+
 def _generate_code_string(length):
     """
     Create a string of random characters of specified length
@@ -502,16 +658,17 @@ def _generate_code_string(length):
     Returns:
         str
     """
-    if length < 1:
-        raise ValueError("Voucher code length must be a positive number.")
+    return _generate_code_strings(length, 1)[0]
 
-    h = hashlib.sha256()
-    h.update(uuid.uuid4().bytes)
-    voucher_code = base64.b32encode(h.digest())[0:length]
-    if Voucher.objects.filter(code__iexact=voucher_code).exists():
-        return _generate_code_string(length)
 
-    return voucher_code
+def _parse_voucher_datetimes(start_datetime, end_datetime):
+    if not isinstance(start_datetime, datetime.datetime):
+        start_datetime = dateutil.parser.parse(start_datetime)
+
+    if not isinstance(end_datetime, datetime.datetime):
+        end_datetime = dateutil.parser.parse(end_datetime)
+
+    return start_datetime, end_datetime
 
 
 def create_new_voucher(code, end_datetime, name, start_datetime, voucher_type):
@@ -532,11 +689,7 @@ def create_new_voucher(code, end_datetime, name, start_datetime, voucher_type):
         Voucher
     """
     voucher_code = code or _generate_code_string(settings.VOUCHER_CODE_LENGTH)
-    if not isinstance(start_datetime, datetime.datetime):
-        start_datetime = dateutil.parser.parse(start_datetime)
-
-    if not isinstance(end_datetime, datetime.datetime):
-        end_datetime = dateutil.parser.parse(end_datetime)
+    start_datetime, end_datetime = _parse_voucher_datetimes(start_datetime, end_datetime)
 
     voucher = Voucher.objects.create(
         name=name[:128],
@@ -549,6 +702,48 @@ def create_new_voucher(code, end_datetime, name, start_datetime, voucher_type):
     return voucher
 
 
+def create_new_vouchers(end_datetime, name, quantity, start_datetime, voucher_type):
+    """
+    Creates vouchers with randomly generated codes using bulk inserts.
+
+    Args:
+        end_datetime (datetime): Voucher end date.
+        name (str): Voucher name.
+        quantity (int): Number of vouchers to be created.
+        start_datetime (datetime): Voucher start date.
+        voucher_type (str): Voucher usage.
+
+    Returns:
+        List[Voucher]
+    """
+    codes = _generate_code_strings(settings.VOUCHER_CODE_LENGTH, quantity)
+    start_datetime, end_datetime = _parse_voucher_datetimes(start_datetime, end_datetime)
+
+    vouchers = [
+        Voucher(
+            name=name[:128],
+            code=code,
+            usage=voucher_type,
+            start_datetime=start_datetime,
+            end_datetime=end_datetime,
+        )
+        for code in codes
+    ]
+    # bulk_create bypasses Voucher.save, which is where vouchers are normally validated.
+    for voucher in vouchers:
+        voucher.clean()
+    Voucher.objects.bulk_create(vouchers, batch_size=VOUCHER_BULK_BATCH_SIZE)
+
+    # Primary keys are only set by bulk_create on PostgreSQL, so read the vouchers back by code.
+    vouchers_by_code = {}
+    for index in range(0, len(codes), VOUCHER_BULK_BATCH_SIZE):
+        vouchers_by_code.update(
+            (voucher.code, voucher)
+            for voucher in Voucher.objects.filter(code__in=codes[index:index + VOUCHER_BULK_BATCH_SIZE])
+        )
+    return [vouchers_by_code[code] for code in codes]
+
+
 def create_vouchers_and_attach_offers(
         code,
         end_datetime,
@@ -577,17 +772,29 @@ def create_vouchers_and_attach_offers(
     Returns:
         List[Voucher]
     """
-    vouchers = []
-    voucher_offers = []
-    enterprise_voucher_offers = []
-    for i in range(quantity):
-        voucher = create_new_voucher(
+    if code:
+        vouchers = [
+            create_new_voucher(
+                end_datetime=end_datetime,
+                start_datetime=start_datetime,
+                voucher_type=voucher_type,
+                code=code,
+                name=name
+            )
+            for __ in range(quantity)
+        ]
+    else:
+        vouchers = create_new_vouchers(
             end_datetime=end_datetime,
+            name=name,
+            quantity=quantity,
             start_datetime=start_datetime,
-            voucher_type=voucher_type,
-            code=code,
-            name=name
+            voucher_type=voucher_type
         )
+
+    voucher_offers = []
+    enterprise_voucher_offers = []
+    for i, voucher in enumerate(vouchers):
         voucher_offers.append(
             VoucherOffer(voucher=voucher, conditionaloffer=offers[i] if len(offers) > 1 else offers[0])
         )
@@ -598,10 +805,9 @@ def create_vouchers_and_attach_offers(
                     conditionaloffer=enterprise_offers[i] if len(enterprise_offers) > 1 else enterprise_offers[0]
                 )
             )
-        vouchers.append(voucher)
 
-    VoucherOffer.objects.bulk_create(voucher_offers)
-    VoucherOffer.objects.bulk_create(enterprise_voucher_offers)
+    VoucherOffer.objects.bulk_create(voucher_offers, batch_size=VOUCHER_BULK_BATCH_SIZE)
+    VoucherOffer.objects.bulk_create(enterprise_voucher_offers, batch_size=VOUCHER_BULK_BATCH_SIZE)
     return vouchers
 
 
@@ -958,6 +1164,11 @@ def update_voucher_offer(offer, benefit_value, benefit_type=None, max_uses=None,
     )
 
 
+def get_voucher_cache_key(code):
+    voucher_code = 'voucher_{code}'.format(code=code)
+    return hashlib.md5(voucher_code.encode('utf-8')).hexdigest()
+
+
 def get_cached_voucher(code):
     """
     Returns a voucher from cache if one is stored to cache, if not the voucher
@@ -972,15 +1183,14 @@ def get_cached_voucher(code):
     Raises:
         Voucher.DoesNotExist: When no vouchers with provided code exist.
     """
-    voucher_code = 'voucher_{code}'.format(code=code)
-    cache_key = hashlib.md5(voucher_code.encode('utf-8')).hexdigest()
-    voucher_cached_response = TieredCache.get_cached_response(cache_key)
+    cache_key = get_voucher_cache_key(code)
+    voucher_cached_response = ProcessTieredCache.get_cached_response(VOUCHER_CACHE_RESOURCE, cache_key)
     if voucher_cached_response.is_found:
         return voucher_cached_response.value
 
     voucher = Voucher.objects.get(code=code)
 
-    TieredCache.set_all_tiers(cache_key, voucher, settings.VOUCHER_CACHE_TIMEOUT)
+    ProcessTieredCache.set_all_tiers(VOUCHER_CACHE_RESOURCE, cache_key, voucher, settings.VOUCHER_CACHE_TIMEOUT)
     return voucher
 
 
@@ -1011,3 +1221,112 @@ def get_voucher_and_products_from_code(code):
         # List of products is empty in case of Multi-course coupon
         return voucher, products
     raise exceptions.ProductNotFoundError()
+
+
+def _get_num_unassigned(vouchers, enterprise_offer):
+    """
+    Returns the number of slots still available for assignment across the vouchers.
+    """
+    # Assignment is only valid for Vouchers linked to an enterprise offer.
+    if not enterprise_offer:
+        return 0
+
+    assignments = OfferAssignment.objects.filter(code__in=vouchers.values('code')).exclude(
+        status__in=[OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]
+    ).values('code').annotate(num_assignments=Count('code')).order_by('code')
+    vouchers_num_assignments = {item['code']: item['num_assignments'] for item in assignments}
+
+    all_slots_available = 0
+    for voucher in vouchers.only('code', 'usage', 'num_orders'):
+        voucher_slots_available = voucher.calculate_available_slots(
+            enterprise_offer.max_global_applications,
+            vouchers_num_assignments.get(voucher.code, 0)
+        )
+        if voucher_slots_available > 0:
+            all_slots_available += voucher_slots_available
+
+    return all_slots_available
+
+
+def compute_coupon_usage(coupon_id):
+    """
+    Computes the usage figures of a coupon from its vouchers and their assignments.
+
+    Arguments:
+        coupon_id (int): ID of the coupon Product.
+
+    Returns:
+        dict: Values for the fields of the coupon's CouponUsageSummary.
+    """
+    vouchers = Voucher.objects.filter(coupon_vouchers__coupon_id=coupon_id)
+    voucher = vouchers.first()
+    if voucher is None:
+        return {
+            'start_date': None, 'end_date': None, 'usage_limitation': '', 'num_codes': 0, 'num_uses': 0,
+            'max_uses': 0, 'num_unassigned': 0, 'num_errors': 0,
+        }
+
+    enterprise_offer = voucher.enterprise_offer
+    offer = enterprise_offer or voucher.original_offer
+    if voucher.usage == Voucher.SINGLE_USE:
+        max_uses_per_code = 1
+    else:
+        max_uses_per_code = offer.max_global_applications or OFFER_MAX_USES_DEFAULT
+
+    totals = vouchers.aggregate(num_codes=Count('id'), num_uses=Sum('num_orders'))
+    return {
+        'start_date': voucher.start_datetime,
+        'end_date': voucher.end_datetime,
+        'usage_limitation': voucher.usage,
+        'num_codes': totals['num_codes'],
+        'num_uses': totals['num_uses'],
+        'max_uses': max_uses_per_code * totals['num_codes'],
+        'num_unassigned': _get_num_unassigned(vouchers, enterprise_offer),
+        'num_errors': OfferAssignment.objects.filter(
+            code__in=vouchers.values('code'), status=OFFER_ASSIGNMENT_EMAIL_BOUNCED
+        ).count(),
+    }
+
+
+def get_coupon_usage_summary(coupon):
+    """
+    Returns the usage summary of a coupon, building it the first time it is requested.
+
+    Arguments:
+        coupon (Product): Coupon product, ideally fetched with select_related('usage_summary').
+
+    Returns:
+        CouponUsageSummary
+    """
+    try:
+        return coupon.usage_summary
+    except CouponUsageSummary.DoesNotExist:
+        pass
+
+    summary = CouponUsageSummary(coupon=coupon, **compute_coupon_usage(coupon.id))
+    try:
+        with transaction.atomic():
+            summary.save()
+    except IntegrityError:
+        # The summary was built concurrently by another request.
+        summary = CouponUsageSummary.objects.get(coupon=coupon)
+    return summary
+
+
+def reset_coupon_usage_summaries(codes=(), coupon_ids=()):
+    """
+    Deletes the usage summaries of the coupons containing the given codes, or with the given IDs, so they are
+    rebuilt from all their codes the next time they are requested.
+
+    This is called when coupons are edited, e.g. when codes are added or the maximum uses change. The
+    transactions that redeem, assign, bounce or revoke codes update the summaries with
+    CouponUsageSummary.objects.track_usage instead.
+
+    Arguments:
+        codes (iterable): Voucher codes whose coupon changed.
+        coupon_ids (iterable): IDs of coupon Products which changed.
+    """
+    if codes or coupon_ids:
+        CouponUsageSummary.objects.filter(
+            Q(coupon__coupon_vouchers__vouchers__code__in=codes) | Q(coupon_id__in=coupon_ids)
+        ).delete()
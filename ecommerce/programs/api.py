@@ -1,13 +1,57 @@
 from __future__ import absolute_import
 
 import logging
+from collections import defaultdict
 
 from django.conf import settings
-from edx_django_utils.cache import TieredCache
+
+from ecommerce.core.cache_utils import PROGRAM_CACHE_RESOURCE, ProcessTieredCache, get_or_fetch_single_flight
 
 logger = logging.getLogger(__name__)
 
 
+def get_program_sku_index_cache_key(site_domain, program_uuid):
+    return '{site_domain}-program-{uuid}-sku-index'.format(site_domain=site_domain, uuid=program_uuid)
+
+
+def build_program_sku_index(program):
+    """
+    Compiles the SKUs of a program's seats and entitlements that can satisfy a program offer.
+
+    Args:
+        program (dict): Program data from the Programs API.
+
+    Returns:
+        dict: The program's applicable seat types, its courses in order with the keys of their runs, the
+            applicable SKUs, and, keyed by SKU, the positions of the courses each SKU belongs to.
+    """
+    applicable_seat_types = program['applicable_seat_types']
+    courses = []
+    courses_by_sku = defaultdict(list)
+    for position, course in enumerate(program['courses']):
+        skus = set()
+        for course_run in course['course_runs']:
+            skus.update(seat['sku'] for seat in course_run['seats'] if seat['type'] in applicable_seat_types)
+        for entitlement in course['entitlements']:
+            if entitlement['mode'].lower() in applicable_seat_types:
+                skus.add(entitlement['sku'])
+
+        for sku in skus:
+            courses_by_sku[sku].append(position)
+        courses.append({
+            'uuid': course['uuid'],
+            'course_run_keys': frozenset(course_run['key'] for course_run in course['course_runs']),
+        })
+
+    return {
+        'applicable_seat_types': frozenset(applicable_seat_types),
+        'courses': courses,
+        'courses_by_sku': {sku: tuple(positions) for sku, positions in courses_by_sku.items()},
+        'has_entitlements': any(course['entitlements'] for course in program['courses']),
+        'skus': frozenset(courses_by_sku),
+    }
+
+
 class ProgramsApiClient:
     """ Client for the Programs API.
 
@@ -33,15 +77,17 @@ class ProgramsApiClient:
         program_uuid = str(uuid)
         cache_key = '{site_domain}-program-{uuid}'.format(site_domain=self.site_domain, uuid=program_uuid)
 
-        program_cached_response = TieredCache.get_cached_response(cache_key)
-
-        if program_cached_response.is_found:  # pragma: no cover
-            logger.debug('Program [%s] was found in the cache.', program_uuid)
-            return program_cached_response.value
-
-        logging.info('Retrieving details of of program [%s]...', program_uuid)
-        program = self.client.programs(program_uuid).get()
+        def fetch_program():
+            logging.info('Retrieving details of of program [%s]...', program_uuid)
+            program = self.client.programs(program_uuid).get()
+            # Compile the SKU index of every version of the program that is cached.
+            ProcessTieredCache.set_all_tiers(
+                PROGRAM_CACHE_RESOURCE,
+                get_program_sku_index_cache_key(self.site_domain, program_uuid),
+                build_program_sku_index(program),
+                self.cache_ttl
+            )
+            logging.info('Program [%s] was successfully retrieved and cached.', program_uuid)
+            return program
 
-        TieredCache.set_all_tiers(cache_key, program, self.cache_ttl)
-        logging.info('Program [%s] was successfully retrieved and cached.', program_uuid)
-        return program
+        return get_or_fetch_single_flight(cache_key, fetch_program, self.cache_ttl, resource=PROGRAM_CACHE_RESOURCE)
@@ -14,7 +14,7 @@ from slumber.exceptions import HttpNotFoundError, SlumberBaseException
 from ecommerce.core.utils import deprecated_traverse_pagination, get_cache_key
 from ecommerce.extensions.offer.decorators import check_condition_applicability
 from ecommerce.extensions.offer.mixins import SingleItemConsumptionConditionMixin
-from ecommerce.programs.utils import get_program
+from ecommerce.programs.utils import get_program, get_program_sku_index
 
 Condition = get_model('offer', 'Condition')
 logger = logging.getLogger(__name__)
@@ -31,20 +31,10 @@ class ProgramCourseRunSeatsCondition(SingleItemConsumptionConditionMixin, Condit
 
     def _get_applicable_skus(self, site_configuration):
         """ SKUs to which this condition applies. """
-        program_skus = set()
         program = get_program(self.program_uuid, site_configuration)
         if program:
-            applicable_seat_types = program['applicable_seat_types']
-
-            for course in program['courses']:
-                for course_run in course['course_runs']:
-                    program_skus.update(
-                        {seat['sku'] for seat in course_run['seats'] if seat['type'] in applicable_seat_types}
-                    )
-                for entitlement in course['entitlements']:
-                    if entitlement['mode'].lower() in applicable_seat_types:
-                        program_skus.add(entitlement['sku'])
-        return program_skus
+            return get_program_sku_index(self.program_uuid, program, site_configuration)['skus']
+        return frozenset()
 
     def _get_lms_resource_for_user(self, basket, resource_name, endpoint):
         cache_key = get_cache_key(
@@ -92,15 +82,6 @@ class ProgramCourseRunSeatsCondition(SingleItemConsumptionConditionMixin, Condit
                     entitlements = response
         return enrollments, entitlements
 
-    def _has_entitlements(self, program):
-        """
-        Determines whether an entitlement product exists for any course in the program.
-        """
-        for course in program['courses']:
-            if course['entitlements']:
-                return True
-        return False
-
     @check_condition_applicability()
     def is_satisfied(self, offer, basket):  # pylint: disable=unused-argument
         """
@@ -114,55 +95,46 @@ class ProgramCourseRunSeatsCondition(SingleItemConsumptionConditionMixin, Condit
             bool
         """
         basket_skus = {line.stockrecord.partner_sku for line in basket.all_lines()}
+        site_configuration = basket.site.siteconfiguration
         try:
-            program = get_program(self.program_uuid, basket.site.siteconfiguration)
+            program = get_program(self.program_uuid, site_configuration)
         except (HttpNotFoundError, SlumberBaseException, Timeout):
             return False
 
-        if program and program['status'] == 'active':
-            applicable_seat_types = program['applicable_seat_types']
-        else:
+        if not program or program['status'] != 'active':
             return False
 
-        retrieve_entitlements = self._has_entitlements(program)
-        enrollments, entitlements = self._get_user_ownership_data(basket, retrieve_entitlements)
-
-        for course in program['courses']:
-            # If the user is already enrolled in a course, we do not need to check their basket for it
-            if any(enrollment['course_details']['course_id'] in [run['key'] for run in course['course_runs']] and
-                   enrollment['mode'] in applicable_seat_types for enrollment in enrollments):
-                continue
-            if any(course['uuid'] == entitlement['course_uuid'] and
-                   entitlement['mode'] in applicable_seat_types for entitlement in entitlements):
-                continue
-
-            # If the  basket has no SKUs left, but we still have courses over which
-            # to iterate, the user cannot meet the condition that all courses be represented.
-            if not basket_skus:
-                return False
-
-            # Get all of the SKUs that can satisfy this course
-            skus = set()
-            for course_run in course['course_runs']:
-                skus.update({seat['sku'] for seat in course_run['seats'] if seat['type'] in applicable_seat_types})
-            for entitlement in course['entitlements']:
-                if entitlement['mode'].lower() in applicable_seat_types:
-                    skus.add(entitlement['sku'])
-
-            # The lack of a difference in the set of SKUs in the basket and the course indicates that
-            # that there is no intersection. Therefore, the basket contains no SKUs for the current course.
-            # Because the user is also not enrolled in the course, it follows that the program condition is not met.
-            diff = basket_skus.difference(skus)
-            if diff == basket_skus:
-                return False
-
-            # If there is a difference between the basket SKUs and course SKUs, it represents the basket SKUs
-            # minus the SKUs for the current course. Since we have already verified the course is represented,
-            # its SKUs can be safely removed from the set of SKUs in the basket being checked. Note that this
-            # does NOT affect the actual basket, just our copy of its SKUs.
-            basket_skus = diff
-
-        return True
+        index = get_program_sku_index(self.program_uuid, program, site_configuration)
+        applicable_seat_types = index['applicable_seat_types']
+        enrollments, entitlements = self._get_user_ownership_data(basket, index['has_entitlements'])
+
+        # If the user is already enrolled in, or entitled to, a course, we do not need to check their basket for it
+        enrolled_course_run_keys = {
+            enrollment['course_details']['course_id'] for enrollment in enrollments
+            if enrollment['mode'] in applicable_seat_types
+        }
+        entitled_course_uuids = {
+            entitlement['course_uuid'] for entitlement in entitlements if entitlement['mode'] in applicable_seat_types
+        }
+        required_courses = {
+            position for position, course in enumerate(index['courses'])
+            if course['uuid'] not in entitled_course_uuids and
+            course['course_run_keys'].isdisjoint(enrolled_course_run_keys)
+        }
+
+        # Each SKU in the basket represents the first of the required courses, in program order, that it can
+        # satisfy. Checking the courses in order, and removing the SKUs of each represented course from the
+        # basket, gives the same result. The condition is met if every required course is represented.
+        represented_courses = set()
+        for sku in basket_skus:
+            position = next(
+                (position for position in index['courses_by_sku'].get(sku, ()) if position in required_courses),
+                None
+            )
+            if position is not None:
+                represented_courses.add(position)
+
+        return represented_courses == required_courses
 
     def can_apply_condition(self, line):
         """ Determines whether the condition can be applied to a given basket line. """
@@ -1,11 +1,13 @@
 from __future__ import absolute_import
 
+import json
 import uuid
 
 import httpretty
 from requests import ConnectionError as ReqConnectionError
 
-from ecommerce.programs.api import ProgramsApiClient
+from ecommerce.core.cache_utils import PROGRAM_CACHE_RESOURCE, ProcessTieredCache
+from ecommerce.programs.api import ProgramsApiClient, build_program_sku_index, get_program_sku_index_cache_key
 from ecommerce.programs.tests.mixins import ProgramTestMixin
 from ecommerce.tests.testcases import TestCase
 
@@ -37,3 +39,55 @@ class ProgramsApiClientTests(ProgramTestMixin, TestCase):
         self.client.site_domain = 'different-domain'
         with self.assertRaises(ReqConnectionError):
             self.client.get_program(program_uuid)
+
+    def test_get_program_compiles_sku_index(self):
+        """ The SKU index of the program should be cached along with the program data. """
+        program_uuid = str(uuid.uuid4())
+        program = {'uuid': program_uuid, 'applicable_seat_types': ['verified'], 'courses': []}
+        httpretty.register_uri(
+            httpretty.GET,
+            '{}/programs/{}/'.format(self.site_configuration.discovery_api_url.strip('/'), program_uuid),
+            body=json.dumps(program),
+            content_type='application/json'
+        )
+
+        self.client.get_program(program_uuid)
+
+        cached_response = ProcessTieredCache.get_cached_response(
+            PROGRAM_CACHE_RESOURCE, get_program_sku_index_cache_key(self.site.domain, program_uuid)
+        )
+        self.assertEqual(cached_response.value, build_program_sku_index(program))
+
+
+class BuildProgramSkuIndexTests(TestCase):
+    def test_build_program_sku_index(self):
+        """ The index should contain the SKUs of the applicable seats and entitlements of each course. """
+        program = {
+            'applicable_seat_types': ['verified', 'professional'],
+            'courses': [
+                {
+                    'uuid': 'course-1',
+                    'course_runs': [
+                        {'key': 'run-1', 'seats': [{'type': 'audit', 'sku': 'A1'}, {'type': 'verified', 'sku': 'V1'}]},
+                        {'key': 'run-2', 'seats': [{'type': 'professional', 'sku': 'P1'}]},
+                    ],
+                    'entitlements': [{'mode': 'Verified', 'sku': 'E1'}],
+                },
+                {
+                    'uuid': 'course-2',
+                    'course_runs': [{'key': 'run-3', 'seats': [{'type': 'verified', 'sku': 'V1'}]}],
+                    'entitlements': [],
+                },
+            ],
+        }
+
+        self.assertEqual(build_program_sku_index(program), {
+            'applicable_seat_types': frozenset(['verified', 'professional']),
+            'courses': [
+                {'uuid': 'course-1', 'course_run_keys': frozenset(['run-1', 'run-2'])},
+                {'uuid': 'course-2', 'course_run_keys': frozenset(['run-3'])},
+            ],
+            'courses_by_sku': {'V1': (0, 1), 'P1': (0,), 'E1': (0,)},
+            'has_entitlements': True,
+            'skus': frozenset(['V1', 'P1', 'E1']),
+        })
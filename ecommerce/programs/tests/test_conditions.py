@@ -316,3 +316,36 @@ class ProgramCourseRunSeatsConditionTests(ProgramTestMixin, TestCase):
                     break
 
         self.assertFalse(self.condition.is_satisfied(offer, basket))
+
+    def test_is_satisfied_with_shared_skus(self):
+        """ A SKU that belongs to several courses should only represent one of them. """
+        offer = factories.ProgramOfferFactory(partner=self.partner, condition=self.condition)
+        basket = BasketFactory(site=self.site, owner=UserFactory())
+        self.site.siteconfiguration.enable_partial_program = False
+        other_stockrecord = self.test_product.stockrecords.first()
+        shared_product = ProductFactory(
+            stockrecords__partner=other_stockrecord.partner, stockrecords__price_excl_tax=10, categories=[]
+        )
+        shared_sku = shared_product.stockrecords.first().partner_sku
+        other_sku = other_stockrecord.partner_sku
+        program = {
+            'status': 'active',
+            'applicable_seat_types': ['verified'],
+            'courses': [
+                {
+                    'uuid': 'course-{}'.format(i),
+                    'course_runs': [{'key': 'course-v1:org+course-{}+run'.format(i), 'seats': [
+                        {'type': 'verified', 'sku': sku} for sku in skus
+                    ]}],
+                    'entitlements': [],
+                }
+                for i, skus in enumerate([[shared_sku], [shared_sku, other_sku]])
+            ],
+        }
+        basket.add_product(shared_product)
+
+        with mock.patch('ecommerce.programs.conditions.get_program', return_value=program):
+            self.assertFalse(self.condition.is_satisfied(offer, basket))
+
+            basket.add_product(self.test_product)
+            self.assertTrue(self.condition.is_satisfied(offer, basket))
@@ -2,11 +2,13 @@ from __future__ import absolute_import
 
 import logging
 
+from django.conf import settings
 from requests.exceptions import ConnectionError as ReqConnectionError
 from requests.exceptions import Timeout
 from slumber.exceptions import HttpNotFoundError, SlumberBaseException
 
-from ecommerce.programs.api import ProgramsApiClient
+from ecommerce.core.cache_utils import PROGRAM_CACHE_RESOURCE, ProcessTieredCache
+from ecommerce.programs.api import ProgramsApiClient, build_program_sku_index, get_program_sku_index_cache_key
 
 log = logging.getLogger(__name__)
 
@@ -39,3 +41,28 @@ def get_program(program_uuid, siteconfiguration):
         log.debug(msg)
 
     return response
+
+
+def get_program_sku_index(program_uuid, program, siteconfiguration):
+    """
+    Returns the SKU index of the program, as compiled by ``build_program_sku_index``.
+
+    The index is compiled, and cached, when the program data is retrieved from the Discovery Service. It is
+    only compiled here if the cached index expired before the program data.
+
+    Args:
+        program_uuid (uuid): id of the program
+        program (dict): Program data, as returned by ``get_program``.
+        siteconfiguration (SiteConfiguration): Configuration of the site the program data was retrieved for.
+
+    Returns:
+        dict
+    """
+    cache_key = get_program_sku_index_cache_key(siteconfiguration.site.domain, str(program_uuid))
+    cached_response = ProcessTieredCache.get_cached_response(PROGRAM_CACHE_RESOURCE, cache_key)
+    if cached_response.is_found:
+        return cached_response.value
+
+    index = build_program_sku_index(program)
+    ProcessTieredCache.set_all_tiers(PROGRAM_CACHE_RESOURCE, cache_key, index, settings.PROGRAM_CACHE_TIMEOUT)
+    return index
@@ -256,6 +256,21 @@ ROOT_URLCONF = '{}.urls'.format(SITE_NAME)
 # Commerce API settings used for publishing information to LMS.
 COMMERCE_API_TIMEOUT = 7
 
+# Maximum number of courses published to LMS concurrently, when publishing many courses.
+LMS_PUBLISH_POOL_SIZE = 8
+# Number of times a publication which failed because of a server error is retried, and the delay before the first
+# retry, which doubles with each retry. The delay is in seconds. Failed connections are retried by the pooled
+# connections, as set by API_CLIENT_CONNECTION_POOL.
+LMS_PUBLISH_MAX_RETRIES = 2
+LMS_PUBLISH_RETRY_BACKOFF = 0.5
+# Number of courses loaded, and published, together by the publish_to_lms command.
+LMS_PUBLISH_BATCH_SIZE = 100
+# Maximum number of courses published by a single request to the bulk publish endpoint.
+LMS_BULK_PUBLISH_MAX_COURSES = 100
+
+# Maximum number of entitlements fetched concurrently from the LMS when checking for repeat purchases.
+ENTITLEMENT_API_POOL_SIZE = 4
+
 # Cache course info from course API.
 COURSES_API_CACHE_TIMEOUT = 3600  # Value is in seconds
 PROGRAM_CACHE_TIMEOUT = 3600  # Value is in seconds.
@@ -273,13 +288,64 @@ CREDIT_PROVIDER_CACHE_TIMEOUT = 600
 # Anonymous User Calculate Cache timeout
 ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT = 3600  # Value is in seconds.
 
+# Maximum number of SKU groups priced by a single request to the batch basket calculate endpoint
+BASKET_CALCULATE_BATCH_MAX_GROUPS = 100
+
 # LMS API settings used for fetching information from LMS
 LMS_API_CACHE_TIMEOUT = 30  # Value is in seconds.
 # END URL CONFIGURATION
 
 VOUCHER_CACHE_TIMEOUT = 10  # Value is in seconds.
+OFFER_INDEX_CACHE_TIMEOUT = 3600  # Value is in seconds.
+PRODUCT_CLASS_CACHE_TIMEOUT = 3600  # Value is in seconds.
+
+# Process-local cache tier kept in front of TieredCache, configured per cached resource.
+# max_size is the number of entries each worker process keeps; timeout is in seconds.
+PROCESS_CACHE_RESOURCES = {
+    'voucher': {'max_size': 2000, 'timeout': 10},
+    'course_info': {'max_size': 2000, 'timeout': 300},
+    'program': {'max_size': 200, 'timeout': 300},
+    'enterprise_learner': {'max_size': 2000, 'timeout': 60},
+    'offer_index': {'max_size': 1, 'timeout': 10},
+    'product_class': {'max_size': 20, 'timeout': 3600},
+}
 
 SDN_CHECK_REQUEST_TIMEOUT = 5  # Value is in seconds.
+# SDN check results are cached per individual, so the check made when a payment is submitted can be
+# answered from the results of the check made when the billing details were entered.
+SDN_CHECK_CACHE_TIMEOUT = 60 * 60  # Value is in seconds.
+# Number of threads making the SDN checks of billing details in the background, and the number of those checks
+# which can be pending. Checks started while that many are pending are skipped, and made when the payment is
+# submitted instead.
+SDN_PRESCREEN_POOL_SIZE = 4
+SDN_PRESCREEN_MAX_PENDING = 100
+
+# Embargo decisions of the LMS are cached per user, IP address and set of courses.
+EMBARGO_CHECK_CACHE_TIMEOUT = 300  # Value is in seconds.
+# Purchases are allowed if the embargo API does not respond within this time.
+EMBARGO_API_TIMEOUT = 2  # Value is in seconds.
+
+# Cache fills guarded against concurrent fetches of the same key wait at most SINGLE_FLIGHT_LOCK_TIMEOUT for the
+# fetch in progress. Until it completes, the expired value is served if it expired less than
+# SINGLE_FLIGHT_STALE_TIMEOUT ago.
+SINGLE_FLIGHT_LOCK_TIMEOUT = 10  # Value is in seconds.
+SINGLE_FLIGHT_STALE_TIMEOUT = 600  # Value is in seconds.
+
+# Site access tokens are renewed in the background once this fraction of their lifetime has passed.
+ACCESS_TOKEN_REFRESH_FRACTION = 0.75
+# Maximum time a single process may hold the lock for renewing a site's access token.
+ACCESS_TOKEN_REFRESH_LOCK_TIMEOUT = 10  # Value is in seconds.
+
+# Keep-alive connection pools shared by the REST API clients, one pool per upstream host.
+# POOL_SIZE is the number of connections each worker process keeps open to a host. MAX_RETRIES applies to
+# failed connections. Requests which time out, or fail, after being sent are not retried, and their errors are
+# raised as they are by requests. TIMEOUT is in seconds and applies when a caller sets none.
+API_CLIENT_CONNECTION_POOL = {
+    'POOL_SIZE': 10,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.1,
+    'TIMEOUT': 10,
+}
 
 # APP CONFIGURATION
 DJANGO_APPS = [
@@ -511,6 +577,7 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_THROTTLE_RATES': {
         'user': '75/minute',
+        'sdn_prescreen': '20/minute',
     },
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
     'TEST_REQUEST_RENDERER_CLASSES': (
@@ -687,6 +754,14 @@ if os.environ.get('ENABLE_DJANGO_TOOLBAR', False):
 # Determines if events are actually sent to Segment. This should only be set to False for testing purposes.
 SEND_SEGMENT_EVENTS = True
 
+# Segment events are queued in process, and a background thread hands them to the Segment client in batches,
+# so requests do not wait on the client. Events tracked while the queue is full are dropped.
+SEGMENT_EVENT_QUEUE_ENABLED = True
+SEGMENT_EVENT_QUEUE_SIZE = 10000
+SEGMENT_EVENT_BATCH_SIZE = 100
+# Longest time a batch waits for more events before it is sent.
+SEGMENT_EVENT_FLUSH_INTERVAL = 0.5  # Value is in seconds.
+
 NEW_CODES_EMAIL_CONFIG = {
     'email_subject': 'New edX codes available',
     'from_email': 'customersuccess@edx.org',
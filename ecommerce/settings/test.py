@@ -155,12 +155,15 @@ ENTERPRISE_API_URL = urljoin(ENTERPRISE_SERVICE_URL, 'api/v1/')
 
 # Don't bother sending fake events to Segment. Doing so creates unnecessary threads.
 SEND_SEGMENT_EVENTS = False
+# Events are handed to the Segment client when they are tracked, so tests can assert them.
+SEGMENT_EVENT_QUEUE_ENABLED = False
 
 # SPEED
 DEBUG = False
 TEMPLATE_DEBUG = False
 CELERY_EAGER_PROPAGATES_EXCEPTIONS = True
 BROKER_BACKEND = 'memory'
+LMS_PUBLISH_RETRY_BACKOFF = 0
 
 #SAILTHRU settings
 SAILTHRU_KEY = 'abc123'
@@ -0,0 +1,23 @@
+"""Python Social Auth pipeline functions."""
+from __future__ import absolute_import
+
+import logging
+
+from ecommerce.extensions.partner.strategy import update_user_country
+
+logger = logging.getLogger(__name__)
+
+
+def update_country(strategy, user=None, *args, **kwargs):  # pylint: disable=unused-argument,keyword-arg-before-vararg
+    """
+    Stores the country of the user's LMS account at login, so that selecting the user's strategy does not
+    have to fetch it.
+    """
+    if user is None or user.country is not None:
+        return
+
+    try:
+        update_user_country(strategy.request, user)
+    except Exception:  # pylint: disable=broad-except
+        # The country is fetched again, in the background, when the user's strategy is selected.
+        logger.exception('Failed to update the country of user [%s] at login.', user.username)
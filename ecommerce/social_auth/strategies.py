@@ -8,6 +8,12 @@ class CurrentSiteDjangoStrategy(EdxDjangoStrategy):
     Python Social Auth strategy which accounts for the current
     Site when enabling third party authentication.
     """
+    DEFAULT_SETTINGS = dict(
+        EdxDjangoStrategy.DEFAULT_SETTINGS,
+        SOCIAL_AUTH_PIPELINE=EdxDjangoStrategy.DEFAULT_SETTINGS['SOCIAL_AUTH_PIPELINE'] + (
+            'ecommerce.social_auth.pipeline.update_country',
+        )
+    )
 
     def get_setting(self, name):
         # Check the request's associated SiteConfiguration for the setting
@@ -0,0 +1,40 @@
+"""Tests of social auth pipeline functions."""
+from __future__ import absolute_import
+
+import mock
+from social_django.models import DjangoStorage
+
+from ecommerce.social_auth.pipeline import update_country
+from ecommerce.social_auth.strategies import CurrentSiteDjangoStrategy
+from ecommerce.tests.testcases import TestCase
+
+
+class UpdateCountryTests(TestCase):
+    """Tests of the update_country pipeline function."""
+
+    def setUp(self):
+        super(UpdateCountryTests, self).setUp()
+        self.strategy = CurrentSiteDjangoStrategy(DjangoStorage, self.request)
+
+    def test_pipeline(self):
+        """Verify the function is part of the login pipeline."""
+        pipeline = self.strategy.get_setting('SOCIAL_AUTH_PIPELINE')
+        self.assertIn('ecommerce.social_auth.pipeline.update_country', pipeline)
+
+    def test_update_country(self):
+        """Verify the country of a user whose country is unknown is stored at login."""
+        user = self.create_user(country=None)
+        with mock.patch('ecommerce.social_auth.pipeline.update_user_country') as mock_update:
+            update_country(self.strategy, user=user)
+        mock_update.assert_called_once_with(self.request, user)
+
+        user.country = 'IN'
+        with mock.patch('ecommerce.social_auth.pipeline.update_user_country') as mock_update:
+            update_country(self.strategy, user=user)
+        self.assertFalse(mock_update.called)
+
+    def test_update_country_failure(self):
+        """Verify login does not fail when the country cannot be stored."""
+        user = self.create_user(country=None)
+        with mock.patch('ecommerce.social_auth.pipeline.update_user_country', side_effect=Exception):
+            update_country(self.strategy, user=user)
@@ -205,6 +205,43 @@ define([
                 }
             },
 
+            getSdnCheckData: function() {
+                var firstName = $('input[name=first_name]').val(),
+                    lastName = $('input[name=last_name]').val(),
+                    city = $('input[name=city]').val(),
+                    country = $('select[name=country]').val();
+
+                if (!firstName || !lastName || !city || !country) {
+                    return null;
+                }
+                return {
+                    name: _s.sprintf('%s %s', firstName, lastName),
+                    city: city,
+                    country: country
+                };
+            },
+
+            sdnPrescreen: function() {
+                // Start the SDN check as soon as the billing details are entered, so that the check made
+                // when the payment is submitted is answered from the cache.
+                var data = BasketPage.getSdnCheckData();
+
+                if (data === null || _.isEqual(data, BasketPage.sdnPrescreenData)) {
+                    return;
+                }
+                BasketPage.sdnPrescreenData = data;
+
+                $.ajax({
+                    url: '/api/v2/sdn/prescreen/',
+                    method: 'POST',
+                    contentType: 'application/json; charset=utf-8',
+                    headers: {
+                        'X-CSRFToken': Cookies.get('ecommerce_csrftoken')
+                    },
+                    data: JSON.stringify(data)
+                });
+            },
+
             sdnCheck: function(event) {
                 var firstName = $('input[name=first_name]').val(),
                     lastName = $('input[name=last_name]').val(),
@@ -521,6 +558,14 @@ define([
                     BasketPage.detectCreditCard();
                 });
 
+                if ($('input[name=sdn-check]').val() === 'enabled') {
+                    $('input[name=first_name], input[name=last_name], input[name=city], select[name=country]').on(
+                        'change', function() {
+                            BasketPage.sdnPrescreen();
+                        }
+                    );
+                }
+
                 $('#quantity-update').on('click', function(e) {
                     BasketPage.validateQuantity(e);
                 });
@@ -417,6 +417,33 @@ define([
                         expect(ajaxData.city).toEqual(city);
                         expect(ajaxData.country).toEqual(country);
                     });
+
+                    it('should prescreen the billing details once they are entered', function() {
+                        var args,
+                            ajaxData;
+
+                        BasketPage.sdnPrescreenData = null;
+                        $('input[name=first_name]').val('Darth');
+                        $('input[name=last_name]').val('Vader');
+                        $('input[name=city]').val('');
+                        $('select[name=country]').val('US');
+
+                        spyOn($, 'ajax');
+                        BasketPage.sdnPrescreen();
+                        expect($.ajax).not.toHaveBeenCalled();
+
+                        $('input[name=city]').val('Death Star');
+                        BasketPage.sdnPrescreen();
+                        BasketPage.sdnPrescreen();
+
+                        expect($.ajax.calls.count()).toEqual(1);
+                        args = $.ajax.calls.argsFor(0)[0];
+                        ajaxData = JSON.parse(args.data);
+                        expect(args.url).toEqual('/api/v2/sdn/prescreen/');
+                        expect(ajaxData.name).toEqual('Darth Vader');
+                        expect(ajaxData.city).toEqual('Death Star');
+                        expect(ajaxData.country).toEqual('US');
+                    });
                 });
 
                 describe('cardInfoValidation', function() {
@@ -4,9 +4,10 @@ from django.conf import settings
 from django.test import LiveServerTestCase as DjangoLiveServerTestCase
 from django.test import TestCase as DjangoTestCase
 from django.test import TransactionTestCase as DjangoTransactionTestCase
-from edx_django_utils.cache import TieredCache
 from oscar.test.factories import CategoryFactory
 
+from ecommerce.core.cache_utils import ProcessTieredCache
+from ecommerce.core.http_pools import clear_api_client_pools
 from ecommerce.tests.mixins import SiteMixin, TestServerUrlMixin, TestWaffleFlagMixin, UserMixin
 
 # When all unit tests are run, the catalog category table will sometimes be empty. However, if only a single test
@@ -21,11 +22,14 @@ class TieredCacheMixin:
     # are moved to edx-django-utils, this can be replaced.
 
     def setUp(self):
-        TieredCache.dangerous_clear_all_tiers()
+        ProcessTieredCache.dangerous_clear_all_tiers()
+        # Connections opened while httpretty was enabled must not be reused by other tests.
+        clear_api_client_pools()
         super(TieredCacheMixin, self).setUp()
 
     def tearDown(self):
-        TieredCache.dangerous_clear_all_tiers()
+        ProcessTieredCache.dangerous_clear_all_tiers()
+        clear_api_client_pools()
         super(TieredCacheMixin, self).tearDown()
 
 